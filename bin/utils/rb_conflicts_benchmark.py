@@ -0,0 +1,88 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import click
+
+from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
+from indico.modules.rb.models.reservations import RepeatFrequency
+from indico.modules.rb.operations.conflicts import RoomConflictIndex
+from indico.modules.rb.util import TempReservationOccurrence
+from indico.util.benchmark import Benchmark
+from indico.web.flask.app import make_app
+
+
+DummyReservation = namedtuple('DummyReservation', ('id', 'is_accepted'))
+DummyOccurrence = namedtuple('DummyOccurrence', ('start_dt', 'end_dt', 'reservation'))
+
+
+def _naive_conflicts(candidates, occurrences):
+    # the nested loop the conflict checks used before `RoomConflictIndex` existed
+    conflicts = set()
+    pre_conflicts = set()
+    conflicting_candidates = set()
+    for candidate in candidates:
+        for occurrence in occurrences:
+            if candidate.overlaps(occurrence):
+                obj = TempReservationOccurrence(*candidate.get_overlap(occurrence), reservation=occurrence.reservation)
+                if occurrence.reservation.is_accepted:
+                    conflicting_candidates.add(candidate)
+                    conflicts.add(obj)
+                else:
+                    pre_conflicts.add(obj)
+    return conflicts, pre_conflicts, conflicting_candidates
+
+
+def _make_room_occurrences(rnd, start_dt, days, bookings_per_day):
+    occurrences = []
+    for day in range(days):
+        for n in range(bookings_per_day):
+            occ_start_dt = start_dt + timedelta(days=day, hours=n * 24 / bookings_per_day)
+            occurrences.append(DummyOccurrence(occ_start_dt, occ_start_dt + timedelta(minutes=rnd.choice((30, 60))),
+                                               DummyReservation(len(occurrences), rnd.random() > 0.1)))
+    return occurrences
+
+
+def _main(rooms, days, bookings_per_day, skip_naive):
+    rnd = random.Random(42)
+    start_dt = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = ReservationOccurrence.create_series(start_dt.replace(hour=9), start_dt.replace(hour=10) +
+                                                     timedelta(days=days - 1), (RepeatFrequency.DAY, 1, None))
+    rooms_occurrences = [_make_room_occurrences(rnd, start_dt, days, bookings_per_day) for __ in range(rooms)]
+    click.echo(f'{rooms} rooms, {len(candidates)} candidates, {days * bookings_per_day} occurrences per room')
+
+    click.echo('Index:  ', nl=False)
+    with Benchmark() as b:
+        indexed = [RoomConflictIndex(occurrences).get_conflicts(candidates) for occurrences in rooms_occurrences]
+    b.print_result(slow=1, veryslow=5)
+    if skip_naive:
+        return
+    click.echo('Naive:  ', nl=False)
+    with Benchmark() as b:
+        naive = [_naive_conflicts(candidates, occurrences) for occurrences in rooms_occurrences]
+    b.print_result(slow=1, veryslow=5)
+    if indexed != naive:
+        raise click.ClickException('Results differ')
+
+
+@click.command()
+@click.option('--rooms', type=int, default=100, show_default=True, help='Number of rooms')
+@click.option('--days', type=int, default=365, show_default=True, help='Length of the daily booking series')
+@click.option('--bookings-per-day', type=int, default=8, show_default=True,
+              help='Number of existing bookings per room and day')
+@click.option('--skip-naive', is_flag=True, help='Only benchmark the indexed conflict check')
+def main(rooms, days, bookings_per_day, skip_naive):
+    """Compare the indexed room conflict check with a naive nested loop."""
+    with make_app().app_context():
+        _main(rooms, days, bookings_per_day, skip_naive)
+
+
+if __name__ == '__main__':
+    main()
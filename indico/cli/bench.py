@@ -0,0 +1,341 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import json
+import sys
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from io import BytesIO
+
+import click
+from flask import current_app, session
+from sqlalchemy.orm import subqueryload
+
+import indico
+from indico.cli.core import cli_group
+from indico.core.db import db
+from indico.modules.categories import Category
+from indico.modules.events import Event
+from indico.modules.events.contributions.models.contributions import Contribution
+from indico.modules.events.export import export_event
+from indico.modules.events.models.events import EventType
+from indico.modules.events.registration.models.forms import RegistrationForm
+from indico.modules.events.registration.models.items import PersonalDataType
+from indico.modules.events.registration.models.registrations import Registration, RegistrationData, RegistrationState
+from indico.modules.events.registration.util import create_personal_data_fields, generate_spreadsheet_from_registrations
+from indico.modules.events.timetable.legacy import TimetableSerializer
+from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
+from indico.modules.rb.models.locations import Location
+from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
+from indico.modules.rb.models.reservations import RepeatFrequency, Reservation
+from indico.modules.rb.models.rooms import Room
+from indico.modules.rb.operations.bookings import get_rooms_availability
+from indico.modules.rb.operations.rooms import search_for_rooms
+from indico.modules.search.base import SearchTarget
+from indico.modules.search.internal import InternalSearch
+from indico.modules.users import User
+from indico.modules.users.util import get_user_by_email
+from indico.util.benchmark import compare_results, measure
+from indico.util.date_time import now_utc
+from indico.util.spreadsheets import generate_csv
+from indico.web.flask.util import url_for
+
+
+#: The title of the category containing all the synthetic data
+BENCHMARK_CATEGORY_TITLE = 'Benchmark data'
+#: The name of the room booking location containing the synthetic rooms
+BENCHMARK_LOCATION_NAME = 'Benchmark'
+#: The email address of the user owning the synthetic data
+BENCHMARK_USER_EMAIL = 'benchmark@example.com'
+
+_topics = ('particle physics', 'detector development', 'computing', 'accelerator physics', 'outreach')
+_benchmarks = {}
+
+
+@dataclass
+class BenchmarkData:
+    """The IDs of the objects the benchmarks run against."""
+
+    root_category_id: int
+    category_id: int
+    event_id: int
+    regform_id: int | None
+    location_id: int | None
+    export_event_id: int | None
+    user_id: int
+
+
+def benchmark(name):
+    """Register a benchmark.
+
+    The decorated function receives a `BenchmarkData` object and runs
+    inside a fresh app and request context.
+    """
+    def decorator(fn):
+        _benchmarks[name] = fn
+        return fn
+    return decorator
+
+
+@cli_group()
+def cli():
+    pass
+
+
+def _get_benchmark_category():
+    return Category.query.filter_by(title=BENCHMARK_CATEGORY_TITLE, is_deleted=False).first()
+
+
+def _get_benchmark_user():
+    user = get_user_by_email(BENCHMARK_USER_EMAIL)
+    if user is None:
+        user = User(first_name='Benchmark', last_name='User', email=BENCHMARK_USER_EMAIL)
+        db.session.add(user)
+    return user
+
+
+def _seed_event(index, category, user, num_contributions, num_registrations):
+    topic = _topics[index % len(_topics)]
+    start_dt = now_utc(exact=False).replace(hour=8, minute=0) + timedelta(days=index - 180)
+    event = Event(creator=user, category=category, title=f'Benchmark event {index} on {topic}',
+                  type_=EventType.conference, timezone='UTC', acl_entries=set(), start_dt=start_dt,
+                  end_dt=start_dt + timedelta(minutes=20 * num_contributions + 60))
+    for i in range(num_contributions):
+        contrib = Contribution(event=event, title=f'Contribution {i} about {topic}', duration=timedelta(minutes=20))
+        db.session.add(TimetableEntry(event=event, object=contrib, type=TimetableEntryType.CONTRIBUTION,
+                                      start_dt=start_dt + timedelta(minutes=20 * i)))
+    if num_registrations:
+        regform = RegistrationForm(event=event, title='Registration', currency='EUR')
+        create_personal_data_fields(regform)
+        for field in regform.sections[0].fields:
+            field.is_enabled = True
+        db.session.flush()
+        fields = {field.personal_data_type: field for field in regform.sections[0].fields}
+        for i in range(num_registrations):
+            values = {PersonalDataType.email: f'participant{i}@example.com',
+                      PersonalDataType.first_name: f'Participant{i}',
+                      PersonalDataType.last_name: f'Benchmark{index}',
+                      PersonalDataType.position: 'Researcher',
+                      PersonalDataType.phone: f'+41 22 767 {i:04d}'}
+            registration = Registration(event=event, registration_form=regform, currency='EUR',
+                                        state=RegistrationState.complete, email=values[PersonalDataType.email],
+                                        first_name=values[PersonalDataType.first_name],
+                                        last_name=values[PersonalDataType.last_name])
+            registration.data = [RegistrationData(field_data=fields[pd_type].current_data, data=value)
+                                 for pd_type, value in values.items()]
+    db.session.flush()
+
+
+def _seed_rooms(user, num_rooms, num_bookings):
+    location = Location(name=BENCHMARK_LOCATION_NAME)
+    for i in range(num_rooms):
+        room = Room(location=location, building=str(100 + i // 10), floor=str(i % 5), number=f'{i:03d}',
+                    owner=user, capacity=10 * (1 + i % 5), verbose_name=None)
+        for j in range(num_bookings):
+            day = date.today() + timedelta(days=j - num_bookings // 2)
+            reservation = Reservation(room=room, booked_for_user=user, created_by_user=user,
+                                      booking_reason='Benchmark', repeat_frequency=RepeatFrequency.NEVER,
+                                      repeat_interval=0, start_dt=datetime.combine(day, time(8 + j % 9)),
+                                      end_dt=datetime.combine(day, time(9 + j % 9)))
+            ReservationOccurrence.create_series_for_reservation(reservation)
+            db.session.add(reservation)
+    db.session.flush()
+
+
+@cli.command()
+@click.option('--categories', type=click.IntRange(1), default=20, show_default=True,
+              help='Number of categories')
+@click.option('--events', type=click.IntRange(1), default=200, show_default=True,
+              help='Number of events')
+@click.option('--contributions', type=click.IntRange(0), default=50, show_default=True,
+              help='Number of contributions per event')
+@click.option('--registrations', type=click.IntRange(0), default=100, show_default=True,
+              help='Number of registrations per event')
+@click.option('--export-contributions', type=click.IntRange(0), default=5000, show_default=True,
+              help='Number of contributions in the event used to benchmark event exports')
+@click.option('--rooms', type=click.IntRange(0), default=50, show_default=True,
+              help='Number of rooms')
+@click.option('--bookings', type=click.IntRange(0), default=20, show_default=True,
+              help='Number of bookings per room')
+@click.confirmation_option(prompt='This adds lots of synthetic data to the database. Never do this on a production '
+                                  'instance! Continue?')
+def seed(categories, events, contributions, registrations, export_contributions, rooms, bookings):
+    """Create synthetic data to run the benchmarks against.
+
+    All events are created inside a new top-level category named
+    "Benchmark data" and all rooms in a new location named "Benchmark".
+    """
+    if _get_benchmark_category():
+        click.secho(f'The benchmark data already exists; delete the "{BENCHMARK_CATEGORY_TITLE}" category first',
+                    fg='red')
+        sys.exit(1)
+    user = _get_benchmark_user()
+    root = Category(parent=Category.get_root(), title=BENCHMARK_CATEGORY_TITLE)
+    subcategories = [Category(parent=root, title=f'Benchmark category {i}') for i in range(categories)]
+    db.session.flush()
+    with click.progressbar(range(events), label='Creating events') as bar:
+        for i in bar:
+            _seed_event(i, subcategories[i % categories], user, contributions, registrations)
+    if export_contributions:
+        # the only event directly inside the benchmark category
+        click.echo('Creating export event')
+        _seed_event(events, root, user, export_contributions, 0)
+    if rooms:
+        click.echo('Creating rooms')
+        _seed_rooms(user, rooms, bookings)
+    db.session.commit()
+    click.secho('Benchmark data created', fg='green')
+
+
+def _get_benchmark_data():
+    root = _get_benchmark_category()
+    if root is None:
+        click.secho('There is no benchmark data; create it using `indico bench seed`', fg='red')
+        sys.exit(1)
+    event = (Event.query
+             .filter(Event.category_chain_overlaps(root.id), ~Event.is_deleted)
+             .order_by(Event.id)
+             .first())
+    regform = event.registration_forms[0] if event.registration_forms else None
+    location = Location.query.filter_by(name=BENCHMARK_LOCATION_NAME, is_deleted=False).first()
+    large_event = Event.query.filter_by(category_id=root.id, is_deleted=False).first()
+    return BenchmarkData(root_category_id=root.id, category_id=event.category_id, event_id=event.id,
+                         regform_id=regform.id if regform else None, location_id=location.id if location else None,
+                         export_event_id=large_event.id if large_event else None,
+                         user_id=_get_benchmark_user().id)
+
+
+@contextmanager
+def _benchmark_context():
+    # every run gets a fresh app/request context and database session, so
+    # nothing is cached between runs unless it would also be cached between
+    # separate requests
+    with current_app.app_context(), current_app.test_request_context():
+        try:
+            yield
+        finally:
+            db.session.rollback()
+            db.session.remove()
+
+
+def _get(url):
+    resp = current_app.test_client().get(url)
+    if resp.status_code != 200:
+        raise click.ClickException(f'Request to {url} failed: {resp.status}')
+    return resp.get_data()
+
+
+@benchmark('category_display')
+def _bench_category_display(data):
+    _get(url_for('categories.display', category_id=data.category_id, _external=True))
+
+
+@benchmark('timetable_serialization')
+def _bench_timetable_serialization(data):
+    TimetableSerializer(Event.get(data.event_id)).serialize_timetable()
+
+
+@benchmark('registration_export')
+def _bench_registration_export(data):
+    if data.regform_id is None:
+        return
+    regform = RegistrationForm.get(data.regform_id)
+    registrations = (Registration.query.with_parent(regform)
+                     .filter(Registration.is_active)
+                     .options(subqueryload('data'))
+                     .order_by(Registration.friendly_id)
+                     .all())
+    headers, rows = generate_spreadsheet_from_registrations(registrations, regform.active_fields,
+                                                            ['reg_date', 'state'])
+    generate_csv(headers, rows)
+
+
+@benchmark('room_availability')
+def _bench_room_availability(data):
+    if data.location_id is None:
+        return
+    session.set_session_user(User.get(data.user_id))
+    start_dt = datetime.combine(date.today(), time(10))
+    end_dt = datetime.combine(date.today() + timedelta(days=27), time(11))
+    filters = {'location_id': data.location_id, 'start_dt': start_dt, 'end_dt': end_dt,
+               'repeat_frequency': RepeatFrequency.DAY, 'repeat_interval': 1}
+    rooms = search_for_rooms(filters, availability=True).all()
+    get_rooms_availability(rooms, start_dt, end_dt, RepeatFrequency.DAY, 1, None)
+
+
+@benchmark('internal_search')
+def _bench_internal_search(data):
+    search = InternalSearch()
+    search.search('physics', page=1, object_types=[SearchTarget.event], category_id=data.root_category_id)
+    search.search('physics', page=1, object_types=[SearchTarget.contribution, SearchTarget.subcontribution],
+                  category_id=data.root_category_id)
+
+
+@benchmark('http_api_export')
+def _bench_http_api_export(data):
+    # the `nc` argument bypasses the API cache so we measure building the data
+    _get(url_for('api.httpapi', path=f'categ/{data.category_id}.json', detail='contributions', nc='yes',
+                 _external=True, **{'from': '-365d', 'to': '365d'}))
+
+
+@benchmark('event_export')
+def _bench_event_export(data):
+    if data.export_event_id is None:
+        return
+    export_event(Event.get(data.export_event_id), BytesIO(), dummy_files=True)
+
+
+@cli.command()
+@click.option('-o', '--output', type=click.File('w'), help='Save the results as JSON to this file')
+@click.option('-n', '--repeat', type=click.IntRange(1), default=5, show_default=True,
+              help='How often to run each benchmark')
+@click.option('-w', '--warmup', type=click.IntRange(0), default=1, show_default=True,
+              help='How often to run each benchmark before measuring it')
+@click.option('-b', '--benchmark', 'names', type=click.Choice(list(_benchmarks)), multiple=True,
+              help='Only run the given benchmark (can be used multiple times)')
+def run(output, repeat, warmup, names):
+    """Run benchmarks of performance-critical code paths.
+
+    The benchmarks use the data created by `indico bench seed`.  The
+    results can be saved to a file and compared with the results from
+    another revision using `indico bench compare`.
+    """
+    data = _get_benchmark_data()
+    results = {}
+    for name, func in _benchmarks.items():
+        if names and name not in names:
+            continue
+        click.echo(f'{name:<30}', nl=False)
+        results[name] = result = measure(partial(func, data), repeat=repeat, warmup=warmup,
+                                         setup=_benchmark_context)
+        click.echo(f'{result["median"]:.05f}s (min {result["min"]:.05f}s, {result["queries"]} queries)')
+    if output:
+        json.dump({'indico_version': indico.__version__,
+                   'created_dt': now_utc().isoformat(),
+                   'objects': asdict(data),
+                   'results': results}, output, indent=2)
+
+
+@cli.command()
+@click.argument('baseline', type=click.File())
+@click.argument('current', type=click.File())
+@click.option('-t', '--threshold', type=click.FloatRange(0), default=10, show_default=True,
+              help='Report benchmarks which got more than this percentage slower')
+def compare(baseline, current, threshold):
+    """Compare the results of two benchmark runs.
+
+    The exit code is 1 if any of the benchmarks in CURRENT is slower or
+    runs more queries than in BASELINE.
+    """
+    comparison = compare_results(json.load(baseline)['results'], json.load(current)['results'], threshold / 100)
+    for name, old, new, change, regressed in comparison:
+        color = 'red' if regressed else ('green' if change < -threshold / 100 else None)
+        click.secho(f'{name:<30}{old:.05f}s -> {new:.05f}s ({change:+.1%})', fg=color)
+    if any(regressed for *__, regressed in comparison):
+        sys.exit(1)
@@ -83,6 +83,11 @@ def maint():
     """Perform maintenance operations."""
 
 
+@cli.group(cls=LazyGroup, import_name='indico.cli.bench:cli')
+def bench():
+    """Run performance benchmarks."""
+
+
 @cli.command(context_settings={'ignore_unknown_options': True, 'allow_extra_args': True}, add_help_option=False)
 @click.option('--watchfiles', is_flag=True, help='Run celery inside watchfiles auto-reloader')
 @click.pass_context
@@ -124,13 +124,16 @@ def export(id, target_file, is_category, keep_uuids, use_pickle, dummy_files, ex
                    'but write the mapping to the indicated Pickle file to be processed afterwards. This is '
                    'an unsupported feature for very advanced use-cases; you almost certainly do not need '
                    'to use it.')
+@click.option('-b', '--bulk', is_flag=True,
+              help='Insert the imported rows in batches. This is much faster when importing large events or '
+                   'categories.')
 def import_(source_file, create_users, create_affiliations, force, verbose, yes, category_id,
-            id_map_path: Path | None = None, files_map_path: Path | None = None):
+            id_map_path: Path | None = None, files_map_path: Path | None = None, bulk=False):
     """Import an event exported from another Indico instance."""
     click.echo('Importing event/category...')
     obj, id_map, files_map = import_event(source_file, category_id, create_users=create_users,
                                           create_affiliations=create_affiliations, verbose=verbose, force=force,
-                                          skip_external_files=(files_map_path is not None))
+                                          skip_external_files=(files_map_path is not None), bulk=bulk)
     if obj is None:
         click.secho('Import failed.', fg='red')
         sys.exit(1)
@@ -6,12 +6,19 @@
 # LICENSE file for more details.
 
 import functools
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import timedelta
 
 from flask import current_app, request
-from flask_multipass import InvalidCredentials, Multipass, NoSuchUser
+from flask_multipass import IdentityInfo, InvalidCredentials, Multipass, NoSuchUser
 from werkzeug.local import LocalProxy
 
 from indico.core import signals
+from indico.core.cache import make_scoped_cache
 from indico.core.config import config
 from indico.core.limiter import make_rate_limiter
 from indico.core.logger import Logger
@@ -21,6 +28,12 @@ from indico.util.signals import values_from_signal
 logger = Logger.get('auth')
 login_rate_limiter = LocalProxy(functools.cache(lambda: make_rate_limiter('login', config.FAILED_LOGIN_RATE_LIMIT)))
 signup_rate_limiter = LocalProxy(functools.cache(lambda: make_rate_limiter('signup', config.SIGNUP_RATE_LIMIT)))
+identity_search_cache = make_scoped_cache('identity-search')
+
+#: How long the results of searching identities are cached
+IDENTITY_SEARCH_CACHE_TTL = timedelta(minutes=5)
+#: The maximum number of identity provider searches running at the same time
+IDENTITY_SEARCH_THREADS = 8
 
 
 class IndicoMultipass(Multipass):
@@ -104,6 +117,56 @@ class IndicoMultipass(Multipass):
             else:
                 raise ValueError('There is no default auth provider')
 
+    def search_identities(self, providers=None, exact=False, *, cache=False, **criteria):
+        """Search user identities matching certain criteria.
+
+        When searching interactively (i.e. with `cache` enabled), all
+        identity providers are searched at the same time.  Providers that do
+        not respond within their ``search_timeout`` setting (by default
+        :data:`IDENTITY_SEARCH_TIMEOUT`) are skipped, so a slow provider does
+        not hold up the results from the other ones.  Otherwise the providers
+        are searched one after another and their results are always complete.
+
+        :param providers: A list of providers to search in.  If not
+                          specified, all providers are searched.
+        :param exact: If criteria need to match exactly
+        :param cache: Whether the results may be cached for a short time.
+                      In that case, searches that took too long are still
+                      cached when they finish, so repeating the search
+                      includes their results.
+        :param criteria: The criteria to search for.
+        :return: A list of matching identities.
+        """
+        if not cache:
+            return list(super().search_identities(providers, exact, **criteria))
+        search_providers = [p for p in self.identity_providers.values()
+                            if p.supports_search and (providers is None or p.name in providers)]
+        identities = []
+        pending = {}
+        for provider in search_providers:
+            cache_key = _get_identity_search_cache_key(provider, exact, criteria)
+            if (cached := identity_search_cache.get(cache_key)) is not None:
+                identities += [_load_identity(provider, state) for state in cached]
+            else:
+                pending[provider] = cache_key
+        if not pending:
+            return identities
+        app = current_app._get_current_object()
+        # searches that take too long keep running in the background so their results get cached
+        executor = _get_identity_search_executor()
+        futures = {provider: executor.submit(_search_provider_identities, app, provider, exact, criteria, cache_key)
+                   for provider, cache_key in pending.items()}
+        start = time.monotonic()
+        for provider, future in futures.items():
+            timeout = provider.settings.get('search_timeout', config.IDENTITY_SEARCH_TIMEOUT)
+            try:
+                identities += future.result(timeout=max(0, start + timeout - time.monotonic()))
+            except FutureTimeoutError:
+                logger.warning('Searching identities in %s took more than %ss', provider.name, timeout)
+            except Exception:
+                logger.exception('Searching identities in %s failed', provider.name)
+        return identities
+
     def handle_auth_error(self, exc, redirect_to_login=False):
         if isinstance(exc, (NoSuchUser, InvalidCredentials)):
             if not getattr(exc, '_indico_no_rate_limit', False):
@@ -127,4 +190,36 @@ class IndicoMultipass(Multipass):
         return super().handle_login_form(provider, data)
 
 
+def _get_identity_search_cache_key(provider, exact, criteria):
+    criteria = {key: sorted(value) if isinstance(value, (list, set, tuple)) else value
+                for key, value in criteria.items()}
+    data = json.dumps([provider.name, exact, criteria], sort_keys=True)
+    return f'{provider.name}-{hashlib.sha256(data.encode()).hexdigest()}'
+
+
+def _dump_identity(identity):
+    # the provider object cannot be pickled, and creating a new IdentityInfo from the
+    # data would apply the provider's data mapping again, so we cache its attributes
+    return {key: value for key, value in vars(identity).items() if key != 'provider'}
+
+
+def _load_identity(provider, state):
+    identity = IdentityInfo.__new__(IdentityInfo)
+    vars(identity).update(state, provider=provider)
+    return identity
+
+
+@functools.cache
+def _get_identity_search_executor():
+    return ThreadPoolExecutor(IDENTITY_SEARCH_THREADS, thread_name_prefix='identity-search')
+
+
+def _search_provider_identities(app, provider, exact, criteria, cache_key):
+    with app.app_context():
+        identities = list(provider.search_identities(provider.map_search_criteria(criteria), exact=exact))
+        identity_search_cache.set(cache_key, [_dump_identity(identity) for identity in identities],
+                                  timeout=IDENTITY_SEARCH_CACHE_TTL)
+    return identities
+
+
 multipass = IndicoMultipass()
@@ -0,0 +1,87 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import threading
+import time
+
+import pytest
+from flask_multipass import IdentityInfo, IdentityProvider
+
+from indico.core.auth import IndicoMultipass, _get_identity_search_cache_key, identity_search_cache, multipass
+
+
+class FakeSearchProvider(IdentityProvider):
+    supports_search = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.searches = 0
+        if not self.settings.get('slow'):
+            self.release.set()
+
+    def search_identities(self, criteria, exact=False):
+        self.searches += 1
+        self.release.wait(5)
+        yield IdentityInfo(self, f'{self.name}-1', email=f'{self.name}@example.test')
+
+
+@pytest.fixture
+def search_providers(mocker):
+    providers = {
+        'fast': FakeSearchProvider(multipass, 'fast', {}),
+        'slow': FakeSearchProvider(multipass, 'slow', {'slow': True, 'search_timeout': 0.1}),
+    }
+    mocker.patch.object(IndicoMultipass, 'identity_providers', new_callable=mocker.PropertyMock,
+                        return_value=providers)
+    yield providers
+    for provider in providers.values():
+        provider.release.set()
+    identity_search_cache.clear()
+
+
+def _wait_for_cached_search(provider, cache_key):
+    for __ in range(50):
+        if identity_search_cache.get(cache_key) is not None:
+            return
+        time.sleep(0.02)
+    raise AssertionError(f'Search in {provider.name} did not finish')
+
+
+def test_search_identities_timeout(search_providers):
+    fast, slow = search_providers['fast'], search_providers['slow']
+    identities = multipass.search_identities(cache=True, email='test')
+    assert [ident.identifier for ident in identities] == ['fast-1']
+    assert fast.searches == slow.searches == 1
+
+
+def test_search_identities_no_timeout(search_providers):
+    # non-interactive searches (e.g. checking group memberships) must be complete
+    fast, slow = search_providers['fast'], search_providers['slow']
+    threading.Timer(0.3, slow.release.set).start()
+    identities = multipass.search_identities(email='test')
+    assert {ident.identifier for ident in identities} == {'fast-1', 'slow-1'}
+    assert fast.searches == slow.searches == 1
+    assert identity_search_cache.get(_get_identity_search_cache_key(slow, False, {'email': 'test'})) is None
+
+
+def test_search_identities_cache(search_providers):
+    fast, slow = search_providers['fast'], search_providers['slow']
+    identities = multipass.search_identities(cache=True, email='test')
+    assert [ident.identifier for ident in identities] == ['fast-1']
+    # the slow search finishes in the background and its results are cached
+    slow.release.set()
+    _wait_for_cached_search(slow, _get_identity_search_cache_key(slow, False, {'email': 'test'}))
+    identities = multipass.search_identities(cache=True, email='test')
+    assert {(ident.provider, ident.identifier, ident.data['email']) for ident in identities} == {
+        (fast, 'fast-1', 'fast@example.test'),
+        (slow, 'slow-1', 'slow@example.test'),
+    }
+    assert fast.searches == slow.searches == 1
+    # different criteria are not cached
+    multipass.search_identities(cache=True, email='other')
+    assert fast.searches == slow.searches == 2
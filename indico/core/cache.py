@@ -6,15 +6,16 @@
 # LICENSE file for more details.
 
 from datetime import timedelta
+from functools import lru_cache
 
 from cachelib.serializers import RedisSerializer
 from flask_caching import Cache
 from flask_caching.backends.rediscache import RedisCache
-from redis import RedisError
-from redis import from_url as redis_from_url
+from redis import Redis, RedisError
 
 from indico.core.config import config
 from indico.core.logger import Logger
+from indico.web.flask.stats import track_time
 
 
 _logger = Logger.get('cache')
@@ -42,6 +43,14 @@ class NoneWrappingRedisSerializer(RedisSerializer):
         return super().dumps(CachedNone.wrap(value), *args, **kwargs)
 
 
+class _TimedRedis(Redis):
+    """A redis client recording the time spent in commands in the request stats."""
+
+    def execute_command(self, *args, **options):
+        with track_time('redis'):
+            return super().execute_command(*args, **options)
+
+
 class IndicoRedisCache(RedisCache):
     """
     This is similar to the original RedisCache from Flask-Caching, but it
@@ -65,7 +74,7 @@ class IndicoRedisCache(RedisCache):
         key_prefix = config.get('CACHE_KEY_PREFIX')
         if key_prefix:
             kwargs['key_prefix'] = key_prefix
-        kwargs['host'] = redis_from_url(config['CACHE_REDIS_URL'], socket_timeout=1)
+        kwargs['host'] = _TimedRedis.from_url(config['CACHE_REDIS_URL'], socket_timeout=1)
         return IndicoRedisCache(*args, **kwargs)
 
 
@@ -88,7 +97,7 @@ class ScopedCache:
     def add(self, key, value, timeout=None):
         if isinstance(timeout, timedelta):
             timeout = int(timeout.total_seconds())
-        self.cache.add(self._scoped(key), value, timeout=timeout)
+        return self.cache.add(self._scoped(key), value, timeout=timeout)
 
     def delete(self, key):
         self.cache.delete(self._scoped(key))
@@ -152,11 +161,12 @@ class IndicoCache(Cache):
         if isinstance(timeout, timedelta):
             timeout = int(timeout.total_seconds())
         try:
-            super().add(key, value, timeout=timeout)
+            return super().add(key, value, timeout=timeout)
         except RedisError:
             if config.DEBUG:
                 raise
             _logger.exception('add(%r) failed', key)
+            return False
 
     def delete(self, key):
         try:
@@ -213,6 +223,19 @@ class IndicoCache(Cache):
             return dict.fromkeys(keys, default)
 
 
+@lru_cache
+def get_redis_client(socket_timeout=1):
+    """Get a client for the redis server used by the cache.
+
+    This is meant for data that is stored in redis directly instead of
+    going through the cache, e.g. because it uses other redis data types.
+    Unlike cache keys, the keys used with it are not prefixed automatically.
+
+    :param socket_timeout: How long (in seconds) to wait for redis
+    """
+    return _TimedRedis.from_url(config.REDIS_CACHE_URL, socket_timeout=socket_timeout)
+
+
 def make_scoped_cache(scope):
     """Create a new scoped cache.
 
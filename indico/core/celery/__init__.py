@@ -49,6 +49,7 @@ def _load_default_modules(app, **kwargs):
 @import_modules.connect
 def _import_modules(*args, **kwargs):
     import indico.core.emails  # noqa: F401,RUF100
+    import indico.legacy.pdfinterface.tasks  # noqa: F401
     import indico.util.tasks  # noqa: F401
     signals.core.import_tasks.send()
 
@@ -66,12 +66,14 @@ DEFAULTS = {
     'ENABLE_APPLE_WALLET': False,
     'ENABLE_GOOGLE_WALLET': False,
     'ENABLE_ROOMBOOKING': False,
+    'ENDPOINT_STATS': False,
     'EXPERIMENTAL_EDITING_SERVICE': False,
     'EXTERNAL_REGISTRATION_URL': None,
     'HELP_URL': 'https://learn.getindico.io',
     'FAILED_LOGIN_RATE_LIMIT': '5 per 15 minutes; 10 per day',
     'FAVICON_URL': None,
     'IDENTITY_PROVIDERS': {},
+    'IDENTITY_SEARCH_TIMEOUT': 3,
     'LATEX_RATE_LIMIT': '2 per 3 seconds',
     'LOCAL_IDENTITIES': True,
     'LOCAL_USERNAMES': True,
@@ -106,9 +108,12 @@ DEFAULTS = {
     'SIGNUP_RATE_LIMIT': '2 per hour; 5 per day',
     'SMTP_ALLOWED_SENDERS': set(),
     'SMTP_CERTFILE': None,
+    'SMTP_DOMAIN_RATE_LIMIT': None,
     'SMTP_KEYFILE': None,
     'SMTP_LOGIN': None,
     'SMTP_PASSWORD': None,
+    'SMTP_RATE_LIMIT': None,
+    'SMTP_REUSE_CONNECTION': False,
     'SMTP_SENDER_FALLBACK': None,
     'SMTP_SERVER': ('localhost', 25),
     'SMTP_TIMEOUT': 30,
@@ -127,6 +132,7 @@ DEFAULTS = {
     'SUPPORT_EMAIL': None,
     'SYSTEM_NOTICES_URL': 'https://getindico.io/notices.yml',
     'TEMP_DIR': '/opt/indico/tmp',
+    'USER_SEARCH_TIMEOUT': 2,
     'USE_PROXY': False,
     'WALLET_LOGO_URL': None,
     'WORKER_NAME': socket.getfqdn(),
@@ -7,11 +7,12 @@
 
 import itertools
 
-from flask import has_request_context, session
+from flask import g, has_request_context, request, session
 from sqlalchemy import inspect
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import load_only, selectinload
 from sqlalchemy.orm.base import NEVER_SET, NO_VALUE
 
 from indico.core import signals
@@ -559,6 +560,169 @@ class ProtectionManagersMixin(ProtectionMixin):
             return set()
 
 
+def apply_acl_entry_strategy(rel, principal):
+    """Apply a loader strategy loading the principals of ACL entries.
+
+    Only the IDs of the principals are loaded; that's all that is needed
+    to check whether a user is covered by an ACL entry.
+
+    :param rel: A loader option for an ``acl_entries`` relationship
+    :param principal: The ACL entry class of the relationship
+    """
+    user_strategy = rel.joinedload('user')
+    user_strategy.lazyload('*')
+    user_strategy.load_only('id')
+    rel.joinedload('local_group').load_only('id')
+    if principal.allow_networks:
+        rel.joinedload('ip_network_group').load_only('id')
+    if principal.allow_category_roles:
+        rel.joinedload('category_role').load_only('id')
+    if principal.allow_event_roles:
+        rel.joinedload('event_role').load_only('id')
+    if principal.allow_registration_forms:
+        rel.joinedload('registration_form').load_only('id')
+    return rel
+
+
+def can_access_many(objs, user, allow_admin=True):
+    """Check if the user can access each of the given objects.
+
+    This is equivalent to calling `~ProtectionMixin.can_access` on every
+    object, but the data needed for the checks is loaded in bulk first,
+    so the number of queries does not depend on the number of objects.
+
+    :param objs: The objects to check
+    :param user: The :class:`.User` to check. May be None if the
+                 user is not logged in.
+    :param allow_admin: If admin users should always have access
+    :return: A dict mapping each object to the result of the check
+    """
+    objs = list(objs)
+    preload_protection_data(objs, user)
+    return {obj: obj.can_access(user, allow_admin=allow_admin) for obj in objs}
+
+
+def can_manage_many(objs, user, permission=None, allow_admin=True):
+    """Check if the user can manage each of the given objects.
+
+    Like `can_access_many`, but for `~ProtectionManagersMixin.can_manage`.
+
+    :return: A dict mapping each object to the result of the check
+    """
+    objs = list(objs)
+    preload_protection_data(objs, user)
+    return {obj: obj.can_manage(user, permission=permission, allow_admin=allow_admin) for obj in objs}
+
+
+def get_access_prefilter(effective_protection_mode, user):
+    """Get an SQL criterion matching the objects a user may be able to access.
+
+    The criterion is only a necessary condition, so it is meant to be used
+    as the `prefilter` of `~indico.core.db.sqlalchemy.util.queries.get_n_matching`
+    while still performing the real access check in Python.  Only anonymous
+    users can be handled in SQL since they cannot access anything protected
+    unless they entered an access key, they are in an IP network group (which
+    may be granted access in any ACL) or a plugin overrides access checks.
+
+    :param effective_protection_mode: The column containing the effective
+                                      protection mode of the queried objects
+    :param user: The :class:`.User` to check. May be None if the
+                 user is not logged in.
+    :return: An SQL criterion or ``None`` if nothing can be excluded
+    """
+    if user is not None or signals.acl.can_access.receivers:
+        return None
+    if has_request_context() and session.get('access_keys'):
+        return None
+    if _is_in_ip_network_group():
+        return None
+    return effective_protection_mode == ProtectionMode.public
+
+
+@memoize_request
+def _is_in_ip_network_group():
+    from indico.modules.networks.models.networks import IPNetworkGroup
+    if not has_request_context() or not request.remote_addr:
+        return False
+    ip = str(request.remote_addr)
+    return any(group.contains_ip(ip) for group in IPNetworkGroup.query)
+
+
+def preload_protection_data(objs, user=None):
+    """Preload the data needed to check access to many objects.
+
+    This loads the ACL entries of the objects and all their protection
+    parents with one query per object type, makes sure the whole category
+    chain is in SQLAlchemy's identity map (so walking up the protection
+    parents does not send any queries) and, if a user is specified,
+    preloads their memberships in the groups used in any of these ACLs.
+
+    :param objs: The objects (all `ProtectionMixin` instances)
+    :param user: The user who will be checked against the ACLs
+    """
+    from indico.modules.categories.models.categories import Category
+    from indico.modules.events.models.events import Event
+
+    seen = set()
+    level = set(objs)
+    while level:
+        seen |= level
+        _preload_acl_entries(level)
+        category_ids = ({obj.category_id for obj in level if isinstance(obj, Event) and obj.category_id is not None} |
+                        {obj.id for obj in level if isinstance(obj, Category)})
+        if category_ids:
+            categories = set(Category._get_chain_query(category_ids))
+            _preload_acl_entries(categories)
+            seen |= categories
+        # everything else usually has only a few distinct parents (e.g. the event of
+        # some contributions), so we can simply climb up the protection parents
+        level = {parent for obj in level
+                 if not isinstance(obj, (Category, Event))
+                 and isinstance(parent := obj.protection_parent, ProtectionMixin)
+                 and parent not in seen}
+    if user is not None:
+        _preload_group_memberships(user, seen)
+
+
+def _preload_acl_entries(objs):
+    objs_by_type = {}
+    for obj in objs:
+        if obj.id is not None and 'acl_entries' not in obj.__dict__:
+            objs_by_type.setdefault(type(obj), set()).add(obj.id)
+    for cls, ids in objs_by_type.items():
+        if 'acl_entries' not in inspect(cls).relationships:
+            continue
+        # querying the objects again populates the acl entries of the objects
+        # which are already in the identity map without touching anything else
+        principal_class = inspect(cls).relationships['acl_entries'].mapper.class_
+        (cls.query
+         .filter(cls.id.in_(ids))
+         .options(load_only('id'), apply_acl_entry_strategy(selectinload('acl_entries'), principal_class))
+         .all())
+
+
+def _preload_group_memberships(user, objs):
+    from indico.modules.groups.core import group_membership_cache
+    multipass_groups = set()
+    has_local_groups = False
+    for obj in objs:
+        for entry in obj.__dict__.get('acl_entries', ()):
+            if entry.type == PrincipalType.local_group:
+                has_local_groups = True
+            elif entry.type == PrincipalType.multipass_group:
+                multipass_groups.add((entry.multipass_group_provider, entry.multipass_group_name))
+    if has_local_groups:
+        user.local_groups  # noqa: B018
+    if not multipass_groups:
+        return
+    membership_cache = g.setdefault('group_membership_cache', {})
+    keys = [f'{provider}:{name}:{user.id}' for provider, name in multipass_groups]
+    if not (keys := [key for key in keys if key not in membership_cache]):
+        return
+    membership_cache.update({key: rv for key, rv in group_membership_cache.get_dict(*keys).items()
+                             if rv is not None})
+
+
 def _get_acl_data(obj, principal):
     """Helper function to get the necessary data for ACL modifications.
 
@@ -12,12 +12,21 @@ from indico.core.db.sqlalchemy.util.queries import escape_like, preprocess_ts_st
 from indico.util.decorators import strict_classproperty
 
 
+def fts_vector(column):
+    """Get the text search vector of a column.
+
+    This is the expression indexed by :func:`make_fts_index`, so any
+    query using it for a fts-indexed column can make use of the index.
+    """
+    return db.func.to_tsvector('simple', column)
+
+
 def make_fts_index(model, column_name, db_column_name=None):
     if db_column_name is None:
         db_column_name = column_name
     return db.Index(
         f'ix_{model.__tablename__}_{db_column_name}_fts',
-        db.func.to_tsvector('simple', getattr(model, column_name)),
+        fts_vector(getattr(model, column_name)),
         postgresql_using='gin'
     )
 
@@ -31,8 +40,7 @@ def fts_matches(column, search_string, *, exact=False):
     :param search_string: A string to search for
     :param exact: Whether to search for the exact string
     """
-    crit = db.func.to_tsvector('simple', column).match(preprocess_ts_string(search_string),
-                                                       postgresql_regconfig='simple')
+    crit = fts_vector(column).match(preprocess_ts_string(search_string), postgresql_regconfig='simple')
     if exact:
         crit &= column.ilike(escape_like(search_string))
     return crit
@@ -6,14 +6,21 @@
 # LICENSE file for more details.
 
 import re
+from contextlib import contextmanager
 
-from sqlalchemy import func, inspect, over
-from sqlalchemy.sql import update
+from sqlalchemy import and_, func, inspect, or_, over, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import operators, update
+from sqlalchemy.sql.elements import UnaryExpression
 
 
 TS_REGEX = re.compile(r'([@<>!()&|:\'\\])')
 
 
+class StatementTimeout(Exception):
+    """Indicate that a query was cancelled by :func:`statement_timeout`."""
+
+
 def limit_groups(query, model, partition_by, order_by, limit=None, offset=0):
     """Limit the number of rows returned for each group.
 
@@ -137,13 +144,36 @@ def get_related_object(obj, relationship, criteria):
     return cls.query.with_parent(obj, relationship).filter_by(**criteria).first()
 
 
-def get_n_matching(query, n, predicate, *, prefetch_factor=5, preload_bulk=None, offset=0):
+def _get_keyset_column(column):
+    if isinstance(column, UnaryExpression) and column.modifier in (operators.asc_op, operators.desc_op):
+        return column.element, column.modifier is operators.desc_op
+    return column, False
+
+
+def _get_keyset_criterion(keyset, values):
+    # (a, b) > (x, y) written as `a > x OR (a = x AND b > y)` so each column
+    # can use its own sort direction
+    criteria = []
+    for i, ((column, descending), value) in enumerate(zip(keyset, values, strict=True)):
+        equal = [col == val for (col, __), val in zip(keyset[:i], values[:i], strict=True)]
+        criteria.append(and_(*equal, (column < value) if descending else (column > value)))
+    return or_(*criteria)
+
+
+def get_n_matching(query, n, predicate, *, prefetch_factor=5, preload_bulk=None, offset=0, keyset=None,
+                   prefilter=None):
     """Get N objects from a query that satisfy a condition.
 
     This queries for ``n * 5`` objects initially and then loads
     more objects until no more results are available or ``n`` objects
     have been found.
 
+    By default the additional objects are loaded using an increasing
+    offset, which means the database has to skip over all the rows it
+    already returned.  When only few rows satisfy the predicate this
+    becomes slow, so whenever possible you should specify a `keyset`
+    to continue right after the last row of the previous query instead.
+
     :param query: A sqlalchemy query object
     :param n: The max number of objects to return
     :param predicate: A callable used to filter the found objects
@@ -151,16 +181,40 @@ def get_n_matching(query, n, predicate, *, prefetch_factor=5, preload_bulk=None,
     :param preload_bulk: Function that's called with the full set of objects
                          to allow for bulk-preloading of data needed in the
                          predicate function
-    :param offset: The initial query offset
+    :param offset: The initial query offset (cannot be combined with `keyset`)
+    :param keyset: A list of columns (use ``column.desc()`` for descending
+                   order) the query is ordered by.  Together they must be
+                   unique (e.g. by ending with the primary key) and may not
+                   contain NULL values.  The query itself must not be
+                   ordered in this case.
+    :param prefilter: An SQL criterion satisfied by every object for which
+                      `predicate` returns ``True``; it lets the database skip
+                      rows which can never match.
     """
+    if prefilter is not None:
+        query = query.filter(prefilter)
+    if keyset is not None:
+        if offset:
+            raise ValueError('offset cannot be used together with keyset')
+        keyset = [_get_keyset_column(column) for column in keyset]
+        query = (query
+                 .order_by(*(column.desc() if descending else column for column, descending in keyset))
+                 .add_columns(*(column for column, __ in keyset)))
+    limit = n * prefetch_factor
     _offset = offset
+    last_key = None
 
     def _get():
-        nonlocal _offset
-        limit = n * prefetch_factor
-        rv = query.offset(_offset).limit(limit).all()
-        _offset += limit
-        return rv
+        nonlocal _offset, last_key
+        if keyset is None:
+            rv = query.offset(_offset).limit(limit).all()
+            _offset += limit
+            return rv
+        keyset_query = query if last_key is None else query.filter(_get_keyset_criterion(keyset, last_key))
+        rows = keyset_query.limit(limit).all()
+        if rows:
+            last_key = tuple(rows[-1])[1:]
+        return [row[0] for row in rows]
 
     results = []
     while len(results) < n:
@@ -177,6 +231,10 @@ def get_n_matching(query, n, predicate, *, prefetch_factor=5, preload_bulk=None,
             results.append(obj)
             if len(results) == n:
                 break
+
+        if len(objects) < limit:
+            # no need to query again if we already got the last rows
+            break
     return results[:n]
 
 
@@ -196,3 +254,33 @@ def with_total_rows(query, single_entity=True):
     total = res[0][-1]
     rows = [row[0] for row in res] if single_entity else [row[:-1] for row in res]
     return rows, total
+
+
+@contextmanager
+def statement_timeout(seconds):
+    """Cancel queries that take too long.
+
+    The timeout applies to each statement executed within the block.  The
+    block runs in a savepoint, so the current transaction can still be used
+    after a query has been cancelled.
+
+    :param seconds: The maximum duration of a single statement
+    :raise StatementTimeout: if a statement was cancelled
+    """
+    from indico.core.db import db
+    savepoint = db.session.begin_nested()
+    previous = db.session.execute(select(func.current_setting('statement_timeout'))).scalar()
+    db.session.execute(select(func.set_config('statement_timeout', f'{int(seconds * 1000)}ms', True)))
+    try:
+        yield
+    except OperationalError as exc:
+        savepoint.rollback()
+        if getattr(exc.orig, 'pgcode', None) == '57014':  # query_canceled
+            raise StatementTimeout from exc
+        raise
+    except BaseException:
+        savepoint.rollback()
+        raise
+    # settings changed with SET LOCAL survive the release of a savepoint
+    db.session.execute(select(func.set_config('statement_timeout', previous, True)))
+    savepoint.commit()
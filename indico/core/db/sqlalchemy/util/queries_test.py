@@ -0,0 +1,70 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from ipaddress import ip_network
+
+import pytest
+
+from indico.core.db.sqlalchemy.protection import ProtectionMode, get_access_prefilter
+from indico.core.db.sqlalchemy.util.queries import get_n_matching
+from indico.modules.categories import Category
+from indico.modules.networks.models.networks import IPNetworkGroup
+
+
+@pytest.fixture
+def categories(create_category):
+    # ordered by title desc and id asc: 2, 5, 8, 1, 4, 7, 10, 3, 6, 9
+    return [create_category(i, title=f'Category {i % 3}') for i in range(1, 11)]
+
+
+@pytest.mark.usefixtures('categories')
+@pytest.mark.parametrize('keyset', (False, True))
+def test_get_n_matching(count_queries, keyset):
+    order = Category.title.desc(), Category.id
+    query = Category.query.filter(Category.id > 0)
+    kwargs = {'keyset': order} if keyset else {}
+    if not keyset:
+        query = query.order_by(*order)
+    with count_queries() as count:
+        res = get_n_matching(query, 3, lambda cat: cat.id % 2 == 0, prefetch_factor=1, **kwargs)
+    assert [cat.id for cat in res] == [2, 8, 4]
+    assert count() == 2
+    # no more queries once the last chunk was smaller than the limit
+    with count_queries() as count:
+        res = get_n_matching(query, 4, lambda cat: cat.id == 9, prefetch_factor=1, **kwargs)
+    assert [cat.id for cat in res] == [9]
+    assert count() == 3
+
+
+@pytest.mark.usefixtures('categories')
+def test_get_n_matching_keyset_offset():
+    with pytest.raises(ValueError):
+        get_n_matching(Category.query, 1, bool, keyset=[Category.id], offset=1)
+
+
+def test_get_n_matching_prefilter(db, categories):
+    categories[1].protection_mode = ProtectionMode.protected
+    categories[4].protection_mode = ProtectionMode.protected
+    db.session.flush()
+    query = Category.query.filter(Category.id > 0)
+    prefilter = get_access_prefilter(Category.effective_protection_mode, None)
+    res = get_n_matching(query, 10, lambda cat: True, keyset=[Category.id], prefilter=prefilter)
+    assert [cat.id for cat in res] == [1, 3, 4, 6, 7, 8, 9, 10]
+
+
+def test_get_access_prefilter(dummy_user):
+    assert get_access_prefilter(Category.effective_protection_mode, dummy_user) is None
+
+
+def test_get_access_prefilter_ip_network(app, db):
+    db.session.add(IPNetworkGroup(name='Internal', networks={ip_network('127.0.0.0/8')}))
+    db.session.flush()
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '192.0.2.1'}):
+        assert get_access_prefilter(Category.effective_protection_mode, None) is not None
+    # anonymous users may be granted access to protected objects via their IP
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        assert get_access_prefilter(Category.effective_protection_mode, None) is None
@@ -8,18 +8,28 @@
 import os
 import pickle
 import tempfile
+import threading
+import time
 from datetime import date
-from email.utils import formataddr, make_msgid, parseaddr
+from email.utils import formataddr, getaddresses, make_msgid, parseaddr
+from enum import Enum
 from fnmatch import fnmatch
+from functools import cache
 from urllib.parse import urlsplit
+from uuid import uuid4
 
 import click
 from celery.exceptions import MaxRetriesExceededError, Retry
+from celery.schedules import crontab
+from sqlalchemy import inspect
 from sqlalchemy.orm.attributes import flag_modified
+from werkzeug.local import LocalProxy
 
+from indico.core.cache import get_redis_client
 from indico.core.celery import celery
 from indico.core.config import config
 from indico.core.db import db
+from indico.core.limiter import make_rate_limiter
 from indico.core.logger import Logger
 from indico.modules.core.settings import core_settings
 from indico.util.date_time import now_utc
@@ -32,6 +42,34 @@ from indico.vendor.django_mail.message import EmailMultiAlternatives
 logger = Logger.get('emails')
 MAX_TRIES = 10
 DELAYS = [30, 60, 120, 300, 600, 1800, 3600, 3600, 7200]
+#: The maximum number of emails sent by a single `send_emails_task`
+BATCH_SIZE = 100
+#: How long (in seconds) an idle SMTP connection may still be reused
+#: when connections are reused (see `SMTP_REUSE_CONNECTION`)
+MAX_CONNECTION_IDLE = 60
+#: The number of emails sent at once above which they are considered a
+#: bulk mailing by the email scheduler
+BULK_THRESHOLD = 10
+#: How long (in seconds) the email scheduler sends emails before leaving
+#: the remaining ones to the next run
+MAX_DISPATCH_DURATION = 300
+#: How long (in seconds) to wait before trying again to send queued emails
+#: while the email scheduler is already running
+DISPATCH_RETRY_DELAY = 10
+
+_smtp_local = threading.local()
+email_rate_limiter = LocalProxy(cache(lambda: make_rate_limiter('email', config.SMTP_RATE_LIMIT, by_ip=False)))
+email_domain_rate_limiter = LocalProxy(cache(lambda: make_rate_limiter('email-domain', config.SMTP_DOMAIN_RATE_LIMIT,
+                                                                       by_ip=False)))
+
+
+class EmailPriority(int, Enum):
+    """The priority of an email queued in the email scheduler."""
+
+    #: Emails usually triggered by a user action, e.g. password resets
+    interactive = 0
+    #: Emails sent to many people at once, e.g. reminders
+    bulk = 1
 
 
 @celery.task(name='send_email', bind=True, max_retries=None)
@@ -73,6 +111,116 @@ def send_email_task(task, email, log_entry=None):
             db.session.commit()
 
 
+@celery.task(name='send_emails', bind=True)
+def send_emails_task(task, emails, *log_entries):
+    """Send multiple emails using a single connection to the mail server.
+
+    Each email that cannot be sent is retried separately using
+    `send_email_task`, just like when sending it on its own.
+
+    :param emails: A list of emails as created by `make_email`
+    :param log_entries: The log entry (or ``None``) for each email
+    """
+    messages = list(zip(emails, log_entries, strict=True))
+    sender = _EmailSender()
+    try:
+        for i, (email, log_entry) in enumerate(messages):
+            try:
+                sender.send(email, log_entry)
+            except Exception as exc:
+                # no point in trying the other emails if we cannot even connect
+                for pending_email, pending_log_entry in messages[i:]:
+                    _retry_email(pending_email, pending_log_entry, exc)
+                return
+    finally:
+        sender.close()
+
+
+class _EmailSender:
+    """Send emails using the same connection to the mail server."""
+
+    def __init__(self):
+        self.connection = None
+
+    def send(self, email, log_entry):
+        """Send an email, or retry it later if sending it failed.
+
+        :return: Whether the email has been sent.
+        :raise Exception: If no connection to the mail server could be
+                          established; in that case it is up to the
+                          caller to retry sending the email.
+        """
+        if self.connection is None:
+            self.connection = _open_smtp_connection()
+        try:
+            do_send_email(email, log_entry, _from_task=True, connection=self.connection)
+        except Exception as exc:
+            self.close(broken=True)
+            _retry_email(email, log_entry, exc)
+            return False
+        event_id = getattr(log_entry, 'event_id', None) if log_entry else None
+        if event_id is not None:
+            logger.info('Sent email "%s" for event %d', truncate(email['subject'], 100), event_id)
+        else:
+            logger.info('Sent email "%s"', truncate(email['subject'], 100))
+        if log_entry:
+            db.session.commit()
+        return True
+
+    def close(self, *, broken=False):
+        if self.connection is not None:
+            _release_smtp_connection(self.connection, broken=broken)
+            self.connection = None
+
+
+def _retry_email(email, log_entry, exc):
+    """Retry sending an email which failed as part of a batch."""
+    delay = DELAYS[0] if not config.DEBUG else 1
+    logger.warning('Could not send email "%s" (attempt 1/%d); retry in %ds [%s]',
+                   truncate(email['subject'], 100), MAX_TRIES, delay, exc)
+    send_email_task.apply_async((email, log_entry), countdown=delay, retries=1)
+
+
+def _open_smtp_connection():
+    """Get an open connection to the mail server.
+
+    When `SMTP_REUSE_CONNECTION` is enabled, a connection that has been
+    used before by the same thread is returned unless it has been idle
+    for too long or the server closed it in the meantime.
+    """
+    if config.SMTP_REUSE_CONNECTION and (connection := getattr(_smtp_local, 'connection', None)):
+        if time.monotonic() - _smtp_local.last_used < MAX_CONNECTION_IDLE and _is_smtp_connection_alive(connection):
+            return connection
+        _release_smtp_connection(connection, broken=True)
+    connection = get_connection()
+    connection.open()
+    if config.SMTP_REUSE_CONNECTION:
+        _smtp_local.connection = connection
+        _smtp_local.last_used = time.monotonic()
+    return connection
+
+
+def _is_smtp_connection_alive(connection):
+    try:
+        return connection.connection.noop()[0] == 250
+    except OSError:
+        return False
+
+
+def _release_smtp_connection(connection, *, broken=False):
+    """Close a connection to the mail server unless it can be reused.
+
+    :param broken: Whether sending an email using the connection
+                   failed, in which case it is never reused.
+    """
+    if getattr(_smtp_local, 'connection', None) is connection:
+        if not broken:
+            _smtp_local.last_used = time.monotonic()
+            return
+        _smtp_local.connection = None
+    connection.close()
+
+
 def get_actual_sender_address(sender_address: str, reply_address: set[str]) -> tuple[str, set]:
     site_title = core_settings.get('site_title')
     if not sender_address:
@@ -96,7 +244,160 @@ def get_actual_sender_address(sender_address: str, reply_address: set[str]) -> t
     return from_address, reply_address
 
 
-def do_send_email(email, log_entry=None, _from_task=False):
+def use_email_scheduler():
+    """Check whether emails are sent through the rate-limited email scheduler."""
+    return config.SMTP_USE_CELERY and bool(config.SMTP_RATE_LIMIT or config.SMTP_DOMAIN_RATE_LIMIT)
+
+
+def _get_redis():
+    return get_redis_client(socket_timeout=5)
+
+
+def _get_email_queue_key(name):
+    # not using the cache key prefix since it changes with every Indico version
+    return f'indico-email-queue:{name}'
+
+
+def _get_recipient_domains(email):
+    addresses = getaddresses([*email['to'], *email['cc'], *email['bcc']])
+    return {address.rpartition('@')[2].lower() for __, address in addresses if '@' in address}
+
+
+def schedule_emails(messages, priority=None):
+    """Queue emails to be sent by the email scheduler.
+
+    The scheduler sends emails ordered by their priority and the time
+    they were queued, while making sure that the rate limits from
+    `SMTP_RATE_LIMIT` and `SMTP_DOMAIN_RATE_LIMIT` are not exceeded.
+
+    :param messages: A list of ``(email, log_entry)`` tuples
+    :param priority: An `EmailPriority`; by default it depends on the
+                     number of emails being queued
+    """
+    if priority is None:
+        priority = EmailPriority.bulk if len(messages) > BULK_THRESHOLD else EmailPriority.interactive
+    # the score sorts by priority first and then by the time the email was queued
+    score = priority * 10**10 + time.time()
+    if any(log_entry and inspect(log_entry).identity_key is None for __, log_entry in messages):
+        # the log entries of emails sent outside a request are usually still pending
+        db.session.flush()
+    payloads = {}
+    for email, log_entry in messages:
+        log_entry_key = inspect(log_entry).identity_key[:2] if log_entry else None
+        payloads[uuid4().hex] = pickle.dumps((email, log_entry_key))
+    redis = _get_redis()
+    pipe = redis.pipeline()
+    pipe.hset(_get_email_queue_key('data'), mapping=payloads)
+    pipe.zadd(_get_email_queue_key('queue'), dict.fromkeys(payloads, score))
+    pipe.execute()
+    dispatch_emails_task.delay()
+
+
+def schedule_email(email, log_entry=None):
+    """Queue a single email to be sent by the email scheduler."""
+    schedule_emails([(email, log_entry)], EmailPriority.interactive)
+
+
+def get_email_queue_stats():
+    """Get the number of emails waiting in the email scheduler queue.
+
+    :return: A dict containing the number of emails for each priority
+             and the age in seconds of the oldest queued email.
+    """
+    queue_key = _get_email_queue_key('queue')
+    redis = _get_redis()
+    pipe = redis.pipeline(transaction=False)
+    for priority in EmailPriority:
+        pipe.zcount(queue_key, priority * 10**10, (priority + 1) * 10**10 - 1)
+    for priority in EmailPriority:
+        pipe.zrangebyscore(queue_key, priority * 10**10, (priority + 1) * 10**10 - 1, start=0, num=1,
+                           withscores=True)
+    results = pipe.execute()
+    counts = dict(zip(EmailPriority, results[:len(EmailPriority)], strict=True))
+    oldest = [score % 10**10 for res in results[len(EmailPriority):] for __, score in res]
+    return {
+        'queued': {priority.name: count for priority, count in counts.items()},
+        'oldest_age': (time.time() - min(oldest)) if oldest else 0,
+    }
+
+
+@celery.task(name='dispatch_emails')
+def dispatch_emails_task():
+    if dispatch_queued_emails() is None:
+        # the scheduler may be about to finish its run without having seen the new emails,
+        # so we try again later (but only once in case many emails are queued meanwhile)
+        if _get_redis().set(_get_email_queue_key('retry'), 1, nx=True, ex=DISPATCH_RETRY_DELAY):
+            dispatch_emails_task.apply_async(countdown=DISPATCH_RETRY_DELAY)
+
+
+@celery.periodic_task(name='dispatch_queued_emails', run_every=crontab(minute='*'), locked=False)
+def dispatch_queued_emails_task():
+    if use_email_scheduler():
+        dispatch_queued_emails()
+
+
+def dispatch_queued_emails():
+    """Send emails from the email scheduler queue as long as the rate limits allow it.
+
+    Emails to a recipient domain which reached its rate limit stay in the
+    queue without holding up the emails to other domains.  Any emails
+    that cannot be sent yet are picked up again by the next run.
+
+    :return: The number of emails that have been sent, or ``None`` if
+             another worker is already sending the queued emails.
+    """
+    lock = _get_redis().lock(_get_email_queue_key('lock'), timeout=(2 * MAX_DISPATCH_DURATION))
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        return _dispatch_queued_emails()
+    finally:
+        lock.release()
+
+
+def _dispatch_queued_emails():
+    redis = _get_redis()
+    queue_key = _get_email_queue_key('queue')
+    data_key = _get_email_queue_key('data')
+    start = time.monotonic()
+    throttled_domains = set()
+    skipped = 0
+    sent = 0
+    sender = _EmailSender()
+    try:
+        while time.monotonic() - start < MAX_DISPATCH_DURATION:
+            if not (msg_ids := redis.zrange(queue_key, skipped, skipped + BATCH_SIZE - 1)):
+                break
+            for msg_id in msg_ids:
+                if not email_rate_limiter.test():
+                    return sent
+                if (payload := redis.hget(data_key, msg_id)) is None:
+                    redis.zrem(queue_key, msg_id)
+                    continue
+                email, log_entry_key = pickle.loads(payload)  # noqa: S301
+                domains = _get_recipient_domains(email)
+                throttled_domains |= {domain for domain in domains - throttled_domains
+                                      if not email_domain_rate_limiter.test(domain)}
+                if domains & throttled_domains:
+                    skipped += 1
+                    continue
+                email_rate_limiter.hit()
+                for domain in domains:
+                    email_domain_rate_limiter.hit(domain)
+                log_entry = log_entry_key[0].get(log_entry_key[1]) if log_entry_key else None
+                try:
+                    sent += sender.send(email, log_entry)
+                except Exception:
+                    # the mail server is not available; leave the email in the queue
+                    logger.exception('Could not connect to the mail server to send queued emails')
+                    return sent
+                redis.pipeline().zrem(queue_key, msg_id).hdel(data_key, msg_id).execute()
+    finally:
+        sender.close()
+    return sent
+
+
+def do_send_email(email, log_entry=None, _from_task=False, connection=None):
     """Send an email.
 
     This function should not be called directly unless your
@@ -112,24 +413,38 @@ def do_send_email(email, log_entry=None, _from_task=False):
                       to indicate that the email has been sent.
     :param _from_task: Indicates that this function is called from
                        the celery task responsible for sending emails.
+    :param connection: An open connection to the mail server to use
+                       instead of connecting just for this email.
     """
-    with get_connection() as conn:
-        msg = EmailMultiAlternatives(subject=email['subject'], body=email['body'], from_email=email['from'],
-                                     to=email['to'], cc=email['cc'], bcc=email['bcc'], reply_to=email['reply_to'],
-                                     attachments=email['attachments'], alternatives=email.get('alternatives'),
-                                     connection=conn)
-        if not msg.to:
-            msg.extra_headers['To'] = 'Undisclosed-recipients:;'
-        if email['html']:
-            msg.content_subtype = 'html'
-        msg.extra_headers['message-id'] = make_msgid(domain=urlsplit(config.BASE_URL).hostname)
-        msg.send()
+    if connection is not None:
+        _send_message(email, connection)
+    else:
+        conn = _open_smtp_connection()
+        try:
+            _send_message(email, conn)
+        except Exception:
+            _release_smtp_connection(conn, broken=True)
+            raise
+        _release_smtp_connection(conn)
     if not _from_task:
         logger.info('Sent email "%s"', truncate(email['subject'], 100))
     if log_entry:
         update_email_log_state(log_entry)
 
 
+def _send_message(email, connection):
+    msg = EmailMultiAlternatives(subject=email['subject'], body=email['body'], from_email=email['from'],
+                                 to=email['to'], cc=email['cc'], bcc=email['bcc'], reply_to=email['reply_to'],
+                                 attachments=email['attachments'], alternatives=email.get('alternatives'),
+                                 connection=connection)
+    if not msg.to:
+        msg.extra_headers['To'] = 'Undisclosed-recipients:;'
+    if email['html']:
+        msg.content_subtype = 'html'
+    msg.extra_headers['message-id'] = make_msgid(domain=urlsplit(config.BASE_URL).hostname)
+    msg.send()
+
+
 def update_email_log_state(log_entry, failed=False):
     if failed:
         log_entry.data['state'] = 'failed'
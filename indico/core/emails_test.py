@@ -5,10 +5,17 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from smtplib import SMTP, SMTPException
+
 import pytest
 
-from indico.core.emails import get_actual_sender_address
+from indico.core import emails
+from indico.core.emails import (EmailPriority, dispatch_emails_task, dispatch_queued_emails, do_send_email,
+                                get_actual_sender_address, get_email_queue_stats, schedule_emails, send_email_task,
+                                send_emails_task)
+from indico.core.limiter import make_rate_limiter
 from indico.modules.core.settings import core_settings
+from indico.modules.logs import AppLogEntry, AppLogRealm, LogKind
 
 
 class MockConfig:
@@ -60,3 +67,119 @@ def test_smtp_sender_config_notset(mocker, sender_email, result):
     core_settings.set('site_title', 'Indico')
     assert get_actual_sender_address(sender_email, set()) == result
     assert get_actual_sender_address(sender_email, {'reply@whatever.com'}) == (result[0], {'reply@whatever.com'})
+
+
+def _make_test_email(recipient):
+    return {'to': {recipient}, 'cc': set(), 'bcc': set(), 'from': 'noreply@example.com', 'reply_to': set(),
+            'attachments': [], 'subject': f'Test for {recipient}', 'body': 'Hello', 'html': False,
+            'alternatives': None}
+
+
+def test_send_emails_task(smtp, mocker):
+    connect = mocker.spy(SMTP, 'connect')
+    send_emails_task.delay([_make_test_email(f'user{i}@example.com') for i in range(3)], None, None, None)
+    assert connect.call_count == 1
+    assert len(smtp.outbox) == 3
+
+
+def test_send_emails_task_retry(smtp, mocker):
+    connect = mocker.spy(SMTP, 'connect')
+    apply_async = mocker.patch.object(send_email_task, 'apply_async')
+    orig_send_message = emails._send_message
+
+    def _send_message(email, connection):
+        if email['to'] == {'user1@example.com'}:
+            raise SMTPException('Recipient rejected')
+        orig_send_message(email, connection)
+
+    mocker.patch('indico.core.emails._send_message', _send_message)
+    messages = [_make_test_email(f'user{i}@example.com') for i in range(3)]
+    send_emails_task.delay(messages, None, None, None)
+    # only the failed email is retried, and the next one uses a new connection
+    apply_async.assert_called_once_with((messages[1], None), countdown=mocker.ANY, retries=1)
+    assert connect.call_count == 2
+    assert [mail['To'] for mail in smtp.outbox] == ['user0@example.com', 'user2@example.com']
+
+
+@pytest.mark.parametrize('reuse', (False, True))
+def test_do_send_email_reuse_connection(smtp, mocker, patch_indico_config, reuse):
+    patch_indico_config('SMTP_REUSE_CONNECTION', reuse)
+    connect = mocker.spy(SMTP, 'connect')
+    try:
+        for i in range(3):
+            do_send_email(_make_test_email(f'user{i}@example.com'))
+    finally:
+        if connection := getattr(emails._smtp_local, 'connection', None):
+            emails._release_smtp_connection(connection, broken=True)
+    assert connect.call_count == (1 if reuse else 3)
+    assert len(smtp.outbox) == 3
+
+
+def test_do_send_email_reuse_closed_connection(smtp, mocker, patch_indico_config):
+    patch_indico_config('SMTP_REUSE_CONNECTION', True)
+    connect = mocker.spy(SMTP, 'connect')
+    try:
+        do_send_email(_make_test_email('user0@example.com'))
+        # the server closed the idle connection
+        emails._smtp_local.connection.connection.close()
+        do_send_email(_make_test_email('user1@example.com'))
+    finally:
+        if connection := getattr(emails._smtp_local, 'connection', None):
+            emails._release_smtp_connection(connection, broken=True)
+    assert connect.call_count == 2
+    assert len(smtp.outbox) == 2
+
+
+@pytest.fixture
+def email_scheduler(mocker, patch_indico_config):
+    patch_indico_config('SMTP_USE_CELERY', True)
+    patch_indico_config('SMTP_DOMAIN_RATE_LIMIT', '2 per minute')
+    domain_rate_limiter = make_rate_limiter('email-domain-test', '2 per minute', by_ip=False)
+    mocker.patch('indico.core.emails.email_domain_rate_limiter', domain_rate_limiter)
+    # queue everything first so we can check the order in which emails are sent
+    mocker.patch.object(dispatch_emails_task, 'delay')
+    redis = emails._get_redis()
+    yield
+    redis.delete(emails._get_email_queue_key('queue'), emails._get_email_queue_key('data'),
+                 emails._get_email_queue_key('retry'))
+    for domain in ('example.com', 'example.org'):
+        domain_rate_limiter.clear(domain)
+
+
+@pytest.mark.usefixtures('email_scheduler')
+def test_email_scheduler(smtp):
+    schedule_emails([(_make_test_email(f'user{i}@example.com'), None) for i in range(3)] +
+                    [(_make_test_email('user@example.org'), None)], EmailPriority.bulk)
+    schedule_emails([(_make_test_email('urgent@example.com'), None)], EmailPriority.interactive)
+    assert get_email_queue_stats()['queued'] == {'interactive': 1, 'bulk': 4}
+    assert dispatch_queued_emails() == 3
+    # interactive emails come first, and the throttled domain does not block other domains
+    assert [mail['To'] for mail in smtp.outbox] == ['urgent@example.com', 'user0@example.com', 'user@example.org']
+    stats = get_email_queue_stats()
+    assert stats['queued'] == {'interactive': 0, 'bulk': 2}
+    assert stats['oldest_age'] >= 0
+
+
+@pytest.mark.usefixtures('db', 'email_scheduler')
+def test_email_scheduler_pending_log_entry(smtp):
+    log_entry = AppLogEntry.log(AppLogRealm.emails, LogKind.other, 'Test', 'Test email', type_='email',
+                                data={'state': 'pending'})
+    schedule_emails([(_make_test_email('user@example.com'), log_entry)])
+    assert log_entry.id is not None
+    assert dispatch_queued_emails() == 1
+    assert log_entry.data['state'] == 'sent'
+
+
+@pytest.mark.usefixtures('email_scheduler')
+def test_email_scheduler_running(mocker):
+    apply_async = mocker.patch.object(dispatch_emails_task, 'apply_async')
+    lock = emails._get_redis().lock(emails._get_email_queue_key('lock'))
+    lock.acquire()
+    try:
+        assert dispatch_queued_emails() is None
+        # new emails are not left to the next periodic run, but only one retry is scheduled
+        dispatch_emails_task()
+        dispatch_emails_task()
+    finally:
+        lock.release()
+    apply_async.assert_called_once_with(countdown=emails.DISPATCH_RETRY_DELAY)
@@ -19,6 +19,7 @@ from webargs.flaskparser import parser as webargs_flask_parser
 from indico.core import signals
 from indico.core.db.sqlalchemy import PyIntEnum, UTCDateTime
 from indico.web.args import parser as indico_webargs_flask_parser
+from indico.web.flask.stats import track_time
 
 
 mm = Marshmallow()
@@ -82,6 +83,10 @@ class IndicoModelConverter(ModelConverter):
 
 
 class IndicoSchema(mm.Schema):
+    def dump(self, obj, *, many=None):
+        with track_time('marshmallow'):
+            return super().dump(obj, many=many)
+
     @post_dump(pass_many=True, pass_original=True)
     def _call_post_dump_signal(self, data, orig, *, many, **kwargs):
         data_list = data if many else [data]
@@ -9,7 +9,8 @@ import mimetypes
 import re
 import time
 from email.mime.base import MIMEBase
-from functools import wraps
+from functools import partial, wraps
+from itertools import batched
 from types import GeneratorType
 from uuid import uuid4
 
@@ -57,8 +58,11 @@ def send_email(email, obj=None, module=None, user=None, log_metadata=None, log_s
     :param user: The user to show in the email log
     :param log_metadata: A metadata dictionary to be saved in the event's log
     """
-    from indico.core.emails import do_send_email, send_email_task
-    fn = send_email_task.delay if config.SMTP_USE_CELERY else do_send_email
+    from indico.core.emails import do_send_email, schedule_email, send_email_task, use_email_scheduler
+    if use_email_scheduler():
+        fn = schedule_email
+    else:
+        fn = send_email_task.delay if config.SMTP_USE_CELERY else do_send_email
     # we log the email immediately (as pending).  if we don't commit,
     # the log message will simply be thrown away later
     log_entry = _log_email(email, obj, module, user, log_metadata, log_summary)
@@ -165,26 +169,49 @@ def flush_email_queue():
     if not queue:
         return
     logger.debug('Sending %d queued emails', len(queue))
-    for fn, email, log_entry in queue:
+    for send, messages in _get_email_queue_batches(queue):
         try:
-            fn(email, log_entry)
+            send()
         except Exception:
             # Flushing the email queue happens after a commit.
             # If anything goes wrong here we keep going and just log
             # it to avoid losing (more) emails in case celery is not
             # used for email sending or there is a temporary issue
             # with celery.
-            if log_entry:
-                update_email_log_state(log_entry, failed=True)
-            path = store_failed_email(email, log_entry)
-            logger.exception('Flushing queued email "%s" failed; stored data in %s',
-                             truncate(email['subject'], 100), path)
+            for email, log_entry in messages:
+                if log_entry:
+                    update_email_log_state(log_entry, failed=True)
+                path = store_failed_email(email, log_entry)
+                logger.exception('Flushing queued email "%s" failed; stored data in %s',
+                                 truncate(email['subject'], 100), path)
             # Wait for a short moment in case it's a very temporary issue
             time.sleep(0.25)
     del queue[:]
     db.session.commit()
 
 
+def _get_email_queue_batches(queue):
+    """Group the queued emails into batches that are sent together.
+
+    When emails are sent by celery, each batch is sent by a single task
+    using the same connection to the mail server.  When the email scheduler
+    is used, all emails are queued at once and the scheduler takes care of
+    sending them within the configured rate limits.
+
+    :return: A list of ``(send, messages)`` tuples, where `send` is a
+             function sending the ``(email, log_entry)`` tuples in
+             `messages`.
+    """
+    from indico.core.emails import BATCH_SIZE, schedule_emails, send_emails_task, use_email_scheduler
+    if not config.SMTP_USE_CELERY or len(queue) == 1:
+        return [(partial(fn, email, log_entry), [(email, log_entry)]) for fn, email, log_entry in queue]
+    messages = [(email, log_entry) for __, email, log_entry in queue]
+    if use_email_scheduler():
+        return [(partial(schedule_emails, messages), messages)]
+    return [(partial(send_emails_task.delay, [email for email, __ in batch], *(log for __, log in batch)), batch)
+            for batch in batched(messages, BATCH_SIZE)]
+
+
 def _attachment_size(att):
     if isinstance(att, MIMEBase):
         return len(att.get_payload(decode=True) or b'')
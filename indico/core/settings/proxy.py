@@ -12,7 +12,7 @@ from operator import attrgetter
 from flask import g, has_request_context
 
 from indico.core.settings.models.settings import Setting, SettingPrincipal
-from indico.core.settings.util import get_all_settings, get_setting, get_setting_acl
+from indico.core.settings.util import get_all_settings, get_setting, get_setting_acl, invalidate_shared_settings
 
 
 class ACLProxyBase:
@@ -49,6 +49,10 @@ class SettingsProxyBase:
     acl_proxy_class = None
     default_sentinel = object()
     allow_cache_outside_request = False
+    #: Whether the settings may be cached across requests.  This only
+    #: makes sense for settings that are not tied to another object and
+    #: requires `_flush_cache` to invalidate them.
+    shared_cache = False
 
     def __init__(self, module, defaults=None, strict=True, acls=None, converters=None):
         self.module = module
@@ -223,6 +227,11 @@ class SettingsProxy(SettingsProxyBase):
     """Proxy class to access settings for a certain module."""
 
     acl_proxy_class = ACLProxy
+    shared_cache = True
+
+    def _flush_cache(self):
+        super()._flush_cache()
+        invalidate_shared_settings()
 
     def get_all(self, no_defaults=False):
         """Retrieve all settings, including ACLs.
@@ -5,6 +5,7 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import pytest
@@ -235,3 +236,29 @@ def test_bound_settings(dummy_event, dummy_user):
     assert bound.acls.get('acl') == {dummy_user}
     assert bound.get('e') == TestEnum.bar
     assert isinstance(bound.get('e'), TestEnum)
+
+
+@pytest.mark.usefixtures('db')
+def test_proxy_shared_cache(app, count_queries):
+    @contextmanager
+    def _request():
+        # a new app context so nothing is kept in `g` like in separate requests
+        with app.app_context(), app.test_request_context(), count_queries() as count:
+            yield count
+
+    proxy = SettingsProxy('test', {'hello': 'world', 'foo': None})
+    proxy.set('foo', ['bar'])
+    with _request() as count:
+        assert proxy.get('foo') == ['bar']
+        assert count() == 1
+        proxy.get('foo').append('oops')
+    # other requests use the settings loaded by the previous one
+    with _request() as count:
+        assert proxy.get('foo') == ['bar']
+        assert proxy.get('hello') == 'world'
+        assert count() == 0
+    # changes invalidate the shared settings
+    proxy.set('foo', 'test')
+    with _request() as count:
+        assert proxy.get('foo') == 'test'
+        assert count() == 1
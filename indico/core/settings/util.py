@@ -5,19 +5,80 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
-from copy import copy
+from copy import copy, deepcopy
 from operator import attrgetter
+from uuid import uuid4
+
+from flask import g, has_app_context, has_request_context
+
+from indico.core import signals
+from indico.core.cache import make_scoped_cache
 
 
 _not_in_db = object()
 
+_settings_version_cache = make_scoped_cache('settings')
+#: Settings shared by all requests handled by this process, mapping the
+#: module names to their settings.  They are discarded whenever the
+#: settings version in the cache does not match the version they were
+#: loaded with.
+_shared_settings = {'version': None, 'settings': {}}
+
+
+def _use_shared_settings():
+    """Check whether the settings shared across requests may be used.
+
+    The settings version is only checked once per request, so a request
+    always uses consistent settings, and never after the settings have
+    been modified in the request since the changes may be rolled back.
+    """
+    if not has_request_context() or g.get('settings_modified'):
+        return False
+    if 'settings_version' not in g:
+        _settings_version_cache.add('version', uuid4().hex)
+        g.settings_version = version = _settings_version_cache.get('version')
+        if version != _shared_settings['version']:
+            _shared_settings.update(version=version, settings={})
+    return g.settings_version is not None and g.settings_version == _shared_settings['version']
+
+
+def _get_shared_settings(cls, module):
+    shared = _shared_settings['settings']
+    try:
+        settings = shared[module]
+    except KeyError:
+        shared[module] = settings = cls.get_all(module)
+    # copy the settings so changes to mutable values never affect other requests
+    return deepcopy(settings)
+
+
+def invalidate_shared_settings():
+    """Discard the settings shared across requests in all processes."""
+    _shared_settings['settings'] = {}
+    # a request (or task) may read the old settings again before the current
+    # transaction has been committed, so we change the version again afterwards
+    _settings_version_cache.set('version', uuid4().hex)
+    if has_app_context():
+        g.settings_version_pending = True
+    if has_request_context():
+        g.settings_modified = True
+
+
+@signals.core.after_commit.connect
+def _invalidate_shared_settings_after_commit(sender, **kwargs):
+    if g.pop('settings_version_pending', False):
+        _settings_version_cache.set('version', uuid4().hex)
+
 
 def _get_cache_key(proxy, name, kwargs):
     return type(proxy), proxy.module, name, frozenset(kwargs.items())
 
 
 def _preload_settings(cls, proxy, cache, **kwargs):
-    settings = cls.get_all(proxy.module, **kwargs)
+    if proxy.shared_cache and not kwargs and _use_shared_settings():
+        settings = _get_shared_settings(cls, proxy.module)
+    else:
+        settings = cls.get_all(proxy.module, **kwargs)
     for name, value in settings.items():
         cache_key = _get_cache_key(proxy, name, kwargs)
         cache[cache_key] = value
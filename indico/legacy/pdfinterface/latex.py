@@ -8,11 +8,14 @@
 import codecs
 import functools
 import os
+import shutil
 import subprocess
 import tempfile
 import time
 import typing as t
 from dataclasses import dataclass
+from datetime import timedelta
+from hashlib import sha256
 from importlib.resources import as_file
 from importlib.resources import files as res_files
 from io import BytesIO
@@ -34,6 +37,7 @@ from werkzeug.local import LocalProxy
 
 from indico.core.cache import make_scoped_cache
 from indico.core.config import config
+from indico.core.db import db
 from indico.core.limiter import make_rate_limiter
 from indico.core.logger import Logger
 from indico.core.marshmallow import mm
@@ -43,35 +47,49 @@ from indico.modules.events.abstracts.models.reviews import AbstractAction
 from indico.modules.events.abstracts.settings import BOACorrespondingAuthorType, boa_settings
 from indico.modules.events.contributions.util import sort_contribs
 from indico.modules.events.util import create_event_logo_tmp_file
+from indico.modules.files.models.files import File
 from indico.util import mdx_latex
 from indico.util.caching import memoize_redis
 from indico.util.date_time import format_date, format_human_timedelta, format_time
-from indico.util.fs import chmod_umask
+from indico.util.fs import chmod_umask, secure_filename
 from indico.util.i18n import _, ngettext
 from indico.util.string import render_markdown
 
 
 #: A rate limiter for PDF generation endpoints that are available publicly without logging in
 latex_rate_limiter = LocalProxy(functools.cache(lambda: make_rate_limiter('latex', config.LATEX_RATE_LIMIT)))
-cache = make_scoped_cache('latex-pdfs')
+#: The state of the PDFs currently being built in the background
+latex_build_cache = make_scoped_cache('latex-builds')
+#: The fingerprints of the PDFs recently generated for a user
+latex_fingerprint_cache = make_scoped_cache('latex-fingerprints')
 
+#: How long building a PDF in the background may take before it is
+#: considered lost and can be requested again
+LATEX_BUILD_TIMEOUT = timedelta(hours=1)
+#: How long a failed build is reported as such before it can be retried
+LATEX_BUILD_FAILURE_TTL = timedelta(minutes=5)
 
-def generate_cached_pdf(fn, key, obj=None) -> BytesIO:
+
+def generate_cached_pdf(fn, key, obj=None, *, ids=()) -> BytesIO:
     """Generate a PDF from LaTeX with caching and rate limiting.
 
     This expects a callable (which will be called with `obj` as its argument)
-    that generates a PDF file and returns the PDF bytes.
+    that returns a `PDFLaTeXBase` instance for the PDF file.
 
-    It also takes a `key` which should be unique to this particular PDF generation and
+    It also takes a `key` which names the kind of document being generated and
     of course the `obj` which is the object from which the PDF is generated (this must be
     an SQLAlchemy object).
 
     In cases where there is no single object, the `obj` argument can be omitted, in which
-    case `fn` will be called without arguments. The `key` must contain enough details to
-    ensure proper cache separation in that case.
-
-    The generated PDF is cached (longer when the request comes from an unauthenticated user),
-    and rate limiting is applied as well if the user is unauthenticated.
+    case `fn` will be called without arguments.  When the PDF contains a list of objects
+    (e.g. the contributions of an event matching some filter), their IDs must be passed
+    in `ids` to ensure proper cache separation.
+
+    The generated PDF is stored based on the fingerprint of its LaTeX source, so the same
+    source is never compiled again as long as the stored PDF exists.  The fingerprint is
+    cached for a short time (longer when the request comes from an unauthenticated user),
+    so a stored PDF can be sent without rendering its source again; otherwise rate limiting
+    is applied before rendering if the user is unauthenticated.
     """
     user_id = session.user.id if session.user else None
     # Cache for a short time even if the user is logged-in, because IIRC some browsers send more
@@ -79,17 +97,170 @@ def generate_cached_pdf(fn, key, obj=None) -> BytesIO:
     cache_ttl = 15 if session.user else 300
     # XXX We cache by user just in case something in the templates depends on who's generating them.
     # I don't think it's the case, and it should not be the case, but better stick on the safe side.
-    cache_key = (key, user_id, *(inspect(obj).identity_key[:2] if obj else ()))
-    if (cached := cache.get(cache_key)) is not None:
-        return BytesIO(cached)
+    identity = inspect(obj).identity if obj else ()
+    if ids:
+        identity += (sha256('-'.join(map(str, sorted(ids))).encode()).hexdigest(),)
+    cache_key = '-'.join(map(str, (key, user_id, *identity)))
+    if (fingerprint := latex_fingerprint_cache.get(cache_key)) and (file := get_latex_pdf(fingerprint)):
+        with file.open() as f:
+            return BytesIO(f.read())
     if not session.user and not latex_rate_limiter.hit():
         delay = format_human_timedelta(latex_rate_limiter.get_reset_delay())
         raise TooManyRequests(f"You're doing this too fast, please try again in {delay}")
-    data = fn(obj) if obj is not None else fn()
-    cache.set(cache_key, data, cache_ttl)
+    pdf = fn(obj) if obj is not None else fn()
+    fingerprint = pdf.prepare()
+    latex_fingerprint_cache.set(cache_key, fingerprint, cache_ttl)
+    if file := get_latex_pdf(fingerprint):
+        shutil.rmtree(pdf.source_dir, ignore_errors=True)
+        with file.open() as f:
+            return BytesIO(f.read())
+    pdf_path = pdf.compile()
+    data = Path(pdf_path).read_bytes()
+    document = '-'.join(map(str, (key, *identity)))
+    _store_latex_pdf(fingerprint, pdf_path, document, f'{key}.pdf')
+    shutil.rmtree(pdf.source_dir, ignore_errors=True)
     return BytesIO(data)
 
 
+def _iter_latex_source_files(source_dir):
+    """Iterate over the files making up the LaTeX source in a directory.
+
+    This skips the fonts (which are part of Indico) and any files
+    created by compiling the source.
+
+    :return: An iterator of ``(relative_path, absolute_path)`` tuples,
+             sorted by the relative path
+    """
+    source_dir = os.fspath(source_dir)
+    paths = []
+    for dirpath, dirnames, files in os.walk(source_dir):
+        dirnames[:] = [d for d in dirnames if d != 'fonts' or dirpath != source_dir]
+        for f in files:
+            if f.startswith('.') or f.endswith(('.pdf', '.log', '.aux', '.out', '.toc')):
+                continue
+            file_path = os.path.join(dirpath, f)
+            paths.append((os.path.relpath(file_path, source_dir), file_path))
+    return iter(sorted(paths))
+
+
+def get_latex_fingerprint(source_dir, template_name, has_toc):
+    """Get a fingerprint identifying the LaTeX source of a PDF.
+
+    Two sources with the same fingerprint contain exactly the same files,
+    so they result in the same PDF.
+    """
+    checksum = sha256(f'{template_name}\0{has_toc}\n'.encode())
+    for path, file_path in _iter_latex_source_files(source_dir):
+        checksum.update(f'{path}\0'.encode())
+        checksum.update(Path(file_path).read_bytes())
+        checksum.update(b'\n')
+    return checksum.hexdigest()
+
+
+def get_latex_pdf(fingerprint):
+    """Get the stored PDF built from the LaTeX source with the given fingerprint."""
+    return (File.query
+            .filter(File.meta.contains({'latex_fingerprint': fingerprint}),
+                    File.storage_file_id.isnot(None))
+            .order_by(File.created_dt.desc())
+            .first())
+
+
+def _store_latex_pdf(fingerprint, pdf_path, document, filename, *, claim=False):
+    """Store a compiled PDF so it can be used instead of compiling the same source again.
+
+    :param document: A string identifying the document; this is used to
+                     keep only the latest version of claimed documents
+    :param filename: The filename to use when sending the PDF
+    :param claim: Whether to keep the PDF until a new version of the
+                  document is stored; otherwise it is deleted with the
+                  other unclaimed files after a day
+    """
+    file = File(filename=secure_filename(filename, 'document.pdf'), content_type='application/pdf',
+                meta={'latex_fingerprint': fingerprint, 'latex_document': document})
+    with open(pdf_path, 'rb') as f:
+        file.save(('latex', fingerprint[:2]), f)
+    db.session.add(file)
+    if claim:
+        # older versions of the document are deleted with the other unclaimed files
+        (File.query
+         .filter(File.meta.contains({'latex_document': document}), File.claimed)
+         .update({File.claimed: False}, synchronize_session='fetch'))
+        file.claim()
+    db.session.flush()
+    return file
+
+
+def request_latex_pdf(pdf, document, filename):
+    """Get a PDF, building it in the background if necessary.
+
+    If the PDF is already being built (e.g. because of a concurrent
+    request for the same document), no new build is started.
+
+    :param pdf: A `PDFLaTeXBase` instance
+    :param document: A string identifying the document; only the latest
+                     PDF of a document is kept
+    :param filename: The filename to use when sending the PDF
+    :return: A ``(file, fingerprint)`` tuple.  The file is ``None`` if
+             the PDF is still being built; in that case `get_latex_build_status`
+             can be used to check when it is available.
+    """
+    from indico.legacy.pdfinterface.tasks import build_latex_pdf
+    fingerprint = pdf.prepare()
+    if file := get_latex_pdf(fingerprint):
+        shutil.rmtree(pdf.source_dir, ignore_errors=True)
+        return file, fingerprint
+    try:
+        if latex_build_cache.add(fingerprint, 'queued', timeout=LATEX_BUILD_TIMEOUT):
+            try:
+                build_latex_pdf.delay(fingerprint, document, filename, pdf.LATEX_TEMPLATE, pdf._table_of_contents,
+                                      pdf.get_source_archive())
+            except Exception:
+                latex_build_cache.delete(fingerprint)
+                raise
+    finally:
+        shutil.rmtree(pdf.source_dir, ignore_errors=True)
+    return get_latex_pdf(fingerprint), fingerprint
+
+
+def get_latex_build_status(fingerprint):
+    """Get the state of a PDF built in the background.
+
+    :return: A dict containing the ``state`` (``queued``, ``compiling``,
+             ``done``, ``failed`` or ``unknown``) and the ``download_url``
+             once the PDF is available
+    """
+    if file := get_latex_pdf(fingerprint):
+        return {'state': 'done', 'download_url': file.signed_download_url}
+    return {'state': latex_build_cache.get(fingerprint, 'unknown'), 'download_url': None}
+
+
+def build_pdf_from_source_archive(fingerprint, document, filename, template_name, has_toc, source_archive):
+    """Compile a PDF from an archive of its LaTeX source and store it.
+
+    This is meant to run in a Celery worker, which is why the source is
+    passed as an archive instead of a directory that may not exist on the
+    worker.
+    """
+    latex_build_cache.set(fingerprint, 'compiling', timeout=LATEX_BUILD_TIMEOUT)
+    source_dir = tempfile.mkdtemp(prefix='indico-texgen-', dir=config.TEMP_DIR)
+    try:
+        with ZipFile(BytesIO(source_archive)) as zip_file:
+            zip_file.extractall(source_dir)
+        latex = LatexRunner(source_dir, has_toc=has_toc)
+        source_filename, target_filename = latex.prepare_source_dir(template_name)
+        pdf_path = latex.compile(source_filename, target_filename)
+        _store_latex_pdf(fingerprint, pdf_path, document, filename, claim=True)
+        db.session.commit()
+    except Exception:
+        latex_build_cache.set(fingerprint, 'failed', timeout=LATEX_BUILD_FAILURE_TTL)
+        raise
+    else:
+        latex_build_cache.delete(fingerprint)
+    finally:
+        shutil.rmtree(source_dir, ignore_errors=True)
+
+
 class PDFLaTeXBase:
     _table_of_contents = False
     LATEX_TEMPLATE = None
@@ -99,7 +270,9 @@ class PDFLaTeXBase:
         # safe_mode - strip out all HTML
         md = markdown.Markdown(safe_mode='remove')
         self.source_dir = tempfile.mkdtemp(prefix='indico-texgen-', dir=config.TEMP_DIR)
-        latex_mdx = mdx_latex.LaTeXExtension(configs={'apply_br': True, 'tmpdir': self.source_dir})
+        self._image_loader = mdx_latex.LatexImageLoader(self.source_dir)
+        latex_mdx = mdx_latex.LaTeXExtension(configs={'apply_br': True, 'tmpdir': self.source_dir,
+                                                      'image_loader': self._image_loader})
         latex_mdx.extendMarkdown(md, markdown.__dict__)
 
         def _escape_latex_math(string):
@@ -111,12 +284,40 @@ class PDFLaTeXBase:
         self._args = {'markdown': _convert_markdown}
 
     def generate(self, *, as_bytes=False):
-        latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents)
+        latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents, image_loader=self._image_loader)
         filename = latex.run(self.LATEX_TEMPLATE, **self._args)
         return Path(filename).read_bytes() if as_bytes else filename
 
-    def generate_source_archive(self):
+    def prepare(self):
+        """Render the LaTeX source without compiling it.
+
+        :return: The fingerprint of the source
+        """
+        latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents, image_loader=self._image_loader)
+        self._source_files = latex.prepare(self.LATEX_TEMPLATE, **self._args)
+        return get_latex_fingerprint(self.source_dir, self.LATEX_TEMPLATE, self._table_of_contents)
+
+    def compile(self):
+        """Compile the source rendered by `prepare`.
+
+        :return: The path of the PDF file
+        """
         latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents)
+        return latex.compile(*self._source_files)
+
+    def get_source_archive(self):
+        """Get a zip archive containing the source rendered by `prepare`.
+
+        Unlike `generate_source_archive`, this does not include the fonts.
+        """
+        buf = BytesIO()
+        with ZipFile(buf, 'w', allowZip64=True) as zip_handler:
+            for path, file_path in _iter_latex_source_files(self.source_dir):
+                zip_handler.write(file_path, path)
+        return buf.getvalue()
+
+    def generate_source_archive(self):
+        latex = LatexRunner(self.source_dir, has_toc=self._table_of_contents, image_loader=self._image_loader)
         latex.prepare(self.LATEX_TEMPLATE, **self._args)
 
         buf = BytesIO()
@@ -254,9 +455,10 @@ def pull_latex_image(podman_config: PodmanConfig):
 class LatexRunner:
     """Handle the PDF generation from a chosen LaTeX template."""
 
-    def __init__(self, source_dir, has_toc=False):
+    def __init__(self, source_dir, has_toc=False, image_loader=None):
         self.source_dir = source_dir
         self.has_toc = has_toc
+        self.image_loader = image_loader
 
     def run_latex(self, source_file, log_file):
         if podman_config := config.XELATEX_PODMAN_CONFIG:
@@ -347,14 +549,20 @@ class LatexRunner:
         return template.render(font_dir='fonts/', **kwargs)
 
     def prepare(self, template_name, **kwargs):
-        chmod_umask(self.source_dir, execute=True)
         source_filename = os.path.join(self.source_dir, template_name + '.tex')
-        target_filename = os.path.join(self.source_dir, template_name + '.pdf')
-
         source = self._render_template(template_name + '.tex', kwargs)
+        if self.image_loader:
+            # the images are fetched while rendering the template
+            source = self.image_loader.resolve(source)
         with codecs.open(source_filename, 'wb', encoding='utf-8') as f:
             f.write(source)
+        return self.prepare_source_dir(template_name)
 
+    def prepare_source_dir(self, template_name):
+        """Prepare a directory containing a rendered source for compiling it."""
+        chmod_umask(self.source_dir, execute=True)
+        source_filename = os.path.join(self.source_dir, template_name + '.tex')
+        target_filename = os.path.join(self.source_dir, template_name + '.pdf')
         with as_file(res_files('indico_fonts')) as font_dir:
             os.symlink(font_dir, os.path.join(self.source_dir, 'fonts'))
         return source_filename, target_filename
@@ -363,6 +571,11 @@ class LatexRunner:
         if not config.LATEX_ENABLED:
             raise RuntimeError('LaTeX is not enabled')
         source_filename, target_filename = self.prepare(template_name, **kwargs)
+        return self.compile(source_filename, target_filename)
+
+    def compile(self, source_filename, target_filename):
+        if not config.LATEX_ENABLED:
+            raise RuntimeError('LaTeX is not enabled')
         log_filename = os.path.join(self.source_dir, 'output.log')
         log_file = open(log_filename, 'a+')  # noqa: SIM115
         start = time.time()
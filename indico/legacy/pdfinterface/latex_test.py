@@ -0,0 +1,101 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from indico.legacy.pdfinterface.latex import (generate_cached_pdf, get_latex_build_status, get_latex_fingerprint,
+                                              request_latex_pdf)
+
+
+def _write_source(path, tex='\\documentclass{article}', image=b'image'):
+    path.mkdir(exist_ok=True)
+    (path / 'single_doc.tex').write_text(tex)
+    (path / 'indico-latex-image.png').write_bytes(image)
+    return path
+
+
+def test_get_latex_fingerprint(tmp_path):
+    fingerprint = get_latex_fingerprint(_write_source(tmp_path / 'a'), 'single_doc', False)
+    assert get_latex_fingerprint(_write_source(tmp_path / 'b'), 'single_doc', False) == fingerprint
+    assert get_latex_fingerprint(_write_source(tmp_path / 'c', image=b'other'), 'single_doc', False) != fingerprint
+    assert get_latex_fingerprint(_write_source(tmp_path / 'd', tex='changed'), 'single_doc', False) != fingerprint
+    assert get_latex_fingerprint(tmp_path / 'a', 'single_doc', True) != fingerprint
+    # fonts and files created when compiling are not part of the source
+    (tmp_path / 'a' / 'fonts').mkdir()
+    (tmp_path / 'a' / 'fonts' / 'font.otf').write_bytes(b'font')
+    (tmp_path / 'a' / 'single_doc.pdf').write_bytes(b'pdf')
+    (tmp_path / 'a' / 'single_doc.log').write_text('log')
+    assert get_latex_fingerprint(tmp_path / 'a', 'single_doc', False) == fingerprint
+
+
+class MockPDF:
+    LATEX_TEMPLATE = 'single_doc'
+    _table_of_contents = False
+
+    def __init__(self, source_dir, fingerprint='fingerprint'):
+        self.source_dir = str(source_dir)
+        self.fingerprint = fingerprint
+
+    def prepare(self):
+        _write_source(Path(self.source_dir))
+        return self.fingerprint
+
+    def get_source_archive(self):
+        return b'archive'
+
+
+@pytest.mark.usefixtures('db')
+def test_request_latex_pdf_once(monkeypatch, tmp_path):
+    from indico.legacy.pdfinterface.tasks import build_latex_pdf
+    calls = []
+    monkeypatch.setattr(build_latex_pdf, 'delay', lambda *args: calls.append(args))
+    assert request_latex_pdf(MockPDF(tmp_path / 'a'), 'doc', 'doc.pdf') == (None, 'fingerprint')
+    assert request_latex_pdf(MockPDF(tmp_path / 'b'), 'doc', 'doc.pdf') == (None, 'fingerprint')
+    assert calls == [('fingerprint', 'doc', 'doc.pdf', 'single_doc', False, b'archive')]
+    assert get_latex_build_status('fingerprint') == {'state': 'queued', 'download_url': None}
+    assert not (tmp_path / 'a').exists()
+
+
+@pytest.mark.usefixtures('request_context')
+def test_generate_cached_pdf_stored(mocker, tmp_path):
+    file = mocker.Mock()
+    file.open.side_effect = lambda: BytesIO(b'pdf')
+    mocker.patch('indico.legacy.pdfinterface.latex.get_latex_pdf', return_value=file)
+    rate_limiter = mocker.patch('indico.legacy.pdfinterface.latex.latex_rate_limiter')
+    fn = mocker.Mock(side_effect=lambda: MockPDF(tmp_path / 'a'))
+    assert generate_cached_pdf(fn, 'stored-test').read() == b'pdf'
+    assert fn.call_count == rate_limiter.hit.call_count == 1
+    assert not (tmp_path / 'a').exists()
+    # the stored PDF is sent again without rendering the source or counting towards the rate limit
+    assert generate_cached_pdf(fn, 'stored-test').read() == b'pdf'
+    assert fn.call_count == rate_limiter.hit.call_count == 1
+
+
+@pytest.mark.usefixtures('request_context')
+def test_generate_cached_pdf_separation(mocker, tmp_path, create_event):
+    def _get_latex_pdf(fingerprint):
+        file = mocker.Mock()
+        file.open.side_effect = lambda: BytesIO(fingerprint.encode())
+        return file
+
+    def _generate(event, ids):
+        fingerprint = f'{event.id}:{",".join(map(str, ids))}'
+        fn = lambda e: MockPDF(tmp_path / fingerprint.replace(':', '-'), fingerprint)
+        return generate_cached_pdf(fn, 'list', event, ids=ids).read().decode()
+
+    mocker.patch('indico.legacy.pdfinterface.latex.get_latex_pdf', side_effect=_get_latex_pdf)
+    mocker.patch('indico.legacy.pdfinterface.latex.latex_rate_limiter')
+    event1 = create_event(1)
+    event2 = create_event(2)
+    # lists of different events or containing different objects are never mixed up
+    assert _generate(event1, [1, 2]) == '1:1,2'
+    assert _generate(event2, [1, 2]) == '2:1,2'
+    assert _generate(event1, [3]) == '1:3'
+    assert _generate(event1, [2, 1]) == '1:1,2'
@@ -0,0 +1,17 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from indico.core.celery import celery
+from indico.legacy.pdfinterface.latex import build_pdf_from_source_archive, get_latex_pdf
+
+
+@celery.task(name='build_latex_pdf')
+def build_latex_pdf(fingerprint, document, filename, template_name, has_toc, source_archive):
+    # the same source may have been requested again after a previous build finished
+    if get_latex_pdf(fingerprint):
+        return
+    build_pdf_from_source_archive(fingerprint, document, filename, template_name, has_toc, source_archive)
@@ -0,0 +1,127 @@
+"""Add category tree table
+
+Revision ID: a4c27e9b31f0
+Revises: 06a037da1ec6
+Create Date: 2026-10-18 12:00:00.000000
+"""
+
+from enum import Enum
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from indico.core.db.sqlalchemy import PyIntEnum
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c27e9b31f0'
+down_revision = '06a037da1ec6'
+branch_labels = None
+depends_on = None
+
+
+class _ProtectionMode(int, Enum):
+    public = 0
+    inheriting = 1
+    protected = 2
+
+
+SQL_FUNCTION_UPDATE_TREE = '''
+    CREATE FUNCTION categories.update_tree() RETURNS trigger AS
+    $BODY$
+    BEGIN
+        -- rebuild the tree data of the category and all its subcategories
+        -- (protection mode 1 is "inheriting")
+        WITH RECURSIVE subtree(id, path, protection_mode, protection_source_id, icon_source_id) AS (
+            SELECT
+                cat.id,
+                COALESCE(parent.path, '{}') || cat.id,
+                CASE WHEN cat.protection_mode = 1 THEN parent.protection_mode
+                     ELSE cat.protection_mode END,
+                CASE WHEN cat.protection_mode = 1 THEN parent.protection_source_id
+                     ELSE cat.id END,
+                CASE WHEN jsonb_typeof(cat.icon_metadata) = 'null' THEN parent.icon_source_id ELSE cat.id END
+            FROM categories.categories cat
+            LEFT JOIN categories.category_tree parent ON (parent.category_id = cat.parent_id)
+            WHERE cat.id = NEW.id
+
+            UNION ALL
+
+            SELECT
+                cat.id,
+                subtree.path || cat.id,
+                CASE WHEN cat.protection_mode = 1 THEN subtree.protection_mode
+                     ELSE cat.protection_mode END,
+                CASE WHEN cat.protection_mode = 1 THEN subtree.protection_source_id
+                     ELSE cat.id END,
+                CASE WHEN jsonb_typeof(cat.icon_metadata) = 'null' THEN subtree.icon_source_id ELSE cat.id END
+            FROM categories.categories cat, subtree
+            -- the cycle check runs before this trigger, but better safe than sorry
+            WHERE cat.parent_id = subtree.id AND cat.id != ALL(subtree.path)
+        )
+        INSERT INTO categories.category_tree (category_id, path, protection_mode, protection_source_id,
+                                              icon_source_id)
+        SELECT * FROM subtree
+        ON CONFLICT (category_id) DO UPDATE SET
+            path = EXCLUDED.path,
+            protection_mode = EXCLUDED.protection_mode,
+            protection_source_id = EXCLUDED.protection_source_id,
+            icon_source_id = EXCLUDED.icon_source_id;
+        RETURN NULL;
+    END;
+    $BODY$
+    LANGUAGE plpgsql
+'''
+
+
+def upgrade():
+    op.create_table(
+        'category_tree',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('path', postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('protection_mode', PyIntEnum(_ProtectionMode, exclude_values={_ProtectionMode.inheriting}),
+                  nullable=False),
+        sa.Column('protection_source_id', sa.Integer(), nullable=False),
+        sa.Column('icon_source_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('category_id'),
+        schema='categories'
+    )
+    op.create_index(None, 'category_tree', ['path'], unique=False, schema='categories', postgresql_using='gin')
+    op.execute('''
+        WITH RECURSIVE tree(id, path, protection_mode, protection_source_id, icon_source_id) AS (
+            SELECT id, ARRAY[id], protection_mode, id,
+                   CASE WHEN jsonb_typeof(icon_metadata) = 'null' THEN NULL ELSE id END
+            FROM categories.categories
+            WHERE parent_id IS NULL
+
+            UNION ALL
+
+            SELECT
+                cat.id,
+                tree.path || cat.id,
+                CASE WHEN cat.protection_mode = 1 THEN tree.protection_mode ELSE cat.protection_mode END,
+                CASE WHEN cat.protection_mode = 1 THEN tree.protection_source_id ELSE cat.id END,
+                CASE WHEN jsonb_typeof(cat.icon_metadata) = 'null' THEN tree.icon_source_id ELSE cat.id END
+            FROM categories.categories cat, tree
+            WHERE cat.parent_id = tree.id
+        )
+        INSERT INTO categories.category_tree (category_id, path, protection_mode, protection_source_id,
+                                              icon_source_id)
+        SELECT * FROM tree;
+    ''')
+    op.execute(SQL_FUNCTION_UPDATE_TREE)
+    op.execute('''
+        CREATE TRIGGER update_tree
+        AFTER INSERT OR UPDATE OF parent_id, protection_mode, icon_metadata
+        ON categories.categories
+        FOR EACH ROW
+        EXECUTE PROCEDURE categories.update_tree();
+    ''')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER update_tree ON categories.categories')
+    op.execute('DROP FUNCTION categories.update_tree()')
+    op.drop_table('category_tree', schema='categories')
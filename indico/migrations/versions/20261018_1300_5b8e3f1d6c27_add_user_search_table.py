@@ -0,0 +1,116 @@
+"""Add user search table
+
+Revision ID: 5b8e3f1d6c27
+Revises: a4c27e9b31f0
+Create Date: 2026-10-18 13:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e3f1d6c27'
+down_revision = 'a4c27e9b31f0'
+branch_labels = None
+depends_on = None
+
+
+SQL_FUNCTION_UPDATE_SEARCH_DATA = '''
+    CREATE FUNCTION users.update_search_data() RETURNS trigger AS
+    $BODY$
+    DECLARE
+        user_ids int[];
+    BEGIN
+        IF TG_TABLE_NAME = 'users' THEN
+            user_ids := ARRAY[NEW.id];
+        ELSIF TG_OP = 'INSERT' THEN
+            user_ids := ARRAY[NEW.user_id];
+        ELSIF TG_OP = 'DELETE' THEN
+            user_ids := ARRAY[OLD.user_id];
+        ELSE
+            user_ids := ARRAY[NEW.user_id, OLD.user_id];
+        END IF;
+        INSERT INTO users.user_search (user_id, first_name, last_name, name, emails, affiliation)
+        SELECT
+            u.id,
+            indico.indico_unaccent(lower(u.first_name)),
+            indico.indico_unaccent(lower(u.last_name)),
+            indico.indico_unaccent(lower(u.first_name || ' ' || u.last_name)),
+            COALESCE((SELECT string_agg(indico.indico_unaccent(e.email), ' ' ORDER BY e.email)
+                      FROM users.emails e
+                      WHERE e.user_id = u.id), ''),
+            indico.indico_unaccent(lower(u.affiliation))
+        FROM users.users u
+        WHERE u.id = ANY(user_ids)
+        ON CONFLICT (user_id) DO UPDATE SET
+            first_name = EXCLUDED.first_name,
+            last_name = EXCLUDED.last_name,
+            name = EXCLUDED.name,
+            emails = EXCLUDED.emails,
+            affiliation = EXCLUDED.affiliation;
+        RETURN NULL;
+    END;
+    $BODY$
+    LANGUAGE plpgsql
+'''
+
+
+def upgrade():
+    op.create_table(
+        'user_search',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(), nullable=False),
+        sa.Column('last_name', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('emails', sa.String(), nullable=False),
+        sa.Column('affiliation', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+        schema='users'
+    )
+    op.execute('''
+        INSERT INTO users.user_search (user_id, first_name, last_name, name, emails, affiliation)
+        SELECT
+            u.id,
+            indico.indico_unaccent(lower(u.first_name)),
+            indico.indico_unaccent(lower(u.last_name)),
+            indico.indico_unaccent(lower(u.first_name || ' ' || u.last_name)),
+            COALESCE(e.emails, ''),
+            indico.indico_unaccent(lower(u.affiliation))
+        FROM users.users u
+        LEFT JOIN (
+            SELECT user_id, string_agg(indico.indico_unaccent(email), ' ' ORDER BY email) AS emails
+            FROM users.emails
+            GROUP BY user_id
+        ) e ON (e.user_id = u.id);
+    ''')
+    # create the indexes after populating the table since this is much faster
+    for col in ('first_name', 'last_name', 'name', 'emails', 'affiliation'):
+        op.create_index(None, 'user_search', [col], unique=False, schema='users', postgresql_using='gin',
+                        postgresql_ops={col: 'gin_trgm_ops'})
+    for col in ('first_name', 'last_name'):
+        op.create_index(f'ix_user_search_{col}_prefix', 'user_search', [col], unique=False, schema='users',
+                        postgresql_ops={col: 'text_pattern_ops'})
+    op.execute(SQL_FUNCTION_UPDATE_SEARCH_DATA)
+    op.execute('''
+        CREATE TRIGGER update_search_data
+        AFTER INSERT OR UPDATE OF first_name, last_name, affiliation
+        ON users.users
+        FOR EACH ROW
+        EXECUTE PROCEDURE users.update_search_data();
+    ''')
+    op.execute('''
+        CREATE TRIGGER update_search_data
+        AFTER INSERT OR DELETE OR UPDATE OF email, user_id
+        ON users.emails
+        FOR EACH ROW
+        EXECUTE PROCEDURE users.update_search_data();
+    ''')
+
+
+def downgrade():
+    op.execute('DROP TRIGGER update_search_data ON users.emails')
+    op.execute('DROP TRIGGER update_search_data ON users.users')
+    op.execute('DROP FUNCTION users.update_search_data()')
+    op.drop_table('user_search', schema='users')
@@ -0,0 +1,23 @@
+"""Add index on file metadata
+
+Revision ID: 8d1f4c6b2e57
+Revises: 5b8e3f1d6c27
+Create Date: 2026-10-18 14:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d1f4c6b2e57'
+down_revision = '5b8e3f1d6c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(None, 'files', ['meta'], unique=False, schema='indico', postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_files_meta', table_name='files', schema='indico')
@@ -49,7 +49,10 @@ window.setupGeneratePackage = function setupGeneratePackage(eventId) {
       closeLoader = IndicoUI.Dialogs.Util.progress($T.gettext('Building package'));
     },
     success(data) {
-      if (data.success) {
+      if (data.success && data.download_url) {
+        window.location.href = data.download_url;
+        closeLoader();
+      } else if (data.success) {
         poll(data.task_id);
       } else {
         handleFlashes(data, true, $form.find('.flashed-messages'));
@@ -25,6 +25,7 @@ from indico.modules.attachments.forms import AttachmentPackageForm
 from indico.modules.attachments.models.attachments import Attachment, AttachmentFile, AttachmentType
 from indico.modules.attachments.models.folders import AttachmentFolder
 from indico.modules.attachments.tasks import generate_materials_package
+from indico.modules.attachments.util import get_cached_package, get_package_fingerprint, get_package_member_key
 from indico.modules.core.captcha import invalidate_captcha
 from indico.modules.events.contributions.models.contributions import Contribution
 from indico.modules.events.contributions.models.subcontributions import SubContribution
@@ -66,6 +67,18 @@ def _get_obj_parent(obj):
 class AttachmentPackageGeneratorMixin(ZipGeneratorMixin):
     #: Whether unscheduled contributions should be included
     ALLOW_UNSCHEDULED = False
+    #: A ``(zip_file, members)`` tuple with a previously generated package
+    #: and a dict mapping member keys to paths in that package.  Files
+    #: found in there are copied from it instead of opening them in the
+    #: storage backend.
+    previous_package = None
+
+    def _open_item(self, item):
+        if self.previous_package is not None:
+            zip_file, members = self.previous_package
+            if name := members.get(get_package_member_key(item)):
+                return zip_file.open(name)
+        return super()._open_item(item)
 
     def _filter_attachments(self, filter_data):
         added_since = filter_data.get('added_since', None)
@@ -205,7 +218,7 @@ class AttachmentPackageMixin(AttachmentPackageGeneratorMixin):
     def _process(self):
         form = self._prepare_form()
         if form.validate_on_submit():
-            attachments = [attachment.id for attachment in self._filter_attachments(form.data)]
+            attachments = self._filter_attachments(form.data)
             if attachments:
                 if self.should_apply_rate_limit:
                     # only increment the rate limit if the user is not a manager, so we don't annoy event managers
@@ -215,7 +228,10 @@ class AttachmentPackageMixin(AttachmentPackageGeneratorMixin):
                         delay = format_human_timedelta(material_package_rate_limiter.get_reset_delay())
                         raise TooManyRequests(f"You're doing this too fast, please try again in {delay}")
                     invalidate_captcha()
-                task = generate_materials_package.delay(attachments, self.event)
+                fingerprint = get_package_fingerprint(self._get_zip_members(attachments))
+                if cached_file := get_cached_package(self.event, fingerprint):
+                    return jsonify(download_url=cached_file.signed_download_url, success=True)
+                task = generate_materials_package.delay([attachment.id for attachment in attachments], self.event)
                 return jsonify(task_id=task.id, success=True)
             else:
                 flash(_('There are no materials matching your criteria.'), 'warning')
@@ -5,13 +5,17 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
-import os
+from contextlib import ExitStack
+from zipfile import ZipFile
 
 from indico.core.celery import celery
 from indico.core.config import config
 from indico.core.db import db
 from indico.modules.attachments.models.attachments import Attachment
+from indico.modules.attachments.util import (get_cached_package, get_latest_package, get_package_fingerprint,
+                                             get_package_member_key)
 from indico.modules.files.models.files import File
+from indico.util.zipstream import IterableReader
 
 
 @celery.task(ignore_result=False)
@@ -20,11 +24,27 @@ def generate_materials_package(attachment_ids, event):
     attachments = Attachment.query.filter(Attachment.id.in_(attachment_ids)).all()
     attachment_package_mixin = AttachmentPackageGeneratorMixin()
     attachment_package_mixin.event = event
-    generated_zip = attachment_package_mixin._generate_zip_file(attachments, return_file=True)
-    f = File(filename='material-package.zip', content_type='application/zip', meta={'event_id': event.id})
-    context = ('event', event.id, 'attachment-package')
-    f.save(context, generated_zip, backend=config.STATIC_SITE_STORAGE)
+    members = attachment_package_mixin._get_zip_members(attachments)
+    member_keys = {name: get_package_member_key(file) for name, file in members.items()}
+    fingerprint = get_package_fingerprint(members)
+    # someone else may have requested the same package while this task was queued
+    if cached_file := get_cached_package(event, fingerprint):
+        return cached_file.signed_download_url
+    with ExitStack() as stack:
+        # copy unchanged files from the last package of the event instead of reading all of them again
+        if latest_package := get_latest_package(event):
+            wanted_keys = set(member_keys.values())
+            reusable = {key: name for name, key in latest_package.meta.get('package_members', {}).items()
+                        if key in wanted_keys}
+            if reusable:
+                path = stack.enter_context(latest_package.get_local_path())
+                attachment_package_mixin.previous_package = (stack.enter_context(ZipFile(path)), reusable)
+        # the archive is streamed straight into the storage backend, without a temporary file
+        zip_stream = IterableReader(attachment_package_mixin._iter_zip_members(members))
+        f = File(filename='material-package.zip', content_type='application/zip',
+                 meta={'event_id': event.id, 'package_fingerprint': fingerprint, 'package_members': member_keys})
+        context = ('event', event.id, 'attachment-package')
+        f.save(context, zip_stream, backend=config.STATIC_SITE_STORAGE)
     db.session.add(f)
     db.session.commit()
-    os.unlink(generated_zip.name)
     return f.signed_download_url
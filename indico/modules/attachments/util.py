@@ -5,12 +5,22 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from datetime import timedelta
+from hashlib import sha256
+
 from flask import session
 
 from indico.core.db import db
+from indico.util.date_time import now_utc
 from indico.util.signals import make_interceptable
 
 
+#: How long a generated material package is reused for identical requests.
+#: Packages are unclaimed files which get deleted after a day, so this must
+#: be short enough for a reused package to still exist when downloading it.
+PACKAGE_CACHE_TTL = timedelta(hours=12)
+
+
 def get_attached_folders(linked_object, include_empty=True, include_hidden=True, preload_event=False):
     """Return a list of all the folders linked to an object.
 
@@ -123,3 +133,42 @@ def get_event(linked_object):
         return None
     else:
         return linked_object.event
+
+
+def get_package_member_key(file):
+    """Get a string identifying the content of a file in a material package."""
+    return f'{file.id}:{file.md5}:{file.size}'
+
+
+def get_package_fingerprint(members):
+    """Get a fingerprint identifying the content of a material package.
+
+    Two packages with the same fingerprint contain the same files under
+    the same paths, so the same archive can be used for both of them.
+
+    :param members: A dict mapping archive paths to `AttachmentFile` objects
+    """
+    checksum = sha256()
+    for path, file in sorted(members.items()):
+        checksum.update(f'{path}\0{get_package_member_key(file)}\n'.encode())
+    return checksum.hexdigest()
+
+
+def _query_recent_packages(event, **meta):
+    from indico.modules.files.models.files import File
+    return (File.query
+            .filter(File.meta.contains({'event_id': event.id, **meta}),
+                    File.meta.op('?')('package_fingerprint'),
+                    File.storage_file_id.isnot(None),
+                    File.created_dt > now_utc() - PACKAGE_CACHE_TTL)
+            .order_by(File.created_dt.desc()))
+
+
+def get_cached_package(event, fingerprint):
+    """Get a recently generated material package with the given fingerprint."""
+    return _query_recent_packages(event, package_fingerprint=fingerprint).first()
+
+
+def get_latest_package(event):
+    """Get the most recently generated material package of an event."""
+    return _query_recent_packages(event).first()
@@ -5,8 +5,10 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from types import SimpleNamespace
+
 from indico.modules.attachments.settings import AttachmentPackageAccess, attachments_settings
-from indico.modules.attachments.util import can_generate_attachment_package
+from indico.modules.attachments.util import can_generate_attachment_package, get_package_fingerprint
 
 
 def test_can_generate_attachment_package(dummy_user, create_user, dummy_event):
@@ -29,3 +31,15 @@ def test_can_generate_attachment_package(dummy_user, create_user, dummy_event):
     assert can_generate_attachment_package(dummy_event, manager)
     assert can_generate_attachment_package(dummy_event, user)
     assert can_generate_attachment_package(dummy_event, None)
+
+
+def test_get_package_fingerprint():
+    foo = SimpleNamespace(id=1, md5='acbd18db4cc2f85cedef654fccc4a4d8', size=3)
+    bar = SimpleNamespace(id=2, md5='37b51d194a7513e45b56f6524f2d51f2', size=3)
+    fingerprint = get_package_fingerprint({'a/foo.txt': foo, 'b/bar.txt': bar})
+    assert fingerprint == get_package_fingerprint({'b/bar.txt': bar, 'a/foo.txt': foo})
+    assert fingerprint != get_package_fingerprint({'a/foo.txt': foo})
+    assert fingerprint != get_package_fingerprint({'a/foo.txt': foo, 'c/bar.txt': bar})
+    # a new version of a file changes the fingerprint even if the content is the same
+    new_bar = SimpleNamespace(id=3, md5=bar.md5, size=bar.size)
+    assert fingerprint != get_package_fingerprint({'a/foo.txt': foo, 'b/bar.txt': new_bar})
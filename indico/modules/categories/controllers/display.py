@@ -24,6 +24,7 @@ from werkzeug.exceptions import BadRequest, Forbidden, NotFound
 
 from indico.core import signals
 from indico.core.db import db
+from indico.core.db.sqlalchemy.protection import get_access_prefilter
 from indico.core.db.sqlalchemy.util.queries import get_n_matching
 from indico.modules.categories.controllers.base import RHCategoryBase, RHDisplayCategoryBase
 from indico.modules.categories.controllers.util import (get_category_view_params, get_event_query_filter,
@@ -34,6 +35,8 @@ from indico.modules.categories.serialize import (serialize_categories_ical, seri
                                                  serialize_category_chain)
 from indico.modules.categories.util import get_category_stats, get_upcoming_events
 from indico.modules.categories.views import WPCategory, WPCategoryCalendar
+from indico.modules.events.last_modified import (get_last_modified, get_request_validators, is_not_modified,
+                                                 make_not_modified_response, set_validators)
 from indico.modules.events.management.settings import global_event_settings
 from indico.modules.events.models.events import Event
 from indico.modules.events.timetable.util import get_category_timetable
@@ -349,10 +352,13 @@ class RHShowPastEventsInCategory(RHShowEventsInCategoryBase):
 @allow_signed_url
 class RHExportCategoryICAL(RHDisplayCategoryBase):
     def _process(self):
+        validators = get_request_validators(get_last_modified(category_ids={self.category.id}), session.user)
+        if is_not_modified(*validators):
+            return make_not_modified_response(*validators)
         filename = f'{secure_filename(self.category.title, str(self.category.id))}-category.ics'
         buf = serialize_categories_ical([self.category.id], session.user,
                                         Event.end_dt >= (now_utc() - timedelta(weeks=4)))
-        return send_file(filename, buf, 'text/calendar')
+        return set_validators(send_file(filename, buf, 'text/calendar'), *validators)
 
 
 class RHExportCategoryAtom(RHDisplayCategoryBase):
@@ -708,9 +714,9 @@ class RHCategoryRelativeEventBase(RHDisplayCategoryBase):
                  .filter(Event.is_visible_in(self.category.id),
                          filter_,
                          ~Event.is_deleted)
-                 .options(subqueryload('acl_entries'))
-                 .order_by(*order))
-        res = get_n_matching(query, 1, lambda event: event.can_access(session.user))
+                 .options(subqueryload('acl_entries')))
+        res = get_n_matching(query, 1, lambda event: event.can_access(session.user), keyset=order,
+                             prefilter=get_access_prefilter(Event.effective_protection_mode, session.user))
         if res:
             return res[0]
 
@@ -106,3 +106,54 @@ def _create_check_cycles(sender, connection, **kwargs):
         LANGUAGE plpgsql
     ''')
     DDL(sql).execute(connection)
+
+
+@signals.core.db_schema_created.connect_via('categories')
+def _create_update_tree(sender, connection, **kwargs):
+    sql = textwrap.dedent('''
+        CREATE FUNCTION categories.update_tree() RETURNS trigger AS
+        $BODY$
+        BEGIN
+            -- rebuild the tree data of the category and all its subcategories
+            -- (protection mode 1 is "inheriting")
+            WITH RECURSIVE subtree(id, path, protection_mode, protection_source_id, icon_source_id) AS (
+                SELECT
+                    cat.id,
+                    COALESCE(parent.path, '{}') || cat.id,
+                    CASE WHEN cat.protection_mode = 1 THEN parent.protection_mode
+                         ELSE cat.protection_mode END,
+                    CASE WHEN cat.protection_mode = 1 THEN parent.protection_source_id
+                         ELSE cat.id END,
+                    CASE WHEN jsonb_typeof(cat.icon_metadata) = 'null' THEN parent.icon_source_id ELSE cat.id END
+                FROM categories.categories cat
+                LEFT JOIN categories.category_tree parent ON (parent.category_id = cat.parent_id)
+                WHERE cat.id = NEW.id
+
+                UNION ALL
+
+                SELECT
+                    cat.id,
+                    subtree.path || cat.id,
+                    CASE WHEN cat.protection_mode = 1 THEN subtree.protection_mode
+                         ELSE cat.protection_mode END,
+                    CASE WHEN cat.protection_mode = 1 THEN subtree.protection_source_id
+                         ELSE cat.id END,
+                    CASE WHEN jsonb_typeof(cat.icon_metadata) = 'null' THEN subtree.icon_source_id ELSE cat.id END
+                FROM categories.categories cat, subtree
+                -- the cycle check runs before this trigger, but better safe than sorry
+                WHERE cat.parent_id = subtree.id AND cat.id != ALL(subtree.path)
+            )
+            INSERT INTO categories.category_tree (category_id, path, protection_mode, protection_source_id,
+                                                  icon_source_id)
+            SELECT * FROM subtree
+            ON CONFLICT (category_id) DO UPDATE SET
+                path = EXCLUDED.path,
+                protection_mode = EXCLUDED.protection_mode,
+                protection_source_id = EXCLUDED.protection_source_id,
+                icon_source_id = EXCLUDED.icon_source_id;
+            RETURN NULL;
+        END;
+        $BODY$
+        LANGUAGE plpgsql
+    ''')
+    DDL(sql).execute(connection)
@@ -8,7 +8,7 @@
 import pytz
 from flask import session
 from sqlalchemy import DDL, orm
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB, array
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by, array
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -24,6 +24,7 @@ from indico.core.db.sqlalchemy.descriptions import DescriptionMixin, RenderMode
 from indico.core.db.sqlalchemy.protection import ProtectionManagersMixin, ProtectionMode
 from indico.core.db.sqlalchemy.searchable import SearchableTitleMixin
 from indico.core.db.sqlalchemy.util.models import auto_table_args
+from indico.modules.categories.models.tree import category_tree_table
 from indico.modules.logs.models.entries import CategoryLogEntry, CategoryLogRealm, LogKind
 from indico.util.date_time import get_display_tz
 from indico.util.decorators import strict_classproperty
@@ -534,28 +535,56 @@ class Category(SearchableTitleMixin, DescriptionMixin, ProtectionManagersMixin,
                      .where(cat_alias.parent_id == cte_query.c.id))
         return cte_query.union_all(rec_query)
 
+    @staticmethod
+    def get_chain_subquery(category_id, col='id'):
+        """Create a scalar subquery for the chain of a category.
+
+        The subquery returns an array containing the data of the chain
+        from the root down to the category itself.  It uses the
+        precomputed paths from the category tree table instead of
+        walking the category tree.
+
+        :param category_id: The expression containing the id of the
+                            category, e.g. ``Event.category_id``
+        :param col: The name of the column to use in the array or a
+                    callable receiving the category alias that must
+                    return the expression used for the array elements.
+        """
+        tree = category_tree_table.alias('chain_tree')
+        if col == 'id':
+            return select([tree.c.path]).where(tree.c.category_id == category_id).correlate_except(tree)
+        cat_alias = db.aliased(Category)
+        path_column = col(cat_alias) if callable(col) else getattr(cat_alias, col)
+        order = func.array_position(tree.c.path, cat_alias.id)
+        return (select([func.array_agg(aggregate_order_by(path_column, order))])
+                .where(tree.c.category_id == category_id, tree.c.path.any(cat_alias.id))
+                .correlate_except(tree, cat_alias))
+
     @property
     def deep_children_query(self):
         """A query object for all subcategories.
 
         This includes subcategories at any level of nesting.
         """
-        cte = Category.get_tree_cte()
         return (Category.query
-                .join(cte, Category.id == cte.c.id)
-                .filter(cte.c.path.contains([self.id]),
-                        cte.c.id != self.id,
-                        ~cte.c.is_deleted))
+                .join(category_tree_table, category_tree_table.c.category_id == Category.id)
+                .filter(category_tree_table.c.path.contains([self.id]),
+                        Category.id != self.id,
+                        ~Category.is_deleted))
 
     @staticmethod
-    def _get_chain_query(start_criterion):
-        cte_query = (select([Category.id, Category.parent_id, literal(0).label('level')])
-                     .where(start_criterion)
-                     .cte('category_chain', recursive=True))
-        parent_query = (select([Category.id, Category.parent_id, cte_query.c.level + 1])
-                        .where(Category.id == cte_query.c.parent_id))
-        cte_query = cte_query.union_all(parent_query)
-        return Category.query.join(cte_query, Category.id == cte_query.c.id).order_by(cte_query.c.level.desc())
+    def _get_chain_query(category_ids):
+        """Create a query for the chains of the specified categories.
+
+        The query retrieves the root category first, followed by the
+        categories in the next level of the tree etc.
+        """
+        start_tree = category_tree_table.alias('start_tree')
+        chain_ids = select([func.unnest(start_tree.c.path)]).where(start_tree.c.category_id.in_(category_ids))
+        return (Category.query
+                .join(category_tree_table, category_tree_table.c.category_id == Category.id)
+                .filter(Category.id.in_(chain_ids))
+                .order_by(func.cardinality(category_tree_table.c.path)))
 
     @property
     def chain_query(self):
@@ -564,7 +593,7 @@ class Category(SearchableTitleMixin, DescriptionMixin, ProtectionManagersMixin,
         The query retrieves the root category first and then all the
         intermediate categories up to (and including) this category.
         """
-        return self._get_chain_query(Category.id == self.id)
+        return self._get_chain_query([self.id])
 
     @property
     def parent_chain_query(self):
@@ -573,7 +602,7 @@ class Category(SearchableTitleMixin, DescriptionMixin, ProtectionManagersMixin,
         The query retrieves the root category first and then all the
         intermediate categories up to (excluding) this category.
         """
-        return self._get_chain_query(Category.id == self.parent_id)
+        return self._get_chain_query([self.parent_id] if not self.is_root else [])
 
     def nth_parent(self, n_categs, fail_on_overflow=True):
         """Return the nth parent of the category.
@@ -700,8 +729,10 @@ def _mappers_configured():
     # Category.effective_protection_mode -- the effective protection mode
     # (public/protected) of the category, even if it's inheriting it from its
     # parent category
-    cte = Category.get_protection_cte()
-    query = select([cte.c.protection_mode]).where(cte.c.id == Category.id).correlate_except(cte).scalar_subquery()
+    query = (select([category_tree_table.c.protection_mode])
+             .where(category_tree_table.c.category_id == Category.id)
+             .correlate_except(category_tree_table)
+             .scalar_subquery())
     Category.effective_protection_mode = column_property(query, deferred=True, expire_on_flush=False)
 
     # Category.effective_google_wallet_config -- the effective google wallet config
@@ -724,11 +755,13 @@ def _mappers_configured():
 
     # Category.effective_icon_data -- the effective icon data of the category,
     # either set on the category itself or inherited from it
-    cte = Category.get_icon_data_cte()
-    query = (select([db.func.json_build_object('source_id', cte.c.source_id,
-                                               'metadata', cte.c.icon_metadata)])
-             .where(cte.c.id == Category.id)
-             .correlate_except(cte)
+    icon_source = db.aliased(Category)
+    query = (select([db.func.json_build_object('source_id', category_tree_table.c.icon_source_id,
+                                               'metadata', icon_source.icon_metadata)])
+             .select_from(category_tree_table.outerjoin(icon_source,
+                                                        icon_source.id == category_tree_table.c.icon_source_id))
+             .where(category_tree_table.c.category_id == Category.id)
+             .correlate_except(category_tree_table, icon_source)
              .scalar_subquery())
     Category.effective_icon_data = column_property(query, deferred=True)
 
@@ -757,40 +790,41 @@ def _mappers_configured():
 
     # Category.chain_titles -- a list of the titles in the parent chain,
     # starting with the root category down to the current category.
-    cte = Category.get_tree_cte('title')
-    query = select([cte.c.path]).where(cte.c.id == Category.id).correlate_except(cte).scalar_subquery()
+    query = Category.get_chain_subquery(Category.id, 'title').scalar_subquery()
     Category.chain_titles = column_property(query, deferred=True)
 
     # Category.chain_ids -- a list of the ids in the parent chain,
     # starting with the root category down to the current category.
     # This is equivalent to the `category_chain` in the Event model.
-    cte = Category.get_tree_cte()
-    query = select([cte.c.path]).where(cte.c.id == Category.id).correlate_except(cte).scalar_subquery()
+    query = Category.get_chain_subquery(Category.id).scalar_subquery()
     Category.chain_ids = column_property(query, deferred=True)
 
     # Category.chain -- a list of the ids and titles in the parent
     # chain, starting with the root category down to the current
     # category.  Each chain entry is a dict containing 'id' and `title`.
-    cte = Category.get_tree_cte(lambda cat: db.func.json_build_object('id', cat.id, 'title', cat.title))
-    query = select([cte.c.path]).where(cte.c.id == Category.id).correlate_except(cte).scalar_subquery()
-    Category.chain = column_property(query, deferred=True)
+    query = Category.get_chain_subquery(Category.id, lambda cat: db.func.json_build_object('id', cat.id,
+                                                                                         'title', cat.title))
+    Category.chain = column_property(query.scalar_subquery(), deferred=True)
 
     # Category.deep_events_count -- the number of events in the category
     # or any child category (excluding deleted events)
-    cte = Category.get_tree_cte()
-    crit = db.and_(cte.c.id == Event.category_id,
-                   cte.c.path.contains(array([Category.id])),
-                   ~cte.c.is_deleted,
+    crit = db.and_(category_tree_table.c.category_id == Event.category_id,
+                   category_tree_table.c.path.contains(array([Category.id])),
                    ~Event.is_deleted)
-    query = select([db.func.count()]).where(crit).correlate_except(Event).scalar_subquery()
+    query = select([db.func.count()]).where(crit).correlate_except(Event, category_tree_table).scalar_subquery()
     Category.deep_events_count = column_property(query, deferred=True)
 
     # Category.deep_children_count -- the number of subcategories in the
     # category or any child category (excluding deleted ones)
-    cte = Category.get_tree_cte()
-    crit = db.and_(cte.c.path.contains(array([Category.id])),
-                   cte.c.id != Category.id, ~cte.c.is_deleted)
-    query = select([db.func.count()]).where(crit).correlate_except(cte).scalar_subquery()
+    cat_alias = db.aliased(Category)
+    crit = db.and_(category_tree_table.c.path.contains(array([Category.id])),
+                   category_tree_table.c.category_id == cat_alias.id,
+                   cat_alias.id != Category.id,
+                   ~cat_alias.is_deleted)
+    query = (select([db.func.count()])
+             .where(crit)
+             .correlate_except(category_tree_table, cat_alias)
+             .scalar_subquery())
     Category.deep_children_count = column_property(query, deferred=True)
 
 
@@ -78,6 +78,49 @@ def test_effective_protection_mode(db):
     }
 
 
+def test_category_tree_maintained(db, create_category):
+    def _get_tree_data():
+        db.session.expire_all()
+        query = Category.query.options(undefer('chain_ids'), undefer('effective_protection_mode'),
+                                       undefer('effective_icon_data'))
+        return {c.id: (c.chain_ids, c.effective_protection_mode, c.effective_icon_data['source_id'])
+                for c in query if c.id}
+
+    a = create_category(1, title='a', protection_mode=ProtectionMode.protected)
+    b = create_category(2, title='b', parent=a)
+    c = create_category(3, title='c', parent=b)
+    d = create_category(4, title='d', protection_mode=ProtectionMode.public)
+    assert _get_tree_data() == {
+        1: ([0, 1], ProtectionMode.protected, None),
+        2: ([0, 1, 2], ProtectionMode.protected, None),
+        3: ([0, 1, 2, 3], ProtectionMode.protected, None),
+        4: ([0, 4], ProtectionMode.public, None),
+    }
+    # moving a category updates the whole subtree
+    b.move(d)
+    b.icon = b'dummy'
+    b.icon_metadata = {'hash': 'foo'}
+    db.session.flush()
+    assert _get_tree_data() == {
+        1: ([0, 1], ProtectionMode.protected, None),
+        2: ([0, 4, 2], ProtectionMode.public, 2),
+        3: ([0, 4, 2, 3], ProtectionMode.public, 2),
+        4: ([0, 4], ProtectionMode.public, None),
+    }
+    d.protection_mode = ProtectionMode.protected
+    c.protection_mode = ProtectionMode.public
+    db.session.flush()
+    assert _get_tree_data() == {
+        1: ([0, 1], ProtectionMode.protected, None),
+        2: ([0, 4, 2], ProtectionMode.protected, 2),
+        3: ([0, 4, 2, 3], ProtectionMode.public, 2),
+        4: ([0, 4], ProtectionMode.protected, None),
+    }
+    assert {cat.id for cat in d.deep_children_query} == {2, 3}
+    assert [cat.id for cat in c.chain_query] == [0, 4, 2, 3]
+    assert Category.get(3).chain_titles == ['Home', 'd', 'b', 'c']
+
+
 @pytest.fixture
 def category_family(create_category, db):
     grandpa = Category.get_root()
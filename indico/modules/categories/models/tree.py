@@ -0,0 +1,76 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from sqlalchemy import DDL
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.event import listens_for
+
+from indico.core.db import db
+from indico.core.db.sqlalchemy import PyIntEnum
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+
+
+#: Precomputed data about the position of each category in the category
+#: tree.  The table is maintained by a trigger on the categories table
+#: (see ``categories.update_tree()``) and must never be modified manually.
+#:
+#: - ``path`` -- the ids of the chain from the root category down to the
+#:               category itself
+#: - ``protection_mode`` -- the effective protection mode (public or
+#:                          protected) of the category
+#: - ``protection_source_id`` -- the category which defines the effective
+#:                               protection mode
+#: - ``icon_source_id`` -- the category whose icon is used by the category,
+#:                         or ``None`` if neither the category nor any of
+#:                         its parents has an icon
+category_tree_table = db.Table(
+    'category_tree',
+    db.metadata,
+    db.Column(
+        'category_id',
+        db.Integer,
+        db.ForeignKey('categories.categories.id', ondelete='CASCADE'),
+        primary_key=True,
+        nullable=False
+    ),
+    db.Column(
+        'path',
+        ARRAY(db.Integer),
+        nullable=False
+    ),
+    db.Column(
+        'protection_mode',
+        PyIntEnum(ProtectionMode, exclude_values={ProtectionMode.inheriting}),
+        nullable=False
+    ),
+    db.Column(
+        'protection_source_id',
+        db.Integer,
+        nullable=False
+    ),
+    db.Column(
+        'icon_source_id',
+        db.Integer,
+        nullable=True
+    ),
+    db.Index(None, 'path', postgresql_using='gin'),
+    schema='categories'
+)
+
+
+@listens_for(category_tree_table, 'after_create')
+def _add_update_tree_trigger(target, conn, **kw):
+    # the trigger on the categories table needs to be created after this
+    # table exists since creating the root category fires it
+    sql = '''
+        CREATE TRIGGER update_tree
+        AFTER INSERT OR UPDATE OF parent_id, protection_mode, icon_metadata
+        ON categories.categories
+        FOR EACH ROW
+        EXECUTE PROCEDURE categories.update_tree();
+    '''
+    DDL(sql).execute(conn)
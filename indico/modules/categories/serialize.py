@@ -11,6 +11,7 @@ from feedgen.feed import FeedGenerator
 from flask import session
 from sqlalchemy.orm import joinedload, load_only, subqueryload, undefer
 
+from indico.core.db.sqlalchemy.protection import can_access_many
 from indico.modules.categories import Category
 from indico.modules.events import Event
 from indico.modules.events.ical import events_to_ical
@@ -57,7 +58,7 @@ def serialize_categories_ical(category_ids, user, event_filter=True, event_filte
     event_contact_settings.preload_bulk({e.id for e in events})
     # make sure the parent categories are in sqlalchemy's identity cache.
     # this avoids query spam from `protection_parent` lookups
-    _parent_categs = (Category._get_chain_query(Category.id.in_({e.category_id for e in events}))  # noqa: F841,RUF100
+    _parent_categs = (Category._get_chain_query({e.category_id for e in events})  # noqa: F841,RUF100
                       .options(load_only('id', 'parent_id', 'protection_mode'),
                                joinedload('acl_entries'))
                       .all())
@@ -84,7 +85,7 @@ def serialize_category_atom(category, url, user, event_filter):
                                 'access_key'),
                       subqueryload('acl_entries'))
              .order_by(Event.start_dt))
-    events = [e for e in query if e.can_access(user)]
+    events = [e for e, can_access in can_access_many(query, user).items() if can_access]
 
     feed = FeedGenerator()
     feed.id(url)
@@ -8,9 +8,9 @@
 from flask import request
 
 from indico.modules.core.controllers import (RHAPIGenerateCaptcha, RHChangeLanguage, RHChangeTimezone, RHConfig,
-                                             RHContact, RHCountries, RHPrincipals, RHRenderMarkdown, RHReportErrorAPI,
-                                             RHResetSignatureTokens, RHSessionExpiry, RHSessionRefresh, RHSettings,
-                                             RHSignURL, RHVersionCheck)
+                                             RHContact, RHCountries, RHEmailQueueStats, RHEndpointStats, RHPrincipals,
+                                             RHRenderMarkdown, RHReportErrorAPI, RHResetSignatureTokens,
+                                             RHSessionExpiry, RHSessionRefresh, RHSettings, RHSignURL, RHVersionCheck)
 from indico.web.flask.util import redirect_view
 from indico.web.flask.wrappers import IndicoBlueprint
 
@@ -19,6 +19,8 @@ _bp = IndicoBlueprint('core', __name__, template_folder='templates', virtual_tem
 
 _bp.add_url_rule('/admin/settings/', 'settings', RHSettings, methods=('GET', 'POST'))
 _bp.add_url_rule('/admin/version-check', 'version_check', RHVersionCheck)
+_bp.add_url_rule('/admin/endpoint-stats.<any(json,txt):format>', 'endpoint_stats', RHEndpointStats)
+_bp.add_url_rule('/admin/email-queue.json', 'email_queue_stats', RHEmailQueueStats)
 
 # TODO: replace with an actual admin dashboard at some point
 _bp.add_url_rule('/admin/', 'admin_dashboard', view_func=redirect_view('.settings'))
@@ -7,6 +7,7 @@
 
 from importlib.metadata import PackageNotFoundError
 from importlib.metadata import version as get_version
+from operator import itemgetter
 from urllib.parse import urljoin, urlsplit
 
 import requests
@@ -21,6 +22,7 @@ from werkzeug.routing import BuildError
 import indico
 from indico.core.config import config
 from indico.core.db.sqlalchemy.principals import PrincipalType
+from indico.core.emails import get_email_queue_stats, use_email_scheduler
 from indico.core.errors import NoReportError, UserValueError
 from indico.core.logger import Logger
 from indico.core.notifications import make_email, send_email
@@ -43,6 +45,7 @@ from indico.util.marshmallow import PrincipalDict, validate_with_message
 from indico.util.string import remove_accents, render_markdown, sanitize_html, str_to_ascii
 from indico.web.args import use_kwargs
 from indico.web.errors import load_error_data
+from indico.web.flask.stats import format_endpoint_stats_prometheus, get_endpoint_stats
 from indico.web.flask.templating import get_template_module
 from indico.web.flask.util import url_for
 from indico.web.forms.base import FormDefaults
@@ -122,6 +125,38 @@ class RHSettings(RHAdminBase):
                                           show_migration_message=show_migration_message)
 
 
+class RHEndpointStats(RHAdminBase):
+    """Aggregated performance statistics of all endpoints."""
+
+    def _check_access(self):
+        RHAdminBase._check_access(self)
+        if not config.ENDPOINT_STATS:
+            raise NotFound
+
+    def _process(self):
+        stats = get_endpoint_stats()
+        if request.view_args['format'] == 'txt':
+            return current_app.response_class(format_endpoint_stats_prometheus(stats),
+                                              mimetype='text/plain; version=0.0.4')
+        return jsonify({endpoint: {**data['metrics'],
+                                   'n_plus_one': [{'statement': statement, 'count': count}
+                                                  for statement, count in sorted(data['n_plus_one'].items(),
+                                                                                 key=itemgetter(1), reverse=True)]}
+                        for endpoint, data in stats.items()})
+
+
+class RHEmailQueueStats(RHAdminBase):
+    """Statistics about the emails waiting to be sent by the email scheduler."""
+
+    def _check_access(self):
+        RHAdminBase._check_access(self)
+        if not use_email_scheduler():
+            raise NotFound
+
+    def _process(self):
+        return jsonify(get_email_queue_stats())
+
+
 class RHChangeTimezone(RH):
     """Update the session/user timezone."""
 
@@ -54,6 +54,70 @@ event_management_object_url_prefixes = {
 signals.acl.entry_changed.connect(make_acl_log_fn(Event, EventLogRealm.management), sender=Event, weak=False)
 
 
+@signals.event.created.connect
+@signals.event.updated.connect
+@signals.event.deleted.connect
+@signals.event.restored.connect
+@signals.event.moved.connect
+@signals.event.type_changed.connect
+@signals.event.location_changed.connect
+@signals.event.person_updated.connect
+@signals.event.contribution_created.connect
+@signals.event.contribution_updated.connect
+@signals.event.contribution_deleted.connect
+@signals.event.subcontribution_created.connect
+@signals.event.subcontribution_updated.connect
+@signals.event.subcontribution_deleted.connect
+@signals.event.session_updated.connect
+@signals.event.session_deleted.connect
+@signals.event.session_block_updated.connect
+@signals.event.session_block_deleted.connect
+@signals.event.times_changed.connect
+@signals.event.note_added.connect
+@signals.event.note_modified.connect
+@signals.event.note_deleted.connect
+@signals.event.note_restored.connect
+@signals.attachments.folder_created.connect
+@signals.attachments.folder_updated.connect
+@signals.attachments.folder_deleted.connect
+@signals.attachments.attachment_created.connect
+@signals.attachments.attachment_updated.connect
+@signals.attachments.attachment_deleted.connect
+@signals.acl.entry_changed.connect
+@signals.acl.protection_changed.connect
+def _mark_event_modified(sender, obj=None, **kwargs):
+    from indico.modules.attachments.models.attachments import Attachment
+    from indico.modules.categories.models.categories import Category
+    from indico.modules.events.last_modified import (mark_category_access_modified, mark_category_data_modified,
+                                                     mark_event_modified)
+    obj = obj or sender
+    if isinstance(obj, Attachment):
+        obj = obj.folder
+    if isinstance(obj, Category):
+        # access to the category and everything inside it may have changed
+        mark_category_access_modified(obj)
+        mark_category_data_modified(obj)
+    elif (event := getattr(obj, 'event', None)) is not None:
+        mark_event_modified(event)
+
+
+@signals.event.moved.connect
+def _mark_old_category_modified(event, old_parent, **kwargs):
+    from indico.modules.events.last_modified import mark_categories_modified
+    mark_categories_modified(old_parent.chain_ids)
+
+
+@signals.category.updated.connect
+@signals.category.moved.connect
+@signals.category.deleted.connect
+def _mark_category_modified(category, old_parent=None, **kwargs):
+    from indico.modules.events.last_modified import mark_categories_modified, mark_category_data_modified
+    mark_categories_modified(category.chain_ids)
+    mark_category_data_modified(category)
+    if old_parent is not None:
+        mark_categories_modified(old_parent.chain_ids)
+
+
 @signals.users.merged.connect
 def _merge_users(target, source, **kwargs):
     from indico.modules.events.models.persons import EventPerson
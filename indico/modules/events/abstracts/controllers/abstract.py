@@ -93,7 +93,7 @@ class RHAbstractExportPDF(RHAbstractBase):
         if not config.LATEX_ENABLED:
             raise NotFound
         filename = f'abstract-{self.abstract.friendly_id}.pdf'
-        data = generate_cached_pdf(lambda a: AbstractToPDF(a).generate(as_bytes=True), 'abstract', self.abstract)
+        data = generate_cached_pdf(AbstractToPDF, 'abstract', self.abstract)
         return send_file(filename, data, 'application/pdf')
 
 
@@ -107,6 +107,5 @@ class RHAbstractExportFullPDF(RHAbstractBase):
         if not config.LATEX_ENABLED:
             raise NotFound
         filename = f'abstract-{self.abstract.friendly_id}-reviews.pdf'
-        data = generate_cached_pdf(lambda a: ConfManagerAbstractToPDF(a).generate(as_bytes=True), 'abstract-full',
-                                   self.abstract)
+        data = generate_cached_pdf(ConfManagerAbstractToPDF, 'abstract-full', self.abstract)
         return send_file(filename, data, 'application/pdf')
@@ -7,14 +7,16 @@
 
 import os
 
-from flask import flash, request, session
+from flask import current_app, flash, jsonify, request, session
 from werkzeug.exceptions import NotFound
 
 from indico.core.config import config
+from indico.legacy.pdfinterface.latex import get_latex_build_status
 from indico.modules.events.abstracts.controllers.base import RHAbstractsBase, RHManageAbstractsBase
 from indico.modules.events.abstracts.forms import BOASettingsForm
 from indico.modules.events.abstracts.settings import boa_settings
 from indico.modules.events.abstracts.util import clear_boa_cache, create_boa, create_boa_tex
+from indico.modules.events.abstracts.views import WPDisplayBOA
 from indico.modules.events.contributions import contribution_settings
 from indico.modules.files.controllers import UploadFileMixin
 from indico.modules.logs.models.entries import EventLogRealm, LogKind
@@ -26,6 +28,11 @@ from indico.web.forms.base import FormDefaults
 from indico.web.util import jsonify_data, jsonify_form
 
 
+#: How often (in seconds) the page shown while the book of abstracts is
+#: being built reloads itself
+BOA_REFRESH_INTERVAL = 5
+
+
 class RHBOASettings(RHManageAbstractsBase):
     """Configure book of abstracts."""
 
@@ -86,20 +93,41 @@ class RHExportBOA(RHAbstractsBase):
         if not published:
             raise NotFound(_('The contributions of this event have not been published yet'))
 
+    def _send_boa(self):
+        file, fingerprint = create_boa(self.event)
+        if file:
+            return file.send()
+        failed = get_latex_build_status(fingerprint)['state'] == 'failed'
+        response = current_app.make_response(WPDisplayBOA.render_template('display/boa_building.html', self.event,
+                                                                          failed=failed))
+        if not failed:
+            # reload the page (which sends the PDF once it is ready) until the build has finished
+            response.headers['Refresh'] = str(BOA_REFRESH_INTERVAL)
+        return response
+
     def _process(self):
         if (
             request.args.get('latex') == '1' and
             config.LATEX_ENABLED and
             self.event.can_manage(session.user, permission='abstracts')
         ):
-            return send_file('book-of-abstracts.pdf', create_boa(self.event), 'application/pdf')
+            return self._send_boa()
         if self.event.has_custom_boa:
             return self.event.custom_boa.send()
         elif config.LATEX_ENABLED:
-            return send_file('book-of-abstracts.pdf', create_boa(self.event), 'application/pdf')
+            return self._send_boa()
         raise NotFound
 
 
+class RHExportBOAStatus(RHExportBOA):
+    """Get the build status of the book of abstracts."""
+
+    def _process(self):
+        if not config.LATEX_ENABLED or not (fingerprint := boa_settings.get(self.event, 'cache_fingerprint')):
+            raise NotFound
+        return jsonify(get_latex_build_status(fingerprint))
+
+
 class RHExportBOATeX(RHManageAbstractsBase):
     """Export a zip file with the book of abstracts in TeX format."""
 
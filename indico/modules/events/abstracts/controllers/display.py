@@ -44,10 +44,8 @@ class RHMyAbstractsExportPDF(RHAbstractsBase):
         if not config.LATEX_ENABLED:
             raise NotFound
         abstracts = get_user_abstracts(self.event, session.user)
-        data = generate_cached_pdf(
-            lambda: AbstractsToPDF(self.event, abstracts).generate(as_bytes=True),
-            ('my-abstracts', '-'.join(sorted(str(a.id) for a in abstracts))),
-        )
+        data = generate_cached_pdf(lambda event: AbstractsToPDF(event, abstracts), 'my-abstracts', self.event,
+                                   ids=[a.id for a in abstracts])
         return send_file('my-abstracts.pdf', data, 'application/pdf')
 
 
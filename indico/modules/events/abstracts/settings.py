@@ -147,7 +147,7 @@ boa_settings = EventSettingsProxy('abstracts_book', {
     'sort_by': BOASortField.id,
     'corresponding_author': BOACorrespondingAuthorType.none,
     'show_abstract_ids': False,
-    'cache_path': None,
+    'cache_fingerprint': None,
     'cache_path_tex': None,
     'min_lines_per_abstract': 0,
     'link_format': BOALinkFormat.frame,
@@ -5,10 +5,7 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
-import errno
 import itertools
-import os
-import shutil
 from collections import defaultdict, namedtuple
 
 from sqlalchemy.orm import contains_eager, joinedload, load_only, noload
@@ -16,7 +13,7 @@ from sqlalchemy.orm import contains_eager, joinedload, load_only, noload
 from indico.core.config import config
 from indico.core.db import db
 from indico.core.db.sqlalchemy.util.session import no_autoflush
-from indico.legacy.pdfinterface.latex import AbstractBook
+from indico.legacy.pdfinterface.latex import AbstractBook, get_latex_build_status, get_latex_pdf, request_latex_pdf
 from indico.modules.events import Event
 from indico.modules.events.abstracts.forms import InvitedAbstractMixin
 from indico.modules.events.abstracts.models.abstracts import Abstract, AbstractState
@@ -315,23 +312,23 @@ def get_track_reviewer_abstract_counts(event, user):
 def create_boa(event):
     """Create the book of abstracts if necessary.
 
-    :return: The path to the PDF file
+    The PDF is built in the background, so it may not be available
+    immediately.
+
+    :return: A ``(file, fingerprint)`` tuple containing the `File` with
+             the PDF (``None`` if it is still being built) and the
+             fingerprint which can be used to get the build status
     """
-    path = boa_settings.get(event, 'cache_path')
-    if path:
-        path = os.path.join(config.CACHE_DIR, path)
-        if os.path.exists(path):
-            # update file mtime so it's not deleted during cache cleanup
-            os.utime(path, None)
-            return path
+    if fingerprint := boa_settings.get(event, 'cache_fingerprint'):
+        if file := get_latex_pdf(fingerprint):
+            return file, fingerprint
+        elif get_latex_build_status(fingerprint)['state'] in ('queued', 'compiling'):
+            return None, fingerprint
     with force_locale(config.DEFAULT_LOCALE):
         pdf = AbstractBook(event)
-        tmp_path = pdf.generate()
-    filename = f'boa-{event.id}.pdf'
-    full_path = os.path.join(config.CACHE_DIR, filename)
-    shutil.move(tmp_path, full_path)
-    boa_settings.set(event, 'cache_path', filename)
-    return full_path
+        file, fingerprint = request_latex_pdf(pdf, f'boa-{event.id}', 'book-of-abstracts.pdf')
+    boa_settings.set(event, 'cache_fingerprint', fingerprint)
+    return file, fingerprint
 
 
 def create_boa_tex(event):
@@ -345,15 +342,12 @@ def create_boa_tex(event):
 
 
 def clear_boa_cache(event):
-    """Delete the cached book of abstract."""
-    path = boa_settings.get(event, 'cache_path')
-    if path:
-        try:
-            os.remove(os.path.join(config.CACHE_DIR, path))
-        except OSError as e:
-            if e.errno != errno.ENOENT:
-                raise
-        boa_settings.delete(event, 'cache_path')
+    """Make sure the book of abstracts is checked for changes.
+
+    The PDF itself is kept until a new version has been built, so it is
+    reused if nothing in it actually changed.
+    """
+    boa_settings.delete(event, 'cache_fingerprint')
 
 
 def get_events_with_abstract_reviewer_convener(user, dt=None):
@@ -31,6 +31,10 @@ class WPDisplayAbstracts(WPDisplayAbstractsBase):
     menu_entry_name = 'call_for_abstracts'
 
 
+class WPDisplayBOA(WPDisplayAbstractsBase):
+    menu_entry_name = 'abstracts_book'
+
+
 class WPDisplayCallForAbstracts(WPDisplayAbstracts):
     pass
 
@@ -18,9 +18,11 @@ from sqlalchemy.orm import joinedload, selectinload, subqueryload, undefer
 from werkzeug.exceptions import ServiceUnavailable
 
 from indico.core import signals
+from indico.core.cache import make_scoped_cache
 from indico.core.db import db
 from indico.core.db.sqlalchemy.principals import PrincipalType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionMode, can_access_many
+from indico.modules.api import api_settings
 from indico.modules.attachments.api.util import build_folders_api_data, build_material_legacy_api_data
 from indico.modules.categories import Category
 from indico.modules.categories.models.legacy_mapping import LegacyCategoryMapping
@@ -28,6 +30,8 @@ from indico.modules.categories.serialize import serialize_categories_ical
 from indico.modules.events import Event
 from indico.modules.events.contributions import contribution_settings
 from indico.modules.events.contributions.models.contributions import Contribution
+from indico.modules.events.last_modified import (get_events_category_data_modified, get_events_last_modified,
+                                                 get_last_modified)
 from indico.modules.events.models.persons import PersonLinkBase
 from indico.modules.events.notes.util import build_note_api_data, build_note_legacy_api_data
 from indico.modules.events.sessions.models.blocks import SessionBlock
@@ -48,6 +52,9 @@ MAX_DATETIME = utc.localize(datetime(2099, 12, 31, 23, 59, 0))
 MIN_DATETIME = utc.localize(datetime(2000, 1, 1))
 
 
+API_EVENT_CACHE = make_scoped_cache('legacy-http-api-events')
+
+
 def find_event_day_bounds(obj, day):
     if not (obj.start_dt_local.date() <= day <= obj.end_dt_local.date()):
         return None, None
@@ -99,6 +106,9 @@ class CategoryEventHook(HTTPAPIHook):
     TYPES = ('event', 'categ')
     RE = r'(?P<idlist>\w+(?:-\w+)*)'
     DEFAULT_DETAIL = 'events'
+    # the serialized events are cached individually and invalidated when they
+    # change, so caching the whole result would only serve outdated data
+    NO_CACHE = True
     MAX_RECORDS = {
         'events': 1000,
         'contributions': 500,
@@ -120,6 +130,16 @@ class CategoryEventHook(HTTPAPIHook):
         self._location = get_query_parameter(self._queryParams, ['l', 'location'])
         self._room = get_query_parameter(self._queryParams, ['r', 'room'])
 
+    def get_last_modified(self, user):
+        id_list = self._pathParams['idlist'].split('-')
+        if not all(x.isdigit() for x in id_list):
+            # favorites and legacy ids would need to be resolved first
+            return None
+        ids = {int(x) for x in id_list}
+        if self._type == 'event':
+            return get_last_modified(event_ids=ids)
+        return get_last_modified(category_ids=ids)
+
     def export_categ(self, user):
         expInt = CategoryEventFetcher(user, self)
         id_list = set(self._idList)
@@ -417,6 +437,7 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
         self._detail_level = get_query_parameter(request.args.to_dict(), ['d', 'detail'], 'events')
         if self._detail_level not in ('events', 'contributions', 'subcontributions', 'sessions'):
             raise HTTPAPIError(f'Invalid detail level: {self._detail_level}', 400)
+        self._no_cache = get_query_parameter(request.args.to_dict(), ['nc', 'nocache'], 'no') == 'yes'
 
     def _calculate_occurrences(self, event, from_dt, to_dt):
         start_dt = max(from_dt, event.start_dt) if from_dt else event.start_dt
@@ -435,6 +456,11 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
             for period in self._calculate_occurrences(event, from_dt, to_dt)
         ]
 
+    def _get_base_query_options(self):
+        # just what's needed to filter the events and check access; everything
+        # else is only loaded for events whose data is not cached yet
+        return [selectinload('acl_entries').joinedload('user'), undefer('effective_protection_mode')]
+
     def _get_query_options(self, detail_level):
         acl_user_strategy = selectinload('acl_entries').joinedload('user')
         # remote group membership checks will trigger a load on _all_emails
@@ -485,9 +511,9 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
                      .filter(~Event.is_deleted,
                              Event.category_chain_overlaps(idlist),
                              Event.happens_between(self._fromDT, self._toDT))
-                     .options(*self._get_query_options(self._detail_level)))
+                     .options(*self._get_base_query_options()))
         query = self._update_query(query)
-        return self.serialize_events(x for x in query if self._filter_event(x) and x.can_access(self.user))
+        return self.serialize_events(self._filter_accessible_events(query))
 
     def category_extra(self, ids):
         if self._toDT is None:
@@ -510,17 +536,13 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
                          Event.happens_between(self._fromDT, self._toDT))
         query = (Event.query
                  .filter(*event_filters)
-                 .options(*self._get_query_options(self._detail_level)))
+                 .options(*self._get_base_query_options()))
         query = self._update_query(query)
-        Contribution.preload_relationships(
-            Contribution.query.join(Event).filter(*event_filters),
-            'timetable_entry'
-        )
-        SessionBlock.preload_relationships(
-            SessionBlock.query.join(Session).join(Event).filter(*event_filters),
-            'timetable_entry'
-        )
-        return self.serialize_events(x for x in query if self._filter_event(x) and x.can_access(self.user))
+        return self.serialize_events(self._filter_accessible_events(query))
+
+    def _filter_accessible_events(self, events):
+        events = [e for e in events if self._filter_event(e)]
+        return [e for e, can_access in can_access_many(events, self.user).items() if can_access]
 
     def _filter_event(self, event):
         if self._room or self._location or self._eventType:
@@ -558,7 +580,40 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
         return query
 
     def serialize_events(self, events):
-        return [self._build_event_api_data(e) for e in events]
+        events = list(events)
+        ttl = api_settings.get('cache_ttl')
+        cache_keys = self._get_event_api_cache_keys(events) if events and ttl > 0 else {}
+        event_data = {}
+        if cache_keys and not self._no_cache:
+            cached = API_EVENT_CACHE.get_many(*(cache_keys[e] for e in events))
+            event_data = {e: data for e, data in zip(events, cached, strict=True) if data is not None}
+        if missing := [e for e in events if e not in event_data]:
+            self._preload_event_api_data(missing)
+            fresh_data = {e: self._build_event_api_fragment(e) for e in missing}
+            if cache_keys:
+                API_EVENT_CACHE.set_many({cache_keys[e]: data for e, data in fresh_data.items()}, ttl)
+            event_data.update(fresh_data)
+        return [self._build_event_api_data(e, event_data[e]) for e in events]
+
+    def _get_event_api_cache_keys(self, events):
+        versions = get_events_last_modified({e.id for e in events})
+        # the data includes the titles of the parent categories
+        category_versions = get_events_category_data_modified(events)
+        user_key = f'user-{self.user.id}' if self.user else 'public'
+        return {e: f'{e.id}:{versions[e.id]}:{category_versions[e.id]}:{self._detail_level}:{self._tz}:{user_key}'
+                for e in events}
+
+    def _preload_event_api_data(self, events):
+        event_ids = {e.id for e in events}
+        # the events are already in the identity map, so this only populates the
+        # relationships needed for their serialization
+        Event.query.filter(Event.id.in_(event_ids)).options(*self._get_query_options(self._detail_level)).all()
+        if self._detail_level == 'events':
+            return
+        Contribution.preload_relationships(Contribution.query.filter(Contribution.event_id.in_(event_ids)),
+                                           'timetable_entry')
+        SessionBlock.preload_relationships(SessionBlock.query.join(Session).filter(Session.event_id.in_(event_ids)),
+                                           'timetable_entry')
 
     def _serialize_category_path(self, category):
         visibility = {'id': None, 'name': 'Everywhere'}
@@ -587,7 +642,31 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
         return [{'_type': 'CategoryPath', 'categoryId': category.id, 'path': self._serialize_category_path(category)}
                 for category in Category.query.filter(Category.id.in_(ids)).options(undefer('chain'))]
 
-    def _build_event_api_data(self, event):
+    def _build_event_api_data(self, event, data=None):
+        """Build the API data of an event.
+
+        :param event: The event to serialize
+        :param data: The data from `_build_event_api_fragment`
+                     in case it was cached
+        """
+        if data is None:
+            data = self._build_event_api_fragment(event)
+        if self._occurrences:
+            data['occurrences'] = self._serialize_event_occurrences(event, self._fromDT, self._toDT)
+        # check whether the plugins want to add/override any data
+        for update in values_from_signal(
+            signals.event.metadata_postprocess.send('http-api', event=event, data=data, user=self.user),
+            as_list=True
+        ):
+            data.update(update)
+        return data
+
+    def _build_event_api_fragment(self, event):
+        """Build the cacheable part of the API data of an event.
+
+        This data may only depend on the event, the user, the detail level
+        and the timezone since it is cached for these.
+        """
         can_manage = self.user is not None and event.can_manage(self.user)
         data = self._build_event_api_data_base(event)
         material_data = build_material_legacy_api_data(event)
@@ -658,14 +737,6 @@ class CategoryEventFetcher(IteratedDataFetcher, SerializerBase):
                     if not session_.can_access(self.user):
                         continue
                     data['sessions'].extend(self._build_session_api_data(session_))
-        if self._occurrences:
-            data['occurrences'] = self._serialize_event_occurrences(event, self._fromDT, self._toDT)
-        # check whether the plugins want to add/override any data
-        for update in values_from_signal(
-            signals.event.metadata_postprocess.send('http-api', event=event, data=data, user=self.user),
-            as_list=True
-        ):
-            data.update(update)
         return data
 
     def _serialize_event_label(self, event):
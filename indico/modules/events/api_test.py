@@ -0,0 +1,66 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from types import SimpleNamespace
+
+import pytest
+import pytz
+
+from indico.core import signals
+from indico.modules.events.api import CategoryEventFetcher
+
+
+def _make_fetcher(user=None):
+    hook = SimpleNamespace(_eventType=None, _occurrences=False, _location=None, _room=None, _tz=pytz.utc,
+                           _offset=None, _limit=None, _detail='events', _orderBy=None, _descending=False,
+                           _fromDT=None, _toDT=None)
+    return CategoryEventFetcher(user, hook)
+
+
+@pytest.mark.usefixtures('request_context')
+def test_serialize_events_cached(mocker, create_event):
+    event = create_event(title='foo')
+    other_event = create_event(title='other')
+    fetcher = _make_fetcher()
+    build = mocker.spy(fetcher, '_build_event_api_fragment')
+    assert [e['title'] for e in fetcher.serialize_events([event, other_event])] == ['foo', 'other']
+    assert build.call_count == 2
+    assert [e['title'] for e in fetcher.serialize_events([event, other_event])] == ['foo', 'other']
+    assert build.call_count == 2
+    # only the modified event is serialized again
+    event.title = 'bar'
+    signals.event.updated.send(event, changes={'title': ('foo', 'bar')})
+    assert [e['title'] for e in fetcher.serialize_events([event, other_event])] == ['bar', 'other']
+    assert build.call_count == 3
+    build.assert_called_with(event)
+
+
+@pytest.mark.usefixtures('request_context')
+def test_serialize_events_cached_per_user(mocker, create_event, create_user):
+    event = create_event(title='foo')
+    fetcher = _make_fetcher()
+    user_fetcher = _make_fetcher(create_user(123))
+    build = mocker.spy(user_fetcher, '_build_event_api_fragment')
+    fetcher.serialize_events([event])
+    user_fetcher.serialize_events([event])
+    assert build.call_count == 1
+
+
+@pytest.mark.usefixtures('request_context')
+def test_serialize_events_cached_category_changed(mocker, create_category, create_event):
+    category = create_category(100, title='Old')
+    event = create_event(title='foo', category=create_category(101, title='Sub', parent=category))
+    fetcher = _make_fetcher()
+    build = mocker.spy(fetcher, '_build_event_api_fragment')
+    fetcher.serialize_events([event])
+    fetcher.serialize_events([event])
+    assert build.call_count == 1
+    # the data includes the titles of all parent categories
+    category.title = 'New'
+    signals.category.updated.send(category, changes={'title': ('Old', 'New')})
+    fetcher.serialize_events([event])
+    assert build.call_count == 2
@@ -230,7 +230,7 @@ class RHContributionExportToPDF(RHContributionDisplayBase):
     def _process(self):
         if not config.LATEX_ENABLED:
             raise NotFound
-        data = generate_cached_pdf(lambda c: ContribToPDF(c).generate(as_bytes=True), 'contrib', self.contrib)
+        data = generate_cached_pdf(ContribToPDF, 'contrib', self.contrib)
         return send_file('contribution.pdf', data, 'application/pdf')
 
 
@@ -239,10 +239,8 @@ class RHContributionsExportToPDF(RHContributionList):
         if not config.LATEX_ENABLED:
             raise NotFound
         contribs = self.list_generator.get_list_kwargs()['contribs']
-        data = generate_cached_pdf(
-            lambda: ContribsToPDF(self.event, contribs).generate(as_bytes=True),
-            ('contribs', '-'.join(sorted(str(c.id) for c in contribs))),
-        )
+        data = generate_cached_pdf(lambda event: ContribsToPDF(event, contribs), 'contribs', self.event,
+                                   ids=[c.id for c in contribs])
         return send_file('contributions.pdf', data, 'application/pdf')
 
 
@@ -20,6 +20,8 @@ from webargs import fields
 from indico.core.config import config
 from indico.modules.events.controllers.base import RHDisplayEventBase, RHEventBase
 from indico.modules.events.ical import CalendarScope, event_to_ical, events_to_ical
+from indico.modules.events.last_modified import (get_last_modified, get_request_validators, is_not_modified,
+                                                 make_not_modified_response, set_validators)
 from indico.modules.events.layout.views import WPPage
 from indico.modules.events.management.settings import privacy_settings
 from indico.modules.events.models.events import EventType
@@ -46,12 +48,17 @@ class RHExportEventICAL(RHDisplayEventBase):
     def _process(self, scope, detail, series):
         if not scope and detail == 'contributions':
             scope = CalendarScope.contribution
+        events = self.event.series.events if series else [self.event]
+        validators = get_request_validators(get_last_modified(event_ids={e.id for e in events}), session.user)
+        if is_not_modified(*validators):
+            return make_not_modified_response(*validators)
         if not series:
             event_ical = event_to_ical(self.event, session.user, scope)
-            return send_file('event.ics', BytesIO(event_ical), 'text/calendar')
+            rv = send_file('event.ics', BytesIO(event_ical), 'text/calendar')
         else:
-            events_ical = events_to_ical(self.event.series.events, session.user, scope)
-            return send_file('event-series.ics', BytesIO(events_ical), 'text/calendar')
+            events_ical = events_to_ical(events, session.user, scope)
+            rv = send_file('event-series.ics', BytesIO(events_ical), 'text/calendar')
+        return set_validators(rv, *validators)
 
 
 class RHDisplayEvent(RHDisplayEventBase):
@@ -10,21 +10,25 @@ import os
 import pickle
 import posixpath
 import re
+import shutil
 import sys
 import tarfile
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from functools import cache
 from importlib import import_module
 from io import BytesIO
 from itertools import batched
 from operator import attrgetter, itemgetter
+from tempfile import SpooledTemporaryFile
 from uuid import uuid4
 
 import click
 import dateutil.parser
 import yaml
 from flask import current_app
-from sqlalchemy import inspect
+from sqlalchemy import inspect, values
 from terminaltables import AsciiTable
 
 import indico
@@ -55,6 +59,12 @@ from indico.util.string import strict_str
 
 
 CURRENT_EXPORT_VERSION = 2  # only bump this for backwards-incompatible changes to the export format itself
+#: The number of threads used to read files from storage during an export
+FILE_COPY_THREADS = 4
+#: The maximum number of values in a single ``IN`` criterion when fetching related rows
+FETCH_BATCH_SIZE = 5000
+#: The number of rows per table that are buffered before inserting them during a bulk import
+IMPORT_BATCH_SIZE = 1000
 _notset = object()
 _skip = object()
 
@@ -113,7 +123,7 @@ def export_event(event_or_category, target_file, *, keep_uuids=False, use_pickle
 
 
 def import_event(source_file, category_id=0, create_users=None, create_affiliations=None, verbose=False, force=False,
-                 skip_external_files=False):
+                 skip_external_files=False, bulk=False):
     """Import a previously-exported event/category.
 
     It is up to the caller of this function to commit the transaction.
@@ -131,10 +141,12 @@ def import_event(source_file, category_id=0, create_users=None, create_affiliati
     :param force: Whether to ignore database version conflicts.
     :param skip_external_files: Whether to skip copying external files, and write
                                 them to the file mapping instead.
+    :param bulk: Whether to insert the rows in batches instead of one by one,
+                 which is much faster when importing large events.
     :return: The imported event/category, the ID mapping and the file mapping.
     """
     importer = EventImporter(source_file, category_id, create_users, create_affiliations, verbose, force,
-                             skip_external_files)
+                             skip_external_files, bulk)
     event_or_category = importer.deserialize()
     return event_or_category, dict(importer.source_id_map), list(importer.files_to_copy)
 
@@ -194,14 +206,27 @@ def _model_to_table(name):
     return getattr(db.m, name).__table__.fullname if name[0].isupper() else name
 
 
+@cache
+def _get_model_globals():
+    return {cls.__name__: cls for cls in get_all_models() if hasattr(cls, '__table__')}
+
+
 def _make_globals(**extra):
     """
     Build a globals dict for the exec/eval environment that contains
     all the models and whatever extra data is needed.
     """
-    globals_ = {cls.__name__: cls for cls in get_all_models() if hasattr(cls, '__table__')}
-    globals_.update(extra)
-    return globals_
+    return {**_get_model_globals(), **extra}
+
+
+@cache
+def _eval_model_expr(expr):
+    """Evaluate a Python expression referencing models.
+
+    The result is cached since the spec uses the same expressions
+    (mostly column references) over and over again.
+    """
+    return eval(expr, _make_globals())  # noqa: S307
 
 
 def _exec_custom(code, **extra):
@@ -218,13 +243,31 @@ def _resolve_col(col):
     :param col: A string containing a Python expression, a model
                 attribute or a Column instance.
     """
-    attr = eval(col, _make_globals()) if isinstance(col, str) else col  # noqa: S307
+    attr = _eval_model_expr(col) if isinstance(col, str) else col
     if isinstance(attr, db.Column):
         return attr
     assert len(attr.prop.columns) == 1
     return attr.prop.columns[0]
 
 
+def _read_storage_file(app, storage, file_id):
+    """Read a file from storage into a temporary file.
+
+    Small files are kept in memory, larger ones are written to disk.
+    This runs in a worker thread, so it needs its own app context.
+    """
+    with app.app_context():
+        f = SpooledTemporaryFile(max_size=(10 * 1024 * 1024), dir=config.TEMP_DIR)  # noqa: SIM115
+        try:
+            with storage.open(file_id) as source:
+                shutil.copyfileobj(source, f)
+        except Exception:
+            f.close()
+            raise
+    f.seek(0)
+    return f
+
+
 def _get_single_fk(col):
     """Get the single-column FK constraint of the specified column."""
     # find the column-specific FK, not some compound fk containing this column
@@ -274,6 +317,10 @@ class EventExporter:
         self.orig_ids = defaultdict(dict)
         self.used_uuids = set()
         self.seen_rows = set()
+        self._pending_values = defaultdict(set)
+        self._fetched_rows = defaultdict(dict)
+        self._file_executor = None
+        self._pending_files = deque()
         self.fk_map = self._get_reverse_fk_map()
         self.spec = self._load_spec()
         self.users = {}
@@ -295,7 +342,13 @@ class EventExporter:
 
     def serialize(self):
         model = type(self.obj)
-        all_objects = list(self._serialize_objects(model.__table__, model.id == self.obj.id, is_root_object=True))
+        root_rows = self._query_rows(model.__table__, model.id == self.obj.id)
+        try:
+            all_objects = list(self._serialize_objects(model.__table__, root_rows, is_root_object=True))
+            while self._pending_files:
+                self._write_pending_file()
+        finally:
+            self._close_file_executor()
         metadata = {
             'timestamp': now_utc(),
             'export_version': CURRENT_EXPORT_VERSION,
@@ -336,6 +389,16 @@ class EventExporter:
             tablespec['fks'] = fks
             tablespec['fks_out'] = {fk: _get_single_fk(db.metadata.tables[tablename].c[fk]).column
                                     for fk in tablespec['fks_out']}
+            # compile all the code snippets once instead of every time they are used
+            tablespec['cols'] = {col: compile(code, f'<{tablename}.{col}>', 'exec') if code is not None else None
+                                 for col, code in tablespec['cols'].items()}
+            if tablespec['skipif']:
+                tablespec['skipif'] = compile(tablespec['skipif'], f'<{tablename}:skipif>', 'eval')
+            if tablespec['order']:
+                order = _eval_model_expr(tablespec['order'])
+                tablespec['order'] = order if isinstance(order, tuple) else (order,)
+            if tablespec['python_order']:
+                tablespec['python_order'] = compile(tablespec['python_order'], f'<{tablename}:python_order>', 'exec')
             return tablespec
 
         with open(os.path.join(current_app.root_path, 'modules', 'events', 'export.yaml')) as f:
@@ -493,12 +556,11 @@ class EventExporter:
             storage_data = {'storage': {'backend': storage_backend, 'file_id': storage_file_id}}
             self.used_storage_backends.add(storage_backend)
         else:
-            with get_storage(storage_backend).open(storage_file_id) as f:
-                self._add_file(uuid, size, f)
+            self._queue_storage_file(uuid, size, get_storage(storage_backend), storage_file_id)
         data['__file__'] = ('file', {'uuid': uuid, 'filename': filename, 'content_type': content_type, 'size': size,
                                      'md5': md5, **storage_data})
 
-    def _serialize_objects(self, table, filter_, *, is_root_object=False, parent_scope=None):
+    def _query_rows(self, table, filter_):
         spec = self.spec[table.fullname]
         query = db.session.query(table).filter(filter_)
         if spec['order']:
@@ -506,24 +568,92 @@ class EventExporter:
             # This is mainly needed for self-referential FKs and CHECK
             # constraints that require certain objects to be exported before
             # the ones referencing them
-            order = eval(spec['order'], _make_globals())  # noqa: S307
-            if not isinstance(order, tuple):
-                order = (order,)
-            query = query.order_by(*order)
+            query = query.order_by(*spec['order'])
         query = query.order_by(*table.primary_key.columns)
         rows = query.all()
+        self._queue_related_rows(table, rows)
+        return rows
+
+    def _queue_related_rows(self, table, rows):
+        """Remember the values needed to fetch the rows related to `rows`.
+
+        The rows referenced by or referencing any of these rows are then
+        fetched in a single query as soon as the first of them is needed.
+        """
+        spec = self.spec[table.fullname]
+        for col, fk in spec['fks_out'].items():
+            self._pending_values[fk].update(row._mapping[table.c[col]] for row in rows)
+        for col, fks in spec['fks'].items():
+            values = {row._mapping[table.c[col]] for row in rows}
+            for fk in fks:
+                self._pending_values[fk].update(values)
+
+    def _get_related_rows(self, column, value):
+        """Get the rows of the column's table where the column has the given value.
+
+        Rather than querying each group of related rows separately, the
+        rows for all the values queued in `_queue_related_rows` are fetched
+        at once.  Within each group the rows are in the same order as if
+        they had been queried separately.
+        """
+        if value is None:
+            return self._query_rows(column.table, column.is_(None))
+        fetched = self._fetched_rows[column]
+        if value not in fetched:
+            values = (self._pending_values.pop(column, set()) - fetched.keys() - {None}) | {value}
+            fetched.update((v, []) for v in values)
+            for chunk in batched(values, FETCH_BATCH_SIZE):
+                for row in self._query_rows(column.table, column.in_(chunk)):
+                    fetched[row._mapping[column]].append(row)
+        return fetched[value]
+
+    def _queue_storage_file(self, name, size, storage, file_id):
+        """Copy a file from storage into the archive in the background.
+
+        The files are read by a small thread pool (which helps a lot with
+        remote storage backends), but only written to the archive from
+        the main thread since it is a stream.
+        """
+        if self._file_executor is None:
+            self._file_executor = ThreadPoolExecutor(FILE_COPY_THREADS, thread_name_prefix='event-export')
+        app = current_app._get_current_object()
+        future = self._file_executor.submit(_read_storage_file, app, storage, file_id)
+        self._pending_files.append((name, size, future))
+        while len(self._pending_files) > 2 * FILE_COPY_THREADS:
+            self._write_pending_file()
+
+    def _write_pending_file(self):
+        name, size, future = self._pending_files.popleft()
+        with future.result() as f:
+            self._add_file(name, size, f)
+
+    def _close_file_executor(self):
+        if self._file_executor is None:
+            return
+        self._file_executor.shutdown(cancel_futures=True)
+        for __, __, future in self._pending_files:
+            if not future.cancelled() and future.exception() is None:
+                future.result().close()
+        self._pending_files.clear()
+        self._file_executor = None
+
+    def _serialize_objects(self, table, rows, *, is_root_object=False, parent_scope=None):
+        spec = self.spec[table.fullname]
         if spec['python_order']:
-            rows = _exec_custom(spec['python_order'], ROWS=rows)['rows']
+            rows = _exec_custom(spec['python_order'], ROWS=list(rows))['rows']
         cascaded = []
-        cat_role = ('category_role',) if self.categories else ()
+        if spec['skipif']:
+            skipif_globals = _make_globals(CAT_ROLE=('category_role',) if self.categories else ())
         if spec['show_progress'] and len(rows) > 1:
             rows_iter = verbose_iterator(rows, len(rows), get_id=attrgetter('id'), get_title=attrgetter('title'),
                                          print_every=1, print_total_time=True)
         else:
             rows_iter = iter(rows)
         for row in rows_iter:
-            if spec['skipif'] and eval(spec['skipif'], _make_globals(ROW=row, CAT_ROLE=cat_role)):  # noqa: S307
-                continue
+            if spec['skipif']:
+                skipif_globals['ROW'] = row
+                if eval(spec['skipif'], skipif_globals):  # noqa: S307
+                    continue
             rowdict = row._asdict()
             pk = tuple(v for k, v in rowdict.items() if table.c[k].primary_key)
             if (table.fullname, pk) in self.seen_rows:
@@ -585,16 +715,16 @@ class EventExporter:
             # export objects referenced in outgoing FKs before the row
             # itself as the FK column might not be nullable
             for col, fk in spec['fks_out'].items():
-                value = rowdict[col]
-                yield from self._serialize_objects(fk.table, value == fk, parent_scope=scope)
+                yield from self._serialize_objects(fk.table, self._get_related_rows(fk, rowdict[col]),
+                                                   parent_scope=scope)
             yield table.fullname, (new_scope, scope), data
             # serialize objects referencing the current row, but don't export them yet
             for col, fks in spec['fks'].items():
-                value = rowdict[col]
                 cascaded += [
                     x
                     for fk in fks
-                    for x in self._serialize_objects(fk.table, value == fk, parent_scope=scope)
+                    for x in self._serialize_objects(fk.table, self._get_related_rows(fk, rowdict[col]),
+                                                     parent_scope=scope)
                 ]
         # we only add incoming fks after being done with all objects in case one
         # of the referenced objects references another object from the current table
@@ -604,7 +734,7 @@ class EventExporter:
 
 class EventImporter:
     def __init__(self, source_file, category_id=0, create_users=None, create_affiliations=None, verbose=False,
-                 force=False, skip_external_files=False):
+                 force=False, skip_external_files=False, bulk=False):
         self.source_file = source_file
         self.category_id = category_id
         self.create_users = create_users
@@ -631,6 +761,13 @@ class EventImporter:
         self.spec = self._load_spec()
         self.deferred_idrefs = defaultdict(set)
         self.files_to_copy = set()
+        self.bulk = bulk
+        # bulk import state: ids preallocated from the PK sequences, rows
+        # waiting to be inserted and deferred references to be set at the end
+        self.preallocated_ids = {}
+        self.insert_buffers = {}
+        self.buffered_uuids = {}
+        self.deferred_updates = defaultdict(list)
 
     def _load_spec(self):
         def _resolve_col_name(col):
@@ -816,10 +953,15 @@ class EventImporter:
             # be referenced themselves. And by putting them last we avoid having deferred idrefs
             x[0] in ('categories.logs', 'events.logs')
         ))
+        if self.bulk:
+            self._preallocate_ids(objects)
         click.echo('Importing data')
         objects_iter = verbose_iterator(objects, len(objects), print_total_time=True)
         for i, (tablename, (new_scope, scope), tabledata) in enumerate(objects_iter):
             self._deserialize_object(db.metadata.tables[tablename], tabledata, scope, new_scope, is_top_level=(i == 0))
+        if self.bulk:
+            for table in list(self.insert_buffers):
+                self._flush_insert_buffer(table)
         if self.deferred_idrefs:
             # Any reference to an ID that was exported need to be replaced
             # with an actual ID at some point - either immediately (if the
@@ -832,6 +974,7 @@ class EventImporter:
                 for table, col, pk_value in values:
                     click.secho(f'  - {table.fullname}.{col} ({pk_value})', fg='yellow')
             raise Exception('Not all deferred idrefs have been consumed')
+        self._apply_deferred_updates()
         obj = self.top_level[0].get(self.top_level[1])
         click.echo('Associating users by email')
         match obj:
@@ -1061,29 +1204,105 @@ class EventImporter:
                 pk_name = _get_pk(table).name
                 assert pk_name not in insert_values
                 # get an ID early since we use it in the filename
-                stmt = db.func.nextval(db.func.pg_get_serial_sequence(table.fullname, pk_name))
-                insert_values[pk_name] = pk_value = db.session.query(stmt).scalar()
+                insert_values[pk_name] = pk_value = self._get_new_pk(table)
                 insert_values.update(self._process_file(pk_value, file_data, scope, table.fullname))
             else:
                 insert_values.update(self._process_file(str(uuid4()), file_data, scope, table.fullname))
         if self.verbose and table.fullname in self.spec['verbose']:
             fmt = self.spec['verbose'][table.fullname]
             click.echo(fmt.format(**insert_values))
-        res = db.session.execute(table.insert(), insert_values)
+        needs_pk = set_idref is not None or is_top_level or new_scope or bool(deferred_idrefs)
+        if self.bulk:
+            pk_value = self._buffer_row(table, data, insert_values, set_idref, needs_pk=needs_pk)
+        else:
+            res = db.session.execute(table.insert(), insert_values)
+            pk_value = _get_inserted_pk(res) if needs_pk else None
         if set_idref is not None:
             # if a column was marked as having incoming FKs, store
             # the ID so the reference can be resolved to the ID
-            self._set_idref(set_idref, _get_inserted_pk(res), set_idref_fullname)
+            self._set_idref(set_idref, pk_value, set_idref_fullname)
         if is_top_level:
-            self.top_level = (top_level_model, _get_inserted_pk(res))
+            self.top_level = (top_level_model, pk_value)
         if new_scope:
             assert scope not in self.scope_id_map
             scope_type = {Event.__table__: 'event', Category.__table__: 'category'}[table]
-            self.scope_id_map[scope] = (scope_type, _get_inserted_pk(res))
+            self.scope_id_map[scope] = (scope_type, pk_value)
         for col, uuid in deferred_idrefs.items():
             # store all the data needed to resolve a deferred ID reference
             # later once the ID is available
-            self.deferred_idrefs[uuid].add((table, col, _get_inserted_pk(res)))
+            self.deferred_idrefs[uuid].add((table, col, pk_value))
+
+    def _get_new_pk(self, table):
+        if ids := self.preallocated_ids.get(table.fullname):
+            return ids.popleft()
+        stmt = db.func.nextval(db.func.pg_get_serial_sequence(table.fullname, _get_pk(table).name))
+        return db.session.query(stmt).scalar()
+
+    def _preallocate_ids(self, objects):
+        """Get the IDs for all rows that will be imported into tables with a sequence.
+
+        Knowing the IDs in advance allows resolving references to rows
+        that have not been inserted yet, so they can be inserted in batches.
+        """
+        for tablename, count in Counter(tablename for tablename, __, __ in objects).items():
+            table = db.metadata.tables[tablename]
+            if not _has_single_pk(table):
+                continue
+            seq = db.func.pg_get_serial_sequence(table.fullname, _get_pk(table).name)
+            if db.session.query(seq).scalar() is None:
+                continue
+            query = db.session.query(db.func.nextval(seq)).select_from(db.func.generate_series(1, count))
+            self.preallocated_ids[tablename] = deque(id_ for id_, in query)
+
+    def _buffer_row(self, table, data, insert_values, uuid, *, needs_pk):
+        """Queue a row to be inserted together with other rows of the same table.
+
+        :return: The PK of the row if it is known
+        """
+        # the rows referenced by this row need to be in the database first
+        for value in data.values():
+            if isinstance(value, tuple) and value[0] == 'idref' and value[1] in self.buffered_uuids:
+                self._flush_insert_buffer(self.buffered_uuids[value[1]])
+        pk_value = None
+        if _has_single_pk(table):
+            pk_name = _get_pk(table).name
+            if pk_name not in insert_values and self.preallocated_ids.get(table.fullname):
+                insert_values[pk_name] = self.preallocated_ids[table.fullname].popleft()
+            pk_value = insert_values.get(pk_name)
+        if needs_pk and pk_value is None:
+            # no way to know the ID in advance, so it needs to be inserted immediately
+            return _get_inserted_pk(db.session.execute(table.insert(), insert_values))
+        buffer = self.insert_buffers.setdefault(table, [])
+        buffer.append((insert_values, uuid))
+        if uuid is not None:
+            self.buffered_uuids[uuid] = table
+        if len(buffer) >= IMPORT_BATCH_SIZE:
+            self._flush_insert_buffer(table)
+        return pk_value
+
+    def _flush_insert_buffer(self, table):
+        """Insert all buffered rows of a table.
+
+        This uses a multi-row ``INSERT`` for all rows that have the same
+        columns.  Rows are only buffered once all the rows they reference
+        have been inserted, so the order in which they are inserted does
+        not matter.
+        """
+        rows_by_cols = defaultdict(list)
+        for insert_values, uuid in self.insert_buffers.pop(table, ()):
+            rows_by_cols[frozenset(insert_values)].append(insert_values)
+            self.buffered_uuids.pop(uuid, None)
+        for rows in rows_by_cols.values():
+            db.session.execute(table.insert(), rows)
+
+    def _apply_deferred_updates(self):
+        """Set the references to rows that were imported after the referencing rows."""
+        for (table, col), updates in self.deferred_updates.items():
+            pk = _get_pk(table)
+            for chunk in batched(updates, IMPORT_BATCH_SIZE):
+                data = values(db.column('pk', pk.type), db.column('value', table.c[col].type), name='data').data(chunk)
+                db.session.execute(table.update().where(pk == data.c.pk).values({col: data.c.value}))
+        self.deferred_updates.clear()
 
     def _set_idref(self, uuid, id_, fullname):
         if self.source_ids is not None:
@@ -1091,8 +1310,11 @@ class EventImporter:
         self.id_map[uuid] = id_
         # update all the previously-deferred ID references
         for table, col, pk_value in self.deferred_idrefs.pop(uuid, ()):
-            pk = _get_pk(table)
-            db.session.execute(table.update().where(pk == pk_value).values({col: id_}))
+            if self.bulk:
+                self.deferred_updates[(table, col)].append((pk_value, id_))
+            else:
+                pk = _get_pk(table)
+                db.session.execute(table.update().where(pk == pk_value).values({col: id_}))
 
 
 class IdRefDeferred(Exception):
@@ -119,7 +119,25 @@ def test_event_attachment_export(db, dummy_event):
         assert tarf.extractfile('00000000-0000-4000-8000-000000000013').read() == b'hello world'
 
 
-def test_event_import(db, dummy_user):
+def test_event_export_query_count(db, dummy_event, count_queries):
+    def _export():
+        with count_queries() as count:
+            export_event(dummy_event, BytesIO())
+        return count()
+
+    for i in range(2):
+        Contribution(event=dummy_event, title=f'c{i}', duration=timedelta(minutes=30))
+    db.session.flush()
+    num_queries = _export()
+    # related rows are fetched in bulk, so more contributions do not result in more queries
+    for i in range(2, 20):
+        Contribution(event=dummy_event, title=f'c{i}', duration=timedelta(minutes=30))
+    db.session.flush()
+    assert _export() == num_queries
+
+
+@pytest.mark.parametrize('bulk', (False, True))
+def test_event_import(db, dummy_user, bulk):
     data_yaml_content = (Path(__file__).parent / 'tests' / 'export_test_2.yaml').read_text()
     objects_yaml_content = (Path(__file__).parent / 'tests' / 'export_test_2_objects.yaml').read_text()
     data_yaml = BytesIO(data_yaml_content.encode())
@@ -143,7 +161,7 @@ def test_event_import(db, dummy_user):
         tarf.addfile(tar_info, BytesIO(b'hello world'))
 
     tar_buffer.seek(0)
-    e = import_event(tar_buffer, create_users=False)[0]
+    e = import_event(tar_buffer, create_users=False, bulk=bulk)[0]
     # Check that event metadata is fine
     assert e.title == 'dummy#0'
     assert e.creator == dummy_user
@@ -0,0 +1,175 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+"""Track when events (and the events inside categories) were last modified.
+
+Events do not have a modification timestamp in the database, so the
+modification signals record the time in the cache instead.  Since there is
+no way to tell whether an entry missing from the cache has never been set
+or got evicted, a missing entry is always considered to have been modified
+just now.  This means the times returned here may be later than the actual
+modification, but never earlier, which makes them safe to use for cache
+invalidation and conditional requests.
+"""
+
+import time
+from datetime import UTC, datetime
+from hashlib import sha1
+
+from flask import current_app, g, request
+from sqlalchemy import select
+from werkzeug.http import is_resource_modified
+
+from indico.core import signals
+from indico.core.cache import make_scoped_cache
+from indico.core.db import db
+
+
+_cache = make_scoped_cache('events-last-modified')
+
+#: How long validators based on the modification times stay valid, even
+#: if nothing changed.  This makes sure changes that are not tracked (e.g.
+#: someone being added to a group) become visible after a while.
+VALIDATOR_LIFETIME = 600
+
+
+def mark_event_modified(event):
+    """Record that an event has been modified.
+
+    This also marks the event's category and all its parents as modified,
+    since the events they contain have changed.
+    """
+    category_ids = event.category.chain_ids if event.category else []
+    _mark_modified([f'event-{event.id}'] + [f'category-{id_}' for id_ in category_ids])
+
+
+def mark_categories_modified(category_ids):
+    """Record that the events inside some categories have changed."""
+    _mark_modified([f'category-{id_}' for id_ in category_ids])
+
+
+def mark_category_access_modified(category):
+    """Record that the access to a category and everything inside it may have changed.
+
+    Besides the category and its parents, this affects all its subcategories
+    and the events inside any of them, since they inherit its protection.
+    """
+    from indico.modules.categories.models.categories import Category
+    from indico.modules.events.models.events import Event
+    subtree_ids = select(Category.get_subtree_ids_cte([category.id]).c.id)
+    category_ids = set(category.chain_ids) | set(db.session.scalars(subtree_ids))
+    event_ids = db.session.scalars(select(Event.id).where(Event.category_id.in_(subtree_ids)))
+    _mark_modified([f'category-{id_}' for id_ in category_ids] + [f'event-{id_}' for id_ in event_ids])
+
+
+def mark_category_data_modified(category):
+    """Record that the data of a category itself (e.g. its title) changed.
+
+    Events include the titles of their parent categories, so this affects
+    all events in the category and its subcategories.
+    """
+    _mark_modified([f'category-data-{category.id}'])
+
+
+def _mark_modified(keys):
+    # the data may be accessed again before the current transaction has been
+    # committed, so we also remove the entries once more after the commit
+    _cache.delete_many(*keys)
+    g.setdefault('events_last_modified_pending', set()).update(keys)
+
+
+@signals.core.after_commit.connect
+def _mark_modified_after_commit(sender, **kwargs):
+    if keys := g.pop('events_last_modified_pending', None):
+        _cache.delete_many(*keys)
+
+
+def _get_modification_times(keys):
+    times = _cache.get_dict(*keys)
+    if missing := {key: time.time() for key, ts in times.items() if ts is None}:
+        _cache.set_many(missing)
+        times.update(missing)
+    return times
+
+
+def get_events_last_modified(event_ids):
+    """Get the modification times of events.
+
+    :param event_ids: A collection of event IDs
+    :return: A dict mapping event IDs to UNIX timestamps
+    """
+    times = _get_modification_times([f'event-{id_}' for id_ in event_ids])
+    return {id_: times[f'event-{id_}'] for id_ in event_ids}
+
+
+def get_events_category_data_modified(events):
+    """Get the times the parent categories of events were last changed.
+
+    :param events: A collection of events
+    :return: A dict mapping event IDs to UNIX timestamps
+    """
+    chains = {event.id: event.category.chain_ids if event.category else [] for event in events}
+    keys = {f'category-data-{id_}' for chain in chains.values() for id_ in chain}
+    times = _get_modification_times(list(keys)) if keys else {}
+    return {event_id: max((times[f'category-data-{id_}'] for id_ in chain), default=0)
+            for event_id, chain in chains.items()}
+
+
+def get_last_modified(event_ids=(), category_ids=()):
+    """Get the last time any of the given events or categories changed.
+
+    For a category, any change of an event inside it (or inside one
+    of its subcategories) counts as a modification.
+
+    :return: A UNIX timestamp or ``None`` if no IDs were specified
+    """
+    keys = [f'event-{id_}' for id_ in event_ids] + [f'category-{id_}' for id_ in category_ids]
+    if not keys:
+        return None
+    return max(_get_modification_times(keys).values())
+
+
+def get_validators(key, last_modified, lifetime=VALIDATOR_LIFETIME):
+    """Get the HTTP validators for a response.
+
+    :param key: A string identifying the requested resource including
+                anything that affects its contents such as the user or
+                the query string
+    :param last_modified: The time the data was last modified
+    :param lifetime: The number of seconds after which the validators
+                     change even if the data has not been modified
+    :return: An ``(etag, last_modified)`` tuple
+    """
+    last_modified = max(last_modified, time.time() // lifetime * lifetime)
+    etag = sha1(f'{key}:{last_modified}'.encode()).hexdigest()
+    return etag, datetime.fromtimestamp(int(last_modified), UTC)
+
+
+def get_request_validators(last_modified, user):
+    """Get the HTTP validators for the current request.
+
+    :param last_modified: The time the data was last modified
+    :param user: The user the data is generated for
+    """
+    return get_validators(f'{request.full_path}:{user.id if user else None}', last_modified)
+
+
+def is_not_modified(etag, last_modified):
+    """Check whether the client already has the current data."""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    """Add the validators to a response."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    return response
+
+
+def make_not_modified_response(etag, last_modified):
+    """Create a `304 Not Modified` response."""
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
@@ -0,0 +1,81 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import time
+
+import pytest
+
+from indico.core import signals
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.modules.events.last_modified import (get_last_modified, get_validators, is_not_modified,
+                                                 mark_category_access_modified, mark_event_modified)
+
+
+@pytest.mark.usefixtures('request_context')
+def test_get_last_modified(create_category, create_event):
+    category = create_category(1)
+    other_category = create_category(2)
+    event = create_event(1, category=category)
+    other_event = create_event(2, category=other_category)
+    assert get_last_modified() is None
+    all_ids = {'event_ids': {event.id, other_event.id}, 'category_ids': {0, category.id, other_category.id}}
+    last_modified = get_last_modified(**all_ids)
+    # unchanged data keeps its modification time
+    assert get_last_modified(**all_ids) == last_modified
+    time.sleep(0.01)
+    mark_event_modified(event)
+    assert get_last_modified(event_ids={event.id}) > last_modified
+    assert get_last_modified(category_ids={category.id}) > last_modified
+    assert get_last_modified(category_ids={0}) > last_modified
+    # other events/categories are not affected
+    assert get_last_modified(event_ids={other_event.id}) <= last_modified
+    assert get_last_modified(category_ids={other_category.id}) <= last_modified
+
+
+@pytest.mark.usefixtures('request_context')
+def test_get_last_modified_category_access(create_category, create_event):
+    category = create_category(1)
+    subcategory = create_category(2, parent=category)
+    other_category = create_category(3)
+    event = create_event(1, category=subcategory)
+    other_event = create_event(2, category=other_category)
+    all_ids = {'event_ids': {event.id, other_event.id}, 'category_ids': {category.id, subcategory.id}}
+    last_modified = get_last_modified(**all_ids)
+    time.sleep(0.01)
+    # events in subcategories inherit the protection
+    mark_category_access_modified(category)
+    assert get_last_modified(event_ids={event.id}) > last_modified
+    assert get_last_modified(category_ids={subcategory.id}) > last_modified
+    assert get_last_modified(event_ids={other_event.id}) <= last_modified
+    assert get_last_modified(category_ids={other_category.id}) <= last_modified
+    # protection changes trigger it as well
+    last_modified = get_last_modified(**all_ids)
+    time.sleep(0.01)
+    signals.acl.protection_changed.send(type(category), obj=category, mode=ProtectionMode.protected,
+                                        old_mode=ProtectionMode.inheriting)
+    assert get_last_modified(event_ids={event.id}) > last_modified
+
+
+@pytest.mark.usefixtures('request_context')
+def test_get_last_modified_event_created(create_category, create_event):
+    category = create_category(1)
+    last_modified = get_last_modified(category_ids={category.id})
+    time.sleep(0.01)
+    event = create_event(1, category=category)
+    signals.event.created.send(event, cloning=False)
+    assert get_last_modified(category_ids={category.id}) > last_modified
+
+
+def test_is_not_modified(app):
+    etag, last_modified = get_validators('foo', time.time())
+    assert get_validators('bar', time.time())[0] != etag
+    with app.test_request_context():
+        assert not is_not_modified(etag, last_modified)
+    with app.test_request_context(headers={'If-None-Match': f'"{etag}"'}):
+        assert is_not_modified(etag, last_modified)
+    with app.test_request_context(headers={'If-None-Match': '"bar"'}):
+        assert not is_not_modified(etag, last_modified)
@@ -5,6 +5,7 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import itertools
 from functools import partial
 from unittest.mock import MagicMock
 
@@ -12,7 +13,7 @@ import pytest
 
 from indico.core import signals
 from indico.core.db.sqlalchemy.principals import EmailPrincipal, PrincipalType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.core.db.sqlalchemy.protection import ProtectionMode, can_access_many
 from indico.core.permissions import get_available_permissions
 from indico.modules.events import Event
 from indico.modules.events.models.principals import EventPrincipal
@@ -460,3 +461,29 @@ def test_has_management_permission_db(create_event, create_user, dummy_user):
     assert not _query().count()
     assert _query('foo').one() == entry
     assert _query('ANY').count() == 2
+
+
+@pytest.mark.usefixtures('request_context')
+def test_can_access_many(db, create_category, create_event, create_user, dummy_group, count_queries):
+    user = create_user(123)
+    dummy_group.group.members.add(user)
+    protected = create_category(1, protection_mode=ProtectionMode.protected)
+    protected.update_principal(dummy_group, read_access=True)
+    child = create_category(2, parent=protected)
+    secret = create_category(3, parent=child, protection_mode=ProtectionMode.protected)
+    modes = (ProtectionMode.inheriting, ProtectionMode.protected, ProtectionMode.public)
+    events = [create_event(i, category=category, protection_mode=mode)
+              for i, (category, mode) in enumerate(itertools.product((protected, child, secret), modes), 1)]
+    events[-2].update_principal(user, read_access=True)
+    db.session.flush()
+    expected = {event: event.can_access(user) for event in events}
+    assert any(expected.values())
+    assert not all(expected.values())
+
+    event_ids = [e.id for e in events]
+    db.session.expire_all()
+    events = Event.query.filter(Event.id.in_(event_ids)).all()
+    with count_queries() as count:
+        assert can_access_many(events, user) == expected
+    # the number of queries must not depend on the number of events
+    assert count() < len(events)
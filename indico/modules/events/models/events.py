@@ -473,16 +473,15 @@ class Event(SearchableTitleMixin, DescriptionMixin, LocationMixin, ProtectionMan
         Create a filter that checks whether the event has any of the
         provided category ids in its parent chain.
 
-        Warning: This method cannot be used in a negated filter.
-
         :param category_ids: A list of category ids or a single
                              category id
         """
-        from indico.modules.categories import Category
+        from indico.modules.categories.models.tree import category_tree_table
         if not isinstance(category_ids, (list, tuple, set)):
             category_ids = [category_ids]
-        cte = Category.get_subtree_ids_cte(category_ids)
-        return cte.c.id == Event.category_id
+        subquery = (select([category_tree_table.c.category_id])
+                    .where(category_tree_table.c.path.overlap(list(category_ids))))
+        return Event.category_id.in_(subquery)
 
     @classmethod
     def is_visible_in(cls, category_id):
@@ -1199,15 +1198,14 @@ def _mappers_configured():
 
     # Event.category_chain -- the category ids of the event, starting
     # with the root category down to the event's immediate parent.
-    cte = Category.get_tree_cte()
-    query = select([cte.c.path]).where(cte.c.id == Event.category_id).correlate_except(cte).scalar_subquery()
+    query = Category.get_chain_subquery(Event.category_id).scalar_subquery()
     Event.category_chain = column_property(query, deferred=True)
 
     # Event.detailed_category_chain -- the category chain of the event, starting
     # with the root category down to the event's immediate parent.
-    cte = Category.get_tree_cte(lambda cat: db.func.json_build_object('id', cat.id, 'title', cat.title))
-    query = select([cte.c.path]).where(cte.c.id == Event.category_id).correlate_except(cte).scalar_subquery()
-    Event.detailed_category_chain = column_property(query, deferred=True)
+    query = Category.get_chain_subquery(Event.category_id, lambda cat: db.func.json_build_object('id', cat.id,
+                                                                                               'title', cat.title))
+    Event.detailed_category_chain = column_property(query.scalar_subquery(), deferred=True)
 
     # Event.effective_protection_mode -- the effective protection mode
     # (public/protected) of the event, even if it's inheriting it from its
@@ -7,16 +7,24 @@
 
 import re
 from collections import namedtuple
+from datetime import timedelta
+from io import BytesIO
 from itertools import product
 
+from celery import chord
+from pypdf import PdfWriter
 from reportlab.lib.units import cm
 from reportlab.lib.utils import ImageReader
+from sqlalchemy.orm import subqueryload
 from werkzeug.exceptions import BadRequest
 
 from indico.core import signals
+from indico.core.cache import make_scoped_cache
+from indico.core.db import db
 from indico.modules.designer.pdf import DesignerPDFBase
 from indico.modules.designer.util import is_regform_field_placeholder
 from indico.modules.events.registration.settings import DEFAULT_BADGE_SETTINGS
+from indico.modules.files.models.files import File
 from indico.util.i18n import _
 from indico.util.placeholders import get_placeholders
 from indico.util.signals import values_from_signal
@@ -25,6 +33,16 @@ from indico.util.signals import values_from_signal
 FONT_SIZE_RE = re.compile(r'(\d+)(pt)?')
 ConfigData = namedtuple('ConfigData', list(DEFAULT_BADGE_SETTINGS))
 
+#: PDFs with more badges than this are generated in the background
+BADGES_BACKGROUND_THRESHOLD = 250
+#: How many badges (rounded up to full pages) are rendered by each
+#: background task
+BADGES_CHUNK_SIZE = 200
+#: How long the state of a badge printing job is kept
+BADGES_JOB_TTL = timedelta(hours=2)
+
+badge_jobs_cache = make_scoped_cache('badge-jobs')
+
 
 def _get_font_size(text):
     return int(FONT_SIZE_RE.match(text).group(1))
@@ -35,10 +53,49 @@ class RegistrantsListToBadgesPDF(DesignerPDFBase):
         super().__init__(template, config)
         from indico.modules.events.registration.util import get_persons
         self.persons = get_persons(registrations, include_accompanying_persons)
+        # the parts of the templates which are the same for every badge
+        self.placeholders = get_placeholders(self.placeholders_context)
+        self._backgrounds = {}
+        self._sorted_items = {}
 
     def _build_config(self, config_data):
         return ConfigData(**config_data)
 
+    def _get_grid_size(self):
+        """Get the number of badges which fit on a page horizontally and vertically."""
+        config = self.config
+        available_width = self.width - (config.left_margin + config.right_margin + config.margin_columns) * cm
+        n_horizontal = int((available_width + config.margin_columns*cm) /
+                           ((self.tpl_data.width_cm + config.margin_columns) * cm))
+        available_height = self.height - (config.top_margin + config.bottom_margin + config.margin_rows) * cm
+        n_vertical = int((available_height + config.margin_rows*cm) /
+                         ((self.tpl_data.height_cm + config.margin_rows) * cm))
+        if not n_horizontal or not n_vertical:
+            raise BadRequest(_('The template dimensions are too large for the page size you selected'))
+        return n_horizontal, n_vertical
+
+    @property
+    def badges_per_page(self):
+        n_horizontal, n_vertical = self._get_grid_size()
+        return n_horizontal * n_vertical
+
+    def _get_background(self, template):
+        """Get the background image of a template, without any transparency."""
+        if template.id not in self._backgrounds:
+            with template.background_image.open() as f:
+                self._backgrounds[template.id] = ImageReader(self._remove_transparency(f))
+        return self._backgrounds[template.id]
+
+    def _get_sorted_items(self, template, tpl_data):
+        """Get the items of a template in the order in which they are drawn."""
+        if template.id not in self._sorted_items:
+            # Print images first
+            image_placeholders = {name for name, placeholder in self.placeholders.items() if placeholder.is_image}
+            self._sorted_items[template.id] = sorted(tpl_data.items,
+                                                     key=lambda item: (int(item.get('zIndex', 10)),
+                                                                       item['type'] not in image_placeholders))
+        return self._sorted_items[template.id]
+
     def _iter_position(self, canvas, n_horizonal, n_vertical):
         """Go over every possible position on the page."""
         config = self.config
@@ -50,17 +107,7 @@ class RegistrantsListToBadgesPDF(DesignerPDFBase):
             canvas.showPage()
 
     def _build_pdf(self, canvas):
-        config = self.config
-
-        available_width = self.width - (config.left_margin + config.right_margin + config.margin_columns) * cm
-        n_horizontal = int((available_width + config.margin_columns*cm) /
-                           ((self.tpl_data.width_cm + config.margin_columns) * cm))
-        available_height = self.height - (config.top_margin + config.bottom_margin + config.margin_rows) * cm
-        n_vertical = int((available_height + config.margin_rows*cm) /
-                         ((self.tpl_data.height_cm + config.margin_rows) * cm))
-
-        if not n_horizontal or not n_vertical:
-            raise BadRequest(_('The template dimensions are too large for the page size you selected'))
+        n_horizontal, n_vertical = self._get_grid_size()
 
         # Print a badge for each registration
         for person, (x, y) in zip(self.persons, self._iter_position(canvas, n_horizontal, n_vertical), strict=False):
@@ -84,15 +131,10 @@ class RegistrantsListToBadgesPDF(DesignerPDFBase):
             canvas.restoreState()
 
         if template.background_image:
-            with template.background_image.open() as f:
-                self._draw_background(canvas, ImageReader(self._remove_transparency(f)), tpl_data, *badge_rect)
-
-        placeholders = get_placeholders(self.placeholders_context)
+            self._draw_background(canvas, self._get_background(template), tpl_data, *badge_rect)
 
-        # Print images first
-        image_placeholders = {name for name, placeholder in placeholders.items() if placeholder.is_image}
-        items = sorted(tpl_data.items, key=lambda item: (int(item.get('zIndex', 10)),
-                                                         item['type'] not in image_placeholders))
+        placeholders = self.placeholders
+        items = self._get_sorted_items(template, tpl_data)
 
         for item in items:
             if is_regform_field_placeholder(item):
@@ -137,6 +179,8 @@ class RegistrantsListToBadgesPDF(DesignerPDFBase):
 
 
 class RegistrantsListToBadgesPDFFoldable(RegistrantsListToBadgesPDF):
+    badges_per_page = 1
+
     def _build_pdf(self, canvas):
         # Only one badge per page
         n_horizontal = 1
@@ -166,18 +210,7 @@ class RegistrantsListToBadgesPDFFoldable(RegistrantsListToBadgesPDF):
 
 class RegistrantsListToBadgesPDFDoubleSided(RegistrantsListToBadgesPDF):
     def _build_pdf(self, canvas):
-        config = self.config
-
-        available_width = self.width - (config.left_margin + config.right_margin + config.margin_columns) * cm
-        n_horizontal = int((available_width + config.margin_columns*cm) /
-                           ((self.tpl_data.width_cm + config.margin_columns) * cm))
-        available_height = self.height - (config.top_margin + config.bottom_margin + config.margin_rows) * cm
-        n_vertical = int((available_height + config.margin_rows*cm) /
-                         ((self.tpl_data.height_cm + config.margin_rows) * cm))
-
-        if not n_horizontal or not n_vertical:
-            raise BadRequest(_('The template dimensions are too large for the page size you selected'))
-
+        n_horizontal, n_vertical = self._get_grid_size()
         per_page = n_horizontal * n_vertical
         # make batch of as many badges as we can fit into one page and add duplicates for printing back sides
         page_used = 0
@@ -208,3 +241,131 @@ class RegistrantsListToBadgesPDFDoubleSided(RegistrantsListToBadgesPDF):
                 x_cm = (self.width - x*cm - self.tpl_data.width_cm*cm)
                 self._draw_badge(canvas, person, self.template.backside_template,
                                  self.backside_tpl_data, x_cm, y * cm)
+
+
+def _get_badge_chunks(pdf, chunk_size=BADGES_CHUNK_SIZE):
+    """Split the badges of a PDF into chunks containing only full pages.
+
+    Since a registration may have more than one badge (for accompanying
+    persons), a chunk can start in the middle of a registration.
+
+    :return: A list of ``(registration_ids, skip, count)`` tuples with
+             the registrations needed for the chunk, the number of
+             badges of the first registration which belong to the
+             previous chunk, and the number of badges in the chunk
+    """
+    per_page = pdf.badges_per_page
+    chunk_size = max(1, -(-chunk_size // per_page)) * per_page
+    chunks = []
+    for start in range(0, len(pdf.persons), chunk_size):
+        persons = pdf.persons[start:start + chunk_size]
+        registration_ids = list(dict.fromkeys(person['registration'].id for person in persons))
+        skip = 0
+        while start > skip and pdf.persons[start - skip - 1]['registration'].id == registration_ids[0]:
+            skip += 1
+        chunks.append((registration_ids, skip, len(persons)))
+    return chunks
+
+
+def start_badges_job(job_id, pdf, regform, filename):
+    """Generate a badges PDF in the background.
+
+    The badges are split into chunks which are rendered in parallel by
+    separate tasks and then merged into a single PDF.
+
+    :param job_id: A unique identifier of the job
+    :param pdf: A `RegistrantsListToBadgesPDF` instance
+    :param regform: The registration form of the registrations
+    :param filename: The filename of the resulting PDF
+    :return: The job state (see `get_badges_job`)
+    """
+    from indico.modules.events.registration.tasks import merge_badges_chunks, render_badges_chunk
+    chunks = _get_badge_chunks(pdf)
+    job = {'state': 'running', 'total': len(pdf.persons), 'chunks': len(chunks), 'file_id': None}
+    if not badge_jobs_cache.add(job_id, job, timeout=BADGES_JOB_TTL):
+        # the job has already been started by a previous request
+        return get_badges_job(job_id)
+    config = pdf.config._asdict()
+    header = [render_badges_chunk.s(job_id, i, type(pdf), pdf.template.id, config, regform.id, registration_ids,
+                                    skip, count)
+              for i, (registration_ids, skip, count) in enumerate(chunks)]
+    chord(header)(merge_badges_chunks.s(job_id, regform.event.id, filename))
+    return get_badges_job(job_id)
+
+
+def get_badges_job(job_id):
+    """Get the state of a badge printing job.
+
+    :return: A dict containing the ``state`` (``running``, ``done`` or
+             ``failed``), the ``total`` number of badges, the number of
+             badges already rendered (``done``) and the ``file_id`` of the
+             PDF once it is available, or ``None`` if there is no such job
+    """
+    job = badge_jobs_cache.get(job_id)
+    if job is None:
+        return None
+    if job['state'] == 'done':
+        job['done'] = job['total']
+    else:
+        chunk_keys = [f'{job_id}-{i}' for i in range(job['chunks'])]
+        job['done'] = sum(badge_jobs_cache.get_dict(*chunk_keys, default=0).values())
+    return job
+
+
+def _update_badges_job(job_id, **data):
+    if job := badge_jobs_cache.get(job_id):
+        badge_jobs_cache.set(job_id, job | data, timeout=BADGES_JOB_TTL)
+
+
+def render_badges_chunk_pdf(job_id, chunk_index, pdf_class, template, config, regform, registration_ids, skip,
+                            count):
+    """Render a chunk of a badge printing job.
+
+    :return: The `File` containing the PDF of the chunk
+    """
+    from indico.modules.events.registration.models.registrations import Registration
+    try:
+        positions = {id_: i for i, id_ in enumerate(registration_ids)}
+        # the print_badge_template signal has already been sent when the job was started
+        query = (Registration.query
+                 .filter(Registration.id.in_(registration_ids))
+                 .options(subqueryload('data').joinedload('field_data')))
+        registrations = sorted(query, key=lambda r: positions[r.id])
+        pdf = pdf_class(template, config, regform.event, registrations, regform.tickets_for_accompanying_persons)
+        pdf.persons = pdf.persons[skip:skip + count]
+        file = File(filename=f'badges-{chunk_index}.pdf', content_type='application/pdf')
+        file.save(('event', regform.event.id, 'badges'), pdf.get_pdf())
+        db.session.add(file)
+        db.session.commit()
+    except Exception:
+        _update_badges_job(job_id, state='failed')
+        raise
+    badge_jobs_cache.set(f'{job_id}-{chunk_index}', count, timeout=BADGES_JOB_TTL)
+    return file
+
+
+def merge_badges_chunk_pdfs(job_id, event, files, filename):
+    """Merge the chunks of a badge printing job into the final PDF.
+
+    The chunks are deleted afterwards.  The final PDF is not claimed, so
+    it is deleted automatically after a while.
+    """
+    try:
+        output = PdfWriter()
+        for file in files:
+            with file.open() as fd:
+                output.append(fd)
+        buf = BytesIO()
+        output.write(buf)
+        buf.seek(0)
+        merged = File(filename=filename, content_type='application/pdf')
+        merged.save(('event', event.id, 'badges'), buf)
+        db.session.add(merged)
+        for file in files:
+            file.delete(delete_from_db=True)
+        db.session.commit()
+    except Exception:
+        _update_badges_job(job_id, state='failed')
+        raise
+    _update_badges_job(job_id, state='done', file_id=merged.id)
+    return merged
@@ -0,0 +1,39 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from types import SimpleNamespace
+
+from indico.modules.events.registration.badges import _get_badge_chunks
+
+
+def _make_persons(*counts):
+    """Create the persons of registrations with the given number of badges each."""
+    return [{'registration': SimpleNamespace(id=reg_id)}
+            for reg_id, count in enumerate(counts, 1)
+            for __ in range(count)]
+
+
+def test_get_badge_chunks():
+    pdf = SimpleNamespace(badges_per_page=4, persons=_make_persons(1, 3, 2, 1, 1, 2, 1, 1))
+    # chunks are rounded up to full pages
+    assert _get_badge_chunks(pdf, chunk_size=3) == [
+        ([1, 2], 0, 4),
+        ([3, 4, 5], 0, 4),
+        ([6, 7, 8], 0, 4),
+    ]
+    assert _get_badge_chunks(pdf, chunk_size=5) == [
+        ([1, 2, 3, 4, 5], 0, 8),
+        ([6, 7, 8], 0, 4),
+    ]
+    # chunks may start in the middle of a registration
+    pdf.badges_per_page = 1
+    assert _get_badge_chunks(pdf, chunk_size=3) == [
+        ([1, 2], 0, 3),
+        ([2, 3], 2, 3),
+        ([4, 5, 6], 0, 3),
+        ([6, 7, 8], 1, 3),
+    ]
@@ -10,11 +10,10 @@ import itertools
 import os
 import uuid
 from collections import defaultdict
-from contextlib import contextmanager
 from io import BytesIO
 from operator import attrgetter
 
-from flask import flash, jsonify, redirect, render_template, request, session
+from flask import current_app, flash, jsonify, redirect, render_template, request, session
 from pypdf import PdfWriter
 from sqlalchemy.orm import joinedload, subqueryload
 from webargs import fields, validate
@@ -32,9 +31,10 @@ from indico.modules.designer.util import get_badge_format, get_inherited_templat
 from indico.modules.events import EventLogRealm
 from indico.modules.events.payment.util import toggle_registration_payment
 from indico.modules.events.registration import logger
-from indico.modules.events.registration.badges import (RegistrantsListToBadgesPDF,
+from indico.modules.events.registration.badges import (BADGES_BACKGROUND_THRESHOLD, RegistrantsListToBadgesPDF,
                                                        RegistrantsListToBadgesPDFDoubleSided,
-                                                       RegistrantsListToBadgesPDFFoldable)
+                                                       RegistrantsListToBadgesPDFFoldable, get_badges_job,
+                                                       start_badges_job)
 from indico.modules.events.registration.constants import PROFILE_PICTURE_SENTINEL
 from indico.modules.events.registration.controllers import (CheckEmailMixin, RegistrationEditMixin,
                                                             UploadRegistrationFileMixin, UploadRegistrationPictureMixin)
@@ -54,15 +54,15 @@ from indico.modules.events.registration.placeholders.registrations import Pictur
 from indico.modules.events.registration.settings import event_badge_settings
 from indico.modules.events.registration.util import (ActionMenuEntry, create_registration,
                                                      generate_pdf_data_from_registrations,
-                                                     generate_spreadsheet_from_registrations,
                                                      get_flat_section_submission_data, get_initial_form_values,
                                                      get_registration_spreadsheet_column_formats,
                                                      get_ticket_attachments, get_title_uuid, get_user_data,
-                                                     import_registrations_from_csv, load_registration_schema,
-                                                     make_registration_schema)
+                                                     import_registrations_from_csv, iter_spreadsheet_from_registrations,
+                                                     load_registration_schema, make_registration_schema)
 from indico.modules.events.registration.views import WPManageRegistration
 from indico.modules.events.timetable.util import create_pdf
 from indico.modules.events.util import ZipGeneratorMixin
+from indico.modules.files.models.files import File
 from indico.modules.logs import LogKind
 from indico.modules.logs.util import make_diff_log
 from indico.modules.receipts.models.files import ReceiptFile
@@ -279,6 +279,9 @@ class RHRegistrationsActionBase(RHManageRegFormBase):
 
     registration_query_options = ()
     _allow_get_all = False
+    #: Whether to skip loading `registrations` in advance, e.g. because the
+    #: RH streams them from `registration_query` instead
+    _stream_registrations = False
 
     @use_kwargs({
         'registration_ids': fields.List(fields.Integer(), data_key='registration_id', load_default=lambda: []),
@@ -296,7 +299,8 @@ class RHRegistrationsActionBase(RHManageRegFormBase):
             # if it's POST we filter by registration ids; otherwise we assume
             # the user wants everything (e.g. API-like usage via personal token)
             query = query.filter(Registration.id.in_(registration_ids))
-        self.registrations = query.all()
+        self.registration_query = query
+        self.registrations = query.all() if not self._stream_registrations else None
 
 
 class RHRegistrationsActionModerationBase(RHRegistrationsActionBase):
@@ -506,9 +510,23 @@ class RHRegistrationsExportBase(RHRegistrationsActionBase):
     def _process_args(self):
         RHRegistrationsActionBase._process_args(self)
         self.export_config = self.list_generator.get_list_export_config()
+        if self.export_config['extra_columns'] and self.registrations is None:
+            # custom columns need all registrations at once to load their data
+            self.registrations = self.registration_query.all()
         for col in self.export_config['extra_columns']:
             col.data = col.load_data(self.registrations)
 
+    def _iter_registrations(self):
+        """Iterate over the registrations to export.
+
+        Unless they have already been loaded, the registrations are streamed
+        from a server-side cursor, so only a small batch of them is kept in
+        memory at any time.
+        """
+        if self.registrations is not None:
+            return iter(self.registrations)
+        return self.registration_query.yield_per(500)
+
 
 class RHRegistrationsExportPDF(RHRegistrationsExportBase):
     """Export registration list to a PDF in table or book style."""
@@ -560,20 +578,30 @@ class RHRegistrationsExportPDF(RHRegistrationsExportBase):
 class RHRegistrationsExportCSV(RHRegistrationsExportBase):
     """Export registration list to a CSV file."""
 
+    # the data is loaded in batches while generating the rows
+    registration_query_options = ()
+    _stream_registrations = True
+
     def _process(self):
-        headers, rows = generate_spreadsheet_from_registrations(self.registrations, self.export_config['regform_items'],
-                                                                self.export_config['static_item_ids'],
-                                                                extra_columns=self.export_config['extra_columns'])
+        headers, rows = iter_spreadsheet_from_registrations(self._iter_registrations(),
+                                                            self.export_config['regform_items'],
+                                                            self.export_config['static_item_ids'],
+                                                            extra_columns=self.export_config['extra_columns'])
         return send_csv('registrations.csv', headers, rows)
 
 
 class RHRegistrationsExportExcel(RHRegistrationsExportBase):
     """Export registration list to an XLSX file."""
 
+    # the data is loaded in batches while generating the rows
+    registration_query_options = ()
+    _stream_registrations = True
+
     def _process(self):
-        headers, rows = generate_spreadsheet_from_registrations(self.registrations, self.export_config['regform_items'],
-                                                                self.export_config['static_item_ids'],
-                                                                extra_columns=self.export_config['extra_columns'])
+        headers, rows = iter_spreadsheet_from_registrations(self._iter_registrations(),
+                                                            self.export_config['regform_items'],
+                                                            self.export_config['static_item_ids'],
+                                                            extra_columns=self.export_config['extra_columns'])
         column_formats = get_registration_spreadsheet_column_formats(self.export_config['regform_items'])
         return send_xlsx('registrations.xlsx', headers, rows, tz=self.event.tzinfo, column_formats=column_formats)
 
@@ -625,8 +653,22 @@ class RHRegistrationsPrintBadges(RHRegistrationsActionBase):
         if self.template.owner.id not in valid_category_ids:
             raise Forbidden
 
+    def _send_job_result(self, job):
+        if job['state'] == 'done':
+            return File.get_or_404(job['file_id']).send()
+        response = current_app.make_response(WPManageRegistration.render_template(
+            'management/print_badges_progress.html', self.event, regform=self.regform, job=job
+        ))
+        if job['state'] == 'running':
+            # reload the page (which sends the PDF once it is ready) until the job has finished
+            response.headers['Refresh'] = '5'
+        return response
+
     def _process(self):
-        config_params = badge_cache.get(request.view_args['uuid'])
+        key = request.view_args['uuid']
+        if job := get_badges_job(key):
+            return self._send_job_result(job)
+        config_params = badge_cache.get(key)
         if not config_params:
             raise NotFound
         if config_params['page_layout'] == PageLayout.foldable:
@@ -647,7 +689,10 @@ class RHRegistrationsPrintBadges(RHRegistrationsActionBase):
         file_name_prefix = 'Tickets' if config_params.pop('is_ticket') else 'Badges'
         pdf = pdf_class(self.template, config_params, self.event, registrations,
                         self.regform.tickets_for_accompanying_persons)
-        return send_file(f'{file_name_prefix}-{self.event.id}.pdf', pdf.get_pdf(), 'application/pdf')
+        filename = f'{file_name_prefix}-{self.event.id}.pdf'
+        if len(pdf.persons) > BADGES_BACKGROUND_THRESHOLD:
+            return self._send_job_result(start_badges_job(key, pdf, self.regform, filename))
+        return send_file(filename, pdf.get_pdf(), 'application/pdf')
 
 
 class RHRegistrationsConfigBadges(RHRegistrationsActionBase):
@@ -1133,14 +1178,15 @@ class RHRegistrationsExportReceipts(ZipGeneratorMixin, RHRegistrationsActionBase
             outputbuf.seek(0)
             yield _FileWrapper(outputbuf, f'{template.title}-{template.id}.pdf')
 
-    @contextmanager
-    def _get_item_path(self, item):
+    def _open_item(self, item):
         if isinstance(item, _FileWrapper):
-            yield item.content
-            return
+            return item.content
+        return item[1].open()
 
-        with item[1].get_local_path() as path:
-            yield path
+    def _get_item_size(self, item):
+        if isinstance(item, _FileWrapper):
+            return item.content.getbuffer().nbytes
+        return item[1].size
 
     @use_kwargs({
         'combined': fields.Bool(load_default=False),
@@ -113,6 +113,11 @@ class AffiliationField(RegistrationFormFieldBase):
     def render_reglist_column(self, data: RegistrationData) -> RegistrationListColumn:
         return RegistrationListColumn(self._render_affiliation(data.data), data.search_data)
 
+    def render_reglist_columns(self, data_list: list[RegistrationData]) -> list[RegistrationListColumn]:
+        search_data = self.get_friendly_data_column(data_list, for_search=True)
+        return [RegistrationListColumn(self._render_affiliation(data.data), text_value)
+                for data, text_value in zip(data_list, search_data, strict=True)]
+
     def create_sql_filter(self, data_list):
         return db.func.coalesce(RegistrationData.data['text'].astext, RegistrationData.data.astext).in_(data_list)
 
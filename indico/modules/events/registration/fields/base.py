@@ -244,6 +244,19 @@ class RegistrationFormFieldBase:
         """
         return registration_data.data
 
+    def get_friendly_data_column(self, data_list, for_humans=False, for_search=False):
+        """Return the data contained in the field for many registrations.
+
+        This is the batch version of :meth:`get_friendly_data` which is used
+        when rendering the data of many registrations at once.  Fields which
+        need to load additional data to render it should override it in order
+        to load that data only once for the whole column.
+
+        :param data_list: A list of `RegistrationData` objects of this field
+        :return: A list containing the data for each item in `data_list`
+        """
+        return [self.get_friendly_data(data, for_humans=for_humans, for_search=for_search) for data in data_list]
+
     def iter_placeholder_info(self):
         yield None, _('Value of "{form_item}" ({parent_form_item})').format(
             form_item=self.form_item.title,
@@ -294,6 +307,15 @@ class RegistrationFormFieldBase:
         """Render the field's data in the management registration list table."""
         return RegistrationListColumn(data.friendly_data, data.search_data)
 
+    def render_reglist_columns(self, data_list: list[RegistrationData]) -> list[RegistrationListColumn]:
+        """Render the data of many registrations in the management registration list table.
+
+        This is the batch version of :meth:`render_reglist_column`.  By default it
+        calls that method for each registration; fields which can render the whole
+        column more efficiently may override it.
+        """
+        return [self.render_reglist_column(data) for data in data_list]
+
     def render_spreadsheet_data(self, data: RegistrationData):
         """Render the field's data in a spreadsheet.
 
@@ -301,6 +323,15 @@ class RegistrationFormFieldBase:
         """
         return data.friendly_data
 
+    def render_spreadsheet_column(self, data_list: list[RegistrationData]) -> list:
+        """Render the data of many registrations in a spreadsheet.
+
+        This is the batch version of :meth:`render_spreadsheet_data`.  By default it
+        calls that method for each registration; fields which can render the whole
+        column more efficiently may override it.
+        """
+        return [self.render_spreadsheet_data(data) for data in data_list]
+
 
 class RegistrationFormBillableField(RegistrationFormFieldBase):
     setup_schema_base_cls = BillableFieldDataSchema
@@ -0,0 +1,30 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from types import SimpleNamespace
+
+from indico.modules.events.registration.custom import RegistrationListColumn
+from indico.modules.events.registration.fields.simple import TextField
+
+
+class UppercaseTextField(TextField):
+    name = 'uppercase-text'
+
+    def render_reglist_column(self, data):
+        return RegistrationListColumn(data.data.upper(), data.data)
+
+    def render_spreadsheet_data(self, data):
+        return data.data.upper()
+
+
+def test_batch_rendering_uses_item_rendering():
+    # fields which only customize how a single item is rendered must also get it in lists and exports
+    field = UppercaseTextField(SimpleNamespace())
+    data_list = [SimpleNamespace(data='foo'), SimpleNamespace(data='bar')]
+    assert field.render_spreadsheet_column(data_list) == ['FOO', 'BAR']
+    assert field.render_reglist_columns(data_list) == [RegistrationListColumn('FOO', 'foo'),
+                                                       RegistrationListColumn('BAR', 'bar')]
@@ -293,28 +293,50 @@ class MultiChoiceField(ChoiceBaseField):
         except ValueError:
             return sys.maxsize
 
-    def get_friendly_data(self, registration_data, for_humans=False, for_search=False):
+    def _get_choice_order(self, registration_data):
+        # Preserve the original multi choice field order given by
+        # the field when getting the selected choices.
+        return [x['id'] for x in registration_data.field_data.field.view_data['choices']]
+
+    def _format_choices(self, reg_data, field_choice_order, for_humans, for_search):
         def _format_item(uuid, number_of_slots):
             caption = self.form_item.data['captions'][uuid]
             return f'{caption} (+{number_of_slots - 1})' if number_of_slots > 1 else caption
 
-        reg_data = registration_data.data
-
-        if not reg_data:
-            return ''
-
-        # Preserve the original multi choice field order given by
-        # the field when getting the selected choices.
-        field_choice_order = [x['id'] for x in registration_data.field_data.field.view_data['choices']]
         reg_data = dict(sorted(reg_data.items(), key=lambda x: self._get_display_index(field_choice_order, x[0])))
         choices = [_format_item(uuid, number_of_slots) for uuid, number_of_slots in reg_data.items()]
-
         return ', '.join(choices) if for_humans or for_search else choices
 
+    def get_friendly_data(self, registration_data, for_humans=False, for_search=False):
+        if not registration_data.data:
+            return ''
+        field_choice_order = self._get_choice_order(registration_data)
+        return self._format_choices(registration_data.data, field_choice_order, for_humans, for_search)
+
+    def get_friendly_data_column(self, data_list, for_humans=False, for_search=False):
+        # building the view data is expensive, so we only do it once for the whole column
+        field_choice_order = None
+        rv = []
+        for data in data_list:
+            if not data.data:
+                rv.append('')
+                continue
+            if field_choice_order is None:
+                field_choice_order = self._get_choice_order(data)
+            rv.append(self._format_choices(data.data, field_choice_order, for_humans, for_search))
+        return rv
+
     def render_reglist_column(self, data):
         display_text = self.get_friendly_data(data, for_humans=True)
         return RegistrationListColumn(display_text, display_text)
 
+    def render_reglist_columns(self, data_list):
+        return [RegistrationListColumn(display_text, display_text)
+                for display_text in self.get_friendly_data_column(data_list, for_humans=True)]
+
+    def render_spreadsheet_column(self, data_list):
+        return self.get_friendly_data_column(data_list)
+
     def get_validators(self, existing_registration):
         def _check_max_choices(new_data):
             if not new_data:
@@ -85,23 +85,43 @@ class SessionsField(RegistrationFormFieldBase):
 
         return [_check_number_of_sessions, _check_session_block_is_valid]
 
-    def get_friendly_data(self, registration_data, for_humans=False, for_search=False):
-        if not registration_data.data:
-            return '' if for_humans or for_search else []
+    def _get_blocks(self, block_ids):
+        return (SessionBlock.query
+                .filter(SessionBlock.id.in_(block_ids))
+                .options(joinedload(SessionBlock.timetable_entry).raiseload('*'))
+                .join(Session)
+                .order_by(SessionBlock.start_dt, Session.title, SessionBlock.title, SessionBlock.id)
+                .all())
+
+    def _format_blocks(self, registration_data, blocks, for_humans, for_search):
+        if for_humans or for_search:
+            return '; '.join(b.full_title for b in blocks)
         event = registration_data.registration.event
         # this is a bit ugly, but we need to use the user's timezone if it's in an end-user area,
         # while using the event's timezone if it's in a management area...
         tzinfo = event.display_tzinfo if isinstance(getattr(g, 'rh', None), RHRegistrationForm) else event.tzinfo
-        blocks = (SessionBlock.query
-                  .filter(SessionBlock.id.in_(registration_data.data))
-                  .options(joinedload(SessionBlock.timetable_entry).raiseload('*'))
-                  .join(Session)
-                  .order_by(SessionBlock.start_dt, Session.title, SessionBlock.title, SessionBlock.id)
-                  .all())
-        if for_humans or for_search:
-            return '; '.join(b.full_title for b in blocks)
         return [_format_block(b, tzinfo) for b in blocks]
 
+    def get_friendly_data(self, registration_data, for_humans=False, for_search=False):
+        if not registration_data.data:
+            return '' if for_humans or for_search else []
+        blocks = self._get_blocks(registration_data.data)
+        return self._format_blocks(registration_data, blocks, for_humans, for_search)
+
+    def get_friendly_data_column(self, data_list, for_humans=False, for_search=False):
+        # load the blocks of all registrations at once; since they are sorted,
+        # picking the ones of each registration keeps them in the correct order
+        block_ids = {block_id for data in data_list if data.data for block_id in data.data}
+        blocks = self._get_blocks(block_ids) if block_ids else []
+        rv = []
+        for data in data_list:
+            if not data.data:
+                rv.append('' if for_humans or for_search else [])
+                continue
+            selected = set(map(int, data.data))
+            rv.append(self._format_blocks(data, [b for b in blocks if b.id in selected], for_humans, for_search))
+        return rv
+
     def create_sql_filter(self, data_list):
         data_list = json.dumps(list(map(int, data_list)))
         return RegistrationData.data.op('@>')(db.func.jsonb(data_list))
@@ -109,3 +129,10 @@ class SessionsField(RegistrationFormFieldBase):
     def render_reglist_column(self, data):
         display_text = self.get_friendly_data(data, for_humans=True)
         return RegistrationListColumn(display_text, display_text)
+
+    def render_reglist_columns(self, data_list):
+        return [RegistrationListColumn(display_text, display_text)
+                for display_text in self.get_friendly_data_column(data_list, for_humans=True)]
+
+    def render_spreadsheet_column(self, data_list):
+        return self.get_friendly_data_column(data_list)
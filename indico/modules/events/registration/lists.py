@@ -5,6 +5,8 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from functools import partial
+
 from flask import request
 from sqlalchemy.orm import joinedload, undefer
 
@@ -15,6 +17,7 @@ from indico.modules.events.registration.models.items import PersonalDataType, Re
 from indico.modules.events.registration.models.registrations import (Registration, RegistrationData, RegistrationState,
                                                                      RegistrationVisibility)
 from indico.modules.events.registration.models.tags import RegistrationTag
+from indico.modules.events.registration.util import load_registration_data_columns, render_registration_data_column
 from indico.modules.events.util import ListGeneratorBase
 from indico.util.i18n import _
 from indico.util.signals import named_objects_from_signal
@@ -269,6 +272,9 @@ class RegistrationListGenerator(ListGeneratorBase):
         for col in extra_columns:
             col.data = col.load_data(registrations)
         regform_items = self._get_sorted_regform_items(dynamic_item_ids)
+        static_column_ids = {col['id'] for col in static_columns}
+        personal_items = [item for item in self.regform.form_items if item.id in static_column_ids]
+        friendly_data, search_data = self._get_rendered_data(registrations, regform_items + personal_items)
         return {
             'regform': self.regform,
             'registrations': registrations,
@@ -276,9 +282,30 @@ class RegistrationListGenerator(ListGeneratorBase):
             'static_columns': static_columns,
             'extra_columns': extra_columns,
             'dynamic_columns': regform_items,
+            'friendly_data': friendly_data,
+            'search_data': search_data,
             'filtering_enabled': total_entries != len(registrations)
         }
 
+    def _get_rendered_data(self, registrations, regform_items):
+        """Render the data of the registrations for the given form items.
+
+        :return: A ``(friendly_data, search_data)`` tuple of dicts mapping
+                 form item ids to lists containing the rendered data of
+                 each registration
+        """
+        columns = load_registration_data_columns(registrations, regform_items)
+        friendly_data = {}
+        search_data = {}
+        for item in regform_items:
+            field_impl = item.field_impl
+            friendly_data[item.id] = render_registration_data_column(columns[item.id],
+                                                                     field_impl.get_friendly_data_column)
+            search_data[item.id] = render_registration_data_column(
+                columns[item.id], partial(field_impl.get_friendly_data_column, for_search=True)
+            )
+        return friendly_data, search_data
+
     def get_list_export_config(self):
         static_item_ids, item_ids, extra_item_ids = self.get_item_ids()
         return {
@@ -13,12 +13,15 @@ from indico.core import signals
 from indico.core.celery import celery
 from indico.core.db import db
 from indico.core.storage.backend import get_storage
+from indico.modules.designer.models.templates import DesignerTemplate
 from indico.modules.events import Event
 from indico.modules.events.registration import logger
+from indico.modules.events.registration.badges import merge_badges_chunk_pdfs, render_badges_chunk_pdf
 from indico.modules.events.registration.models.form_fields import RegistrationFormField, RegistrationFormFieldData
 from indico.modules.events.registration.models.forms import RegistrationForm
 from indico.modules.events.registration.models.registrations import Registration, RegistrationData
 from indico.modules.events.registration.util import close_registration
+from indico.modules.files.models.files import File
 from indico.modules.receipts.models.files import ReceiptFile
 from indico.util.date_time import now_utc
 from indico.util.string import snakify_keys
@@ -118,3 +121,18 @@ def delete_previous_registration_file(registration_id, field_data_id, storage_ba
     logger.debug('Deleting registration file: %s from %s storage', storage_file_id, storage_backend)
     storage = get_storage(storage_backend)
     storage.delete(storage_file_id)
+
+
+@celery.task(name='render_badges_chunk', ignore_result=False)
+def render_badges_chunk(job_id, chunk_index, pdf_class, template_id, config, regform_id, registration_ids, skip,
+                        count):
+    template = DesignerTemplate.get(template_id)
+    regform = RegistrationForm.get(regform_id)
+    return render_badges_chunk_pdf(job_id, chunk_index, pdf_class, template, config, regform, registration_ids, skip,
+                                   count).id
+
+
+@celery.task(name='merge_badges_chunks')
+def merge_badges_chunks(file_ids, job_id, event_id, filename):
+    files = {f.id: f for f in File.query.filter(File.id.in_(file_ids))}
+    merge_badges_chunk_pdfs(job_id, Event.get(event_id), [files[id_] for id_ in file_ids], filename)
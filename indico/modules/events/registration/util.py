@@ -18,8 +18,8 @@ from flask import json, session
 from marshmallow import RAISE, ValidationError, fields, validates
 from PIL import Image, ImageOps
 from qrcode import QRCode, constants
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import contains_eager, joinedload, load_only, undefer
+from sqlalchemy import and_, inspect, or_
+from sqlalchemy.orm import contains_eager, joinedload, load_only, selectinload, undefer
 
 from indico.core import signals
 from indico.core.config import config
@@ -602,6 +602,56 @@ def update_registration_consent_to_publish(registration, consent_to_publish):
     registration.consent_to_publish = consent_to_publish
 
 
+def load_registration_data_columns(registrations, regform_items):
+    """Load the data of many registrations for the given form items.
+
+    The data is grouped by form item so each column can be converted at once
+    using the batch renderers of the fields (e.g.
+    :meth:`~.RegistrationFormFieldBase.render_spreadsheet_column`).  Unless
+    the data of the registrations has already been loaded, it is loaded
+    using a single query.
+
+    :param registrations: A list of registrations
+    :param regform_items: The form items to load the data for
+    :return: A dict mapping form item ids to lists containing the
+             `RegistrationData` of each registration (in the same order
+             as `registrations`) or ``None`` if there is no data
+    """
+    positions = {registration.id: i for i, registration in enumerate(registrations)}
+    columns = {item.id: [None] * len(registrations) for item in regform_items}
+    if not registrations or not columns:
+        return columns
+    if all('data' not in inspect(registration).unloaded for registration in registrations):
+        data_iter = itertools.chain.from_iterable(registration.data for registration in registrations)
+    else:
+        data_iter = (RegistrationData.query
+                     .join(RegistrationData.field_data)
+                     .filter(RegistrationData.registration_id.in_(positions),
+                             RegistrationFormFieldData.field_id.in_(columns))
+                     .options(contains_eager(RegistrationData.field_data)))
+    for data in data_iter:
+        if (column := columns.get(data.field_data.field_id)) is not None:
+            column[positions[data.registration_id]] = data
+    return columns
+
+
+def render_registration_data_column(column, render):
+    """Render a column returned by `load_registration_data_columns`.
+
+    :param column: A list of `RegistrationData` objects or ``None``
+    :param render: A batch renderer of the column's field, which is called
+                   with a list of all the `RegistrationData` objects
+    :return: A list containing the rendered data or ``None`` for each
+             element of `column`
+    """
+    indexes = [i for i, data in enumerate(column) if data is not None]
+    rv = [None] * len(column)
+    if indexes:
+        for i, value in zip(indexes, render([column[i] for i in indexes]), strict=True):
+            rv[i] = value
+    return rv
+
+
 def get_registration_spreadsheet_column_formats(regform_items):
     """Return the configured formats for date columns in registration exports."""
     return {
@@ -610,13 +660,18 @@ def get_registration_spreadsheet_column_formats(regform_items):
     }
 
 
-def generate_spreadsheet_from_registrations(registrations, regform_items, static_items, extra_columns=()):
-    """Generate a spreadsheet data from a given registration list.
+def iter_spreadsheet_from_registrations(registrations, regform_items, static_items, extra_columns=()):
+    """Generate spreadsheet data lazily from a given registration list.
+
+    Unlike `generate_spreadsheet_from_registrations`, the rows are only
+    built while iterating over them, so `registrations` can be streamed
+    from a server-side cursor without keeping all of them in memory.
 
     :param registrations: The list of registrations to include in the file
     :param regform_items: The registration form items to be used as columns
     :param static_items: Registration form information as extra columns
     :param extra_columns: Custom list items from the `registrant_list_items` signal
+    :return: A ``(headers, rows)`` tuple where `rows` is an iterator
     """
     field_names = ['ID', 'Name']
     special_item_mapping = {
@@ -640,43 +695,70 @@ def generate_spreadsheet_from_registrations(registrations, regform_items, static
             field_names.append(unique_col('{} ({})'.format(item.title, 'Departure'), item.id))
     field_names.extend(title for name, (title, fn) in special_item_mapping.items() if name in static_items)
     field_names.extend(str(col.title) for col in extra_columns)
-    rows = []
-    for registration in registrations:
-        data = registration.data_by_field
-        registration_dict = {
-            'ID': registration.friendly_id,
-            'Name': f'{registration.first_name} {registration.last_name}'
-        }
-        tzinfo = registration.event.tzinfo
-        for item in regform_items:
-            key = unique_col(item.title, item.id)
-            if item.input_type == 'accommodation':
-                registration_dict[key] = data[item.id].friendly_data.get('choice') if item.id in data else ''
-                key = unique_col('{} ({})'.format(item.title, 'Arrival'), item.id)
-                arrival_date = data[item.id].friendly_data.get('arrival_date') if item.id in data else None
-                registration_dict[key] = arrival_date or ''
-                key = unique_col('{} ({})'.format(item.title, 'Departure'), item.id)
-                departure_date = data[item.id].friendly_data.get('departure_date') if item.id in data else None
-                registration_dict[key] = departure_date or ''
-            elif item.input_type == 'date':
-                if item.id not in data or not data[item.id].data:  # missing or empty data for the field
-                    registration_dict[key] = ''
-                    continue
-                registration_dict[key] = datetime.fromisoformat(data[item.id].data).replace(tzinfo=tzinfo)
-            elif item.id in data:
-                registration_dict[key] = item.field_impl.render_spreadsheet_data(data[item.id])
-            else:
-                registration_dict[key] = ''
-        for name, (title, fn) in special_item_mapping.items():
-            if name not in static_items:
-                continue
-            value = fn(registration)
-            registration_dict[title] = value
-        for col in extra_columns:
-            col_data = col.data.get(registration)
-            registration_dict[str(col.title)] = col_data.text_value if col_data else ''
-        rows.append(registration_dict)
-    return field_names, rows
+
+    def _render_column(item, column):
+        if item.input_type == 'date':
+            return [data.data if data is not None else None for data in column]
+        elif item.input_type == 'accommodation':
+            return render_registration_data_column(column, item.field_impl.get_friendly_data_column)
+        return render_registration_data_column(column, item.field_impl.render_spreadsheet_column)
+
+    def _iter_rows():
+        # the data is loaded and rendered column by column in batches of registrations,
+        # so it is never necessary to keep the data of all registrations in memory
+        for batch in itertools.batched(registrations, 500):
+            columns = load_registration_data_columns(batch, regform_items)
+            rendered = {item.id: _render_column(item, columns[item.id]) for item in regform_items}
+            for i, registration in enumerate(batch):
+                registration_dict = {
+                    'ID': registration.friendly_id,
+                    'Name': f'{registration.first_name} {registration.last_name}'
+                }
+                tzinfo = registration.event.tzinfo
+                for item in regform_items:
+                    key = unique_col(item.title, item.id)
+                    has_data = columns[item.id][i] is not None
+                    value = rendered[item.id][i]
+                    if item.input_type == 'accommodation':
+                        registration_dict[key] = value.get('choice') if has_data else ''
+                        key = unique_col('{} ({})'.format(item.title, 'Arrival'), item.id)
+                        arrival_date = value.get('arrival_date') if has_data else None
+                        registration_dict[key] = arrival_date or ''
+                        key = unique_col('{} ({})'.format(item.title, 'Departure'), item.id)
+                        departure_date = value.get('departure_date') if has_data else None
+                        registration_dict[key] = departure_date or ''
+                    elif item.input_type == 'date':
+                        if not has_data or not value:  # missing or empty data for the field
+                            registration_dict[key] = ''
+                            continue
+                        registration_dict[key] = datetime.fromisoformat(value).replace(tzinfo=tzinfo)
+                    elif has_data:
+                        registration_dict[key] = value
+                    else:
+                        registration_dict[key] = ''
+                for name, (title, fn) in special_item_mapping.items():
+                    if name not in static_items:
+                        continue
+                    value = fn(registration)
+                    registration_dict[title] = value
+                for col in extra_columns:
+                    col_data = col.data.get(registration)
+                    registration_dict[str(col.title)] = col_data.text_value if col_data else ''
+                yield registration_dict
+
+    return field_names, _iter_rows()
+
+
+def generate_spreadsheet_from_registrations(registrations, regform_items, static_items, extra_columns=()):
+    """Generate a spreadsheet data from a given registration list.
+
+    :param registrations: The list of registrations to include in the file
+    :param regform_items: The registration form items to be used as columns
+    :param static_items: Registration form information as extra columns
+    :param extra_columns: Custom list items from the `registrant_list_items` signal
+    """
+    headers, rows = iter_spreadsheet_from_registrations(registrations, regform_items, static_items, extra_columns)
+    return headers, list(rows)
 
 
 def generate_pdf_data_from_registrations(event, registrations, regform_items, static_items, extra_columns, empty_value):
@@ -735,24 +817,25 @@ def generate_pdf_data_from_registrations(event, registrations, regform_items, st
     field_names.extend(unique_col(item.title, item.id) for item in regform_items)
     field_names.extend(title for name, (title, fn) in special_item_mapping.items() if name in static_items)
     field_names.extend(str(col.title) for col in extra_columns)
+    columns = load_registration_data_columns(registrations, regform_items)
+    rendered = {item.id: render_registration_data_column(columns[item.id], item.field_impl.render_reglist_columns)
+                for item in regform_items}
     rows = []
-    for registration in registrations:
-        data = registration.data_by_field
+    for i, registration in enumerate(registrations):
         row_data = {
             _('ID'): f'#{registration.friendly_id}',
             _('Name'): f'{registration.first_name} {registration.last_name}'
         }
         for item in regform_items:
             key = unique_col(item.title, item.id)
-            if item.id not in data:
+            col = rendered[item.id][i]
+            if col is None:
                 row_data[key] = empty_value
+            elif item.input_type == 'accommodation':
+                # XXX ugly hack, but the "content" for this field is a dict...
+                row_data[key] = col.text_value
             else:
-                col = item.field_impl.render_reglist_column(data[item.id])
-                if item.input_type == 'accommodation':
-                    # XXX ugly hack, but the "content" for this field is a dict...
-                    row_data[key] = col.text_value
-                else:
-                    row_data[key] = col.content
+                row_data[key] = col.content
         for name, (title, fn) in special_item_mapping.items():
             if name not in static_items:
                 continue
@@ -839,20 +922,51 @@ def get_events_registered(user, dt=None):
     return {registration.event_id for registration in query}
 
 
+def get_registrations_personal_data(regform, registrations):
+    """Get the personal data of many registrations at once.
+
+    This returns the same data as `Registration.get_personal_data` but
+    loads and renders the data of each personal data field only once
+    for all registrations.
+
+    :param regform: The registration form of the registrations
+    :param registrations: A list of registrations
+    :return: A list containing the personal data of each registration
+    """
+    items = [item for item in regform.form_items if item.is_field and item.personal_data_type is not None]
+    columns = load_registration_data_columns(registrations, items)
+    personal_data = [{} for __ in registrations]
+    for item in items:
+        column = columns[item.id]
+        friendly_data = render_registration_data_column(column, item.field_impl.get_friendly_data_column)
+        for registration_personal_data, data, value in zip(personal_data, column, friendly_data, strict=True):
+            if data is not None and data.data:
+                registration_personal_data[item.personal_data_type.name] = value
+    # might happen with imported legacy registrations (missing personal data)
+    for registration, registration_personal_data in zip(registrations, personal_data, strict=True):
+        registration_personal_data.setdefault('first_name', registration.first_name)
+        registration_personal_data.setdefault('last_name', registration.last_name)
+        registration_personal_data.setdefault('email', registration.email)
+    return personal_data
+
+
 def build_registrations_api_data(event):
     api_data = []
-    query = (RegistrationForm.query.with_parent(event)
-             .options(joinedload('registrations').joinedload('data').joinedload('field_data')))
-    for regform in query:
-        for registration in regform.active_registrations:
-            registration_info = _build_base_registration_info(registration)
+    for regform in RegistrationForm.query.with_parent(event):
+        registrations = (Registration.query.with_parent(regform)
+                         .filter(Registration.is_active)
+                         .options(selectinload('tags'))
+                         .all())
+        personal_data = get_registrations_personal_data(regform, registrations)
+        for registration, registration_personal_data in zip(registrations, personal_data, strict=True):
+            registration_info = _build_base_registration_info(registration, registration_personal_data)
             registration_info['checkin_secret'] = registration.ticket_uuid
             api_data.append(registration_info)
     return api_data
 
 
-def _build_base_registration_info(registration):
-    personal_data = _build_personal_data(registration)
+def _build_base_registration_info(registration, personal_data=None):
+    personal_data = _build_personal_data(registration, personal_data)
     return {
         'registrant_id': str(registration.id),
         'checked_in': registration.checked_in,
@@ -863,8 +977,9 @@ def _build_base_registration_info(registration):
     }
 
 
-def _build_personal_data(registration):
-    personal_data = registration.get_personal_data()
+def _build_personal_data(registration, personal_data=None):
+    if personal_data is None:
+        personal_data = registration.get_personal_data()
     personal_data['firstName'] = personal_data.pop('first_name')
     personal_data['surname'] = personal_data.pop('last_name')
     personal_data['country'] = personal_data.pop('country', '')
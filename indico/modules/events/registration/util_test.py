@@ -32,14 +32,15 @@ from indico.modules.events.registration.models.registrations import (Registratio
                                                                      RegistrationVisibility)
 from indico.modules.events.registration.util import (create_registration, generate_spreadsheet_from_registrations,
                                                      get_event_regforms_registrations, get_registered_event_persons,
-                                                     get_ticket_qr_code_data, get_user_data,
-                                                     import_invitations_from_user_records,
+                                                     get_registrations_personal_data, get_ticket_qr_code_data,
+                                                     get_user_data, import_invitations_from_user_records,
                                                      import_registrations_from_csv, import_user_records_from_csv,
-                                                     modify_registration, process_registration_picture)
+                                                     load_registration_data_columns, modify_registration,
+                                                     process_registration_picture)
 from indico.modules.users.models.affiliations import Affiliation
 from indico.modules.users.models.users import ProfilePictureSource, UserTitle
 from indico.testing.util import assert_json_snapshot
-from indico.util.spreadsheets import CSVFieldDelimiter
+from indico.util.spreadsheets import CSVFieldDelimiter, unique_col
 
 
 pytest_plugins = ('indico.modules.events.registration.testing.fixtures',
@@ -210,6 +211,47 @@ def test_import_registrations(dummy_regform, dummy_user):
     assert 'phone' not in data
 
 
+def test_load_registration_data_columns(db, dummy_regform, count_queries):
+    registrations = [
+        create_registration(dummy_regform, {
+            'email': 'alice@example.test',
+            'first_name': 'Alice',
+            'last_name': 'Doe',
+        }, notify_user=False),
+        create_registration(dummy_regform, {
+            'email': 'bob@example.test',
+            'first_name': 'Bob',
+            'last_name': 'Doe',
+            'affiliation': 'ACME Inc.',
+        }, notify_user=False),
+    ]
+    fields = {field.personal_data_type: field for field in dummy_regform.active_fields}
+    first_name_field = fields[PersonalDataType.first_name]
+    affiliation_field = fields[PersonalDataType.affiliation]
+    expected_personal_data = [reg.get_personal_data() for reg in registrations]
+    for reg in registrations:
+        db.session.expire(reg, ['data'])
+
+    with count_queries() as count:
+        columns = load_registration_data_columns(registrations, [first_name_field, affiliation_field])
+    assert count() == 1
+    assert [data.data for data in columns[first_name_field.id]] == ['Alice', 'Bob']
+    assert columns[affiliation_field.id][1].friendly_data == 'ACME Inc.'
+    # data that has already been loaded is not queried again
+    for reg in registrations:
+        assert reg.data
+    with count_queries() as count:
+        assert load_registration_data_columns(registrations, [first_name_field]) == {
+            first_name_field.id: columns[first_name_field.id]
+        }
+    assert count() == 0
+
+    assert get_registrations_personal_data(dummy_regform, registrations) == expected_personal_data
+    __, rows = generate_spreadsheet_from_registrations(registrations, [first_name_field, affiliation_field], set())
+    assert [row[unique_col(first_name_field.title, first_name_field.id)] for row in rows] == ['Alice', 'Bob']
+    assert rows[1][unique_col(affiliation_field.title, affiliation_field.id)] == 'ACME Inc.'
+
+
 def test_import_registrations_error(dummy_regform, dummy_user):
     dummy_user.secondary_emails.add('dummy@example.test')
 
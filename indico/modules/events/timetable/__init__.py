@@ -42,6 +42,37 @@ def _extend_event_management_menu(sender, event, **kwargs):
                             icon='calendar')
 
 
+@signals.event.updated.connect
+@signals.event.location_changed.connect
+@signals.event.person_updated.connect
+@signals.event.timetable_entry_created.connect
+@signals.event.timetable_entry_updated.connect
+@signals.event.timetable_entry_deleted.connect
+@signals.event.times_changed.connect
+@signals.event.contribution_created.connect
+@signals.event.contribution_updated.connect
+@signals.event.contribution_deleted.connect
+@signals.event.session_updated.connect
+@signals.event.session_deleted.connect
+@signals.event.session_block_updated.connect
+@signals.event.session_block_deleted.connect
+@signals.attachments.folder_created.connect
+@signals.attachments.folder_updated.connect
+@signals.attachments.folder_deleted.connect
+@signals.attachments.attachment_created.connect
+@signals.attachments.attachment_updated.connect
+@signals.attachments.attachment_deleted.connect
+@signals.acl.protection_changed.connect
+def _invalidate_timetable(sender, obj=None, **kwargs):
+    from indico.modules.attachments.models.attachments import Attachment
+    from indico.modules.events.timetable.cache import invalidate_timetable
+    obj = obj or sender
+    if isinstance(obj, Attachment):
+        obj = obj.folder
+    if (event := getattr(obj, 'event', None)) is not None:
+        invalidate_timetable(event)
+
+
 @signals.event_management.get_cloners.connect
 def _get_timetable_cloner(sender, **kwargs):
     from indico.modules.events.timetable.clone import TimetableCloner
@@ -0,0 +1,53 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+"""Cache the serialized timetables of events.
+
+Each event has a version token in the cache, which is replaced whenever
+anything shown in the timetable changes.  Cached timetables include the
+version in their key, so after a change they are never used again and
+simply expire.
+"""
+
+from datetime import timedelta
+from uuid import uuid4
+
+from flask import g
+
+from indico.core import signals
+from indico.core.cache import make_scoped_cache
+
+
+timetable_cache = make_scoped_cache('timetable')
+
+#: How long a cached timetable is kept.  Since a change of the timetable
+#: results in a new version, this only matters for changes which are not
+#: tracked (e.g. a user changing their name).
+TIMETABLE_CACHE_TTL = timedelta(hours=1)
+
+
+def get_timetable_version(event):
+    """Get the current version of an event's timetable."""
+    version = timetable_cache.get(f'version-{event.id}')
+    if version is None:
+        version = uuid4().hex
+        timetable_cache.set(f'version-{event.id}', version, timeout=TIMETABLE_CACHE_TTL)
+    return version
+
+
+def invalidate_timetable(event):
+    """Make sure the cached timetable of an event is not used anymore."""
+    # the timetable may be serialized again before the current transaction
+    # has been committed, so we also reset the version after the commit
+    timetable_cache.delete(f'version-{event.id}')
+    g.setdefault('timetable_versions_pending', set()).add(event.id)
+
+
+@signals.core.after_commit.connect
+def _invalidate_timetables_after_commit(sender, **kwargs):
+    if event_ids := g.pop('timetable_versions_pending', None):
+        timetable_cache.delete_many(*(f'version-{id_}' for id_ in event_ids))
@@ -46,7 +46,7 @@ class RHTimetable(RHTimetableProtectionBase):
         self.event.preload_all_acl_entries()
         if self.theme is None:
             event_info = serialize_event_info(self.event)
-            timetable_data = TimetableSerializer(self.event).serialize_timetable(strip_empty_days=True)
+            timetable_data = TimetableSerializer(self.event).serialize_cached_timetable(strip_empty_days=True)
             timetable_settings = layout_settings.get(self.event, 'timetable_theme_settings')
             return self.view_class.render_template('display.html', self.event, event_info=event_info,
                                                    timetable_data=timetable_data, timetable_settings=timetable_settings,
@@ -12,8 +12,12 @@ from itertools import chain
 from flask import has_request_context, session
 from sqlalchemy.orm import defaultload
 
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.modules.attachments.models.folders import AttachmentFolder
+from indico.modules.attachments.util import get_attached_items
 from indico.modules.events.contributions.models.persons import AuthorType
-from indico.modules.events.models.events import EventType
+from indico.modules.events.models.events import Event, EventType
+from indico.modules.events.timetable.cache import TIMETABLE_CACHE_TTL, get_timetable_version, timetable_cache
 from indico.modules.events.timetable.models.entries import TimetableEntry, TimetableEntryType
 from indico.util.date_time import iterdays
 from indico.web.flask.util import url_for
@@ -48,7 +52,7 @@ class TimetableSerializer:
             date_str = day.strftime('%Y%m%d')
             if date_str not in timetable:
                 continue
-            if not entry.can_view(self.user):
+            if not self._can_view_entry(entry):
                 continue
             data = self.serialize_timetable_entry(entry, load_children=False)
             key = self._get_entry_key(entry)
@@ -65,6 +69,74 @@ class TimetableSerializer:
             timetable = self._strip_empty_days(timetable)
         return timetable
 
+    def serialize_cached_timetable(self, strip_empty_days=False):
+        """Serialize the timetable based on a cached public version.
+
+        The timetable is serialized without any access checks and cached
+        until something in it changes.  The entries and attachment folders
+        which not everyone who can access the event may see are then removed
+        from that version depending on the access of the user, which avoids
+        serializing the whole timetable for every user.
+        """
+        if self.management or self.can_manage_event:
+            # managers get additional data, e.g. the email addresses of speakers
+            return self.serialize_timetable(strip_empty_days=strip_empty_days)
+        tzinfo = self.event.display_tzinfo
+        cache_key = f'{self.event.id}-{get_timetable_version(self.event)}-{tzinfo}-{int(self.api)}'
+        data = timetable_cache.get(cache_key)
+        if data is None:
+            serializer = _PublicTimetableSerializer(self.event, api=self.api)
+            data = {'timetable': serializer.serialize_timetable(),
+                    'restricted_entries': serializer.restricted_entries,
+                    'restricted_folders': serializer.restricted_folders}
+            timetable_cache.set(cache_key, data, timeout=TIMETABLE_CACHE_TTL)
+        timetable = self._mask_timetable(data['timetable'], data['restricted_entries'], data['restricted_folders'])
+        if strip_empty_days:
+            timetable = self._strip_empty_days(timetable)
+        return timetable
+
+    def _mask_timetable(self, timetable, restricted_entries, restricted_folders):
+        """Remove the entries and folders the user cannot see from a timetable.
+
+        :param restricted_entries: A dict mapping the ids of timetable entries
+                                   which need an access check to their keys
+        :param restricted_folders: A dict mapping the ids of attachment folders
+                                   which need an access check to the ids of
+                                   the attachments they contain
+        """
+        hidden_entries = set()
+        hidden_folders = set()
+        if restricted_entries:
+            self.event.preload_all_acl_entries()
+            entries = TimetableEntry.query.filter(TimetableEntry.id.in_(list(restricted_entries))).all()
+            hidden_entries = {restricted_entries[entry.id] for entry in entries if not entry.can_view(self.user)}
+        if restricted_folders:
+            folders = AttachmentFolder.query.filter(AttachmentFolder.id.in_(list(restricted_folders))).all()
+            hidden_folders = {folder.id for folder in folders if not folder.can_view(self.user)}
+        if not hidden_entries and not hidden_folders:
+            return timetable
+        hidden_attachments = set(chain.from_iterable(restricted_folders[id_] for id_ in hidden_folders))
+
+        def _mask_attachments(data):
+            if not (attachments := data.get('attachments')) or not hidden_folders:
+                return
+            attachments['files'] = [a for a in attachments['files'] or [] if a['id'] not in hidden_attachments]
+            attachments['folders'] = [f for f in attachments['folders'] if f['id'] not in hidden_folders]
+            if not attachments['files'] and not attachments['folders']:
+                attachments['files'] = None
+
+        def _mask_entries(entries):
+            for key in hidden_entries & entries.keys():
+                del entries[key]
+            for data in entries.values():
+                _mask_attachments(data)
+                if children := data.get('entries'):
+                    _mask_entries(children)
+
+        for day_entries in timetable.values():
+            _mask_entries(day_entries)
+        return timetable
+
     def serialize_session_timetable(self, session_, without_blocks=False, strip_empty_days=False):
         event_tz = self.event.tzinfo
         timetable = {}
@@ -201,6 +273,12 @@ class TimetableSerializer:
                      'title': break_.title})
         return data
 
+    def _can_view_entry(self, entry):
+        return entry.can_view(self.user)
+
+    def _get_attached_items(self, obj):
+        return obj.attached_items
+
     def _get_attachment_data(self, obj):
         def serialize_attachment(attachment):
             return {'id': attachment.id,
@@ -217,7 +295,7 @@ class TimetableSerializer:
                     'attachments': list(map(serialize_attachment, folder.attachments))}
 
         data = {'files': [], 'folders': []}
-        items = obj.attached_items
+        items = self._get_attached_items(obj)
         data['files'] = list(map(serialize_attachment, items.get('files', [])))
         data['folders'] = list(map(serialize_folder, items.get('folders', [])))
         if not data['files'] and not data['folders']:
@@ -296,6 +374,56 @@ class TimetableSerializer:
         return data
 
 
+def _is_visible_to_event_viewers(obj):
+    """Check whether everyone who can access the event can access an object."""
+    while not isinstance(obj, Event):
+        if obj.protection_mode == ProtectionMode.public:
+            return True
+        elif obj.protection_mode == ProtectionMode.protected:
+            return False
+        obj = obj.protection_parent
+    return True
+
+
+class _PublicTimetableSerializer(TimetableSerializer):
+    """Serialize a timetable without performing any access checks.
+
+    The entries and attachment folders which need an access check are
+    recorded, so they can be removed later for users who cannot see them.
+    """
+
+    def __init__(self, event, api=False):
+        super().__init__(event, api=api)
+        self.user = None
+        self.can_manage_event = False
+        self.restricted_entries = {}
+        self.restricted_folders = {}
+
+    def _can_view_entry(self, entry):
+        if entry.type == TimetableEntryType.CONTRIBUTION:
+            visible = _is_visible_to_event_viewers(entry.contribution)
+        elif entry.type == TimetableEntryType.SESSION_BLOCK:
+            visible = _is_visible_to_event_viewers(entry.session_block.session)
+        else:
+            visible = entry.parent is None or _is_visible_to_event_viewers(entry.parent.session_block.session)
+        if not visible:
+            self.restricted_entries[entry.id] = self._get_entry_key(entry)
+        return True
+
+    def _get_attached_items(self, obj):
+        # same as `obj.attached_items`, but the access checks happen when masking the timetable
+        items = get_attached_items(obj, include_empty=False, preload_event=obj.PRELOAD_EVENT_ATTACHED_ITEMS)
+        folders = [folder for folder in items.get('folders', []) if not folder.is_hidden]
+        files = [attachment for attachment in items.get('files', []) if not attachment.folder.is_hidden]
+        for folder in {*folders, *(attachment.folder for attachment in files)}:
+            if not (_is_visible_to_event_viewers(folder.object) and
+                    (folder.is_always_visible or _is_visible_to_event_viewers(folder))):
+                self.restricted_folders[folder.id] = [attachment.id for attachment in folder.attachments]
+        if not folders and not files:
+            return {}
+        return {'folders': folders, 'files': files}
+
+
 def serialize_contribution(contribution):
     return {'id': contribution.id,
             'friendly_id': contribution.friendly_id,
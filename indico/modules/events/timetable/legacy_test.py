@@ -0,0 +1,67 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from datetime import timedelta
+
+import pytest
+
+from indico.core import signals
+from indico.core.db.sqlalchemy.protection import ProtectionMode
+from indico.modules.attachments.util import get_attached_items
+from indico.modules.events.timetable.cache import invalidate_timetable
+from indico.modules.events.timetable.legacy import TimetableSerializer
+from indico.util.signals import interceptable_sender
+
+
+@pytest.fixture
+def contributions(db, dummy_event, create_contribution, create_timetable_entry, create_user):
+    public = create_contribution(dummy_event, 'Public')
+    protected = create_contribution(dummy_event, 'Protected', protection_mode=ProtectionMode.protected)
+    protected.update_principal(create_user(123), read_access=True)
+    create_timetable_entry(dummy_event, public, dummy_event.start_dt)
+    create_timetable_entry(dummy_event, protected, dummy_event.start_dt + timedelta(minutes=20))
+    db.session.flush()
+    return public, protected
+
+
+def _get_titles(timetable):
+    return sorted(entry['title'] for day in timetable.values() for entry in day.values())
+
+
+@pytest.mark.usefixtures('request_context', 'contributions')
+def test_serialize_cached_timetable(dummy_event, create_user):
+    user = create_user(123)
+    for __ in range(2):
+        anonymous_timetable = TimetableSerializer(dummy_event).serialize_cached_timetable()
+        user_timetable = TimetableSerializer(dummy_event, user=user).serialize_cached_timetable()
+        assert _get_titles(anonymous_timetable) == ['Public']
+        assert _get_titles(user_timetable) == ['Protected', 'Public']
+        assert anonymous_timetable == TimetableSerializer(dummy_event).serialize_timetable()
+        assert user_timetable == TimetableSerializer(dummy_event, user=user).serialize_timetable()
+
+
+@pytest.mark.usefixtures('request_context')
+def test_serialize_cached_timetable_invalidation(dummy_event, contributions):
+    public, __ = contributions
+    assert _get_titles(TimetableSerializer(dummy_event).serialize_cached_timetable()) == ['Public']
+    public.title = 'Updated'
+    assert _get_titles(TimetableSerializer(dummy_event).serialize_cached_timetable()) == ['Public']
+    invalidate_timetable(dummy_event)
+    assert _get_titles(TimetableSerializer(dummy_event).serialize_cached_timetable()) == ['Updated']
+
+
+@pytest.mark.usefixtures('request_context')
+def test_serialize_cached_timetable_interceptable(dummy_event, contributions):
+    # plugins intercepting the attachment lookup must affect the cached timetable as well
+    linked_objects = set()
+
+    def _handler(sender, args, **kwargs):
+        linked_objects.add(args.arguments['linked_object'])
+
+    with signals.plugin.interceptable_function.connected_to(_handler, interceptable_sender(get_attached_items)):
+        TimetableSerializer(dummy_event).serialize_cached_timetable()
+    assert linked_objects == set(contributions)
@@ -13,11 +13,12 @@ import warnings
 from collections import defaultdict
 from contextlib import contextmanager
 from copy import deepcopy
-from io import BytesIO
+from functools import partial
+from hashlib import sha256
 from mimetypes import guess_extension
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from urllib.parse import urlsplit
-from zipfile import ZipFile
 
 from flask import current_app, flash, g, redirect, request, session
 from sqlalchemy import inspect
@@ -49,12 +50,13 @@ from indico.modules.events.timetable.models.entries import TimetableEntry
 from indico.modules.networks import IPNetworkGroup
 from indico.modules.users import User
 from indico.util.caching import memoize_request
-from indico.util.fs import chmod_umask, secure_filename
+from indico.util.fs import secure_filename
 from indico.util.i18n import _
 from indico.util.iterables import materialize_iterable
 from indico.util.string import strip_tags
 from indico.util.user import principal_from_identifier
-from indico.web.flask.util import send_file, url_for
+from indico.util.zipstream import ZipStreamEntry, iter_zip_stream
+from indico.web.flask.util import send_stream, url_for
 from indico.web.forms.colors import get_colors
 
 
@@ -365,14 +367,19 @@ def create_event_logo_tmp_file(event, tmpdir=None):
     """Create a temporary file with the event's logo.
 
     If `tmpdir` is specified, the logo file is created in there and
-    a path relative to that directory is returned.
+    a path relative to that directory is returned.  Its name is then
+    based on the logo's content, so it is the same for the same logo.
     """
     logo_meta = event.logo_metadata
     logo_extension = guess_extension(logo_meta['content_type']) or os.path.splitext(logo_meta['filename'])[1]
-    with NamedTemporaryFile(delete=False, dir=(tmpdir or config.TEMP_DIR), suffix=logo_extension) as temp_file:
+    if tmpdir:
+        filename = f'logo-{sha256(event.logo).hexdigest()[:16]}{logo_extension}'
+        Path(tmpdir, filename).write_bytes(event.logo)
+        return filename
+    with NamedTemporaryFile(delete=False, dir=config.TEMP_DIR, suffix=logo_extension) as temp_file:
         temp_file.write(event.logo)
         temp_file.flush()
-    return os.path.relpath(temp_file.name, tmpdir) if tmpdir else temp_file.name
+    return temp_file.name
 
 
 @contextmanager
@@ -713,35 +720,54 @@ class ZipGeneratorMixin:
     def _iter_items(self, files_holder):
         yield from files_holder
 
-    def _get_item_path(self, item):
-        return item.get_local_path()
+    def _open_item(self, item):
+        """Open the file of an item for reading."""
+        return item.open()
 
-    def _generate_zip_file(self, files_holder, name_prefix='material', name_suffix=None, return_file=False):
-        """Generate a zip file containing the files passed.
+    def _get_item_size(self, item):
+        """Get the file size of an item, or `None` if it is not known."""
+        return item.size
+
+    def _get_zip_members(self, files_holder):
+        """Get a dict mapping the paths in the zip file to the items stored there."""
+        self.used_filenames = set()
+        members = {}
+        for item in self._iter_items(files_holder):
+            name = self._prepare_folder_structure(item)
+            self.used_filenames.add(name)
+            members[name] = item
+        return members
+
+    def _iter_zip_members(self, members):
+        """Generate a zip file containing the given members, chunk by chunk.
+
+        The archive is never stored anywhere; each file is read from its
+        storage backend while the archive is being generated.
+
+        :param members: A dict as returned by `_get_zip_members`
+        """
+        entries = [ZipStreamEntry(name, partial(self._open_item, item), self._get_item_size(item))
+                   for name, item in members.items()]
+        return iter_zip_stream(entries)
+
+    def _iter_zip_file(self, files_holder):
+        """Generate a zip file containing the files passed, chunk by chunk.
+
+        :param files_holder: An iterable (or an iterable containing) object that
+                             contains the files to be added in the zip file.
+        """
+        return self._iter_zip_members(self._get_zip_members(files_holder))
+
+    def _generate_zip_file(self, files_holder, name_prefix='material', name_suffix=None):
+        """Send a zip file containing the files passed.
 
         :param files_holder: An iterable (or an iterable containing) object that
                              contains the files to be added in the zip file.
         :param name_prefix: The prefix to the zip file name
         :param name_suffix: The suffix to the zip file name
-        :param return_file: Return the temp file instead of a response
         """
-        temp_file = NamedTemporaryFile(suffix='.zip', dir=config.TEMP_DIR, delete=False)  # noqa: SIM115
-        with ZipFile(temp_file.name, 'w', allowZip64=True) as zip_handler:
-            self.used_filenames = set()
-            for item in self._iter_items(files_holder):
-                name = self._prepare_folder_structure(item)
-                self.used_filenames.add(name)
-                with self._get_item_path(item) as filepath:
-                    if isinstance(filepath, BytesIO):
-                        zip_handler.writestr(name, filepath.getvalue())
-                    else:
-                        zip_handler.write(filepath, name)
-
         zip_file_name = f'{name_prefix}-{name_suffix}.zip' if name_suffix else f'{name_prefix}.zip'
-        chmod_umask(temp_file.name)
-        if return_file:
-            return temp_file
-        return send_file(zip_file_name, temp_file.name, 'application/zip', inline=False)
+        return send_stream(zip_file_name, self._iter_zip_file(files_holder), 'application/zip', inline=False)
 
     def _prepare_folder_structure(self, item):
         file_name = secure_filename(f'{item.id}_{item.filename}', str(item.id))
@@ -23,7 +23,8 @@ from indico.web.flask.util import url_for
 
 class File(StoredFileMixin, db.Model):
     __tablename__ = 'files'
-    __table_args__ = {'schema': 'indico'}
+    __table_args__ = (db.Index(None, 'meta', postgresql_using='gin'),
+                      {'schema': 'indico'})
 
     id = db.Column(
         db.Integer,
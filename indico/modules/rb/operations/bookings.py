@@ -28,7 +28,7 @@ from indico.modules.rb.models.reservations import RepeatFrequency, Reservation
 from indico.modules.rb.models.room_nonbookable_periods import NonBookablePeriod
 from indico.modules.rb.models.rooms import Room
 from indico.modules.rb.operations.blockings import filter_blocked_rooms, get_rooms_blockings, group_blocked_rooms
-from indico.modules.rb.operations.conflicts import get_concurrent_pre_bookings, get_rooms_conflicts
+from indico.modules.rb.operations.conflicts import IntervalIndex, get_concurrent_pre_bookings, get_rooms_conflicts
 from indico.modules.rb.operations.misc import get_rooms_nonbookable_periods, get_rooms_unbookable_hours
 from indico.modules.rb.util import (WEEKDAYS, group_by_occurrence_date, serialize_availability, serialize_blockings,
                                     serialize_booking_details, serialize_nonbookable_periods, serialize_occurrences,
@@ -156,8 +156,8 @@ def get_rooms_availability(rooms, start_dt, end_dt, repeat_frequency, repeat_int
 
 
 def get_room_candidates(candidates, conflicts):
-    return [candidate for candidate in candidates
-            if not (any(candidate.overlaps(conflict) for conflict in conflicts))]
+    conflicts = IntervalIndex(conflicts, key=lambda c: (c.start_dt, c.end_dt))
+    return [candidate for candidate in candidates if not conflicts.overlaps(candidate.start_dt, candidate.end_dt)]
 
 
 def _bookings_query(filters, *, noload_room=False, load_room_acl=False):
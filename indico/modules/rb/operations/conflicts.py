@@ -5,9 +5,11 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from datetime import datetime
-from itertools import combinations
+from datetime import datetime, timedelta
+from itertools import combinations, islice
+from operator import itemgetter
 
 from flask import session
 from sqlalchemy.orm import contains_eager
@@ -21,6 +23,105 @@ from indico.util.date_time import get_overlap
 from indico.util.iterables import group_list
 
 
+class IntervalIndex:
+    """A static index to find the items overlapping with a half-open interval.
+
+    The items are sorted by their start once, so a lookup only needs a binary
+    search plus a scan over the items that may actually overlap, i.e. those
+    starting less than the longest indexed interval before the queried range.
+
+    :param items: The items to index
+    :param key: A callable returning a ``(start, end)`` tuple for an item
+    """
+
+    def __init__(self, items, key):
+        entries = sorted(((*key(item), item) for item in items), key=itemgetter(0))
+        self._starts = [start for start, __, __ in entries]
+        self._entries = entries
+        self._max_length = max((end - start for start, end, __ in entries), default=None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def overlapping(self, start, end):
+        """Yield ``(start, end, item)`` for all items overlapping with ``[start, end)``."""
+        if not self._entries:
+            return
+        lo = bisect_right(self._starts, start - self._max_length)
+        hi = bisect_left(self._starts, end)
+        for entry in islice(self._entries, lo, hi):
+            if entry[1] > start:
+                yield entry
+
+    def overlaps(self, start, end):
+        """Check whether any item overlaps with ``[start, end)``."""
+        return next(self.overlapping(start, end), None) is not None
+
+
+class RoomConflictIndex:
+    """Everything a booking candidate in a single room can conflict with.
+
+    The index is built once per room from the existing occurrences and the
+    blockings, nonbookable periods and unbookable hours that apply to the
+    current user, so checking a whole series of candidates against it does
+    not compare every candidate with every existing occurrence.
+
+    :param occurrences: Valid `ReservationOccurrence` objects in the room
+    :param blockings: `Blocking` objects which cannot be overridden
+    :param nonbookable_periods: `NonBookablePeriod` objects of the room
+    :param unbookable_hours: A dict mapping weekdays to the unbookable hours
+                             of the room on that day
+    :param skip_conflicts_with: Reservation ids to ignore
+    """
+
+    def __init__(self, occurrences=(), blockings=(), nonbookable_periods=(), unbookable_hours=None,
+                 skip_conflicts_with=frozenset()):
+        occurrences = [occ for occ in occurrences if occ.reservation.id not in skip_conflicts_with]
+        self.occurrences = IntervalIndex(occurrences, key=lambda occ: (occ.start_dt, occ.end_dt))
+        self.blockings = IntervalIndex(blockings, key=lambda b: (b.start_date, b.end_date + timedelta(days=1)))
+        self.nonbookable_periods = IntervalIndex(nonbookable_periods, key=lambda p: (p.start_dt, p.end_dt))
+        self.unbookable_hours = unbookable_hours or {}
+
+    def get_conflicts(self, candidates):
+        """Check booking candidates for conflicts.
+
+        :return: A ``(conflicts, pre_conflicts, conflicting_candidates)``
+                 tuple of sets.
+        """
+        conflicts = set()
+        pre_conflicts = set()
+        conflicting_candidates = set()
+        for candidate in candidates:
+            start_dt, end_dt = candidate.start_dt, candidate.end_dt
+            for occ_start_dt, occ_end_dt, occurrence in self.occurrences.overlapping(start_dt, end_dt):
+                obj = TempReservationOccurrence(max(start_dt, occ_start_dt), min(end_dt, occ_end_dt),
+                                                reservation=occurrence.reservation)
+                if occurrence.reservation.is_accepted:
+                    conflicting_candidates.add(candidate)
+                    conflicts.add(obj)
+                else:
+                    pre_conflicts.add(obj)
+            start_date = start_dt.date()
+            if self.blockings.overlaps(start_date, start_date + timedelta(days=1)):
+                conflicting_candidates.add(candidate)
+                conflicts.add(TempReservationOccurrence(start_dt, end_dt, None))
+            for period_start_dt, period_end_dt, __ in self.nonbookable_periods.overlapping(start_dt, end_dt):
+                conflicting_candidates.add(candidate)
+                conflicts.add(TempReservationOccurrence(max(start_dt, period_start_dt), min(end_dt, period_end_dt),
+                                                        None))
+            for hours in self.unbookable_hours.get(WEEKDAYS[start_dt.weekday()], ()):
+                hours_start_dt = start_dt.replace(hour=hours.start_time.hour, minute=hours.start_time.minute)
+                hours_end_dt = end_dt.replace(hour=hours.end_time.hour, minute=hours.end_time.minute)
+                overlap = get_overlap((start_dt, end_dt), (hours_start_dt, hours_end_dt))
+                if overlap.count(None) != len(overlap):
+                    conflicting_candidates.add(candidate)
+                    conflicts.add(TempReservationOccurrence(overlap[0], overlap[1], None))
+        return conflicts, pre_conflicts, conflicting_candidates
+
+
 def get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interval, recurrence_weekdays, blocked_rooms,
                         nonbookable_periods, unbookable_hours, skip_conflicts_with=None, allow_admin=False,
                         skip_past_conflicts=False):
@@ -33,9 +134,9 @@ def get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interv
                                                      (repeat_frequency, repeat_interval, recurrence_weekdays))
     check_empty_candidates(candidates)
 
-    room_ids = [room.id for room in rooms]
+    rooms_by_id = {room.id: room for room in rooms}
     query = (ReservationOccurrence.query
-             .filter(Reservation.room_id.in_(room_ids),
+             .filter(Reservation.room_id.in_(list(rooms_by_id)),
                      ReservationOccurrence.is_valid,
                      ReservationOccurrence.filter_overlap(candidates))
              .join(ReservationOccurrence.reservation)
@@ -47,96 +148,60 @@ def get_rooms_conflicts(rooms, start_dt, end_dt, repeat_frequency, repeat_interv
     if skip_past_conflicts:
         query = query.filter(ReservationOccurrence.start_dt > datetime.now())
 
-    overlapping_occurrences = group_list(query, key=lambda obj: obj.reservation.room.id,
-                                         sort_by=lambda obj: obj.reservation.room.id)
-    for room_id, occurrences in overlapping_occurrences.items():
-        conflicts = get_room_bookings_conflicts(candidates, occurrences, skip_conflicts_with)
+    overlapping_occurrences = group_list(query, key=lambda obj: obj.reservation.room_id,
+                                         sort_by=lambda obj: obj.reservation.room_id)
+    blockings = {room_id: [br.blocking for br in rooms_blocked_rooms
+                           if not br.blocking.can_override(session.user, room=_get_room(rooms_by_id, room_id),
+                                                           allow_admin=allow_admin)]
+                 for room_id, rooms_blocked_rooms in blocked_rooms.items()}
+
+    if allow_admin and rb_is_admin(session.user):
+        overridable_room_ids = set(nonbookable_periods) | set(unbookable_hours)
+    else:
+        overridable_room_ids = {room_id for room_id in set(nonbookable_periods) | set(unbookable_hours)
+                                if _get_room(rooms_by_id, room_id).can_override(session.user,
+                                                                                 allow_admin=allow_admin)}
+
+    room_ids = set(overlapping_occurrences) | set(blockings) | set(nonbookable_periods) | set(unbookable_hours)
+    for room_id in room_ids:
+        overridable = room_id in overridable_room_ids
+        index = RoomConflictIndex(occurrences=overlapping_occurrences.get(room_id, ()),
+                                  blockings=blockings.get(room_id, ()),
+                                  nonbookable_periods=(() if overridable else nonbookable_periods.get(room_id, ())),
+                                  unbookable_hours=(None if overridable else unbookable_hours.get(room_id)),
+                                  skip_conflicts_with=skip_conflicts_with)
+        conflicts = index.get_conflicts(candidates)
         rooms_conflicts[room_id], rooms_pre_conflicts[room_id], rooms_conflicting_candidates[room_id] = conflicts
-    for room_id, occurrences in blocked_rooms.items():
-        conflicts, conflicting_candidates = get_room_blockings_conflicts(room_id, candidates, occurrences,
-                                                                         allow_admin=allow_admin)
-        rooms_conflicts[room_id] |= conflicts
-        rooms_conflicting_candidates[room_id] |= conflicting_candidates
-
-    if not (allow_admin and rb_is_admin(session.user)):
-        for room_id, occurrences in nonbookable_periods.items():
-            room = Room.get_or_404(room_id)
-            if not room.can_override(session.user, allow_admin=allow_admin):
-                conflicts, conflicting_candidates = get_room_nonbookable_periods_conflicts(candidates, occurrences)
-                rooms_conflicts[room_id] |= conflicts
-                rooms_conflicting_candidates[room_id] |= conflicting_candidates
-
-        for room_id, occurrences in unbookable_hours.items():
-            room = Room.get_or_404(room_id)
-            if not room.can_override(session.user, allow_admin=allow_admin):
-                conflicts, conflicting_candidates = get_room_unbookable_hours_conflicts(candidates, occurrences)
-                rooms_conflicts[room_id] |= conflicts
-                rooms_conflicting_candidates[room_id] |= conflicting_candidates
     rooms_conflicting_candidates = defaultdict(list, ((k, list(v)) for k, v in rooms_conflicting_candidates.items()))
     return rooms_conflicts, rooms_pre_conflicts, rooms_conflicting_candidates
 
 
+def _get_room(rooms_by_id, room_id):
+    return rooms_by_id[room_id] if room_id in rooms_by_id else Room.get_or_404(room_id)
+
+
 def get_room_bookings_conflicts(candidates, occurrences, skip_conflicts_with=frozenset()):
-    conflicts = set()
-    pre_conflicts = set()
-    conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            if occurrence.reservation.id in skip_conflicts_with:
-                continue
-            if candidate.overlaps(occurrence):
-                overlap = candidate.get_overlap(occurrence)
-                obj = TempReservationOccurrence(*overlap, reservation=occurrence.reservation)
-                if occurrence.reservation.is_accepted:
-                    conflicting_candidates.add(candidate)
-                    conflicts.add(obj)
-                else:
-                    pre_conflicts.add(obj)
+    conflicts, pre_conflicts, conflicting_candidates = RoomConflictIndex(
+        occurrences=occurrences, skip_conflicts_with=skip_conflicts_with
+    ).get_conflicts(candidates)
     return conflicts, pre_conflicts, conflicting_candidates
 
 
 def get_room_blockings_conflicts(room_id, candidates, occurrences, allow_admin):
-    conflicts = set()
-    conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            blocking = occurrence.blocking
-            if blocking.start_date <= candidate.start_dt.date() <= blocking.end_date:
-                if blocking.can_override(session.user, room=Room.get(room_id), allow_admin=allow_admin):
-                    continue
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(candidate.start_dt, candidate.end_dt, None)
-                conflicts.add(obj)
+    room = Room.get(room_id)
+    blockings = [occ.blocking for occ in occurrences
+                 if not occ.blocking.can_override(session.user, room=room, allow_admin=allow_admin)]
+    conflicts, __, conflicting_candidates = RoomConflictIndex(blockings=blockings).get_conflicts(candidates)
     return conflicts, conflicting_candidates
 
 
 def get_room_nonbookable_periods_conflicts(candidates, occurrences):
-    conflicts = set()
-    conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences:
-            overlap = get_overlap((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt))
-            if overlap.count(None) != len(overlap):
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(overlap[0], overlap[1], None)
-                conflicts.add(obj)
+    conflicts, __, conflicting_candidates = RoomConflictIndex(nonbookable_periods=occurrences).get_conflicts(candidates)
     return conflicts, conflicting_candidates
 
 
 def get_room_unbookable_hours_conflicts(candidates, occurrences):
-    conflicts = set()
-    conflicting_candidates = set()
-    for candidate in candidates:
-        for occurrence in occurrences[WEEKDAYS[candidate.start_dt.weekday()]]:
-            hours_start_dt = candidate.start_dt.replace(hour=occurrence.start_time.hour,
-                                                        minute=occurrence.start_time.minute)
-            hours_end_dt = candidate.end_dt.replace(hour=occurrence.end_time.hour,
-                                                    minute=occurrence.end_time.minute)
-            overlap = get_overlap((candidate.start_dt, candidate.end_dt), (hours_start_dt, hours_end_dt))
-            if overlap.count(None) != len(overlap):
-                conflicting_candidates.add(candidate)
-                obj = TempReservationOccurrence(overlap[0], overlap[1], None)
-                conflicts.add(obj)
+    conflicts, __, conflicting_candidates = RoomConflictIndex(unbookable_hours=occurrences).get_conflicts(candidates)
     return conflicts, conflicting_candidates
 
 
@@ -0,0 +1,139 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import random
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from operator import itemgetter
+from types import SimpleNamespace
+
+import pytest
+
+from indico.modules.rb.models.reservation_occurrences import ReservationOccurrence
+from indico.modules.rb.models.reservations import RepeatFrequency
+from indico.modules.rb.operations.conflicts import IntervalIndex, RoomConflictIndex
+from indico.modules.rb.util import TempReservationOccurrence
+from indico.util.date_time import get_overlap, overlaps
+
+
+DummyReservation = namedtuple('DummyReservation', ('id', 'is_accepted'))
+
+
+def _make_occurrence(start_dt, end_dt, reservation_id, accepted=True):
+    reservation = DummyReservation(reservation_id, accepted)
+    return SimpleNamespace(start_dt=start_dt, end_dt=end_dt, reservation=reservation)
+
+
+@pytest.mark.parametrize(('start', 'end', 'expected'), (
+    (0, 1, set()),
+    (0, 2, set()),
+    (1, 3, {'a'}),
+    (2, 4, {'a'}),
+    (3, 7, {'a', 'b', 'c'}),
+    (9, 11, {'c'}),
+    (30, 40, set()),
+))
+def test_interval_index(start, end, expected):
+    intervals = {'a': (2, 4), 'b': (5, 6), 'c': (6, 10)}
+    index = IntervalIndex(intervals.items(), key=itemgetter(1))
+    assert {item[0] for __, __, item in index.overlapping(start, end)} == expected
+    assert index.overlaps(start, end) == bool(expected)
+
+
+def test_interval_index_empty():
+    index = IntervalIndex([], key=lambda x: x)
+    assert not index
+    assert not list(index.overlapping(1, 2))
+    assert not index.overlaps(1, 2)
+
+
+def test_interval_index_matches_naive():
+    rnd = random.Random(42)
+    intervals = []
+    for __ in range(500):
+        start = rnd.randint(0, 10000)
+        intervals.append((start, start + rnd.choice((1, 5, 30, 2000))))
+    index = IntervalIndex(intervals, key=lambda x: x)
+    for __ in range(500):
+        start = rnd.randint(0, 10000)
+        end = start + rnd.randint(1, 100)
+        expected = sorted(i for i in intervals if overlaps(i, (start, end)))
+        assert sorted(item for __, __, item in index.overlapping(start, end)) == expected
+
+
+def test_room_conflict_index_bookings():
+    day = date(2026, 1, 5)
+    candidates = ReservationOccurrence.create_series(datetime.combine(day, time(10)),
+                                                     datetime.combine(day + timedelta(days=9), time(12)),
+                                                     (RepeatFrequency.DAY, 1, None))
+    occurrences = [
+        _make_occurrence(datetime.combine(day, time(11)), datetime.combine(day, time(13)), 1),
+        _make_occurrence(datetime.combine(day, time(12)), datetime.combine(day, time(13)), 2),
+        _make_occurrence(datetime.combine(day + timedelta(days=1), time(8)),
+                         datetime.combine(day + timedelta(days=1), time(10, 30)), 3, accepted=False),
+        _make_occurrence(datetime.combine(day + timedelta(days=2), time(9)),
+                         datetime.combine(day + timedelta(days=2), time(11)), 4),
+    ]
+    index = RoomConflictIndex(occurrences=occurrences, skip_conflicts_with={4})
+    conflicts, pre_conflicts, conflicting_candidates = index.get_conflicts(candidates)
+    assert conflicts == {TempReservationOccurrence(datetime.combine(day, time(11)), datetime.combine(day, time(12)),
+                                                   occurrences[0].reservation)}
+    assert pre_conflicts == {TempReservationOccurrence(datetime.combine(day + timedelta(days=1), time(10)),
+                                                       datetime.combine(day + timedelta(days=1), time(10, 30)),
+                                                       occurrences[2].reservation)}
+    assert conflicting_candidates == {candidates[0]}
+
+
+def test_room_conflict_index_blockings_and_periods():
+    day = date(2026, 1, 5)
+    candidates = ReservationOccurrence.create_series(datetime.combine(day, time(10)),
+                                                     datetime.combine(day + timedelta(days=9), time(12)),
+                                                     (RepeatFrequency.DAY, 1, None))
+    blockings = [SimpleNamespace(start_date=day + timedelta(days=2), end_date=day + timedelta(days=3))]
+    periods = [SimpleNamespace(start_dt=datetime.combine(day + timedelta(days=6), time(11)),
+                               end_dt=datetime.combine(day + timedelta(days=7), time(10, 30)))]
+    unbookable_hours = {'mon': [SimpleNamespace(start_time=time(0), end_time=time(10, 15))]}
+    index = RoomConflictIndex(blockings=blockings, nonbookable_periods=periods, unbookable_hours=unbookable_hours)
+    conflicts, pre_conflicts, conflicting_candidates = index.get_conflicts(candidates)
+    assert not pre_conflicts
+    # 2026-01-05 and 2026-01-12 are mondays
+    assert conflicting_candidates == {candidates[0], candidates[2], candidates[3], candidates[6], candidates[7]}
+    assert TempReservationOccurrence(candidates[2].start_dt, candidates[2].end_dt, None) in conflicts
+    assert TempReservationOccurrence(candidates[6].start_dt.replace(hour=11), candidates[6].end_dt, None) in conflicts
+    assert TempReservationOccurrence(candidates[7].start_dt, candidates[7].start_dt.replace(minute=30),
+                                     None) in conflicts
+    assert TempReservationOccurrence(candidates[0].start_dt, candidates[0].start_dt.replace(minute=15),
+                                     None) in conflicts
+
+
+def test_room_conflict_index_matches_naive():
+    rnd = random.Random(1337)
+    start_dt = datetime(2026, 1, 1, 9)
+    candidates = ReservationOccurrence.create_series(start_dt, start_dt.replace(year=2027, hour=10),
+                                                     (RepeatFrequency.DAY, 1, None))
+    occurrences = []
+    for i in range(2000):
+        occ_start_dt = start_dt + timedelta(days=rnd.randint(0, 400), minutes=rnd.choice((-90, -30, 0, 30, 90)))
+        occurrences.append(_make_occurrence(occ_start_dt, occ_start_dt + timedelta(minutes=rnd.choice((30, 60))),
+                                            i, accepted=rnd.random() > 0.2))
+    expected_conflicts = set()
+    expected_pre_conflicts = set()
+    expected_candidates = set()
+    for candidate in candidates:
+        for occurrence in occurrences:
+            if overlaps((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt)):
+                overlap = get_overlap((candidate.start_dt, candidate.end_dt), (occurrence.start_dt, occurrence.end_dt))
+                obj = TempReservationOccurrence(*overlap, reservation=occurrence.reservation)
+                if occurrence.reservation.is_accepted:
+                    expected_candidates.add(candidate)
+                    expected_conflicts.add(obj)
+                else:
+                    expected_pre_conflicts.add(obj)
+    conflicts, pre_conflicts, conflicting_candidates = RoomConflictIndex(occurrences).get_conflicts(candidates)
+    assert conflicts == expected_conflicts
+    assert pre_conflicts == expected_pre_conflicts
+    assert conflicting_candidates == expected_candidates
@@ -5,16 +5,22 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import html
 import itertools
+from functools import reduce
 
+from markupsafe import escape
 from marshmallow import EXCLUDE, fields
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import ARRAY, REAL, TSVECTOR
 from sqlalchemy.orm import contains_eager, joinedload, load_only, raiseload, selectinload, subqueryload, undefer
 from werkzeug.exceptions import BadRequest
 
 from indico.core.db import db
 from indico.core.db.sqlalchemy.links import LinkType
-from indico.core.db.sqlalchemy.protection import ProtectionMode
-from indico.core.db.sqlalchemy.util.queries import get_n_matching
+from indico.core.db.sqlalchemy.protection import ProtectionMode, apply_acl_entry_strategy, get_access_prefilter
+from indico.core.db.sqlalchemy.searchable import fts_vector
+from indico.core.db.sqlalchemy.util.queries import get_n_matching, preprocess_ts_string
 from indico.core.marshmallow import mm
 from indico.modules.attachments.models.attachments import Attachment
 from indico.modules.attachments.models.folders import AttachmentFolder
@@ -23,8 +29,10 @@ from indico.modules.categories import Category
 from indico.modules.categories.models.principals import CategoryPrincipal
 from indico.modules.events import Event
 from indico.modules.events.contributions.models.contributions import Contribution
+from indico.modules.events.contributions.models.persons import ContributionPersonLink
 from indico.modules.events.contributions.models.principals import ContributionPrincipal
 from indico.modules.events.contributions.models.subcontributions import SubContribution
+from indico.modules.events.models.persons import EventPerson, EventPersonLink
 from indico.modules.events.models.principals import EventPrincipal
 from indico.modules.events.notes.models.notes import EventNote, EventNoteRevision
 from indico.modules.events.sessions.models.blocks import SessionBlock
@@ -37,20 +45,19 @@ from indico.modules.search.schemas import (AttachmentSchema, DetailedCategorySch
                                            HTMLStrippingEventNoteSchema, HTMLStrippingEventSchema)
 
 
-def _apply_acl_entry_strategy(rel, principal):
-    user_strategy = rel.joinedload('user')
-    user_strategy.lazyload('*')
-    user_strategy.load_only('id')
-    rel.joinedload('local_group').load_only('id')
-    if principal.allow_networks:
-        rel.joinedload('ip_network_group').load_only('id')
-    if principal.allow_category_roles:
-        rel.joinedload('category_role').load_only('id')
-    if principal.allow_event_roles:
-        rel.joinedload('event_role').load_only('id')
-    if principal.allow_registration_forms:
-        rel.joinedload('registration_form').load_only('id')
-    return rel
+#: The maximum number of matches that are ranked by relevance.  Only the
+#: newest matches are ranked, which keeps the time needed to rank them
+#: close to the time needed to find them; any older matches are listed
+#: newest-first after the ranked ones.
+RANKED_SEARCH_CANDIDATES = 1000
+#: The weights of the title (A), description (B) and speakers (C) of an
+#: object when ranking search results, in the order expected by ``ts_rank_cd``
+RANK_WEIGHTS = [0, 0.2, 0.4, 1.0]
+
+# markers used in ``ts_headline`` output since the text is escaped afterwards
+_highlight_start = '\ue000'
+_highlight_stop = '\ue001'
+_highlight_delimiter = '\ue002'
 
 
 class _InternalSearchArgs(mm.Schema):
@@ -71,6 +78,53 @@ def _apply_contrib_access_strategy(rel):
     return rel
 
 
+def _ts_query(q):
+    return db.func.to_tsquery('simple', preprocess_ts_string(q))
+
+
+def _make_rank(q, *weighted_columns):
+    """Rank how well the columns of an object match a search string.
+
+    The text search vectors of the columns are the same expressions as
+    the ones in their fulltext search indexes.
+
+    :param weighted_columns: ``(column, weight)`` tuples, with the
+                             weight being one of the letters in
+                             `RANK_WEIGHTS`
+    """
+    # the vector of a NULL column (e.g. no speakers) would make the whole vector NULL
+    vector = reduce(lambda a, b: a.op('||')(b),
+                    (db.func.coalesce(db.func.setweight(fts_vector(column), weight), db.cast('', TSVECTOR))
+                     for column, weight in weighted_columns))
+    return db.func.ts_rank_cd(db.cast(RANK_WEIGHTS, ARRAY(REAL)), vector, _ts_query(q))
+
+
+def _get_person_names(link_cls, *criteria):
+    return (select(db.func.string_agg(EventPerson.first_name + ' ' + EventPerson.last_name, ' '))
+            .where(EventPerson.id == link_cls.person_id, *criteria)
+            .scalar_subquery())
+
+
+def _get_highlights(model, column, q, ids):
+    """Get the fragments of a text column matching a search string.
+
+    :return: A dict mapping object ids to lists of HTML fragments in
+             which the matching words are highlighted
+    """
+    if not ids:
+        return {}
+    text = db.func.trim(db.func.regexp_replace(db.func.regexp_replace(column, '<[^>]*>', ' ', 'g'), r'\s+', ' ', 'g'))
+    options = (f'StartSel={_highlight_start}, StopSel={_highlight_stop}, MaxWords=25, MinWords=10, '
+               f'MaxFragments=3, FragmentDelimiter={_highlight_delimiter}')
+    headline = db.func.ts_headline('simple', text, _ts_query(q), options)
+    query = db.session.query(model.id, headline).filter(model.id.in_(ids))
+    return {id_: [str(escape(html.unescape(fragment)))
+                  .replace(_highlight_start, '<strong>')
+                  .replace(_highlight_stop, '</strong>')
+                  for fragment in headline.split(_highlight_delimiter) if _highlight_start in fragment]
+            for id_, headline in query}
+
+
 class InternalSearch(IndicoSearchProvider):
     def search(self, query, user=None, page=None, object_types=(), *, admin_override_enabled=False, **params):
         params = _InternalSearchArgs().load(params)
@@ -130,8 +184,8 @@ class InternalSearch(IndicoSearchProvider):
             .options(load_only('id', 'parent_id', 'protection_mode'))
         )
         Category.preload_relationships(query, 'acl_entries',
-                                       strategy=lambda rel: _apply_acl_entry_strategy(subqueryload(rel),
-                                                                                      CategoryPrincipal))
+                                       strategy=lambda rel: apply_acl_entry_strategy(subqueryload(rel),
+                                                                                     CategoryPrincipal))
         preloaded_categories |= set(query)
 
     def _can_access(self, user, obj, allow_effective_protection_mode=True, admin_override_enabled=False):
@@ -160,41 +214,97 @@ class InternalSearch(IndicoSearchProvider):
         return (protection_mode == ProtectionMode.public or
                 obj.can_access(user, allow_admin=admin_override_enabled))
 
-    def _paginate(self, query, page, column, user, admin_override_enabled):
-        reverse = False
-        pagenav = {'prev': None, 'next': None}
-        if not page:
-            query = query.order_by(column.desc())
-        elif page > 0:  # next page
-            query = query.filter(column < page).order_by(column.desc())
-            # since we asked for a next page we know that a previous page exists
-            pagenav['prev'] = -(page - 1)
-        elif page < 0:  # prev page
-            query = query.filter(column > -page).order_by(column)
-            # since we asked for a previous page we know that a next page exists
-            pagenav['next'] = -(page - 1)
-            reverse = True
+    def _paginate(self, query, page, model, rank, user, admin_override_enabled, prefilter=None):
+        """Get a page of search results ordered by relevance.
+
+        The newest `RANKED_SEARCH_CANDIDATES` objects matching the query are
+        ordered by their rank, followed by all older matches ordered from
+        newest to oldest.  Objects the user cannot access are skipped, so the
+        page tokens point to an object instead of being page numbers: a
+        positive token is the key of the first object of the page, while a
+        negative one is the key of the object right after the last object of
+        the page.  The key of a ranked object is its position in the ranked
+        list; the key of an older object is its id plus the number of ranked
+        candidates, so older pages can continue right after the id of the last
+        object instead of skipping over all the previous matches.
+
+        :return: A ``(results, pagenav)`` tuple
+        """
+        if prefilter is not None:
+            query = query.filter(prefilter)
+        candidates = (query.enable_eagerloads(False)
+                      .with_entities(model.id)
+                      .order_by(model.id.desc())
+                      .limit(RANKED_SEARCH_CANDIDATES)
+                      .subquery())
+        ranked_ids = [id_ for id_, in db.session.execute(select(model.id)
+                                                          .where(model.id.in_(select(candidates.c.id)))
+                                                          .order_by(rank.desc(), model.id.desc()))]
+        older_query = None
+        if len(ranked_ids) == RANKED_SEARCH_CANDIDATES:
+            older_query = query.filter(model.id < min(ranked_ids))
 
         preloaded_categories = set()
-        res = get_n_matching(
-            query, self.RESULTS_PER_PAGE + 1,
-            lambda obj: self._can_access(user, obj, admin_override_enabled=admin_override_enabled),
-            prefetch_factor=20,
-            preload_bulk=lambda objs: self._preload_categories(objs, preloaded_categories)
-        )
+        n = self.RESULTS_PER_PAGE + 1
+
+        def _can_access(obj):
+            return self._can_access(user, obj, admin_override_enabled=admin_override_enabled)
+
+        def _get_ranked(n, positions):
+            res = []
+            chunk_size = n * 5
+            for chunk in itertools.batched(positions, chunk_size):
+                chunk_ids = [ranked_ids[pos] for pos in chunk]
+                objs_by_id = {obj.id: obj for obj in query.filter(model.id.in_(chunk_ids))}
+                if objs_by_id:
+                    self._preload_categories(list(objs_by_id.values()), preloaded_categories)
+                res += [(pos, objs_by_id[id_]) for pos, id_ in zip(chunk, chunk_ids, strict=True)
+                        if id_ in objs_by_id and _can_access(objs_by_id[id_])]
+                if len(res) >= n:
+                    break
+            return res[:n]
+
+        def _get_older(n, criterion, keyset):
+            if older_query is None or n <= 0:
+                return []
+            objs = get_n_matching(older_query.filter(criterion), n, _can_access,
+                                  preload_bulk=lambda objs: self._preload_categories(objs, preloaded_categories),
+                                  keyset=keyset)
+            return [(RANKED_SEARCH_CANDIDATES + obj.id, obj) for obj in objs]
+
+        pagenav = {'prev': None, 'next': None}
+        reverse = bool(page and page < 0)
+        if reverse:
+            # go backwards from the first object of the next page
+            key = -page
+            pagenav['next'] = key
+            res = []
+            if key > RANKED_SEARCH_CANDIDATES:
+                res += _get_older(n, model.id > key - RANKED_SEARCH_CANDIDATES, [model.id])
+            res += _get_ranked(n - len(res), range(min(key, len(ranked_ids)) - 1, -1, -1))
+        else:
+            key = page or 0
+            if page:
+                pagenav['prev'] = -page
+            res = []
+            if key < RANKED_SEARCH_CANDIDATES:
+                res += _get_ranked(n, range(key, len(ranked_ids)))
+                res += _get_older(n - len(res), db.true(), [model.id.desc()])
+            else:
+                res += _get_older(n, model.id <= key - RANKED_SEARCH_CANDIDATES, [model.id.desc()])
 
         if len(res) > self.RESULTS_PER_PAGE:
-            # we queried 1 more so we can see if there are more results available
-            del res[self.RESULTS_PER_PAGE:]
+            # we looked for 1 more so we can see if there are more results available
             if reverse:
-                pagenav['prev'] = -res[-1].id
+                pagenav['prev'] = -res[self.RESULTS_PER_PAGE - 1][0]
             else:
-                pagenav['next'] = res[-1].id
+                pagenav['next'] = res[self.RESULTS_PER_PAGE][0]
+            del res[self.RESULTS_PER_PAGE:]
 
         if reverse:
             res.reverse()
 
-        return res, pagenav
+        return [obj for __, obj in res], pagenav
 
     def search_categories(self, q, user, page, category_id, admin_override_enabled):
         if not category_id:
@@ -212,7 +322,9 @@ class InternalSearch(IndicoSearchProvider):
                           undefer(Category.effective_protection_mode),
                           subqueryload(Category.acl_entries)))
 
-        objs, pagenav = self._paginate(query, page, Category.id, user, admin_override_enabled)
+        prefilter = get_access_prefilter(Category.effective_protection_mode, user)
+        rank = _make_rank(q, (Category.title, 'A'))
+        objs, pagenav = self._paginate(query, page, Category, rank, user, admin_override_enabled, prefilter)
         res = DetailedCategorySchema(many=True).dump(objs)
         return pagenav, CategoryResultSchema(many=True).load(res)
 
@@ -232,10 +344,13 @@ class InternalSearch(IndicoSearchProvider):
             .options(
                 load_only('id', 'category_id', 'access_key', 'protection_mode'),
                 undefer(Event.effective_protection_mode),
-                _apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
+                apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
             )
         )
-        objs, pagenav = self._paginate(query, page, Event.id, user, admin_override_enabled)
+        prefilter = get_access_prefilter(Event.effective_protection_mode, user)
+        rank = _make_rank(q, (Event.title, 'A'), (Event.description, 'B'),
+                          (_get_person_names(EventPersonLink, EventPersonLink.event_id == Event.id), 'C'))
+        objs, pagenav = self._paginate(query, page, Event, rank, user, admin_override_enabled, prefilter)
 
         query = (
             Event.query
@@ -250,8 +365,12 @@ class InternalSearch(IndicoSearchProvider):
         events_by_id = {e.id: e for e in query}
         events = [events_by_id[e.id] for e in objs]
 
-        res = HTMLStrippingEventSchema(many=True).dump(events)
-        return pagenav, EventResultSchema(many=True).load(res)
+        res = EventResultSchema(many=True).load(HTMLStrippingEventSchema(many=True).dump(events))
+        highlights = _get_highlights(Event, Event.description, q, [e.id for e in events])
+        for result in res:
+            if description_highlight := highlights.get(result['event_id']):
+                result['highlight'] = {'description': description_highlight}
+        return pagenav, res
 
     def search_contribs(self, q, user, page, category_id, event_id, admin_override_enabled):
         # XXX: Ideally we would search in subcontributions as well, but our pagination
@@ -276,18 +395,22 @@ class InternalSearch(IndicoSearchProvider):
             .options(
                 load_only('id', 'session_id', 'event_id', 'protection_mode'),
                 undefer(Contribution.effective_protection_mode),
-                _apply_acl_entry_strategy(selectinload(Contribution.acl_entries), ContributionPrincipal),
+                apply_acl_entry_strategy(selectinload(Contribution.acl_entries), ContributionPrincipal),
                 joinedload(Contribution.session).options(
                     load_only('id', 'protection_mode', 'event_id'),
                     selectinload(Session.acl_entries)
                 ),
                 contains_eager('event').options(
-                    _apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
+                    apply_acl_entry_strategy(selectinload(Event.acl_entries), EventPrincipal)
                 )
             )
         )
 
-        objs, pagenav = self._paginate(query, page, Contribution.id, user, admin_override_enabled)
+        prefilter = get_access_prefilter(Contribution.effective_protection_mode, user)
+        speakers = _get_person_names(ContributionPersonLink, ContributionPersonLink.contribution_id == Contribution.id,
+                                     ContributionPersonLink.is_speaker)
+        rank = _make_rank(q, (Contribution.title, 'A'), (Contribution.description, 'B'), (speakers, 'C'))
+        objs, pagenav = self._paginate(query, page, Contribution, rank, user, admin_override_enabled, prefilter)
 
         event_strategy = joinedload(Contribution.event)
         event_strategy.joinedload(Event.own_venue)
@@ -322,8 +445,12 @@ class InternalSearch(IndicoSearchProvider):
         contribs_by_id = {c.id: c for c in query}
         contribs = [contribs_by_id[c.id] for c in objs]
 
-        res = HTMLStrippingContributionSchema(many=True).dump(contribs)
-        return pagenav, ContributionResultSchema(many=True).load(res)
+        res = ContributionResultSchema(many=True).load(HTMLStrippingContributionSchema(many=True).dump(contribs))
+        highlights = _get_highlights(Contribution, Contribution.description, q, [c.id for c in contribs])
+        for result in res:
+            if description_highlight := highlights.get(result['contribution_id']):
+                result['highlight'] = {'description': description_highlight}
+        return pagenav, res
 
     def search_attachments(self, q, user, page, category_id, event_id, admin_override_enabled):
         contrib_event = db.aliased(Event)
@@ -333,25 +460,25 @@ class InternalSearch(IndicoSearchProvider):
         subcontrib_event = db.aliased(Event)
         session_event = db.aliased(Event)
 
-        attachment_strategy = _apply_acl_entry_strategy(selectinload(Attachment.acl_entries), AttachmentPrincipal)
+        attachment_strategy = apply_acl_entry_strategy(selectinload(Attachment.acl_entries), AttachmentPrincipal)
         folder_strategy = contains_eager(Attachment.folder)
         folder_strategy.load_only('id', 'protection_mode', 'link_type', 'category_id', 'event_id', 'linked_event_id',
                                   'contribution_id', 'subcontribution_id', 'session_id')
-        _apply_acl_entry_strategy(folder_strategy.selectinload(AttachmentFolder.acl_entries), AttachmentFolderPrincipal)
+        apply_acl_entry_strategy(folder_strategy.selectinload(AttachmentFolder.acl_entries), AttachmentFolderPrincipal)
         # event
         event_strategy = folder_strategy.contains_eager(AttachmentFolder.linked_event)
         _apply_event_access_strategy(event_strategy)
-        _apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
         # contribution
         contrib_strategy = folder_strategy.contains_eager(AttachmentFolder.contribution)
         _apply_contrib_access_strategy(contrib_strategy)
-        _apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
         contrib_event_strategy = contrib_strategy.contains_eager(Contribution.event.of_type(contrib_event))
         _apply_event_access_strategy(contrib_event_strategy)
-        _apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
         contrib_session_strategy = contrib_strategy.contains_eager(Contribution.session.of_type(contrib_session))
         contrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
         # subcontribution
         subcontrib_strategy = folder_strategy.contains_eager(AttachmentFolder.subcontribution)
         subcontrib_strategy.load_only('id', 'contribution_id', 'title')
@@ -359,18 +486,18 @@ class InternalSearch(IndicoSearchProvider):
             SubContribution.contribution.of_type(subcontrib_contrib)
         )
         _apply_contrib_access_strategy(subcontrib_contrib_strategy)
-        _apply_acl_entry_strategy(subcontrib_contrib_strategy
+        apply_acl_entry_strategy(subcontrib_contrib_strategy
                                   .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
         subcontrib_event_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.event.of_type(subcontrib_event)
         )
         _apply_event_access_strategy(subcontrib_event_strategy)
-        _apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
         subcontrib_session_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.session.of_type(subcontrib_session)
         )
         subcontrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
+        apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
                                   SessionPrincipal)
         # session
         session_strategy = folder_strategy.contains_eager(AttachmentFolder.session)
@@ -378,7 +505,7 @@ class InternalSearch(IndicoSearchProvider):
         session_event_strategy = session_strategy.contains_eager(Session.event.of_type(session_event))
         _apply_event_access_strategy(session_event_strategy)
         session_event_strategy.selectinload(session_event.acl_entries)
-        _apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
 
         attachment_filters = [
             Attachment.title_matches(q),
@@ -430,7 +557,8 @@ class InternalSearch(IndicoSearchProvider):
             .outerjoin(Session.event.of_type(session_event))
         )
 
-        objs, pagenav = self._paginate(query, page, Attachment.id, user, admin_override_enabled)
+        rank = _make_rank(q, (Attachment.title, 'A'))
+        objs, pagenav = self._paginate(query, page, Attachment, rank, user, admin_override_enabled)
 
         query = (
             Attachment.query
@@ -464,35 +592,35 @@ class InternalSearch(IndicoSearchProvider):
         event_strategy = note_strategy.contains_eager(EventNote.linked_event)
         event_strategy.undefer(Event.effective_protection_mode)
         _apply_event_access_strategy(event_strategy)
-        _apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(event_strategy.selectinload(Event.acl_entries), EventPrincipal)
         # contribution
         contrib_strategy = note_strategy.contains_eager(EventNote.contribution)
         _apply_contrib_access_strategy(contrib_strategy)
-        _apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
+        apply_acl_entry_strategy(contrib_strategy.selectinload(Contribution.acl_entries), ContributionPrincipal)
         contrib_event_strategy = contrib_strategy.contains_eager(Contribution.event.of_type(contrib_event))
         _apply_event_access_strategy(contrib_event_strategy)
-        _apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(contrib_event_strategy.selectinload(contrib_event.acl_entries), EventPrincipal)
         contrib_session_strategy = contrib_strategy.contains_eager(Contribution.session.of_type(contrib_session))
         contrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(contrib_session_strategy.selectinload(contrib_session.acl_entries), SessionPrincipal)
         # subcontribution
         subcontrib_strategy = note_strategy.contains_eager(EventNote.subcontribution)
         subcontrib_contrib_strategy = subcontrib_strategy.contains_eager(
             SubContribution.contribution.of_type(subcontrib_contrib)
         )
         _apply_contrib_access_strategy(subcontrib_contrib_strategy)
-        _apply_acl_entry_strategy(subcontrib_contrib_strategy
+        apply_acl_entry_strategy(subcontrib_contrib_strategy
                                   .selectinload(subcontrib_contrib.acl_entries), ContributionPrincipal)
         subcontrib_event_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.event.of_type(subcontrib_event)
         )
         _apply_event_access_strategy(subcontrib_event_strategy)
-        _apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
+        apply_acl_entry_strategy(subcontrib_event_strategy.selectinload(subcontrib_event.acl_entries), EventPrincipal)
         subcontrib_session_strategy = subcontrib_contrib_strategy.contains_eager(
             subcontrib_contrib.session.of_type(subcontrib_session)
         )
         subcontrib_session_strategy.load_only('id', 'event_id', 'protection_mode')
-        _apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
+        apply_acl_entry_strategy(subcontrib_session_strategy.selectinload(subcontrib_session.acl_entries),
                                   SessionPrincipal)
         # session
         session_strategy = note_strategy.contains_eager(EventNote.session)
@@ -500,7 +628,7 @@ class InternalSearch(IndicoSearchProvider):
         session_event_strategy = session_strategy.contains_eager(Session.event.of_type(session_event))
         _apply_event_access_strategy(session_event_strategy)
         session_event_strategy.selectinload(session_event.acl_entries)
-        _apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
+        apply_acl_entry_strategy(session_strategy.selectinload(Session.acl_entries), SessionPrincipal)
 
         note_filters = [
             EventNote.html_matches(q),
@@ -549,7 +677,8 @@ class InternalSearch(IndicoSearchProvider):
             .outerjoin(Session.event.of_type(session_event))
         )
 
-        objs, pagenav = self._paginate(query, page, EventNote.id, user, admin_override_enabled)
+        rank = _make_rank(q, (EventNote.html, 'B'))
+        objs, pagenav = self._paginate(query, page, EventNote, rank, user, admin_override_enabled)
 
         query = (
             EventNote.query
@@ -564,5 +693,9 @@ class InternalSearch(IndicoSearchProvider):
         notes_by_id = {n.id: n for n in query}
         notes = [notes_by_id[n.id] for n in objs]
 
-        res = HTMLStrippingEventNoteSchema(many=True).dump(notes)
-        return pagenav, EventNoteResultSchema(many=True).load(res)
+        res = EventNoteResultSchema(many=True).load(HTMLStrippingEventNoteSchema(many=True).dump(notes))
+        highlights = _get_highlights(EventNote, EventNote.html, q, [n.id for n in notes])
+        for result in res:
+            if content_highlight := highlights.get(result['note_id']):
+                result['highlight'] = {'content': content_highlight}
+        return pagenav, res
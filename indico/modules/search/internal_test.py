@@ -0,0 +1,90 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import pytest
+
+from indico.modules.events.models.persons import EventPerson, EventPersonLink
+from indico.modules.search import internal
+from indico.modules.search.base import SearchTarget
+from indico.modules.search.internal import InternalSearch
+
+
+@pytest.fixture
+def events(db, create_event):
+    events = [create_event(title=f'Physics meeting {i}') for i in range(1, 5)]
+    events[0].description = '<p>Everything about <em>physics</em> & more</p>'
+    person = EventPerson(event=events[1], first_name='Physics', last_name='Person')
+    events[1].person_links.append(EventPersonLink(person=person))
+    db.session.flush()
+    return events
+
+
+@pytest.mark.usefixtures('request_context')
+def test_search_events_ranked(events):
+    res = InternalSearch().search('physics', object_types=[SearchTarget.event])
+    # matches in the description and speakers rank higher than newer events matching only in the title
+    assert [r['event_id'] for r in res['results']] == [events[0].id, events[1].id, events[3].id, events[2].id]
+    # the number of matches would include objects the user cannot access
+    assert res['total'] == -1
+    assert res['results'][0]['highlight'] == {
+        'description': ['Everything about <strong>physics</strong> &amp; more']
+    }
+    assert res['results'][1]['highlight'] == {}
+
+
+@pytest.mark.usefixtures('request_context', 'events')
+def test_search_events_paginated(monkeypatch):
+    monkeypatch.setattr(InternalSearch, 'RESULTS_PER_PAGE', 3)
+    search = InternalSearch()
+    res = search.search('physics', object_types=[SearchTarget.event])
+    first_page = [r['event_id'] for r in res['results']]
+    assert len(first_page) == 3
+    assert res['pagenav'] == {'prev': None, 'next': 3}
+    res = search.search('physics', page=3, object_types=[SearchTarget.event])
+    assert len(res['results']) == 1
+    assert res['pagenav'] == {'prev': -3, 'next': None}
+    res = search.search('physics', page=-3, object_types=[SearchTarget.event])
+    assert [r['event_id'] for r in res['results']] == first_page
+    assert res['pagenav'] == {'prev': None, 'next': 3}
+
+
+@pytest.mark.usefixtures('request_context')
+def test_search_events_beyond_ranked(monkeypatch, events):
+    monkeypatch.setattr(internal, 'RANKED_SEARCH_CANDIDATES', 2)
+    monkeypatch.setattr(InternalSearch, 'RESULTS_PER_PAGE', 3)
+    search = InternalSearch()
+    # older matches than the ranked ones are listed newest-first
+    res = search.search('physics', object_types=[SearchTarget.event])
+    assert [r['event_id'] for r in res['results']] == [events[3].id, events[2].id, events[1].id]
+    # the token of an older match contains its id so the next page can continue right there
+    assert res['pagenav'] == {'prev': None, 'next': 2 + events[0].id}
+    res = search.search('physics', page=2 + events[0].id, object_types=[SearchTarget.event])
+    assert [r['event_id'] for r in res['results']] == [events[0].id]
+    assert res['pagenav'] == {'prev': -(2 + events[0].id), 'next': None}
+    res = search.search('physics', page=-(2 + events[0].id), object_types=[SearchTarget.event])
+    assert [r['event_id'] for r in res['results']] == [events[3].id, events[2].id, events[1].id]
+    assert res['pagenav'] == {'prev': None, 'next': 2 + events[0].id}
+
+
+@pytest.mark.usefixtures('request_context')
+def test_search_events_older_pages(monkeypatch, events):
+    monkeypatch.setattr(internal, 'RANKED_SEARCH_CANDIDATES', 1)
+    monkeypatch.setattr(InternalSearch, 'RESULTS_PER_PAGE', 1)
+    search = InternalSearch()
+    pages = []
+    page = None
+    while True:
+        res = search.search('physics', page=page, object_types=[SearchTarget.event])
+        pages.append([r['event_id'] for r in res['results']])
+        if (page := res['pagenav']['next']) is None:
+            break
+    assert pages == [[events[3].id], [events[2].id], [events[1].id], [events[0].id]]
+    # going back through the older matches leads back to the ranked one
+    while (page := res['pagenav']['prev']) is not None:
+        res = search.search('physics', page=page, object_types=[SearchTarget.event])
+        pages.append([r['event_id'] for r in res['results']])
+    assert pages[4:] == [[events[1].id], [events[2].id], [events[3].id]]
@@ -59,7 +59,8 @@ from indico.modules.users.util import (GravatarError, SearchAffiliationsMixin, g
                                        get_gravatar_for_user, get_linked_events, get_mastodon_server_name,
                                        get_related_categories, get_suggested_categories, get_unlisted_events,
                                        get_user_by_email, get_user_titles, log_user_update, merge_users,
-                                       search_affiliations, search_users, send_avatar, serialize_user, set_user_avatar)
+                                       search_affiliations, search_users, search_users_ranked, send_avatar,
+                                       serialize_user, set_user_avatar)
 from indico.modules.users.views import (WPAffiliationsDashboard, WPUser, WPUserDashboard, WPUserDataExport,
                                         WPUserFavorites, WPUserPersonalData, WPUserProfilePic, WPUsersAdmin)
 from indico.util.date_time import now_utc
@@ -1102,24 +1103,27 @@ class RHUserSearch(RHProtected):
         'No criteria provided'
     ), location='query')
     def _process(self, exact, external, favorites_first, **criteria):
-        matches = search_users(exact=exact, include_pending=True, external=external, **criteria)
+        matches, total = search_users_ranked(10, exact=exact, include_pending=True, external=external,
+                                             favorites_first=favorites_first, cache=True, **criteria)
         self.externals = {}
 
-        def _sort_key(entry):
+        def _sort_key(item):
             # Sort results by providing exact matches first, initially considering accents, and
-            # then without considering accents.
+            # then without considering accents. Otherwise keep the order of the search results,
+            # which are ranked by similarity.
+            rank, entry = item
             exact_match_keys = [entry[k].lower() != v.lower() for k, v in criteria.items()]
             unaccent_exact_match_keys = [
                 remove_accents(entry[k].lower()) != remove_accents(v.lower())
                 for k, v in criteria.items()
             ]
-            return *exact_match_keys, *unaccent_exact_match_keys, entry['full_name'], entry['email']
+            return *exact_match_keys, *unaccent_exact_match_keys, rank
 
-        results = sorted((self._serialize_entry(entry) for entry in matches), key=_sort_key)
+        results = [entry for __, entry in sorted(enumerate(self._serialize_entry(entry) for entry in matches),
+                                                 key=_sort_key)]
         if favorites_first:
             favorites = {u.id for u in session.user.favorite_users}
             results.sort(key=lambda x: x['id'] not in favorites)
-        total = len(results)
         results = results[:10]
         self._process_pending_users(results)
         return jsonify(users=results, total=total)
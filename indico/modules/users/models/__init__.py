@@ -0,0 +1,55 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import textwrap
+
+from sqlalchemy import DDL
+
+from indico.core import signals
+
+
+@signals.core.db_schema_created.connect_via('users')
+def _create_update_search_data(sender, connection, **kwargs):
+    sql = textwrap.dedent('''
+        CREATE FUNCTION users.update_search_data() RETURNS trigger AS
+        $BODY$
+        DECLARE
+            user_ids int[];
+        BEGIN
+            IF TG_TABLE_NAME = 'users' THEN
+                user_ids := ARRAY[NEW.id];
+            ELSIF TG_OP = 'INSERT' THEN
+                user_ids := ARRAY[NEW.user_id];
+            ELSIF TG_OP = 'DELETE' THEN
+                user_ids := ARRAY[OLD.user_id];
+            ELSE
+                user_ids := ARRAY[NEW.user_id, OLD.user_id];
+            END IF;
+            INSERT INTO users.user_search (user_id, first_name, last_name, name, emails, affiliation)
+            SELECT
+                u.id,
+                indico.indico_unaccent(lower(u.first_name)),
+                indico.indico_unaccent(lower(u.last_name)),
+                indico.indico_unaccent(lower(u.first_name || ' ' || u.last_name)),
+                COALESCE((SELECT string_agg(indico.indico_unaccent(e.email), ' ' ORDER BY e.email)
+                          FROM users.emails e
+                          WHERE e.user_id = u.id), ''),
+                indico.indico_unaccent(lower(u.affiliation))
+            FROM users.users u
+            WHERE u.id = ANY(user_ids)
+            ON CONFLICT (user_id) DO UPDATE SET
+                first_name = EXCLUDED.first_name,
+                last_name = EXCLUDED.last_name,
+                name = EXCLUDED.name,
+                emails = EXCLUDED.emails,
+                affiliation = EXCLUDED.affiliation;
+            RETURN NULL;
+        END;
+        $BODY$
+        LANGUAGE plpgsql
+    ''')
+    DDL(sql).execute(connection)
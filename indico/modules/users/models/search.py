@@ -0,0 +1,90 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from sqlalchemy import DDL
+from sqlalchemy.event import listens_for
+
+from indico.core.db import db
+from indico.modules.users.models.emails import UserEmail
+
+
+#: Normalized data used to search for users.  The table is maintained by
+#: triggers on the users and emails tables (see ``users.update_search_data()``)
+#: and must never be modified manually.  All values are lowercase and
+#: unaccented, and each column has a trigram index so substring searches
+#: do not need to scan the whole table.
+#:
+#: - ``first_name``, ``last_name`` -- the names of the user; these also have
+#:                                    a btree index for prefix searches
+#: - ``name`` -- the first and last name separated by a space
+#: - ``emails`` -- all email addresses of the user separated by spaces
+#: - ``affiliation`` -- the affiliation of the user
+user_search_table = db.Table(
+    'user_search',
+    db.metadata,
+    db.Column(
+        'user_id',
+        db.Integer,
+        db.ForeignKey('users.users.id', ondelete='CASCADE'),
+        primary_key=True,
+        nullable=False
+    ),
+    db.Column(
+        'first_name',
+        db.String,
+        nullable=False
+    ),
+    db.Column(
+        'last_name',
+        db.String,
+        nullable=False
+    ),
+    db.Column(
+        'name',
+        db.String,
+        nullable=False
+    ),
+    db.Column(
+        'emails',
+        db.String,
+        nullable=False
+    ),
+    db.Column(
+        'affiliation',
+        db.String,
+        nullable=False
+    ),
+    *(db.Index(None, col, postgresql_using='gin', postgresql_ops={col: 'gin_trgm_ops'})
+      for col in ('first_name', 'last_name', 'name', 'emails', 'affiliation')),
+    *(db.Index(f'ix_user_search_{col}_prefix', col, postgresql_ops={col: 'text_pattern_ops'})
+      for col in ('first_name', 'last_name')),
+    schema='users'
+)
+
+
+@listens_for(user_search_table, 'after_create')
+def _add_update_search_data_trigger(target, conn, **kw):
+    sql = '''
+        CREATE TRIGGER update_search_data
+        AFTER INSERT OR UPDATE OF first_name, last_name, affiliation
+        ON users.users
+        FOR EACH ROW
+        EXECUTE PROCEDURE users.update_search_data();
+    '''
+    DDL(sql).execute(conn)
+
+
+@listens_for(UserEmail.__table__, 'after_create')
+def _add_update_search_data_emails_trigger(target, conn, **kw):
+    sql = '''
+        CREATE TRIGGER update_search_data
+        AFTER INSERT OR DELETE OR UPDATE OF email, user_id
+        ON users.emails
+        FOR EACH ROW
+        EXECUTE PROCEDURE users.update_search_data();
+    '''
+    DDL(sql).execute(conn)
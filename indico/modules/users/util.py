@@ -23,11 +23,12 @@ from werkzeug.http import http_date, parse_date
 
 from indico.core import signals
 from indico.core.auth import multipass
+from indico.core.config import config
 from indico.core.db import db
 from indico.core.db.sqlalchemy.custom.unaccent import unaccent_match
 from indico.core.db.sqlalchemy.principals import PrincipalMixin, PrincipalPermissionsMixin, PrincipalType
 from indico.core.db.sqlalchemy.searchable import fts_matches
-from indico.core.db.sqlalchemy.util.queries import escape_like
+from indico.core.db.sqlalchemy.util.queries import StatementTimeout, escape_like, statement_timeout, with_total_rows
 from indico.modules.categories import Category
 from indico.modules.categories.models.principals import CategoryPrincipal
 from indico.modules.events import Event
@@ -37,6 +38,7 @@ from indico.modules.users import User, logger
 from indico.modules.users.models.affiliations import Affiliation
 from indico.modules.users.models.emails import UserEmail
 from indico.modules.users.models.favorites import favorite_user_table
+from indico.modules.users.models.search import user_search_table
 from indico.modules.users.models.suggestions import SuggestedCategory
 from indico.modules.users.models.users import ProfilePictureSource, UserTitle
 from indico.util.caching import memoize_redis, memoize_request
@@ -47,7 +49,7 @@ from indico.util.fs import secure_filename
 from indico.util.i18n import _
 from indico.util.network import make_validate_request_url_hook, validate_request_url
 from indico.util.signals import make_interceptable, values_from_signal
-from indico.util.string import crc32, remove_accents
+from indico.util.string import crc32
 from indico.web.args import use_kwargs
 from indico.web.flask.util import send_file, url_for
 from indico.web.util import strip_path_from_url
@@ -58,6 +60,10 @@ user_colors = ['#e06055', '#ff8a65', '#e91e63', '#f06292', '#673ab7', '#ba68c8',
                '#00a4e4', '#4dd0e1', '#0097a7', '#d4e157', '#aed581', '#57bb8a', '#4db6ac', '#607d8b', '#795548',
                '#a1887f', '#fdd835', '#a3a3a3', '#556c60', '#605264', '#923035', '#915a30', '#55526f', '#67635a']
 
+#: Search terms shorter than this only match the beginning of names, since
+#: a trigram index cannot be used to find them anywhere in a value
+MIN_SUBSTRING_SEARCH_LENGTH = 3
+
 
 def get_admin_emails():
     """Get the email addresses of all Indico admins."""
@@ -215,16 +221,51 @@ def serialize_user(user):
     }
 
 
-def _build_name_search(name_list):
-    text = remove_accents('%{}%'.format('%'.join(escape_like(name) for name in name_list)))
-    return db.or_(db.func.indico.indico_unaccent(db.func.concat(User.first_name, ' ', User.last_name)).ilike(text),
-                  db.func.indico.indico_unaccent(db.func.concat(User.last_name, ' ', User.first_name)).ilike(text))
+def _search_match(column, value, prefix=False):
+    """Match a column of the user search table against a search term.
+
+    Short terms only match the beginning of the value, since a trigram
+    index cannot be used to look for them anywhere in the value.
+    """
+    value = value.lower()
+    if prefix or len(value) < MIN_SUBSTRING_SEARCH_LENGTH:
+        pattern = f'{escape_like(value)}%'
+    else:
+        pattern = f'%{escape_like(value)}%'
+    return column.like(db.func.indico.indico_unaccent(pattern))
+
+
+def _search_similarity(column, value):
+    return db.func.similarity(column, db.func.indico.indico_unaccent(value.lower()))
+
+
+def _build_name_search(name_list, prefix=False):
+    search = user_search_table.c
+    criteria = []
+    for name in name_list:
+        if prefix or len(name) < MIN_SUBSTRING_SEARCH_LENGTH:
+            criteria.append(db.or_(_search_match(search.first_name, name, True),
+                                   _search_match(search.last_name, name, True)))
+        else:
+            criteria.append(_search_match(search.name, name))
+    return db.and_(*criteria)
 
 
 def build_user_search_query(criteria, exact=False, include_deleted=False, include_pending=False,
-                            include_blocked=False, favorites_first=False):
+                            include_blocked=False, favorites_first=False, prefix=False):
+    """Build a query searching for users.
+
+    Unless `exact` is set, the name, email and affiliation criteria use the
+    trigram-indexed user search table, and the results are ordered by how
+    similar they are to the search terms.
+
+    :param prefix: Only match the beginning of the names, emails and
+                   affiliations, which is faster but finds fewer users
+    """
     unspecified = object()
-    query = User.query.distinct(User.id).options(db.joinedload(User._all_emails))
+    search = user_search_table.c
+    query = User.query.options(db.joinedload(User._all_emails))
+    similarity = []
 
     if not include_pending:
         query = query.filter(~User.is_pending)
@@ -234,8 +275,11 @@ def build_user_search_query(criteria, exact=False, include_deleted=False, includ
         query = query.filter(~User.is_blocked)
 
     email = criteria.pop('email', unspecified)
-    if email is not unspecified:
-        query = query.join(UserEmail).filter(unaccent_match(UserEmail.email, email, exact))
+    if email is not unspecified and exact:
+        query = query.filter(User._all_emails.any(unaccent_match(UserEmail.email, email, exact)))
+    elif email is not unspecified:
+        query = query.filter(_search_match(search.emails, email, prefix))
+        similarity.append(_search_similarity(search.emails, email))
 
     # search on any of the name fields (first_name OR last_name)
     name = criteria.pop('name', unspecified)
@@ -244,18 +288,24 @@ def build_user_search_query(criteria, exact=False, include_deleted=False, includ
             raise ValueError("'name' is not compatible with 'exact'")
         if 'first_name' in criteria or 'last_name' in criteria:
             raise ValueError("'name' is not compatible with (first|last)_name")
-        query = query.filter(_build_name_search(name.replace(',', '').split()))
+        query = query.filter(_build_name_search(name.replace(',', '').split(), prefix))
+        similarity.append(_search_similarity(search.name, name))
 
     for k, v in criteria.items():
-        query = query.filter(unaccent_match(getattr(User, k), v, exact))
-
-    # wrap as subquery so we can apply order regardless of distinct-by-id
-    query = query.from_self()
-
+        if exact or k not in {'first_name', 'last_name', 'affiliation'}:
+            query = query.filter(unaccent_match(getattr(User, k), v, exact))
+        else:
+            query = query.filter(_search_match(search[k], v, prefix))
+            similarity.append(_search_similarity(search[k], v))
+
+    if similarity:
+        query = query.join(user_search_table, search.user_id == User.id)
     if favorites_first:
         query = (query.outerjoin(favorite_user_table, db.and_(favorite_user_table.c.user_id == session.user.id,
                                                               favorite_user_table.c.target_id == User.id))
                  .order_by(nullslast(favorite_user_table.c.user_id)))
+    if similarity:
+        query = query.order_by(sum(similarity[1:], start=similarity[0]).desc())
     return query.order_by(db.func.lower(db.func.indico.indico_unaccent(User.first_name)),
                           db.func.lower(db.func.indico.indico_unaccent(User.last_name)),
                           User.id)
@@ -279,7 +329,7 @@ def _deduplicate_identities(identities):
 
 
 def search_users(exact=False, include_deleted=False, include_pending=False, include_blocked=False,
-                 external=False, allow_system_user=False, **criteria):
+                 external=False, allow_system_user=False, *, cache=False, **criteria):
     """Search for users.
 
     :param exact: Indicates if only exact matches should be returned.
@@ -295,6 +345,10 @@ def search_users(exact=False, include_deleted=False, include_pending=False, incl
                      for matching users.
     :param allow_system_user: Whether the system user may be returned
                               in the search results.
+    :param cache: Whether the external search is interactive, in which
+                  case slow identity providers are skipped and the
+                  results are cached for a short time (see
+                  :meth:`.IndicoMultipass.search_identities`).
     :param criteria: A dict containing any of the following keys:
                      name, first_name, last_name, email, affiliation, phone,
                      address
@@ -312,29 +366,81 @@ def search_users(exact=False, include_deleted=False, include_pending=False, incl
                                      include_pending=include_pending, include_blocked=include_blocked)
              .options(db.joinedload(User.identities),
                       db.joinedload(User.merged_into_user)))
+    users = query.all()
+    system_user = {user for user in users if user.is_system and not user.all_emails and allow_system_user}
+    users = [user for user in users if user.all_emails]
+    return set(_add_external_identities(users, exact, criteria, external=external, cache=cache)) | system_user
+
+
+def search_users_ranked(limit, exact=False, include_pending=False, external=False, favorites_first=False, *,
+                        cache=False, **criteria):
+    """Search for the users matching some criteria best.
+
+    Unlike :func:`search_users` this only loads the best matches from the
+    database.  If the search takes longer than ``USER_SEARCH_TIMEOUT``, it
+    is repeated looking only for names etc. starting with the search terms.
+
+    :param limit: The maximum number of Indico users to return
+    :param favorites_first: Whether the favorite users of the current user
+                            should be returned first.
+    :param cache: Whether the external search is interactive (see
+                  :func:`search_users`).
+    :return: A ``(results, total)`` tuple; the results contain the matching
+             users ordered by relevance, followed by any external users
+             (:class:`~flask_multipass.IdentityInfo` objects) if `external`
+             was set.  The total is the number of matching Indico users and
+             external users.
+    """
+    criteria = {key: value.strip() for key, value in criteria.items() if value.strip()}
 
-    found_emails = {}
-    found_identities = {}
-    system_user = set()
-    for user in query:
-        for identity in user.identities:
-            found_identities[(identity.provider, identity.identifier)] = user
-        for email in user.all_emails:
-            found_emails[email] = user
-        if user.is_system and not user.all_emails and allow_system_user:
-            system_user = {user}
-
-    # external user providers
-    if external:
-        identities = multipass.search_identities(exact=exact, **criteria)
-
-        for ident in _deduplicate_identities(identities):
-            if ((ident.provider.name, ident.identifier) not in found_identities and
-                    ident.data['email'].lower() not in found_emails):
-                found_emails[ident.data['email'].lower()] = ident
-                found_identities[(ident.provider, ident.identifier)] = ident
-
-    return set(found_emails.values()) | system_user
+    if not criteria:
+        return [], 0
+
+    def _search(prefix=False):
+        # like in `search_users`, only users with an email can be found
+        query = (build_user_search_query(dict(criteria), exact=exact, include_pending=include_pending,
+                                         favorites_first=favorites_first, prefix=prefix)
+                 .filter(~User.is_system, User._all_emails.any())
+                 .options(db.joinedload(User.identities))
+                 .limit(limit))
+        return with_total_rows(query)
+
+    try:
+        with statement_timeout(config.USER_SEARCH_TIMEOUT):
+            users, total = _search()
+    except StatementTimeout:
+        logger.warning('User search for %r took too long; searching for prefixes instead', criteria)
+        users, total = _search(prefix=True)
+    results = _add_external_identities(users, exact, criteria, external=external, cache=cache,
+                                       complete=(len(users) == total))
+    return results, total + len(results) - len(users)
+
+
+def _add_external_identities(users, exact, criteria, *, external, cache, complete=True):
+    """Add the matching external users who are not in Indico yet to a list of users.
+
+    :param cache: Whether the identity search is interactive and thus may
+                  skip slow providers and use cached results.
+    :param complete: Whether `users` contains all Indico users matching the
+                     criteria; otherwise the database is checked for users
+                     with the emails of the external users.
+    """
+    if not external:
+        return users
+    found_emails = {email for user in users for email in user.all_emails}
+    found_identities = {(identity.provider, identity.identifier) for user in users for identity in user.identities}
+    identities = {}
+    for ident in _deduplicate_identities(multipass.search_identities(exact=exact, cache=cache, **criteria)):
+        email = ident.data['email'].lower()
+        if (ident.provider.name, ident.identifier) not in found_identities and email not in found_emails:
+            found_emails.add(email)
+            identities[email] = ident
+    if identities and not complete:
+        existing = {email for email, in (UserEmail.query
+                                         .filter(UserEmail.email.in_(identities), ~UserEmail.is_user_deleted)
+                                         .with_entities(UserEmail.email))}
+        identities = {email: ident for email, ident in identities.items() if email not in existing}
+    return [*users, *identities.values()]
 
 
 def get_user_by_email(email, create_pending=False):
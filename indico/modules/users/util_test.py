@@ -0,0 +1,93 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import pytest
+from sqlalchemy import select
+
+from indico.core.db.sqlalchemy.util.queries import StatementTimeout
+from indico.modules.users import User, util
+from indico.modules.users.models.search import user_search_table
+from indico.modules.users.util import search_users, search_users_ranked
+
+
+def test_user_search_table(db, create_user):
+    user = create_user(123, first_name='Çarlös', last_name='Müller', email='foo@example.test')
+    user.secondary_emails.add('bar@example.test')
+    user.affiliation = 'Fancy Lab'
+    db.session.flush()
+    row = db.session.execute(select(user_search_table).where(user_search_table.c.user_id == user.id)).one()
+    assert row.name == 'carlos muller'
+    assert row.emails == 'bar@example.test foo@example.test'
+    assert row.affiliation == 'fancy lab'
+
+
+@pytest.fixture
+def search_users_data(create_user):
+    create_user(1, first_name='Jonathan', last_name='Smith', email='jon@example.test')
+    create_user(2, first_name='John', last_name='Smithers', email='john@example.test')
+    create_user(3, first_name='John', last_name='Smith', email='john.smith@example.test')
+    create_user(4, first_name='Alice', last_name='Jones', email='alice@example.test')
+
+
+@pytest.mark.usefixtures('search_users_data')
+def test_search_users():
+    assert {u.id for u in search_users(name='smith jo')} == {1, 2, 3}
+    assert {u.id for u in search_users(name='jo')} == {1, 2, 3, 4}
+    assert {u.id for u in search_users(last_name='ith')} == {1, 2, 3}
+    # short terms only match the beginning of names
+    assert {u.id for u in search_users(last_name='it')} == set()
+    assert {u.id for u in search_users(email='john')} == {2, 3}
+    assert {u.id for u in search_users(email='john@example.test', exact=True)} == {2}
+
+
+@pytest.mark.usefixtures('search_users_data')
+def test_search_users_ranked():
+    users, total = search_users_ranked(10, first_name='john', last_name='smith')
+    assert [u.id for u in users] == [3, 2]
+    users, total = search_users_ranked(1, first_name='john', last_name='smith')
+    assert [u.id for u in users] == [3]
+    assert total == 2
+
+
+@pytest.mark.usefixtures('search_users_data')
+def test_search_users_ranked_timeout(mocker):
+    # simulate the substring search taking too long
+    orig_build_user_search_query = util.build_user_search_query
+
+    def _build_user_search_query(criteria, *, prefix=False, **kwargs):
+        if not prefix:
+            raise StatementTimeout
+        return orig_build_user_search_query(criteria, prefix=prefix, **kwargs)
+
+    mocker.patch('indico.modules.users.util.build_user_search_query', _build_user_search_query)
+    users, total = search_users_ranked(10, last_name='mith')
+    assert users == []
+    assert total == 0
+    users, total = search_users_ranked(10, last_name='smith')
+    assert {u.id for u in users} == {1, 2, 3}
+
+
+@pytest.mark.usefixtures('search_users_data')
+def test_search_users_external_cache(mocker):
+    search_identities = mocker.patch('indico.modules.users.util.multipass.search_identities', return_value=[])
+    # only interactive searches may skip slow identity providers
+    search_users(external=True, email='john@example.test', exact=True)
+    search_identities.assert_called_once_with(exact=True, cache=False, email='john@example.test')
+    search_identities.reset_mock()
+    search_users_ranked(10, external=True, cache=True, last_name='smith')
+    search_identities.assert_called_once_with(exact=False, cache=True, last_name='smith')
+
+
+@pytest.mark.usefixtures('search_users_data')
+def test_search_users_ranked_no_email(db):
+    db.session.add(User(id=5, first_name='John', last_name='Smithson'))
+    db.session.flush()
+    users, total = search_users_ranked(10, last_name='smith')
+    assert {u.id for u in users} == {1, 2, 3}
+    assert total == 3
+    # the system user ("Indico System") has no email either
+    assert search_users_ranked(10, last_name='system') == ([], 0)
@@ -5,10 +5,14 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import statistics
 import time
+from contextlib import nullcontext
 from math import isinf
 
 import click
+from sqlalchemy.engine import Engine
+from sqlalchemy.event import listen, remove
 
 
 class Benchmark:
@@ -67,3 +71,66 @@ class Benchmark:
             click.secho(str(self), fg='yellow', bold=True)
         else:
             click.secho(str(self), fg='green', bold=True)
+
+
+def measure(func, *, repeat=5, warmup=1, setup=nullcontext):
+    """Measure how long a function takes to run.
+
+    :param func: The function to benchmark
+    :param repeat: How often to run the function
+    :param warmup: How often to run the function before measuring it,
+                   e.g. to fill caches that would usually be warm
+    :param setup: A callable returning a context manager each run
+                  is wrapped in, e.g. to provide a fresh app context
+    :return: A dict containing the duration of each run, some
+             statistics and the number of SQL queries per run
+    """
+    query_count = 0
+
+    def _count_query(*args, **kwargs):
+        nonlocal query_count
+        query_count += 1
+
+    for __ in range(warmup):
+        with setup():
+            func()
+    runs = []
+    listen(Engine, 'after_cursor_execute', _count_query)
+    try:
+        for __ in range(repeat):
+            with setup(), Benchmark() as b:
+                func()
+            runs.append(float(b))
+    finally:
+        remove(Engine, 'after_cursor_execute', _count_query)
+    return {
+        'runs': runs,
+        'min': min(runs),
+        'max': max(runs),
+        'mean': statistics.mean(runs),
+        'median': statistics.median(runs),
+        'queries': query_count // repeat,
+    }
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """Compare the results of two benchmark runs.
+
+    :param baseline: A dict mapping benchmark names to the data
+                     returned by `measure`
+    :param current: A dict in the same format as `baseline`
+    :param threshold: The relative increase of the median duration
+                      (or query count) considered a regression
+    :return: A list of ``(name, old, new, change, regressed)`` tuples
+             for all benchmarks present in both dicts, where `old` and
+             `new` are the median durations and `change` the relative
+             difference between them
+    """
+    comparison = []
+    for name, new in current.items():
+        if (old := baseline.get(name)) is None:
+            continue
+        change = (new['median'] - old['median']) / old['median'] if old['median'] else 0
+        regressed = change > threshold or new['queries'] > old['queries'] * (1 + threshold)
+        comparison.append((name, old['median'], new['median'], change, regressed))
+    return comparison
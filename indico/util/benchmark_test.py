@@ -0,0 +1,41 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+from contextlib import contextmanager
+
+from indico.util.benchmark import compare_results, measure
+
+
+def test_measure():
+    calls = []
+
+    @contextmanager
+    def _setup():
+        calls.append('setup')
+        yield
+
+    result = measure(lambda: calls.append('run'), repeat=3, warmup=2, setup=_setup)
+    assert calls == ['setup', 'run'] * 5
+    assert len(result['runs']) == 3
+    assert result['min'] <= result['median'] <= result['max']
+    assert result['queries'] == 0
+
+
+def test_compare_results():
+    baseline = {'a': {'median': 4, 'queries': 10},
+                'b': {'median': 1, 'queries': 10},
+                'c': {'median': 1, 'queries': 10},
+                'd': {'median': 1, 'queries': 10}}
+    current = {'a': {'median': 4.25, 'queries': 10},
+               'b': {'median': 1.5, 'queries': 10},
+               'c': {'median': 0.5, 'queries': 20},
+               'new': {'median': 1, 'queries': 10}}
+    assert compare_results(baseline, current) == [
+        ('a', 4, 4.25, 0.0625, False),
+        ('b', 1, 1.5, 0.5, True),
+        ('c', 1, 0.5, -0.5, True),
+    ]
@@ -5,10 +5,17 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import os
+import pickle
+import time
+from collections import OrderedDict
 from functools import wraps
 from inspect import getcallargs
+from threading import Lock
 
 from flask import current_app, g, has_request_context
+from redis import RedisError
+from redis import from_url as redis_from_url
 from werkzeug.exceptions import Conflict
 
 
@@ -58,7 +65,134 @@ def memoize_request(f):
     return memoizer
 
 
-def memoize_redis(ttl, *, versioned=False):
+class _NearCache:
+    """A small in-process LRU cache whose entries expire quickly.
+
+    Values are stored pickled so callers never share (and possibly modify)
+    the same object, just like when the value comes from redis.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, data = self._data[key]
+            except KeyError:
+                return default
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(data)  # noqa: S301
+
+    def set(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _NearCacheInvalidator:
+    """Clear near caches in all processes through redis pub/sub.
+
+    Each process subscribes to the invalidation channel the first time
+    it uses a near cache.  If that fails, near caches are not used in
+    the process since they could not be invalidated.
+    """
+
+    def __init__(self):
+        self.near_caches = {}
+        self._lock = Lock()
+        self._pid = None
+        self._client = None
+        self._listening = False
+
+    @property
+    def channel(self):
+        return f"{current_app.config.get('CACHE_KEY_PREFIX', '')}memoize-invalidate"
+
+    def _get_client(self):
+        if self._pid != os.getpid():
+            # never share connections or the listener thread with a parent process
+            self._pid = os.getpid()
+            self._client = redis_from_url(current_app.config['CACHE_REDIS_URL'], socket_timeout=1)
+            self._listening = False
+        return self._client
+
+    def listen(self):
+        """Make sure this process receives invalidations.
+
+        :return: Whether near caches can be used
+        """
+        if self._pid == os.getpid() and self._listening:
+            return True
+        if not current_app.config.get('CACHE_REDIS_URL'):
+            return False
+        with self._lock:
+            client = self._get_client()
+            if not self._listening:
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(**{self.channel: self._handle_message})
+                    pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._handle_error)
+                except RedisError:
+                    _log_redis_error('Could not subscribe to near cache invalidations')
+                    self._pid = None
+                    return False
+                self._listening = True
+        return True
+
+    def _handle_message(self, message):
+        if near_cache := self.near_caches.get(message['data'].decode()):
+            near_cache.clear()
+
+    def _handle_error(self, exc, pubsub, thread):
+        from indico.core.logger import Logger
+        Logger.get('cache').warning('Lost connection for near cache invalidations: %s', exc)
+        thread.stop()
+        pubsub.close()
+        # we may have missed some invalidations
+        self._listening = False
+        for near_cache in self.near_caches.values():
+            near_cache.clear()
+
+    def invalidate(self, name):
+        if near_cache := self.near_caches.get(name):
+            near_cache.clear()
+        if not current_app.config.get('CACHE_REDIS_URL'):
+            return
+        with self._lock:
+            client = self._get_client()
+        try:
+            client.publish(self.channel, name)
+        except RedisError:
+            _log_redis_error('Could not publish near cache invalidation for %s', name)
+
+
+def _log_redis_error(msg, *args):
+    from indico.core.logger import Logger
+    Logger.get('cache').exception(msg, *args)
+
+
+_near_cache_invalidator = _NearCacheInvalidator()
+
+
+def memoize_redis(ttl, *, versioned=False, near_ttl=5, near_size=1000):
     """Memoize a function in redis.
 
     The cached value can be cleared by calling the method
@@ -67,23 +201,74 @@ def memoize_redis(ttl, *, versioned=False):
     whether a value has been cached call ``is_cached()`` in the
     same way.
 
+    Recently used values are also kept in memory for a few seconds
+    to avoid asking redis over and over again for the same data.  This
+    in-process cache is cleared in all processes when ``clear_cached()``
+    or ``bump_version()`` are called.
+
+    To get the values for many different arguments with a single redis
+    query, call ``get_many()`` with a list of argument tuples.
+
     :param ttl: How long the result should be cached.  May be a
                 timedelta or a number (seconds).
+    :param versioned: Whether to add a ``bump_version()`` method to
+                      the decorated function which invalidates all
+                      cached values at once.
+    :param near_ttl: How long (in seconds) values are kept in memory.
+                     Set to 0 to always ask redis.
+    :param near_size: How many values are kept in memory.
     """
     from indico.core.cache import make_scoped_cache
     cache = make_scoped_cache('memoize')
 
     def decorator(f):
         version_key = '_version_', f.__module__, f.__name__
-
-        def _get_key(args, kwargs):
+        name = f'{f.__module__}:{f.__qualname__}'
+        near_cache = _near_cache_invalidator.near_caches[name] = _NearCache(near_size, near_ttl)
+
+        def _use_near_cache():
+            return near_ttl > 0 and _near_cache_invalidator.listen()
+
+        def _get_version():
+            if not _use_near_cache():
+                return cache.get(version_key, 0)
+            version = near_cache.get(version_key, _notset)
+            if version is _notset:
+                version = cache.get(version_key, 0)
+                near_cache.set(version_key, version)
+            return version
+
+        def _get_key(args, kwargs, version=None):
             version_parts = ()
             if versioned:
-                version_parts = (cache.get(version_key, 0),)
+                version_parts = (_get_version() if version is None else version,)
             return *version_parts, f.__module__, f.__name__, make_hashable(getcallargs(f, *args, **kwargs))
 
+        def _get_cached_many(keys):
+            values = dict.fromkeys(keys, _notset)
+            use_near_cache = _use_near_cache()
+            if use_near_cache:
+                values.update({key: value for key in keys
+                               if (value := near_cache.get(key, _notset)) is not _notset})
+            if missing := [key for key, value in values.items() if value is _notset]:
+                cached = dict(zip(missing, cache.get_many(*missing, default=_notset), strict=True))
+                values.update(cached)
+                if use_near_cache:
+                    for key, value in cached.items():
+                        if value is not _notset:
+                            near_cache.set(key, value)
+            return values
+
+        def _set_cached_many(values):
+            cache.set_many(values, timeout=ttl)
+            if _use_near_cache():
+                for key, value in values.items():
+                    near_cache.set(key, value)
+
         def _clear_cached(*args, **kwargs):
-            cache.delete(_get_key(args, kwargs))
+            key = _get_key(args, kwargs)
+            cache.delete(key)
+            _near_cache_invalidator.invalidate(name)
 
         def _is_cached(*args, **kwargs):
             return cache.get(_get_key(args, kwargs), _notset) is not _notset
@@ -92,6 +277,28 @@ def memoize_redis(ttl, *, versioned=False):
             if new_version is None:
                 new_version = cache.get(version_key, 0) + 1
             cache.set(version_key, new_version)
+            _near_cache_invalidator.invalidate(name)
+
+        def _get_many(calls):
+            """Get the results for many sets of arguments at once.
+
+            :param calls: An iterable of tuples containing the positional
+                          arguments for each call
+            :return: A list with the return value for each call
+            """
+            calls = list(calls)
+            if current_app.config['TESTING'] or current_app.config.get('REPL'):
+                return [f(*args) for args in calls]
+            version = _get_version() if versioned else None
+            keys = [_get_key(args, {}, version) for args in calls]
+            values = _get_cached_many(keys)
+            new_values = {}
+            for args, key in zip(calls, keys, strict=True):
+                if values[key] is _notset:
+                    values[key] = new_values[key] = f(*args)
+            if new_values:
+                _set_cached_many(new_values)
+            return [values[key] for key in keys]
 
         @wraps(f)
         def memoizer(*args, **kwargs):
@@ -100,14 +307,15 @@ def memoize_redis(ttl, *, versioned=False):
                 return f(*args, **kwargs)
 
             key = _get_key(args, kwargs)
-            value = cache.get(key, _notset)
+            value = _get_cached_many([key])[key]
             if value is _notset:
                 value = f(*args, **kwargs)
-                cache.set(key, value, timeout=ttl)
+                _set_cached_many({key: value})
             return value
 
         memoizer.clear_cached = _clear_cached
         memoizer.is_cached = _is_cached
+        memoizer.get_many = _get_many
         if versioned:
             memoizer.bump_version = _bump_version
         return memoizer
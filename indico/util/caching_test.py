@@ -7,7 +7,8 @@
 
 import pytest
 
-from indico.util.caching import memoize_request
+from indico.core.cache import ScopedCache
+from indico.util.caching import memoize_redis, memoize_request
 
 
 @pytest.fixture
@@ -46,3 +47,47 @@ def test_memoize_request_args():
     assert calls[0] == 3
     fn(a=2, b=2, foo='bar')
     assert calls[0] == 3
+
+
+@pytest.mark.usefixtures('not_testing')
+def test_memoize_redis_near_cache(mocker):
+    calls = []
+
+    @memoize_redis(60)
+    def fn(a):
+        calls.append(a)
+        return [a]
+
+    assert fn(1) == [1]
+    get_many = mocker.spy(ScopedCache, 'get_many')
+    rv = fn(1)
+    assert rv == [1]
+    assert not get_many.called
+    # modifying the returned value does not affect the cached one
+    rv.append(2)
+    assert fn(1) == [1]
+    assert calls == [1]
+    fn.clear_cached(1)
+    assert fn(1) == [1]
+    assert get_many.called
+    assert calls == [1, 1]
+
+
+@pytest.mark.usefixtures('not_testing')
+def test_memoize_redis_get_many():
+    calls = []
+
+    @memoize_redis(60, versioned=True, near_ttl=0)
+    def fn(a, b=1):
+        calls.append(a)
+        return a * b
+
+    assert fn.get_many([(1,), (2, 3)]) == [1, 6]
+    assert calls == [1, 2]
+    assert fn(2, 3) == 6
+    assert fn(2, b=3) == 6
+    assert fn.get_many([(1,), (2, 3), (4,)]) == [1, 6, 4]
+    assert calls == [1, 2, 4]
+    fn.bump_version()
+    assert fn.get_many([(1,)]) == [1]
+    assert calls == [1, 2, 4, 1]
@@ -71,18 +71,25 @@ Version 2.1: (August 2013)
 """
 
 
+import json
 import os
 import re
 import textwrap
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from hashlib import sha256
 from io import BytesIO
 from mimetypes import guess_extension
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from urllib.parse import urljoin, urlparse
 from xml.etree import ElementTree as etree  # noqa: N813
 
 import markdown
 import requests
+from flask import current_app
 from lxml.html import html5parser
 from PIL import Image
 from requests.exceptions import ConnectionError, InvalidURL
@@ -92,6 +99,11 @@ from indico.util.network import InsecureRequestError, make_validate_request_url_
 
 __version__ = '2.1'
 
+#: How long a fetched image is used without checking whether it changed
+IMAGE_CACHE_FRESHNESS = timedelta(minutes=5)
+#: How many images are fetched at the same time
+IMAGE_FETCH_WORKERS = 8
+
 
 start_single_quote_re = re.compile(r"""(^|\s|")'""")
 start_double_quote_re = re.compile(r'''(^|\s|'|`)"''')
@@ -295,6 +307,126 @@ def latex_render_error(message):
        \end{tcolorbox}''' % latex_escape(message))
 
 
+def _get_image_cache_paths(url):
+    """Get the paths of an image's cache entry.
+
+    :return: A ``(metadata_path, data_path)`` tuple
+    """
+    from indico.core.config import config
+    key = sha256(url.encode()).hexdigest()
+    cache_dir = os.path.join(config.CACHE_DIR, 'latex-images')
+    return os.path.join(cache_dir, f'{key}.json'), os.path.join(cache_dir, key)
+
+
+def _get_cached_image(url):
+    """Get an image from the local image cache.
+
+    :return: A ``(metadata, data)`` tuple or ``None`` if the image is
+             not cached
+    """
+    metadata_path, data_path = _get_image_cache_paths(url)
+    try:
+        metadata = json.loads(Path(metadata_path).read_text())
+        data = Path(data_path).read_bytes()
+        # update the mtime so the cache cleanup does not delete images which are still used
+        os.utime(metadata_path, None)
+        os.utime(data_path, None)
+    except (OSError, ValueError):
+        return None
+    if metadata.get('url') != url:
+        return None
+    return metadata, data
+
+
+def _write_file_atomic(path, data):
+    with NamedTemporaryFile(dir=os.path.dirname(path), prefix='.', delete=False) as f:
+        f.write(data)
+    os.replace(f.name, path)
+
+
+def _cache_image(url, metadata, data=None):
+    """Store an image in the local image cache.
+
+    If `data` is omitted, only the metadata is updated.
+    """
+    metadata_path, data_path = _get_image_cache_paths(url)
+    os.makedirs(os.path.dirname(metadata_path), exist_ok=True)
+    if data is not None:
+        _write_file_atomic(data_path, data)
+    _write_file_atomic(metadata_path, json.dumps(dict(metadata, url=url, fetched=time.time())).encode())
+
+
+def _get_image_extension(resp):
+    extension = None
+    if resp.headers.get('content-type'):
+        extension = guess_extension(resp.headers['content-type'])
+        # as incredible as it might seem, '.jpe' will be the answer in some Python environments
+        if extension == '.jpe':
+            extension = '.jpg'
+    if not extension:
+        try:
+            # Try to use PIL to get file type
+            image = Image.open(BytesIO(resp.content))
+            # Worst case scenario, assume it's PNG
+            extension = IMAGE_FORMAT_EXTENSIONS.get(image.format, '.png')
+        except OSError:
+            raise ImageURLException('Cannot read image data. Maybe not an image file?')
+    return extension
+
+
+def fetch_image(src):
+    """Fetch an image from a URL.
+
+    Fetched images are kept in a local cache.  An image which has been
+    fetched recently is used without any request; otherwise the server
+    is asked whether it changed (using its ETag or modification date),
+    and the image is only downloaded again if it did.
+
+    :param src: the URL of the image
+    :returns: a ``(data, extension)`` tuple
+    """
+    from indico.core.config import config
+    info = urlparse(src)
+    if not info.scheme and not info.netloc and info.path.startswith('/'):
+        # make relative links absolute
+        src = urljoin(config.BASE_URL, src)
+    if urlparse(src).scheme not in ('http', 'https'):
+        raise ImageURLException(f'URL scheme not supported: {src}')
+    headers = {}
+    if cached := _get_cached_image(src):
+        metadata, data = cached
+        if time.time() - metadata['fetched'] < IMAGE_CACHE_FRESHNESS.total_seconds():
+            return data, metadata['extension']
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+    try:
+        validate_request_url(src)
+        resp = requests.get(src, timeout=5, headers=headers, **make_validate_request_url_hook())
+    except InvalidURL:
+        raise ImageURLException(f"Cannot understand URL '{src}'")
+    except (requests.Timeout, ConnectionError):
+        raise ImageURLException(f'Problem downloading image ({src})')
+    except requests.TooManyRedirects:
+        raise ImageURLException(f'Too many redirects downloading image ({src})')
+    except InsecureRequestError:
+        raise ImageURLException(f'Disallowed URL ({src})')
+
+    if resp.status_code == 304 and cached:
+        _cache_image(src, metadata)
+        return data, metadata['extension']
+    elif resp.status_code != 200:
+        raise ImageURLException(f'[{resp.status_code}] Error fetching image')
+
+    extension = _get_image_extension(resp)
+    metadata = {'extension': extension,
+                'etag': resp.headers.get('etag'),
+                'last_modified': resp.headers.get('last-modified')}
+    _cache_image(src, metadata, resp.content)
+    return resp.content, extension
+
+
 def latex_render_image(src, alt, tmpdir, strict=False):
     """Generate LaTeX code that includes an arbitrary image from a URL.
 
@@ -310,52 +442,24 @@ def latex_render_image(src, alt, tmpdir, strict=False):
     :returns: a ``(latex_code, file_path)`` tuple, containing the LaTeX code
               and path to the temporary image file.
     """
-    from indico.core.config import config
     try:
-        info = urlparse(src)
-        if not info.scheme and not info.netloc and info.path.startswith('/'):
-            # make relative links absolute
-            src = urljoin(config.BASE_URL, src)
-        if urlparse(src).scheme not in ('http', 'https'):
-            raise ImageURLException(f'URL scheme not supported: {src}')
-        else:
-            try:
-                validate_request_url(src)
-                resp = requests.get(src, timeout=5, **make_validate_request_url_hook())
-            except InvalidURL:
-                raise ImageURLException(f"Cannot understand URL '{src}'")
-            except (requests.Timeout, ConnectionError):
-                raise ImageURLException(f'Problem downloading image ({src})')
-            except requests.TooManyRedirects:
-                raise ImageURLException(f'Too many redirects downloading image ({src})')
-            except InsecureRequestError:
-                raise ImageURLException(f'Disallowed URL ({src})')
-            extension = None
-
-            if resp.status_code != 200:
-                raise ImageURLException(f'[{resp.status_code}] Error fetching image')
-
-            if resp.headers.get('content-type'):
-                extension = guess_extension(resp.headers['content-type'])
-                # as incredible as it might seem, '.jpe' will be the answer in some Python environments
-                if extension == '.jpe':
-                    extension = '.jpg'
-            if not extension:
-                try:
-                    # Try to use PIL to get file type
-                    image = Image.open(BytesIO(resp.content))
-                    # Worst case scenario, assume it's PNG
-                    extension = IMAGE_FORMAT_EXTENSIONS.get(image.format, '.png')
-                except OSError:
-                    raise ImageURLException('Cannot read image data. Maybe not an image file?')
-            with NamedTemporaryFile(prefix='indico-latex-', suffix=extension, dir=tmpdir, delete=False) as tempfile:
-                tempfile.write(resp.content)
+        data, extension = fetch_image(src)
     except ImageURLException as exc:
         if strict:
             raise
         else:
             return latex_render_error(f'Could not include image: {exc}'), None
 
+    if tmpdir:
+        # name the file after its content so the LaTeX source is the same whenever
+        # the same image is included, which allows caching the compiled PDF
+        image_path = os.path.join(tmpdir, f'indico-latex-{sha256(data).hexdigest()[:16]}{extension}')
+        Path(image_path).write_bytes(data)
+    else:
+        with NamedTemporaryFile(prefix='indico-latex-', suffix=extension, delete=False) as tempfile:
+            tempfile.write(data)
+        image_path = tempfile.name
+
     # Using graphicx and ajustbox package for *max width*
     return (textwrap.dedent(r'''
         \begin{figure}[H]
@@ -363,7 +467,51 @@ def latex_render_image(src, alt, tmpdir, strict=False):
           \includegraphics[max width=\linewidth]{%s}
           \caption{%s}
         \end{figure}
-        ''' % (os.path.basename(tempfile.name), latex_escape(alt))), tempfile.name)
+        ''' % (os.path.basename(image_path), latex_escape(alt))), image_path)
+
+
+def _render_image_in_app_context(app, src, alt, tmpdir):
+    with app.app_context():
+        return latex_render_image(src, alt, tmpdir)
+
+
+class LatexImageLoader:
+    """Fetch the images included in a LaTeX document concurrently.
+
+    While the document is rendered, each image is replaced with a
+    placeholder and fetched in the background.  Once the whole document
+    has been rendered, `resolve` replaces the placeholders with the LaTeX
+    code including the images.
+    """
+
+    def __init__(self, tmpdir, max_workers=IMAGE_FETCH_WORKERS):
+        self.tmpdir = tmpdir
+        self.max_workers = max_workers
+        self._placeholder = f'indicolateximage{uuid.uuid4().hex}'
+        self._images = {}
+        self._executor = None
+
+    def render(self, src, alt):
+        """Start fetching an image and get a placeholder for it."""
+        if (src, alt) not in self._images:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='latex-images')
+            future = self._executor.submit(_render_image_in_app_context, current_app._get_current_object(), src,
+                                           alt, self.tmpdir)
+            self._images[(src, alt)] = (f'{self._placeholder}x{len(self._images)}x', future)
+        return self._images[(src, alt)][0]
+
+    def resolve(self, source):
+        """Replace the placeholders in a document with the fetched images."""
+        try:
+            for placeholder, future in self._images.values():
+                source = source.replace(placeholder, future.result()[0])
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._images = {}
+        return source
 
 
 def makeExtension(configs=None):  # noqa: N802
@@ -488,7 +636,11 @@ class LaTeXTreeProcessor(markdown.treeprocessors.Treeprocessor):
         elif ournode.tag in ('table', 'thead', 'tbody', 'tr', 'th', 'td'):
             raise RuntimeError('Unexpected table in markdown data for LaTeX')
         elif ournode.tag == 'img':
-            buffer += latex_render_image(ournode.get('src'), ournode.get('alt'), tmpdir=self.configs.get('tmpdir'))[0]
+            if image_loader := self.configs.get('image_loader'):
+                buffer += image_loader.render(ournode.get('src'), ournode.get('alt'))
+            else:
+                buffer += latex_render_image(ournode.get('src'), ournode.get('alt'),
+                                             tmpdir=self.configs.get('tmpdir'))[0]
         elif ournode.tag == 'a':
             # this one gets escaped in convert_link_to_latex
             buffer += '<a href="{}">{}</a>'.format(ournode.get('href'), subcontent)
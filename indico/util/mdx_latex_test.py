@@ -7,10 +7,13 @@
 
 # ruff: noqa: E501
 
+from datetime import timedelta
+
 import pytest
 from markdown import Markdown
 
-from indico.util.mdx_latex import LaTeXExtension, _resolve_latex_carets, latex_escape
+from indico.util import mdx_latex
+from indico.util.mdx_latex import LaTeXExtension, LatexImageLoader, _resolve_latex_carets, fetch_image, latex_escape
 
 
 @pytest.mark.parametrize(('input', 'expected'), (
@@ -91,3 +94,47 @@ def test_convert_markdown_to_latex(input, expected):
     _latex_md = LaTeXExtension(configs={'apply_br': True})
     _latex_md.extendMarkdown(md, md.__dict__)
     assert md.convert(input) == expected
+
+
+@pytest.fixture
+def image_cache(monkeypatch, patch_indico_config, tmp_path):
+    monkeypatch.setattr('indico.util.network.is_private_url', lambda url: False)
+    patch_indico_config('CACHE_DIR', str(tmp_path / 'cache'))
+
+
+@pytest.mark.usefixtures('image_cache')
+def test_fetch_image_cached(monkeypatch, mocked_responses):
+    url = 'https://example.test/image.png'
+    mocked_responses.get(url, body=b'image', content_type='image/png', headers={'ETag': '"v1"'})
+    assert fetch_image(url) == (b'image', '.png')
+    # recently fetched images are used without any request
+    assert fetch_image(url) == (b'image', '.png')
+    assert len(mocked_responses.calls) == 1
+    # afterwards the server is asked whether the image changed
+    monkeypatch.setattr(mdx_latex, 'IMAGE_CACHE_FRESHNESS', timedelta(0))
+    mocked_responses.replace('GET', url, status=304)
+    assert fetch_image(url) == (b'image', '.png')
+    assert mocked_responses.calls[1].request.headers['If-None-Match'] == '"v1"'
+    mocked_responses.replace('GET', url, body=b'new image', content_type='image/jpeg', headers={'ETag': '"v2"'})
+    assert fetch_image(url) == (b'new image', '.jpg')
+    assert mocked_responses.calls[2].request.headers['If-None-Match'] == '"v1"'
+
+
+@pytest.mark.usefixtures('image_cache')
+def test_latex_image_loader(mocked_responses, tmp_path):
+    mocked_responses.get('https://example.test/a.png', body=b'a', content_type='image/png')
+    mocked_responses.get('https://example.test/b.png', body=b'b', content_type='image/png')
+    mocked_responses.get('https://example.test/missing.png', status=404)
+    loader = LatexImageLoader(str(tmp_path))
+    md = Markdown(safe_mode='remove')
+    LaTeXExtension(configs={'tmpdir': str(tmp_path), 'image_loader': loader}).extendMarkdown(md, md.__dict__)
+    source = md.convert('![A](https://example.test/a.png) ![B](https://example.test/b.png)\n\n'
+                        '![Missing](https://example.test/missing.png) ![A](https://example.test/a.png)')
+    assert 'includegraphics' not in source
+    source = loader.resolve(source)
+    assert 'indicolateximage' not in source
+    assert source.count(r'\caption{A}') == 2
+    assert source.count(r'\caption{B}') == 1
+    assert 'Could not include image: [404] Error fetching image' in source
+    assert len(mocked_responses.calls) == 3
+    assert sorted(p.read_bytes() for p in tmp_path.glob('indico-latex-*.png')) == [b'a', b'b']
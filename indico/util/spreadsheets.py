@@ -7,19 +7,22 @@
 
 import csv
 import re
+from codecs import BOM_UTF8
 from contextlib import contextmanager
 from datetime import date, datetime
 from enum import auto
-from io import BytesIO, TextIOWrapper
+from io import BytesIO, StringIO, TextIOWrapper
+from tempfile import TemporaryFile
 
 from markupsafe import Markup
 from speaklater import is_lazy_string
 from xlsxwriter import Workbook
 
+from indico.core.config import config
 from indico.core.errors import UserValueError
 from indico.util.enum import RichStrEnum
 from indico.util.i18n import _
-from indico.web.flask.util import send_file
+from indico.web.flask.util import send_file, send_stream
 
 
 class CSVFieldDelimiter(RichStrEnum):
@@ -93,6 +96,42 @@ def csv_text_io_wrapper(buf):
         w.detach()
 
 
+def _iter_row_values(headers, rows):
+    # convert row dicts to lists ordered like the headers
+    for row in rows:
+        assert len(row) == len(headers)
+        yield [row[header] for header in headers]
+
+
+def iter_csv(headers, rows, *, include_header=True, chunk_size=65536):
+    """Generate a CSV file chunk by chunk.
+
+    Unlike `generate_csv`, the rows are only consumed while the file is
+    being generated, so `rows` can be a generator (e.g. reading from a
+    server-side cursor) and the CSV data never needs to be kept in memory
+    as a whole.
+
+    :param headers: a list of cell captions
+    :param rows: an iterable of dicts mapping captions to values
+    :param include_header: whether to include a header in the data
+    :param chunk_size: the approximate size of the chunks
+    :return: an iterator yielding the UTF-8 encoded CSV data
+    """
+    yield BOM_UTF8
+    buf = StringIO(newline='')
+    writer = csv.writer(buf)
+    if include_header:
+        writer.writerow(map(_prepare_header, headers))
+    for values in _iter_row_values(headers, rows):
+        writer.writerow([_prepare_csv_data(v) for v in values])
+        if buf.tell() >= chunk_size:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
 def generate_csv(headers, rows, *, include_header=True):
     """Generate a CSV file from a list of headers and rows.
 
@@ -105,18 +144,7 @@ def generate_csv(headers, rows, *, include_header=True):
     :param include_header: whether to include a header in the data
     :return: an `io.BytesIO` containing the CSV data
     """
-    buf = BytesIO()
-    with csv_text_io_wrapper(buf) as csvbuf:
-        writer = csv.writer(csvbuf)
-        if include_header:
-            writer.writerow(map(_prepare_header, headers))
-        header_positions = {name: i for i, name in enumerate(headers)}
-        assert all(len(row) == len(headers) for row in rows)
-        for row in rows:
-            row = sorted(row.items(), key=lambda x: header_positions[x[0]])
-            writer.writerow([_prepare_csv_data(v) for k, v in row])
-    buf.seek(0)
-    return buf
+    return BytesIO(b''.join(iter_csv(headers, rows, include_header=include_header)))
 
 
 def _prepare_excel_data(data):
@@ -145,25 +173,12 @@ def _strftime_to_excel_number_format(fmt):
     return result
 
 
-def generate_xlsx(headers, rows, *, tz=None, column_formats=None):
-    """Generate an XLSX file from a list of headers and rows.
-
-    :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
-    :param tz: the timezone for the values that are datetime objects
-    :param column_formats: optional mapping of header keys to Excel number formats
-    :return: an `io.BytesIO` containing the XLSX data
-    """
+def _write_xlsx(file, headers, rows, *, tz, column_formats, workbook_options):
     if column_formats is None:
         column_formats = {}
-    workbook_options = {'in_memory': True, 'strings_to_formulas': False, 'strings_to_numbers': False,
+    workbook_options = {**workbook_options, 'strings_to_formulas': False, 'strings_to_numbers': False,
                         'strings_to_urls': False}
-    buf = BytesIO()
-    header_positions = {name: i for i, name in enumerate(headers)}
-    # convert row dicts to lists
-    rows = [[x[1] for x in sorted(row.items(), key=lambda x: header_positions[x[0]])] for row in rows]
-    assert all(len(row) == len(headers) for row in rows)
-    with Workbook(buf, workbook_options) as workbook:
+    with Workbook(file, workbook_options) as workbook:
         bold = workbook.add_format({'bold': True})
         wb_formats = {
             fmt: workbook.add_format({'num_format': _strftime_to_excel_number_format(fmt)})
@@ -178,7 +193,7 @@ def generate_xlsx(headers, rows, *, tz=None, column_formats=None):
         sheet = workbook.add_worksheet()
         for col, name in enumerate(map(_prepare_header, headers)):
             sheet.write(0, col, name, bold)
-        for row, values in enumerate(rows, 1):
+        for row, values in enumerate(_iter_row_values(headers, rows), 1):
             for col, data in enumerate(values):
                 cell_format = column_formats_list[col]
                 if isinstance(data, datetime):
@@ -188,21 +203,59 @@ def generate_xlsx(headers, rows, *, tz=None, column_formats=None):
                     sheet.write_datetime(row, col, data, cell_format or date_format)
                 else:
                     sheet.write(row, col, _prepare_excel_data(data), cell_format)
+
+
+def generate_xlsx(headers, rows, *, tz=None, column_formats=None):
+    """Generate an XLSX file from a list of headers and rows.
+
+    :param headers: a list of cell captions
+    :param rows: a list of dicts mapping captions to values
+    :param tz: the timezone for the values that are datetime objects
+    :param column_formats: optional mapping of header keys to Excel number formats
+    :return: an `io.BytesIO` containing the XLSX data
+    """
+    buf = BytesIO()
+    _write_xlsx(buf, headers, rows, tz=tz, column_formats=column_formats, workbook_options={'in_memory': True})
     buf.seek(0)
     return buf
 
 
+def generate_xlsx_file(headers, rows, *, tz=None, column_formats=None):
+    """Generate an XLSX file in a temporary file.
+
+    Unlike `generate_xlsx`, this uses the ``constant_memory`` mode of
+    xlsxwriter, which writes each row to disk as soon as the next one
+    starts, so `rows` can be a generator and the memory usage does not
+    depend on the number of rows.
+
+    :param headers: a list of cell captions
+    :param rows: an iterable of dicts mapping captions to values
+    :param tz: the timezone for the values that are datetime objects
+    :param column_formats: optional mapping of header keys to Excel number formats
+    :return: an anonymous temporary file containing the XLSX data
+    """
+    file = TemporaryFile(dir=config.TEMP_DIR)  # noqa: SIM115
+    try:
+        _write_xlsx(file, headers, rows, tz=tz, column_formats=column_formats,
+                    workbook_options={'constant_memory': True, 'tmpdir': config.TEMP_DIR})
+    except Exception:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
 def send_csv(filename, headers, rows, *, include_header=True):
     """Send a CSV file to the client.
 
     :param filename: The name of the CSV file
     :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
+    :param rows: an iterable of dicts mapping captions to values; it is
+                 only consumed while the response is being sent
     :param include_header: whether to include a header in the data
-    :return: a flask response containing the CSV data
+    :return: a flask response streaming the CSV data
     """
-    buf = generate_csv(headers, rows, include_header=include_header)
-    return send_file(filename, buf, 'text/csv', inline=False)
+    return send_stream(filename, iter_csv(headers, rows, include_header=include_header), 'text/csv', inline=False)
 
 
 def send_xlsx(filename, headers, rows, *, tz=None, column_formats=None):
@@ -210,10 +263,10 @@ def send_xlsx(filename, headers, rows, *, tz=None, column_formats=None):
 
     :param filename: The name of the CSV file
     :param headers: a list of cell captions
-    :param rows: a list of dicts mapping captions to values
+    :param rows: an iterable of dicts mapping captions to values
     :param tz: the timezone for the values that are datetime objects
     :param column_formats: optional mapping of header keys to Excel number formats
     :return: a flask response containing the XLSX data
     """
-    buf = generate_xlsx(headers, rows, tz=tz, column_formats=column_formats)
-    return send_file(filename, buf, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', inline=False)
+    file = generate_xlsx_file(headers, rows, tz=tz, column_formats=column_formats)
+    return send_file(filename, file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', inline=False)
@@ -9,7 +9,7 @@ import textwrap
 
 import pytest
 
-from indico.util.spreadsheets import generate_csv
+from indico.util.spreadsheets import generate_csv, iter_csv
 
 
 def test_generate_csv():
@@ -51,3 +51,15 @@ def test_generate_csv_malicious(value, expected):
     rows = [{'foo': value, 'bar': ''}]
     csv = generate_csv(headers, rows).read().decode('utf-8-sig').strip().splitlines()
     assert csv == ['foo,bar', f'{expected},']
+
+
+def test_iter_csv():
+    headers = ['foo', 'bar']
+    rows = [{'bar': i, 'foo': 'hello'} for i in range(100)]
+    chunks = list(iter_csv(headers, (row for row in rows), chunk_size=50))
+    assert len(chunks) > 10
+    assert all(len(chunk) < 70 for chunk in chunks)
+    assert b''.join(chunks) == generate_csv(headers, rows).read()
+    csv = b''.join(chunks).decode('utf-8-sig').splitlines()
+    assert csv[:3] == ['foo,bar', 'hello,0', 'hello,1']
+    assert len(csv) == 101
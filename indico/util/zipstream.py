@@ -0,0 +1,117 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import time
+from zipfile import ZIP64_LIMIT, ZIP_STORED, ZipFile, ZipInfo
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _ZipOutput:
+    """A write-only, unseekable file object buffering the zip output.
+
+    Since it does not support ``tell()`` and ``seek()``, :class:`~zipfile.ZipFile`
+    writes data descriptors after each member instead of going back to patch
+    the local file headers, so everything written can be handed out right away.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamEntry:
+    """A file to be written to a streamed zip archive.
+
+    :param name: The path of the file inside the archive
+    :param opener: A callable returning a file-like object (which is
+                   used as a context manager) with the file contents
+    :param size: The size of the file if known.  Files larger than 4 GB
+                 need ZIP64 extensions which are always enabled if the
+                 size is not known.
+    :param date_time: The modification time of the file as a ``time``
+                      tuple; defaults to the current time
+    """
+
+    def __init__(self, name, opener, size=None, date_time=None):
+        self.name = name
+        self.opener = opener
+        self.size = size
+        self.date_time = date_time or time.localtime(time.time())[:6]
+
+    def __repr__(self):
+        return f'<ZipStreamEntry({self.name!r}, {self.size})>'
+
+
+def iter_zip_stream(entries, chunk_size=CHUNK_SIZE):
+    """Generate a zip archive chunk by chunk.
+
+    The files are read from the objects returned by the entry openers
+    and never written to disk, so memory usage stays bounded by the
+    chunk size no matter how large the archive is.
+
+    :param entries: An iterable of :class:`ZipStreamEntry` objects
+    :param chunk_size: The size of the chunks read from the files
+    :return: An iterator yielding the archive as bytestrings
+    """
+    output = _ZipOutput()
+    with ZipFile(output, 'w', compression=ZIP_STORED, allowZip64=True) as zip_file:
+        for entry in entries:
+            info = ZipInfo(entry.name, date_time=entry.date_time)
+            info.compress_type = ZIP_STORED
+            force_zip64 = entry.size is None or entry.size >= ZIP64_LIMIT
+            if entry.size is not None:
+                info.file_size = entry.size
+            with entry.opener() as src, zip_file.open(info, 'w', force_zip64=force_zip64) as dest:
+                while chunk := src.read(chunk_size):
+                    dest.write(chunk)
+                    if data := output.drain():
+                        yield data
+            if data := output.drain():
+                yield data
+    if data := output.drain():
+        yield data
+
+
+class IterableReader:
+    """Wrap an iterable of bytestrings in a read-only file-like object.
+
+    This allows passing a stream (e.g. from :func:`iter_zip_stream`) to
+    code expecting a file object, such as the storage backends.
+    """
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._buffer + b''.join(self._iterator)
+            self._buffer = b''
+            return data
+        while len(self._buffer) < size:
+            try:
+                self._buffer += next(self._iterator)
+            except StopIteration:
+                break
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readable(self):
+        return True
@@ -0,0 +1,62 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import os
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+
+from indico.util.zipstream import IterableReader, ZipStreamEntry, iter_zip_stream
+
+
+FILES = {
+    'empty.txt': b'',
+    'foo/bar.txt': b'hello world',
+    'foo/random.bin': os.urandom(300000),
+}
+
+
+def _make_entries(known_size):
+    return [ZipStreamEntry(name, lambda data=data: BytesIO(data), len(data) if known_size else None)
+            for name, data in FILES.items()]
+
+
+@pytest.mark.parametrize('known_size', (True, False))
+def test_iter_zip_stream(known_size):
+    chunks = list(iter_zip_stream(_make_entries(known_size), chunk_size=1024))
+    assert len(chunks) > len(FILES)
+    assert all(chunks)
+    # nothing is buffered beyond a single chunk of file data plus the zip headers
+    assert max(len(chunk) for chunk in chunks) < 2048
+    with ZipFile(BytesIO(b''.join(chunks))) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == list(FILES)
+        for name, data in FILES.items():
+            assert zip_file.read(name) == data
+
+
+def test_iter_zip_stream_no_files():
+    with ZipFile(BytesIO(b''.join(iter_zip_stream([])))) as zip_file:
+        assert zip_file.namelist() == []
+
+
+def test_iterable_reader():
+    reader = IterableReader([b'foo', b'', b'barbaz', b'x'])
+    assert reader.read(2) == b'fo'
+    assert reader.read(4) == b'obar'
+    assert reader.read() == b'bazx'
+    assert reader.read(10) == b''
+
+
+def test_iterable_reader_zip_stream():
+    reader = IterableReader(iter_zip_stream(_make_entries(False)))
+    buf = BytesIO()
+    while chunk := reader.read(4096):
+        buf.write(chunk)
+    with ZipFile(buf) as zip_file:
+        assert zip_file.read('foo/random.bin') == FILES['foo/random.bin']
@@ -5,12 +5,48 @@
 # modify it under the terms of the MIT License; see the
 # LICENSE file for more details.
 
+import re
 import time
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
 
-from flask import g, request_started
+from flask import current_app, g, has_app_context, request, request_started, request_tearing_down
 from sqlalchemy.engine import Engine
 from sqlalchemy.event import listens_for
 
+from indico.core.config import config
+
+
+#: The kinds of work whose duration is tracked besides SQL queries
+TIMERS = ('jinja', 'redis', 'marshmallow')
+#: How often the same statement may be executed during a single request
+#: before it is reported as a N+1 query pattern
+N_PLUS_ONE_THRESHOLD = 10
+#: The size (in seconds) of a time bucket in the per-endpoint statistics
+ENDPOINT_STATS_BUCKET_SIZE = 3600
+#: The number of buckets covered by the per-endpoint statistics
+ENDPOINT_STATS_BUCKETS = 24
+#: The metrics collected for each endpoint
+ENDPOINT_METRICS = ('requests', 'duration', 'query_count', 'query_duration', 'query_rows', *TIMERS,
+                    'n_plus_one_requests')
+
+_placeholder_re = re.compile(r'%\(\w+\)s')
+_placeholder_list_re = re.compile(r'\(\?(?:, \?)*\)')
+_whitespace_re = re.compile(r'\s+')
+
+
+def get_statement_fingerprint(statement):
+    """Normalize an SQL statement so equivalent queries can be grouped.
+
+    Parameters are replaced with placeholders and lists of parameters (e.g.
+    in ``IN`` criteria) are collapsed, so the same query with different
+    arguments always results in the same fingerprint.
+    """
+    statement = _whitespace_re.sub(' ', statement).strip()
+    statement = _placeholder_re.sub('?', statement)
+    return _placeholder_list_re.sub('(...)', statement)
+
 
 def request_stats_request_started():
     if g.get('request_stats_initialized'):
@@ -18,14 +54,46 @@ def request_stats_request_started():
     g.request_stats_initialized = True
     g.query_count = 0
     g.query_duration = 0
+    g.query_rows = 0
+    g.query_fingerprints = {}
+    g.request_timers = dict.fromkeys(TIMERS, 0)
+    g.request_timer_depth = Counter()
     g.req_start_ts = time.time()
 
 
+@contextmanager
+def track_time(timer):
+    """Add the time spent in a block of code to the request statistics.
+
+    Nested blocks using the same timer are only counted once, so it is
+    safe to use this in code that may be called recursively.
+
+    :param timer: One of the names in `TIMERS`
+    """
+    if not has_app_context() or not g.get('request_stats_initialized'):
+        yield
+        return
+    depth = g.request_timer_depth
+    depth[timer] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        depth[timer] -= 1
+        if not depth[timer]:
+            g.request_timers[timer] += time.perf_counter() - start
+
+
 def setup_request_stats(app):
     @request_started.connect_via(app)
     def _request_started(sender, **kwargs):
         request_stats_request_started()
 
+    @request_tearing_down.connect_via(app)
+    def _request_tearing_down(sender, **kwargs):
+        if config.ENDPOINT_STATS and g.get('request_stats_initialized') and request.endpoint:
+            _record_endpoint_stats(request.endpoint, get_request_stats())
+
     @listens_for(Engine, 'before_cursor_execute', named=True)
     def before_cursor_execute(context, **unused):
         if not g.get('request_stats_initialized'):
@@ -33,12 +101,20 @@ def setup_request_stats(app):
         context._query_start_time = time.time()
 
     @listens_for(Engine, 'after_cursor_execute', named=True)
-    def after_cursor_execute(context, **unused):
+    def after_cursor_execute(context, cursor, statement, **unused):
         if not g.get('request_stats_initialized'):
             return
         total = time.time() - context._query_start_time
+        rows = max(cursor.rowcount, 0)
         g.query_count += 1
         g.query_duration += total
+        g.query_rows += rows
+        if not config.ENDPOINT_STATS and not config.DEBUG:
+            # fingerprinting is only needed to detect N+1 query patterns
+            return
+        fingerprint = get_statement_fingerprint(statement)
+        count, duration, total_rows = g.query_fingerprints.get(fingerprint, (0, 0, 0))
+        g.query_fingerprints[fingerprint] = (count + 1, duration + total, total_rows + rows)
 
 
 def get_request_stats():
@@ -46,5 +122,127 @@ def get_request_stats():
     return {
         'query_count': g.query_count if initialized else 0,
         'query_duration': g.query_duration if initialized else 0,
-        'req_duration': (time.time() - g.req_start_ts) if initialized else 0
+        'query_rows': g.query_rows if initialized else 0,
+        'req_duration': (time.time() - g.req_start_ts) if initialized else 0,
+        'timers': dict(g.request_timers) if initialized else dict.fromkeys(TIMERS, 0),
+        'n_plus_one': get_n_plus_one_queries() if initialized else [],
+    }
+
+
+def get_query_stats():
+    """Get the statistics for each distinct statement of the current request.
+
+    :return: A list of ``(fingerprint, count, duration, rows)`` tuples,
+             ordered by total duration
+    """
+    if not g.get('request_stats_initialized'):
+        return []
+    stats = [(fingerprint, *data) for fingerprint, data in g.query_fingerprints.items()]
+    return sorted(stats, key=itemgetter(2), reverse=True)
+
+
+def get_n_plus_one_queries(threshold=N_PLUS_ONE_THRESHOLD):
+    """Get the statements of the current request that look like N+1 queries.
+
+    Statements are only tracked when the ``ENDPOINT_STATS`` config
+    setting or debug mode is enabled.
+
+    :param threshold: How often a statement must have been executed
+    :return: A list of ``(fingerprint, count)`` tuples
+    """
+    return [(fingerprint, count) for fingerprint, count, __, __ in get_query_stats() if count > threshold]
+
+
+def _get_endpoint_stats_key(bucket, kind='stats'):
+    return f"{current_app.config.get('CACHE_KEY_PREFIX', '')}endpoint-{kind}:{bucket}"
+
+
+def _record_endpoint_stats(endpoint, stats):
+    from redis import RedisError
+
+    from indico.core.cache import get_redis_client
+    bucket = int(time.time() // ENDPOINT_STATS_BUCKET_SIZE)
+    ttl = ENDPOINT_STATS_BUCKET_SIZE * (ENDPOINT_STATS_BUCKETS + 1)
+    stats_key = _get_endpoint_stats_key(bucket)
+    values = {
+        'requests': 1,
+        'duration': stats['req_duration'],
+        'query_count': stats['query_count'],
+        'query_duration': stats['query_duration'],
+        'query_rows': stats['query_rows'],
+        **stats['timers'],
+        'n_plus_one_requests': int(bool(stats['n_plus_one'])),
+    }
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        for metric, value in values.items():
+            if value:
+                pipe.hincrbyfloat(stats_key, f'{endpoint}|{metric}', value)
+        pipe.expire(stats_key, ttl)
+        if stats['n_plus_one']:
+            n_plus_one_key = _get_endpoint_stats_key(bucket, 'n-plus-one')
+            for fingerprint, count in stats['n_plus_one']:
+                pipe.hincrby(n_plus_one_key, f'{endpoint}|{fingerprint}', count)
+            pipe.expire(n_plus_one_key, ttl)
+        pipe.execute()
+    except RedisError:
+        from indico.core.logger import Logger
+        Logger.get('requests').exception('Could not record endpoint stats')
+
+
+def get_endpoint_stats():
+    """Get the aggregated statistics of all endpoints.
+
+    The statistics cover the last `ENDPOINT_STATS_BUCKETS` hours and are
+    only collected when the ``ENDPOINT_STATS`` config setting is enabled.
+
+    :return: A dict mapping endpoint names to dicts containing the
+             metrics and the statements which were executed more than
+             `N_PLUS_ONE_THRESHOLD` times in a request, along with the
+             total number of executions of each such statement
+    """
+    from indico.core.cache import get_redis_client
+    current_bucket = int(time.time() // ENDPOINT_STATS_BUCKET_SIZE)
+    buckets = range(current_bucket - ENDPOINT_STATS_BUCKETS + 1, current_bucket + 1)
+    pipe = get_redis_client().pipeline(transaction=False)
+    for bucket in buckets:
+        pipe.hgetall(_get_endpoint_stats_key(bucket))
+        pipe.hgetall(_get_endpoint_stats_key(bucket, 'n-plus-one'))
+    results = pipe.execute()
+    endpoints = {}
+    for bucket_stats, bucket_n_plus_one in zip(results[::2], results[1::2], strict=True):
+        for field, value in bucket_stats.items():
+            endpoint, metric = field.decode().rsplit('|', 1)
+            data = endpoints.setdefault(endpoint, {'metrics': dict.fromkeys(ENDPOINT_METRICS, 0), 'n_plus_one': {}})
+            data['metrics'][metric] += float(value)
+        for field, value in bucket_n_plus_one.items():
+            endpoint, fingerprint = field.decode().split('|', 1)
+            data = endpoints.setdefault(endpoint, {'metrics': dict.fromkeys(ENDPOINT_METRICS, 0), 'n_plus_one': {}})
+            data['n_plus_one'][fingerprint] = data['n_plus_one'].get(fingerprint, 0) + int(value)
+    return endpoints
+
+
+def format_endpoint_stats_prometheus(endpoint_stats):
+    """Format endpoint statistics in the Prometheus text format.
+
+    :param endpoint_stats: The data returned by `get_endpoint_stats`
+    """
+    descriptions = {
+        'requests': 'Number of requests',
+        'duration': 'Total time spent handling requests in seconds',
+        'query_count': 'Number of SQL queries',
+        'query_duration': 'Total time spent in SQL queries in seconds',
+        'query_rows': 'Number of rows returned by SQL queries',
+        'jinja': 'Total time spent rendering templates in seconds',
+        'redis': 'Total time spent in redis commands in seconds',
+        'marshmallow': 'Total time spent serializing data with marshmallow in seconds',
+        'n_plus_one_requests': 'Number of requests containing N+1 query patterns',
     }
+    lines = []
+    for metric in ENDPOINT_METRICS:
+        name = f'indico_endpoint_{metric}'
+        lines.append(f'# HELP {name} {descriptions[metric]} (last {ENDPOINT_STATS_BUCKETS} hours)')
+        lines.append(f'# TYPE {name} gauge')
+        for endpoint, data in sorted(endpoint_stats.items()):
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {data["metrics"][metric]:g}')
+    return '\n'.join(lines) + '\n'
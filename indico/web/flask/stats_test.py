@@ -0,0 +1,63 @@
+# This file is part of Indico.
+# Copyright (C) 2002 - 2026 CERN
+#
+# Indico is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see the
+# LICENSE file for more details.
+
+import time
+
+import pytest
+from sqlalchemy import text
+
+from indico.web.flask.stats import (get_n_plus_one_queries, get_request_stats, get_statement_fingerprint,
+                                    request_stats_request_started, track_time)
+
+
+def test_get_statement_fingerprint():
+    assert get_statement_fingerprint('SELECT * FROM foo\n  WHERE id = %(id_1)s') == 'SELECT * FROM foo WHERE id = ?'
+    assert (get_statement_fingerprint('SELECT * FROM foo WHERE id IN (%(id_1_1)s, %(id_1_2)s)') ==
+            get_statement_fingerprint('SELECT * FROM foo WHERE id IN (%(id_1_1)s)') ==
+            'SELECT * FROM foo WHERE id IN (...)')
+
+
+@pytest.mark.usefixtures('request_context')
+def test_track_time():
+    request_stats_request_started()
+    with track_time('jinja'):
+        time.sleep(0.01)
+        # nested blocks must not be counted twice
+        with track_time('jinja'):
+            time.sleep(0.01)
+    timers = get_request_stats()['timers']
+    assert 0.02 <= timers['jinja'] < 0.04
+    assert timers['redis'] == 0
+
+
+def test_track_time_no_request(app):
+    with app.app_context(), track_time('jinja'):
+        pass
+
+
+@pytest.mark.usefixtures('request_context')
+def test_n_plus_one_queries(db, create_user, patch_indico_config):
+    patch_indico_config('ENDPOINT_STATS', True)
+    user_ids = [create_user(i).id for i in range(1, 6)]
+    request_stats_request_started()
+    for user_id in user_ids:
+        db.session.execute(text('SELECT * FROM users.users WHERE id = :id'), {'id': user_id}).all()
+    db.session.execute(text('SELECT 1')).all()
+    assert get_n_plus_one_queries(threshold=4) == [('SELECT * FROM users.users WHERE id = ?', 5)]
+    assert get_n_plus_one_queries(threshold=5) == []
+    assert get_request_stats()['query_rows'] == 6
+
+
+@pytest.mark.usefixtures('request_context')
+def test_n_plus_one_queries_disabled(db, patch_indico_config):
+    patch_indico_config('ENDPOINT_STATS', False)
+    patch_indico_config('DEBUG', False)
+    request_stats_request_started()
+    for __ in range(5):
+        db.session.execute(text('SELECT 1')).all()
+    assert get_n_plus_one_queries(threshold=4) == []
+    assert get_request_stats()['query_count'] == 5
@@ -16,7 +16,7 @@ from dateutil.relativedelta import relativedelta
 from flask import current_app
 from flask_pluginengine.templating import PluginEnvironment
 from flask_pluginengine.util import get_state
-from jinja2 import pass_environment
+from jinja2 import Template, pass_environment
 from jinja2.filters import _GroupTuple, make_attrgetter
 from jinja2.loaders import BaseLoader, FileSystemLoader, TemplateNotFound, split_template_path
 from jinja2.runtime import StrictUndefined
@@ -26,6 +26,7 @@ from markupsafe import Markup
 from indico.core import signals
 from indico.util.signals import values_from_signal
 from indico.util.string import natural_sort_key, render_markdown
+from indico.web.flask.stats import track_time
 
 
 indentation_re = re.compile(r'^ +', re.MULTILINE)
@@ -313,7 +314,15 @@ class SemiStrictUndefined(StrictUndefined):
         return not self.__eq__(other)
 
 
+class IndicoTemplate(Template):
+    def render(self, *args, **kwargs):
+        with track_time('jinja'):
+            return super().render(*args, **kwargs)
+
+
 class IndicoEnvironment(PluginEnvironment):
+    template_class = IndicoTemplate
+
     def getattr(self, obj, attribute):
         rv = super().getattr(obj, attribute)
         if isinstance(rv, StrictUndefined):
@@ -9,11 +9,13 @@ import inspect
 import os
 import re
 import secrets
+import unicodedata
 from importlib import import_module
-from urllib.parse import urlsplit
+from urllib.parse import quote, urlsplit
 
-from flask import Blueprint, current_app, g, has_request_context, redirect, request
+from flask import Blueprint, Response, current_app, g, has_request_context, redirect, request
 from flask import send_file as _send_file
+from flask import stream_with_context
 from flask import url_for as _url_for
 from flask.helpers import get_root_path
 from flask_cors import cross_origin
@@ -323,6 +325,39 @@ def send_file(name, path_or_fd, mimetype, *, last_modified=None, no_cache=True,
     return rv
 
 
+def send_stream(name, iterable, mimetype, *, inline=None, safe=True, content_length=None):
+    """Send a file that is generated while it is being sent.
+
+    Unlike :func:`send_file`, this does not need the whole file to exist
+    before sending it, so the memory/disk usage does not depend on the
+    size of the file.  The request context is kept alive until the
+    iterable has been consumed, so it may still access the database.
+
+    `name`, `mimetype`, `inline` and `safe` behave like in :func:`send_file`.
+    `iterable` is an iterable yielding the file's content as bytes.
+    `content_length` can be set if the size of the file is known in advance.
+    """
+    name = re.sub(r'\s+', ' ', name).strip()
+    assert '/' in mimetype
+    inline = should_inline_file(mimetype, inline, safe=safe)
+    rv = Response(stream_with_context(iterable), mimetype=mimetype, direct_passthrough=True)
+    try:
+        name.encode('ascii')
+    except UnicodeEncodeError:
+        simple_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple_name, 'filename*': "UTF-8''{}".format(quote(name, safe='!#$&+-.^_`|~'))}
+    else:
+        names = {'filename': name}
+    rv.headers.set('Content-Disposition', 'inline' if inline else 'attachment', **names)
+    if content_length is not None:
+        rv.content_length = content_length
+    if safe:
+        rv.headers.add('Content-Security-Policy', get_safe_file_csp())
+    rv.cache_control.private = True
+    rv.cache_control.no_cache = True
+    return rv
+
+
 def endpoint_for_url(url, base_url=None):
     if base_url is None:
         base_url = config.BASE_URL
@@ -26,6 +26,8 @@ from indico.core.logger import Logger
 from indico.core.oauth import require_oauth
 from indico.modules.api import APIMode, api_settings
 from indico.modules.api.models.keys import APIKey
+from indico.modules.events.last_modified import (get_validators, is_not_modified, make_not_modified_response,
+                                                 set_validators)
 from indico.util.signals import make_interceptable
 from indico.web.http_api import HTTPAPIHook
 from indico.web.http_api.metadata.serializer import Serializer
@@ -99,6 +101,19 @@ def checkAK(apiKey, signature, timestamp, path, query):
     return ak, onlyPublic
 
 
+def _get_validators(hook, user, cache_key):
+    """Get the ETag and Last-Modified values for a request, if supported by the hook."""
+    ttl = api_settings.get('cache_ttl')
+    if request.method != 'GET' or ttl <= 0:
+        return None
+    if (last_modified := hook.get_last_modified(user)) is None:
+        return None
+    # the validators change after the cache ttl even if nothing was modified, since
+    # not all changes (e.g. group memberships) are tracked and relative dates in the
+    # query string (e.g. `from=today`) do not always refer to the same date
+    return get_validators(cache_key, last_modified, lifetime=ttl)
+
+
 @make_interceptable
 def handler(prefix, path):
     path = posixpath.join('/', prefix, path)
@@ -149,6 +164,8 @@ def handler(prefix, path):
     status_code = None
     is_response = False
     cached = False
+    not_modified = False
+    validators = None
     try:
         used_session = None
         if cookieAuth:
@@ -213,14 +230,17 @@ def handler(prefix, path):
 
         addToCache = not hook.NO_CACHE
         cacheKey = RE_REMOVE_EXTENSION.sub('', cacheKey)
-        if not noCache:
+        validators = _get_validators(hook, user, cacheKey)
+        if validators and is_not_modified(*validators):
+            not_modified = True
+        elif not noCache:
             obj = API_CACHE.get(cacheKey)
             if obj is not None:
                 result, extra, ts, complete, typeMap = obj
                 addToCache = False
                 cached = True
         g.current_api_user = user
-        if result is None:
+        if result is None and not not_modified:
             # Perform the actual exporting
             res = hook(user)
             if isinstance(res, current_app.response_class):
@@ -240,7 +260,7 @@ def handler(prefix, path):
         if e.code:
             status_code = e.code
 
-    if result is None and error is None:
+    if result is None and error is None and not not_modified:
         raise NotFound
     else:
         if ak and error is None:
@@ -257,11 +277,17 @@ def handler(prefix, path):
         # Log successful api requests
         if error is None:
             log_path = f'{path}?{query}' if query else path
-            if cached:
+            if not_modified:
+                logger.info('%s %s [IP=%s] (not modified)', request.method, log_path, request.remote_addr)
+            elif cached:
                 logger.info('%s %s [IP=%s] (cached)', request.method, log_path, request.remote_addr)
             else:
                 logger.info('%s %s [IP=%s]', request.method, log_path, request.remote_addr)
+        if not_modified:
+            return make_not_modified_response(*validators)
         if is_response:
+            if validators:
+                set_validators(result, *validators)
             return result
         serializer = Serializer.create(dformat, query_params=queryParams, pretty=pretty, typeMap=typeMap,
                                        **hook.serializer_args)
@@ -283,6 +309,8 @@ def handler(prefix, path):
                 response.content_type = content_type
             if status_code:
                 response.status_code = status_code
+            elif validators:
+                set_validators(response, *validators)
             return response
         except Exception:
             logger.exception('Serialization error in request %s?%s', path, query)
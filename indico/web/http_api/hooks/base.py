@@ -136,6 +136,15 @@ class HTTPAPIHook:
     def _has_access(self, user):
         return True
 
+    def get_last_modified(self, user):
+        """Get the time the exported data was last modified.
+
+        Hooks that can determine this without performing the export
+        should return a UNIX timestamp; it is used to send a `304 Not
+        Modified` response to clients which already have the current data.
+        """
+        return None
+
     @property
     def serializer_args(self):
         return {}